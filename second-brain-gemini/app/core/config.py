@@ -59,13 +59,15 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-# Debug: Print WhatsApp provider configuration on startup
-print(f"\n{'='*60}")
-print(f"📱 WhatsApp Provider Configuration")
-print(f"{'='*60}")
-print(f"Provider: Meta Cloud API")
-print(f"Meta configured: {bool(settings.whatsapp_cloud_api_token and settings.whatsapp_phone_number_id)}")
-print(f"  - WHATSAPP_CLOUD_API_TOKEN: {'✅' if settings.whatsapp_cloud_api_token else '❌'}")
-print(f"  - WHATSAPP_PHONE_NUMBER_ID: {'✅' if settings.whatsapp_phone_number_id else '❌'}")
-print(f"  - WHATSAPP_VERIFY_TOKEN: {'✅' if settings.whatsapp_verify_token else '❌'}")
-print(f"{'='*60}\n")
+
+def log_whatsapp_config():
+    """Debug: Print WhatsApp provider configuration (called from app startup)."""
+    print(f"\n{'='*60}")
+    print(f"📱 WhatsApp Provider Configuration")
+    print(f"{'='*60}")
+    print(f"Provider: Meta Cloud API")
+    print(f"Meta configured: {bool(settings.whatsapp_cloud_api_token and settings.whatsapp_phone_number_id)}")
+    print(f"  - WHATSAPP_CLOUD_API_TOKEN: {'✅' if settings.whatsapp_cloud_api_token else '❌'}")
+    print(f"  - WHATSAPP_PHONE_NUMBER_ID: {'✅' if settings.whatsapp_phone_number_id else '❌'}")
+    print(f"  - WHATSAPP_VERIFY_TOKEN: {'✅' if settings.whatsapp_verify_token else '❌'}")
+    print(f"{'='*60}\n")
@@ -8,7 +8,7 @@ from fastapi.datastructures import FormData
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse, RedirectResponse, Response, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 import tempfile
 import os
 import io
@@ -19,12 +19,17 @@ from datetime import datetime
 from collections import deque
 from threading import Lock
 
-from app.core.config import settings
-from app.services.gemini_service import gemini_service
+from app.core.config import settings, log_whatsapp_config
 from app.services.pdf_service import pdf_service
 from app.services.whatsapp_provider import WhatsAppProviderFactory
-from app.services.drive_memory_service import DriveMemoryService
-from app.services.conversation_engine import conversation_engine
+from app.services.service_registry import register, service, build as build_service
+from app.services.tool_cache import tool_cache
+from app.services.response_streamer import STREAM_REPLIES, StreamingReply, get_streaming_metrics
+
+# Heavy singletons (google.generativeai, model discovery, OAuth) are lazy proxies —
+# built on first use or by the background warm-up in startup_event.
+gemini_service = service("gemini_service")
+conversation_engine = service("conversation_engine")
 
 # Initialize WhatsApp provider based on configuration
 whatsapp_provider = WhatsAppProviderFactory.create_provider()
@@ -38,23 +43,30 @@ else:
     print(f"   Config setting: {settings.whatsapp_provider}")
     print(f"   Available providers: {WhatsAppProviderFactory.get_available_providers()}")
 
-# Initialize Drive Memory Service
-drive_memory_service = DriveMemoryService()
-if drive_memory_service.is_configured:
-    print(f"✅ Drive Memory Service initialized")
-    print(f"   Memory folder ID: {drive_memory_service.folder_id}")
-else:
-    print(f"⚠️  Drive Memory Service not configured (DRIVE_MEMORY_FOLDER_ID not set)")
-
-# Initialize Speaker Identity Service (Speaker Identity Graph)
-try:
-    from app.services.speaker_identity_service import speaker_identity_service
-    speaker_identity_service.initialize(drive_memory_service)
-    stats = speaker_identity_service.get_stats()
-    print(f"🎤 Speaker Identity Service initialized: {stats['total_people']} people, "
-          f"{stats['total_voice_profiles']} voice profiles")
-except Exception as sig_init_err:
-    print(f"⚠️  Speaker Identity Service init failed (non-fatal): {sig_init_err}")
+# Initialize Drive Memory Service (lazy — OAuth refresh happens on first use)
+def _build_drive_memory_service():
+    from app.services.drive_memory_service import DriveMemoryService
+    instance = DriveMemoryService()
+    if instance.is_configured:
+        print(f"✅ Drive Memory Service initialized")
+        print(f"   Memory folder ID: {instance.folder_id}")
+    else:
+        print(f"⚠️  Drive Memory Service not configured (DRIVE_MEMORY_FOLDER_ID not set)")
+    return instance
+
+drive_memory_service = register("drive_memory_service", _build_drive_memory_service)
+
+
+def _init_speaker_identity_service():
+    """Initialize Speaker Identity Service (Speaker Identity Graph) — loads from Drive."""
+    try:
+        from app.services.speaker_identity_service import speaker_identity_service
+        speaker_identity_service.initialize(drive_memory_service)
+        stats = speaker_identity_service.get_stats()
+        print(f"🎤 Speaker Identity Service initialized: {stats['total_people']} people, "
+              f"{stats['total_voice_profiles']} voice profiles")
+    except Exception as sig_init_err:
+        print(f"⚠️  Speaker Identity Service init failed (non-fatal): {sig_init_err}")
 
 # Check pyannote availability — LIGHTWEIGHT check only (no torch/CUDA import)
 # Heavy imports (torch, pyannote.audio) are deferred to first audio processing
@@ -80,8 +92,13 @@ _processed_media_ids = deque(maxlen=500)
 # Local file is a fast cache; Drive is the durable backing store.
 _PENDING_ID_FILE = Path(__file__).parent.parent / ".pending_identifications.json"
 
-def _load_pending_identifications() -> dict:
-    """Load pending identifications from disk (fast) or Drive (durable fallback)."""
+def _load_pending_identifications(allow_drive: bool = True) -> dict:
+    """
+    Load pending identifications from disk (fast) or Drive (durable fallback).
+    
+    At import time only the local file is read (allow_drive=False); the Drive
+    fallback runs from startup_event so importing the app never hits the network.
+    """
     # First try local file (fast, works within same container lifecycle)
     try:
         if _PENDING_ID_FILE.exists():
@@ -93,6 +110,9 @@ def _load_pending_identifications() -> dict:
     except Exception as e:
         print(f"⚠️  Failed to load pending identifications from local file: {e}")
     
+    if not allow_drive:
+        return {}
+    
     # Fallback: load from Google Drive (survives container restarts)
     try:
         if drive_memory_service and drive_memory_service.is_configured:
@@ -133,7 +153,7 @@ def _save_pending_identifications():
     except Exception as e:
         print(f"⚠️  Failed to save pending identifications to Drive: {e}")
 
-pending_identifications = _load_pending_identifications()
+pending_identifications = _load_pending_identifications(allow_drive=False)
 
 # Voice Map: Persistent mapping of Speaker ID -> Real Name
 # This is stored in Drive Memory as part of user_profile
@@ -602,88 +622,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ================================================================
+# STARTUP WARM-UP TASKS (run by startup_orchestrator as a DAG)
+# ================================================================
+
+def _warm_memory_cache():
+    """Pre-warm the Drive memory cache."""
+    if drive_memory_service.is_configured:
+        print("🔥 Pre-warming memory cache...")
+        drive_memory_service.preload_memory()
+    else:
+        print("⚠️  Skipping memory cache pre-warm (Drive Memory Service not configured)")
+
+
+def _warm_pending_identifications():
+    """Recover pending voice identifications from Drive after a container restart."""
+    if not pending_identifications:
+        pending_identifications.update(_load_pending_identifications())
+
+
+def _warm_knowledge_base():
+    """IDENTITY CONTEXT VERIFICATION: Pre-load KB and print summary."""
+    from app.services.knowledge_base_service import (
+        load_context, load_snapshot, revalidate_in_background, get_identity_context_summary
+    )
+    
+    print("\n📚 ══════════════════════════════════════════════")
+    print("📚  IDENTITY CONTEXT INITIALIZATION")
+    print("📚 ══════════════════════════════════════════════")
+    
+    # Fast path: restore the last snapshot, then re-sync with Drive in the background
+    if load_snapshot():
+        def _on_kb_changed():
+            if conversation_engine._initialized:
+                conversation_engine.refresh_system_instruction()
+        
+        revalidate_in_background(on_change=_on_kb_changed)
+    
+    kb_context = load_context()
+    summary = get_identity_context_summary()
+    
+    if kb_context:
+        print(f"✅ {summary}")
+    else:
+        print("⚠️  Identity Context: No data loaded (KB empty or not configured)")
+    
+    print("📚 ══════════════════════════════════════════════\n")
+
+
+def _init_conversation_engine():
+    """
+    CONVERSATION ENGINE: Initialize LLM-First engine with tools.
+    Phase 1: Load user profile from memory → inject into CE
+    Phase 2B: Pass drive_memory_service reference for search_meetings
+    """
+    user_profile = {}
+    try:
+        memory = drive_memory_service.get_memory()
+        user_profile = memory.get("user_profile", {})
+        if user_profile:
+            # Debug: Print full profile (excluding chat_history) so we can verify data
+            import json as startup_json
+            profile_preview = {
+                k: v for k, v in user_profile.items()
+                if k != "chat_history"
+            }
+            print(f"👤 [Profile] Loaded user profile: {list(user_profile.keys())}")
+            print(f"👤 [Profile] Full content (excl. chat_history):")
+            print(startup_json.dumps(profile_preview, ensure_ascii=False, indent=2)[:2000])
+        else:
+            print("ℹ️  [Profile] No user profile found in memory")
+    except Exception as profile_err:
+        print(f"⚠️  [Profile] Could not load user profile: {profile_err}")
+
+    conversation_engine.initialize(
+        user_profile=user_profile,
+        drive_memory_service=drive_memory_service
+    )
+    print("✅ [ConvEngine] Conversation Engine ready — LLM-First architecture active")
+    if user_profile:
+        print(f"   📋 Profile injected: {', '.join(k for k in user_profile.keys() if k != 'chat_history')}")
+    print(f"   🔧 Tools: search_person, get_reports, save_fact, list_org_stats, search_meetings, search_notebook, search_flights")
+
+
+def _load_pyannote_models():
+    """Preload pyannote models; _ensure_models reports failure by returning False."""
+    from app.services import pyannote_service
+    if not pyannote_service._ensure_models():
+        raise RuntimeError("pyannote models failed to load (see log above)")
+
+
 # Startup event: Pre-warm memory cache
 @app.on_event("startup")
 async def startup_event():
-    """Pre-warm memory cache, start scheduler, and send deployment notification."""
+    """Launch the warm-up DAG, start scheduler, and send deployment notification."""
     
     # Read version
     version_file = Path(__file__).parent.parent / "VERSION"
     current_version = version_file.read_text().strip() if version_file.exists() else "unknown"
     is_production = os.environ.get('RENDER', '') == 'true'
     print(f"{'🚀 Production' if is_production else '📍 Local'} — v{current_version}")
-    
-    # Pre-warm memory cache
-    try:
-        if drive_memory_service.is_configured:
-            print("🔥 Pre-warming memory cache...")
-            drive_memory_service.preload_memory()
-        else:
-            print("⚠️  Skipping memory cache pre-warm (Drive Memory Service not configured)")
-    except Exception as e:
-        print(f"⚠️  Memory cache pre-warm failed: {e}")
-    
-    # ================================================================
-    # IDENTITY CONTEXT VERIFICATION: Pre-load KB and print summary
-    # ================================================================
-    try:
-        from app.services.knowledge_base_service import load_context, get_identity_context_summary
-        
-        print("\n📚 ══════════════════════════════════════════════")
-        print("📚  IDENTITY CONTEXT INITIALIZATION")
-        print("📚 ══════════════════════════════════════════════")
-        
-        kb_context = load_context()
-        summary = get_identity_context_summary()
-        
-        if kb_context:
-            print(f"✅ {summary}")
-        else:
-            print("⚠️  Identity Context: No data loaded (KB empty or not configured)")
-        
-        print("📚 ══════════════════════════════════════════════\n")
-    except Exception as kb_init_error:
-        print(f"⚠️  Identity Context initialization error: {kb_init_error}")
-        import traceback
-        traceback.print_exc()
+    log_whatsapp_config()
     
     # ================================================================
-    # CONVERSATION ENGINE: Initialize LLM-First engine with tools
-    # Phase 1: Load user profile from memory → inject into CE
-    # Phase 2B: Pass drive_memory_service reference for search_meetings
+    # WARM-UP DAG: independent warm-ups run concurrently; /ready flips
+    # once the critical path (memory, KB, models, engine) has finished.
     # ================================================================
-    try:
-        user_profile = {}
-        try:
-            memory = drive_memory_service.get_memory()
-            user_profile = memory.get("user_profile", {})
-            if user_profile:
-                # Debug: Print full profile (excluding chat_history) so we can verify data
-                import json as startup_json
-                profile_preview = {
-                    k: v for k, v in user_profile.items()
-                    if k != "chat_history"
-                }
-                print(f"👤 [Profile] Loaded user profile: {list(user_profile.keys())}")
-                print(f"👤 [Profile] Full content (excl. chat_history):")
-                print(startup_json.dumps(profile_preview, ensure_ascii=False, indent=2)[:2000])
-            else:
-                print("ℹ️  [Profile] No user profile found in memory")
-        except Exception as profile_err:
-            print(f"⚠️  [Profile] Could not load user profile: {profile_err}")
-
-        conversation_engine.initialize(
-            user_profile=user_profile,
-            drive_memory_service=drive_memory_service
-        )
-        print("✅ [ConvEngine] Conversation Engine ready — LLM-First architecture active")
-        if user_profile:
-            print(f"   📋 Profile injected: {', '.join(k for k in user_profile.keys() if k != 'chat_history')}")
-        print(f"   🔧 Tools: search_person, get_reports, save_fact, list_org_stats, search_meetings, search_notebook, search_flights")
-    except Exception as ce_error:
-        print(f"⚠️  Conversation Engine initialization error: {ce_error}")
-        import traceback
-        traceback.print_exc()
+    from app.services.startup_orchestrator import startup_orchestrator
+    
+    startup_orchestrator.add("memory_cache", _warm_memory_cache)
+    startup_orchestrator.add("knowledge_base", _warm_knowledge_base)
+    startup_orchestrator.add("model_discovery", lambda: build_service("gemini_service"))
+    startup_orchestrator.add("conversation_engine", _init_conversation_engine,
+                             deps=["memory_cache", "knowledge_base", "model_discovery"])
+    startup_orchestrator.add("speaker_identity", _init_speaker_identity_service, critical=False)
+    startup_orchestrator.add("pending_identifications", _warm_pending_identifications, critical=False)
+    startup_orchestrator.add("expert_analysis", lambda: build_service("expert_analysis_service"),
+                             deps=["model_discovery"], critical=False)
+    startup_orchestrator.add("notebooklm", lambda: build_service("notebooklm_service"),
+                             deps=["model_discovery"], critical=False)
+    if os.environ.get("PYANNOTE_PRELOAD", "").lower() in ("1", "true", "yes") and _hf_token:
+        startup_orchestrator.add("pyannote_models", _load_pyannote_models, critical=False)
+    # Recordings queued before a restart resume once the pipeline's dependencies are warm
+    startup_orchestrator.add("audio_jobs", _start_audio_job_queue,
+                             deps=["memory_cache", "knowledge_base", "model_discovery"], critical=False)
+    startup_orchestrator.start()
     
     # Start the APScheduler for cron jobs
     try:
@@ -859,6 +922,16 @@ async def startup_event():
                 import traceback
                 traceback.print_exc()
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Checkpoint conversation sessions so the next container can rehydrate them."""
+    try:
+        if conversation_engine.is_built and conversation_engine.flush_sessions():
+            print("💾 [ConvEngine] Session checkpoint written on shutdown")
+    except Exception as e:
+        print(f"⚠️  Session checkpoint on shutdown failed: {e}")
+
 # Get the project root directory (parent of app/)
 _base_dir = Path(__file__).parent.parent.resolve()
 _static_dir = _base_dir / "static"
@@ -910,6 +983,22 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness gate: 503 until the critical warm-up path has finished,
+    and while a failed critical task is waiting for its background retry.
+    
+    /health answers as soon as the process is up (liveness); route traffic
+    on /ready. Body includes per-task status and timing.
+    """
+    from app.services.startup_orchestrator import startup_orchestrator
+    from app.services.service_registry import get_status as get_service_status
+    status = startup_orchestrator.get_status()
+    status["services"] = get_service_status()
+    return JSONResponse(status_code=200 if status["healthy"] else 503, content=status)
+
+
 @app.get("/version")
 async def get_version():
     """Get the current version number."""
@@ -924,14 +1013,41 @@ async def get_version():
 @app.get("/debug/engine-status")
 async def debug_engine_status():
     """Quick diagnostic for the conversation engine and NotebookLM."""
+    from app.services.file_registry import file_registry
+    from app.services.hedged_calls import get_latency_report
+    from app.services.meeting_search import meeting_search_service
+    from app.services.upload_poller import processing_model
     from app.services.notebooklm_service import notebooklm_service
+    from app.services.post_processing_queue import post_processing_queue
+    from app.services.audio_job_queue import audio_job_queue
     return {
         "initialized": conversation_engine._initialized,
         "model_name": conversation_engine._model_name if hasattr(conversation_engine, '_model_name') else "N/A",
         "model_set": conversation_engine._model is not None if hasattr(conversation_engine, '_model') else False,
         "system_instruction_len": len(conversation_engine._kb_system_instruction) if conversation_engine._kb_system_instruction else 0,
         "active_sessions": len(conversation_engine._sessions) if hasattr(conversation_engine, '_sessions') else 0,
+        "sessions": conversation_engine._sessions.stats(),
+        "message_queue": conversation_engine.get_queue_metrics(),
+        "tool_cache": tool_cache.stats(),
+        "meeting_search": meeting_search_service.get_status(),
+        "reply_streaming": get_streaming_metrics(),
+        "context_cache": conversation_engine._context_cache.get_status(),
+        "gemini_latency": get_latency_report(),
+        "gemini_files": file_registry.get_status(),
+        "upload_processing": processing_model.snapshot(),
         "notebooklm": notebooklm_service.get_status(),
+        "post_processing": post_processing_queue.get_metrics(),
+        "audio_jobs": audio_job_queue.get_status(),
+    }
+
+
+@app.get("/debug/audio-jobs")
+async def debug_audio_jobs(status: Optional[str] = None, lane: Optional[str] = None, limit: int = 50):
+    """Audio job queue: counts per lane and the most recent jobs (filter by status/lane)."""
+    from app.services.audio_job_queue import audio_job_queue
+    return {
+        **audio_job_queue.get_status(),
+        "jobs": audio_job_queue.list_jobs(status=status, lane=lane, limit=min(limit, 500)),
     }
 
 
@@ -1373,12 +1489,58 @@ def run_audit_in_background(from_number: str):
 # This runs in the background to avoid 502 timeouts on WhatsApp webhooks
 # ============================================================================
 
+class AudioDownloadError(Exception):
+    """WhatsApp media could not be fetched; the message is what the user is told."""
+
+
+def _download_whatsapp_media(media_id: str, access_token: str) -> bytes:
+    """Fetch an audio message's bytes from the WhatsApp Cloud API."""
+    import requests
+
+    print("🔐 Downloading media from WhatsApp...")
+    media_url = f"https://graph.facebook.com/v18.0/{media_id}"
+    headers = {"Authorization": f"Bearer {access_token}"}
+    try:
+        media_response = requests.get(media_url, headers=headers, timeout=30)
+        if media_response.status_code != 200:
+            print(f"❌ Failed to get media URL. Status: {media_response.status_code}")
+            raise AudioDownloadError("שגיאה בהורדת האודיו מווטסאפ")
+
+        download_url = media_response.json().get("url")
+        if not download_url:
+            print("❌ No download URL in media response")
+            raise AudioDownloadError("שגיאה בהורדת האודיו מווטסאפ")
+
+        audio_response = requests.get(download_url, headers=headers, timeout=60)
+        if audio_response.status_code != 200:
+            print(f"❌ Failed to download audio. Status: {audio_response.status_code}")
+            raise AudioDownloadError("שגיאה בהורדת האודיו")
+    except requests.RequestException as e:
+        print(f"❌ WhatsApp media request failed: {e}")
+        raise AudioDownloadError("שגיאה בהורדת האודיו מווטסאפ") from e
+
+    print(f"✅ Media downloaded: {len(audio_response.content)} bytes")
+    return audio_response.content
+
+
+def _probe_duration_seconds(path: str) -> Optional[float]:
+    """Audio duration from ffprobe (no decode); None if it cannot be read."""
+    try:
+        from pydub.utils import mediainfo
+        return float(mediainfo(path)["duration"])
+    except Exception as e:
+        print(f"⚠️  Could not probe audio duration: {e}")
+        return None
+
+
 def process_audio_in_background(
     message_id: str,
     from_number: str,
     media_id: str,
     access_token: str,
-    phone_number_id: str
+    phone_number_id: str,
+    lane: Optional[str] = None,
+    attempt: int = 1,
 ):
     """
     Process audio message from WhatsApp in background.
@@ -1391,8 +1553,12 @@ def process_audio_in_background(
     The core pipeline (diarization, expert analysis, speaker ID, VAD,
     fact identification, working memory, notifications) lives in ONE place:
     app/services/audio_pipeline.py
+
+    When run by the audio job queue (lane is set), download errors are
+    raised so the job is retried with backoff, and a recording longer than
+    VOICE_LANE_MAX_SECONDS that arrived on the voice lane is handed to the
+    meeting lane (which downloads it again) instead of being analysed here.
     """
-    import requests
     import tempfile
     import traceback
     from app.services.audio_pipeline import process_audio_core
@@ -1401,13 +1567,15 @@ def process_audio_in_background(
     print(f"🎤 BACKGROUND AUDIO PROCESSING STARTED (WhatsApp)")
     print(f"   Message ID: {message_id}")
     print(f"   From: {from_number}")
+    if lane:
+        print(f"   Lane: {lane} (attempt {attempt})")
     print(f"{'='*60}\n")
 
     tmp_path = None
 
-    # Send immediate "Processing..." message
+    # Send immediate "Processing..." message (once — not on retries or the meeting hand-off)
     try:
-        if whatsapp_provider:
+        if whatsapp_provider and attempt == 1 and lane != "meeting":
             whatsapp_provider.send_whatsapp(
                 message="🎙️ קיבלתי, אני על זה.",
                 to=f"+{from_number}"
@@ -1418,38 +1586,41 @@ def process_audio_in_background(
 
     try:
         # ── Step 1: Download audio from WhatsApp API ──
-        print("🔐 Downloading media from WhatsApp...")
-        media_url = f"https://graph.facebook.com/v18.0/{media_id}"
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        media_response = requests.get(media_url, headers=headers, timeout=30)
-        if media_response.status_code != 200:
-            print(f"❌ Failed to get media URL. Status: {media_response.status_code}")
-            _send_error_to_user(from_number, "שגיאה בהורדת האודיו מווטסאפ")
-            return
-
-        media_info = media_response.json()
-        download_url = media_info.get("url")
-        if not download_url:
-            print("❌ No download URL in media response")
-            _send_error_to_user(from_number, "שגיאה בהורדת האודיו מווטסאפ")
-            return
-
-        audio_response = requests.get(download_url, headers=headers, timeout=60)
-        if audio_response.status_code != 200:
-            print(f"❌ Failed to download audio. Status: {audio_response.status_code}")
-            _send_error_to_user(from_number, "שגיאה בהורדת האודיו")
+        try:
+            audio_bytes = _download_whatsapp_media(media_id, access_token)
+        except AudioDownloadError as download_err:
+            if lane:
+                raise
+            _send_error_to_user(from_number, str(download_err))
             return
 
-        audio_bytes = audio_response.content
-        print(f"✅ Media downloaded: {len(audio_bytes)} bytes")
-
         # ── Step 2: Save to temp file IMMEDIATELY ──
         with tempfile.NamedTemporaryFile(delete=False, suffix='.ogg') as tmp_file:
             tmp_file.write(audio_bytes)
             tmp_path = tmp_file.name
         print(f"💾 Saved to temp file: {tmp_path}")
 
+        # ── Voice lane: long recordings go to the meeting lane ──
+        if lane == "voice":
+            from app.services.audio_job_queue import audio_job_queue, VOICE_LANE_MAX_SECONDS
+            duration = _probe_duration_seconds(tmp_path)
+            if duration is None or duration > VOICE_LANE_MAX_SECONDS:
+                print(f"📊 Recording is {'of unknown length' if duration is None else f'{duration:.0f}s'} "
+                      f"— handing off to the meeting lane")
+                audio_job_queue.enqueue(
+                    "whatsapp_audio",
+                    key=f"wa:{message_id}:meeting",
+                    payload={
+                        "message_id": message_id,
+                        "from_number": from_number,
+                        "media_id": media_id,
+                        "phone_number_id": phone_number_id,
+                        "lane": "meeting",
+                    },
+                    lane="meeting",
+                )
+                return
+
         # ── Step 3: Process audio FIRST (user gets analysis immediately) ──
         # Build a minimal audio_metadata dict — Drive upload happens AFTER processing.
         # This ensures user gets their analysis even if the Drive upload crashes
@@ -1487,6 +1658,9 @@ def process_audio_in_background(
             print(f"⚠️  Drive archive failed (non-critical): {drive_err}")
             # Non-critical: user already has their analysis
 
+    except AudioDownloadError:
+        raise   # Queued job: retried by the audio job queue
+
     except Exception as e:
         print(f"❌ BACKGROUND AUDIO ERROR: {e}")
         traceback.print_exc()
@@ -1504,6 +1678,35 @@ def process_audio_in_background(
                 pass
 
 
+def _run_whatsapp_audio_job(payload: Dict[str, Any], attempt: int):
+    """Audio job handler. The WhatsApp token is looked up now; jobs never store it."""
+    from app.services.meta_whatsapp_service import meta_whatsapp_service
+    if not meta_whatsapp_service.access_token:
+        raise RuntimeError("WhatsApp API token not available")
+    process_audio_in_background(
+        message_id=payload["message_id"],
+        from_number=payload["from_number"],
+        media_id=payload["media_id"],
+        access_token=meta_whatsapp_service.access_token,
+        phone_number_id=payload["phone_number_id"],
+        lane=payload["lane"],
+        attempt=attempt,
+    )
+
+
+def _start_audio_job_queue():
+    """Register the recording handlers and start the lane workers (resumes jobs left by a restart)."""
+    from app.services.audio_job_queue import audio_job_queue
+    from process_meetings import notify_inbox_job_failure, process_inbox_job
+    audio_job_queue.register(
+        "whatsapp_audio", _run_whatsapp_audio_job,
+        on_failure=lambda payload, error: _send_error_to_user(
+            payload["from_number"], "שגיאה בהורדת האודיו מווטסאפ. נסה לשלוח שוב."),
+    )
+    audio_job_queue.register("drive_inbox", process_inbox_job, on_failure=notify_inbox_job_failure)
+    audio_job_queue.start()
+
+
 def _send_error_to_user(from_number: str, error_msg: str):
     """Send error message to user via WhatsApp."""
     if whatsapp_provider:
@@ -1765,15 +1968,32 @@ async def webhook(request: Request, background_tasks: BackgroundTasks):
                                     # NOTE: Acknowledgment moved to process_audio_in_background 
                                     # to avoid duplicate messages
                                     
-                                    # Queue background processing - PREVENTS 502 TIMEOUT
-                                    background_tasks.add_task(
-                                        process_audio_in_background,
-                                        message_id=message_id,
-                                        from_number=from_number,
-                                        media_id=media_id,
-                                        access_token=access_token,
-                                        phone_number_id=phone_number_id
+                                    # Durable audio job (voice lane first; long recordings
+                                    # move to the meeting lane). The message_id key makes
+                                    # webhook redeliveries no-ops - PREVENTS 502 TIMEOUT
+                                    from app.services.audio_job_queue import audio_job_queue
+                                    job_id = audio_job_queue.enqueue(
+                                        "whatsapp_audio",
+                                        key=f"wa:{message_id}",
+                                        payload={
+                                            "message_id": message_id,
+                                            "from_number": from_number,
+                                            "media_id": media_id,
+                                            "phone_number_id": phone_number_id,
+                                            "lane": "voice",
+                                        },
+                                        lane="voice",
                                     )
+                                    if job_id is None:
+                                        # Audio job queue disabled — process in this request's background task
+                                        background_tasks.add_task(
+                                            process_audio_in_background,
+                                            message_id=message_id,
+                                            from_number=from_number,
+                                            media_id=media_id,
+                                            access_token=access_token,
+                                            phone_number_id=phone_number_id
+                                        )
                                     
                                     print(f"✅ Audio processing queued in background for message {message_id}")
                                     # Return immediately - processing continues in background
@@ -2033,11 +2253,11 @@ async def webhook(request: Request, background_tasks: BackgroundTasks):
                                         try:
                                             from app.services.knowledge_base_service import get_kb_query_context
                                             
-                                            kb_context = get_kb_query_context()
+                                            resolved_name = resolved_selection.display_name
+                                            original_q = resolved_selection.pending_query
+                                            kb_context = get_kb_query_context(f"{original_q} {resolved_name}")
                                             if kb_context:
                                                 # Re-execute the original query with the resolved person name
-                                                resolved_name = resolved_selection.display_name
-                                                original_q = resolved_selection.pending_query
                                                 # Inject the resolved name into context hint for Gemini
                                                 enhanced_query = (
                                                     f"{original_q}\n\n"
@@ -2134,18 +2354,24 @@ async def webhook(request: Request, background_tasks: BackgroundTasks):
                                     def _process_text_in_background(phone, text, msg_id):
                                         """Background task: process text via Conversation Engine and send reply."""
                                         try:
+                                            # Long answers are streamed: the first message goes
+                                            # out while Gemini is still generating the rest
+                                            reply = StreamingReply(
+                                                send=lambda m: whatsapp_provider.send_whatsapp(message=m, to=f"+{phone}"),
+                                                typing=lambda: whatsapp_provider.send_typing_indicator(msg_id),
+                                                label=phone[-4:],
+                                            )
+                                            reply.start()
                                             ai_response = conversation_engine.process_message(
                                                 phone=phone,
-                                                message=text
+                                                message=text,
+                                                on_text=reply.feed if STREAM_REPLIES else None,
                                             )
                                             
                                             print(f"🤖 Generated AI response: {ai_response[:100]}...")
                                             
-                                            # Send AI response via WhatsApp
-                                            reply_result = whatsapp_provider.send_whatsapp(
-                                                message=ai_response,
-                                                to=f"+{phone}"
-                                            )
+                                            # Send the rest of the AI response via WhatsApp
+                                            reply_result = reply.finish(ai_response)
                                             
                                             if reply_result.get('success'):
                                                 print(f"✅ AI response sent successfully")
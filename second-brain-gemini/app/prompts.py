@@ -409,3 +409,124 @@ OUTPUT FORMAT — JSON with transcription + expert summary + sentiment
    Return the estimated date in ISO format (e.g., "2026-01-15T14:30:00") or null if you cannot determine when it happened.
    This is CRITICAL because the audio file metadata may not contain the original recording date.
 """
+
+
+# ============================================================================
+# CHUNKED TRANSCRIPTION PROMPTS
+# Long pyannote-assisted recordings are transcribed in ~10-minute chunks in
+# parallel (see chunked_transcription.py):
+#   1. CHUNK_TRANSCRIPTION_PROMPT — transcription only, one call per chunk,
+#      timestamps relative to the start of the chunk
+#   2. CHUNKED_EXPERT_PROMPT — expert analysis once, over the merged
+#      transcript text (no audio)
+# ============================================================================
+CHUNK_TRANSCRIPTION_PROMPT = """You are a professional transcriber. This audio is PART {part} of {parts} of a longer recording.
+
+An AI diarization system has already identified who speaks when in this part.
+Use these EXACT speaker labels and approximate timestamps (seconds from the start of THIS part):
+
+{diarization_info}
+
+YOUR JOB:
+- Write EXACTLY what each speaker said (word-for-word transcription)
+- Use the speaker names provided above — do NOT reassign or merge speakers
+- Timestamps are seconds from the start of THIS audio part, not of the whole recording
+- A sentence may start or end mid-way at the edges of the part — transcribe what you hear
+
+OUTPUT FORMAT — JSON only:
+
+{{
+  "segments": [
+    {{"speaker": "Name or Unknown Speaker X", "start": 0.0, "end": 5.2, "text": "Exact words spoken"}},
+    {{"speaker": "Name or Unknown Speaker X", "start": 5.2, "end": 12.0, "text": "Exact words spoken"}}
+  ]
+}}
+
+**CRITICAL INSTRUCTIONS:**
+1. Output ONLY valid JSON - no markdown, no text before/after
+2. Transcribe the whole part — do not summarize or skip
+"""
+
+CHUNKED_EXPERT_PROMPT = """You are an expert AI assistant. Below is the full transcript of a recorded conversation, with speakers already identified.
+
+═══════════════════════════════════════════════════════════════════════════════
+TRANSCRIPT
+═══════════════════════════════════════════════════════════════════════════════
+
+{transcript}
+
+═══════════════════════════════════════════════════════════════════════════════
+PART 1: EXPERT ANALYSIS (Multi-Agent System)
+═══════════════════════════════════════════════════════════════════════════════
+
+First, classify the conversation context:
+- RELATIONSHIP: Discussions about feelings, relationship dynamics, shared life
+- PARENTING: Raising children, home logistics, education, discipline
+- LEADERSHIP: Team management, hiring, mentoring, culture
+- STRATEGY: Business decisions, product roadmap, tech strategy
+
+Then adopt the appropriate expert persona:
+
+**RELATIONSHIP (Esther Perel Mode):**
+Focus on emotional intelligence, balance between security and freedom, the "unsaid".
+
+**STRATEGY (McKinsey + Tech Innovation Mode):**
+Focus on MECE structure, data-driven insights, Agile/Lean thinking.
+
+**LEADERSHIP (Simon Sinek Mode):**
+Focus on "Start with Why", The Infinite Game, Circle of Safety.
+
+**PARENTING (Adler Institute Mode):**
+Focus on encouragement, natural consequences, cooperation.
+
+═══════════════════════════════════════════════════════════════════════════════
+PART 2: SENTIMENT ANALYSIS PER SPEAKER
+═══════════════════════════════════════════════════════════════════════════════
+
+For each speaker, provide:
+- A sentiment score from -1.0 (very negative) to +1.0 (very positive)
+- Key emotional indicators observed in their words
+
+═══════════════════════════════════════════════════════════════════════════════
+OUTPUT FORMAT — JSON with expert summary + sentiment
+═══════════════════════════════════════════════════════════════════════════════
+
+{{
+  "topics": ["topic1", "topic2", "topic3"],
+  "speaker_sentiment": {{
+    "Yuval Laikin": {{"score": 0.3, "indicators": "sounds focused, slightly tense"}},
+    "Unknown Speaker 1": {{"score": 0.7, "indicators": "upbeat, enthusiastic"}}
+  }},
+  "recording_date_hint": "2026-01-15T14:30:00",
+  "expert_summary": "
+🧠 הכובע שנבחר: [שם המומחה]
+
+📌 נושא השיחה: [3-5 מילים]
+
+🕵️ הסאב-טקסט (ניתוח עומק): [2-3 משפטים]
+
+💡 תובנה מרכזית: [התובנה החשובה ביותר]
+
+⚖️ מדד: [ציון 1-10 + הסבר קצר]
+
+✅ אקשן אייטמס:
+• [משימה 1]
+• [משימה 2]
+
+📈 קאיזן - פידבק לצמיחה:
+✓ לשימור: [התנהגות חיובית]
+→ לשיפור: [תחום לצמיחה]
+
+❓ שאלה למחשבה: [שאלה מאתגרת]
+"
+}}
+
+**CRITICAL INSTRUCTIONS:**
+1. Output ONLY valid JSON - no markdown, no text before/after
+2. The "expert_summary" must be a complete, thorough Hebrew analysis of the WHOLE conversation — do NOT truncate or abbreviate
+3. Use the EXACT speaker names from the transcript
+4. Add "topics" - 3-5 key topics discussed (in Hebrew)
+5. Add "speaker_sentiment" - sentiment score per speaker
+6. **recording_date_hint** - Estimate WHEN this conversation took place from explicit dates, day-of-week
+   references, holidays or seasons mentioned. Return ISO format (e.g., "2026-01-15T14:30:00") or null.
+"""
@@ -1169,5 +1169,6 @@ class ArchitectureAuditService:
         }
 
 
-# Singleton instance
-architecture_audit_service = ArchitectureAuditService()
+# Singleton instance (built on first use / by startup warm-up)
+from app.services.service_registry import service
+architecture_audit_service = service("architecture_audit_service")
@@ -0,0 +1,329 @@
+"""
+Audio Job Queue — durable, laned worker pool for recordings
+
+WhatsApp audio went to FastAPI BackgroundTasks inside the web process,
+and the Drive inbox ran inline in the APScheduler job. Both called
+process_audio_core synchronously. Nothing limited how many recordings
+ran at once, nothing showed what was waiting, and a restart lost every
+recording in flight (the webhook had already been answered 200).
+
+Recordings are now jobs in a local SQLite table (AUDIO_JOB_DB):
+  - Each job has a kind (handler), a lane and an idempotency key (the
+    WhatsApp message_id, the Drive file_id). enqueue() of a key that
+    already exists is ignored, so webhook redeliveries and repeated inbox
+    polls never process a recording twice. With rearm_failed=True (the
+    inbox poller), a key whose job failed at least REARM_AFTER_SECONDS
+    ago is queued again with fresh attempts, so a file left in the inbox
+    after an outage is picked up by a later poll.
+  - Lanes have their own workers (LANE_WORKERS). "voice" is for short
+    voice commands and the first look at WhatsApp audio; "meeting" is for
+    full meeting analyses. A two-hour meeting never makes a voice command
+    wait behind it.
+  - A handler that raises is retried after RETRY_BASE_SECONDS, doubling
+    per attempt, up to max_attempts. Then the job is "failed" and the
+    kind's on_failure hook runs (e.g. tell the user).
+  - Attempts are counted when a job is claimed. Jobs still "running" at
+    start() were interrupted by a restart and are queued again, or
+    failed if they have used every attempt (a recording that crashes the
+    container must not crash it forever).
+  - Finished jobs are pruned after RETENTION_SECONDS.
+
+    audio_job_queue.register("whatsapp_audio", handle_whatsapp_audio, on_failure=notify_user)
+    audio_job_queue.start()
+    audio_job_queue.enqueue("whatsapp_audio", key=message_id, payload={...}, lane="voice")
+
+Payloads are JSON and must not hold secrets (tokens are looked up when
+the job runs). /debug/audio-jobs shows counts per lane and recent jobs.
+Kill switch: AUDIO_JOB_QUEUE_ENABLED=false (enqueue returns None and the
+callers process the recording directly, as before).
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+AUDIO_JOB_QUEUE_ENABLED = os.environ.get("AUDIO_JOB_QUEUE_ENABLED", "true").lower() == "true"
+AUDIO_JOB_DB = os.environ.get("AUDIO_JOB_DB", "/tmp/_audio_jobs.sqlite3")
+LANE_WORKERS: Dict[str, int] = {
+    "voice": int(os.environ.get("AUDIO_VOICE_WORKERS", "2")),
+    "meeting": int(os.environ.get("AUDIO_MEETING_WORKERS", "1")),
+}
+# WhatsApp audio longer than this leaves the voice lane (same cut-off as the
+# pipeline's voice-command router)
+VOICE_LANE_MAX_SECONDS = 30
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 30
+RETENTION_SECONDS = 7 * 24 * 3600
+REARM_AFTER_SECONDS = int(os.environ.get("AUDIO_JOB_REARM_SECONDS", "600"))
+POLL_SECONDS = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,           -- queued → running → done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (lane, status, run_after);
+"""
+_COLUMNS = ("id", "key", "kind", "lane", "payload", "status", "attempts", "max_attempts",
+            "run_after", "created_at", "started_at", "finished_at", "last_error")
+
+
+class AudioJobQueue:
+    """SQLite-backed job queue with per-lane worker threads."""
+
+    def __init__(self, db_path: str = AUDIO_JOB_DB, lanes: Optional[Dict[str, int]] = None,
+                 enabled: bool = AUDIO_JOB_QUEUE_ENABLED, retry_base: float = RETRY_BASE_SECONDS,
+                 rearm_after: float = REARM_AFTER_SECONDS):
+        self._db_path = db_path
+        self._lanes = dict(LANE_WORKERS if lanes is None else lanes)
+        self._enabled = enabled
+        self._retry_base = retry_base
+        self._rearm_after = rearm_after
+        self._handlers: Dict[str, Callable[[Dict[str, Any], int], Any]] = {}
+        self._on_failure: Dict[str, Callable[[Dict[str, Any], str], Any]] = {}
+        self._cond = threading.Condition()
+        self._db: Optional[sqlite3.Connection] = None
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._enabled
+
+    # ─── Setup ───────────────────────────────────────────────────
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], int], Any],
+                 on_failure: Optional[Callable[[Dict[str, Any], str], Any]] = None):
+        """handler(payload, attempt) runs the job; on_failure(payload, error) after the last attempt."""
+        self._handlers[kind] = handler
+        if on_failure:
+            self._on_failure[kind] = on_failure
+
+    def _conn_locked(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self._db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self._db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def start(self) -> "AudioJobQueue":
+        """Recover jobs interrupted by a restart, prune old ones and start the lane workers."""
+        if not self._enabled or self._threads:
+            return self
+        now = time.time()
+        with self._cond:
+            db = self._conn_locked()
+            exhausted = db.execute(
+                "UPDATE jobs SET status='failed', finished_at=?, last_error='interrupted by restart' "
+                "WHERE status='running' AND attempts >= max_attempts", (now,)).rowcount
+            requeued = db.execute(
+                "UPDATE jobs SET status='queued', run_after=? WHERE status='running'", (now,)).rowcount
+            pruned = db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                (now - RETENTION_SECONDS,)).rowcount
+            pending = db.execute("SELECT COUNT(*) FROM jobs WHERE status='queued'").fetchone()[0]
+            for lane, workers in self._lanes.items():
+                for i in range(workers):
+                    thread = threading.Thread(target=self._worker, args=(lane,), daemon=True,
+                                              name=f"audio-{lane}-{i}")
+                    self._threads.append(thread)
+                    thread.start()
+        print(f"🎛️  [AudioJobs] Started {len(self._threads)} workers "
+              f"({', '.join(f'{lane}={n}' for lane, n in self._lanes.items())}) — "
+              f"{pending} pending, {requeued} resumed after restart, {exhausted} gave up, {pruned} pruned")
+        return self
+
+    # ─── Enqueue ─────────────────────────────────────────────────
+
+    def enqueue(self, kind: str, key: str, payload: Dict[str, Any], lane: str = "meeting",
+                max_attempts: int = MAX_ATTEMPTS, rearm_failed: bool = False) -> Optional[int]:
+        """
+        Add a job unless one with the same key exists. Returns the job id
+        (new or existing), or None when the queue is disabled.
+
+        rearm_failed: queue an existing job again (attempts reset) if it
+        failed more than REARM_AFTER_SECONDS ago.
+        """
+        if not self._enabled:
+            return None
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown audio job lane '{lane}'")
+        now = time.time()
+        with self._cond:
+            db = self._conn_locked()
+            created = db.execute(
+                "INSERT OR IGNORE INTO jobs (key, kind, lane, payload, status, max_attempts, run_after, created_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (key, kind, lane, json.dumps(payload, ensure_ascii=False), max_attempts, now, now)).rowcount
+            rearmed = 0
+            if not created and rearm_failed:
+                rearmed = db.execute(
+                    "UPDATE jobs SET status='queued', attempts=0, max_attempts=?, payload=?, run_after=?, "
+                    "started_at=NULL, finished_at=NULL WHERE key=? AND status='failed' AND finished_at<=?",
+                    (max_attempts, json.dumps(payload, ensure_ascii=False), now, key,
+                     now - self._rearm_after)).rowcount
+            job_id, status = db.execute("SELECT id, status FROM jobs WHERE key=?", (key,)).fetchone()
+            if created or rearmed:
+                self._cond.notify_all()
+        if created:
+            print(f"📥 [AudioJobs] Queued {kind} #{job_id} ({lane} lane, key {key})")
+        elif rearmed:
+            print(f"🔁 [AudioJobs] Re-queued failed {kind} #{job_id} ({lane} lane, key {key})")
+        else:
+            print(f"♻️  [AudioJobs] Duplicate {kind} ignored (key {key} is job #{job_id}, {status})")
+        return job_id
+
+    # ─── Workers ─────────────────────────────────────────────────
+
+    def _claim_locked(self, lane: str) -> Optional[Dict[str, Any]]:
+        db = self._conn_locked()
+        row = db.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE lane=? AND status='queued' AND run_after<=? "
+            "ORDER BY run_after, id LIMIT 1", (lane, time.time())).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["attempts"] += 1
+        job["started_at"] = time.time()
+        db.execute("UPDATE jobs SET status='running', attempts=?, started_at=? WHERE id=?",
+                   (job["attempts"], job["started_at"], job["id"]))
+        return job
+
+    def _next_due_locked(self, lane: str) -> Optional[float]:
+        row = self._conn_locked().execute(
+            "SELECT MIN(run_after) FROM jobs WHERE lane=? AND status='queued'", (lane,)).fetchone()
+        return row[0] if row else None
+
+    def _worker(self, lane: str):
+        while True:
+            with self._cond:
+                job = self._claim_locked(lane)
+                while job is None:
+                    due = self._next_due_locked(lane)
+                    wait_s = POLL_SECONDS if due is None else min(max(due - time.time(), 0.05), POLL_SECONDS)
+                    self._cond.wait(wait_s)
+                    job = self._claim_locked(lane)
+            self._run(job)
+
+    def _run(self, job: Dict[str, Any]):
+        label = f"{job['kind']} #{job['id']} (attempt {job['attempts']}/{job['max_attempts']})"
+        print(f"▶️  [AudioJobs] Running {label} — waited {job['started_at'] - job['created_at']:.1f}s")
+        handler = self._handlers.get(job["kind"])
+        error = None
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler registered for '{job['kind']}'")
+            handler(json.loads(job["payload"]), job["attempts"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"[AudioJobs] {label} failed: {error}")
+
+        retry = error is not None and handler is not None and job["attempts"] < job["max_attempts"]
+        if error is not None and not retry:
+            # Before the job leaves "running", so wait_idle() also waits for the hook
+            print(f"❌ [AudioJobs] {label} failed for good: {error[:200]}")
+            on_failure = self._on_failure.get(job["kind"])
+            if on_failure:
+                try:
+                    on_failure(json.loads(job["payload"]), error)
+                except Exception as hook_err:
+                    logger.error(f"[AudioJobs] on_failure for {label} failed: {hook_err}")
+
+        now = time.time()
+        with self._cond:
+            db = self._conn_locked()
+            if error is None:
+                db.execute("UPDATE jobs SET status='done', finished_at=?, last_error=NULL WHERE id=?",
+                           (now, job["id"]))
+            elif retry:
+                delay = self._retry_base * (2 ** (job["attempts"] - 1))
+                db.execute("UPDATE jobs SET status='queued', run_after=?, last_error=? WHERE id=?",
+                           (now + delay, error[:500], job["id"]))
+            else:
+                db.execute("UPDATE jobs SET status='failed', finished_at=?, last_error=? WHERE id=?",
+                           (now, error[:500], job["id"]))
+            self._cond.notify_all()
+
+        if error is None:
+            print(f"✅ [AudioJobs] {label} done in {now - job['started_at']:.1f}s")
+        elif retry:
+            print(f"🔁 [AudioJobs] {label} failed: {error[:200]} — retrying in {delay:.0f}s")
+
+    # ─── Introspection ───────────────────────────────────────────
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until no job is queued or running. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._enabled and self._conn_locked().execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 1.0) if remaining is not None else 1.0)
+        return True
+
+    def list_jobs(self, status: Optional[str] = None, lane: Optional[str] = None,
+                  limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs first, optionally filtered by status and lane."""
+        if not self._enabled:
+            return []
+        clauses, params = [], []
+        if status:
+            clauses.append("status=?")
+            params.append(status)
+        if lane:
+            clauses.append("lane=?")
+            params.append(lane)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._cond:
+            rows = self._conn_locked().execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs {where} ORDER BY id DESC LIMIT ?",
+                (*params, limit)).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(zip(_COLUMNS, row))
+            job["payload"] = json.loads(job["payload"])
+            jobs.append(job)
+        return jobs
+
+    def get_status(self) -> Dict[str, Any]:
+        if not self._enabled:
+            return {"enabled": False}
+        with self._cond:
+            rows = self._conn_locked().execute(
+                "SELECT lane, status, COUNT(*) FROM jobs GROUP BY lane, status").fetchall()
+            oldest = self._conn_locked().execute(
+                "SELECT MIN(created_at) FROM jobs WHERE status='queued'").fetchone()[0]
+        lanes = {lane: {"workers": workers, "queued": 0, "running": 0, "done": 0, "failed": 0}
+                 for lane, workers in self._lanes.items()}
+        for lane, status, count in rows:
+            lanes.setdefault(lane, {"workers": 0, "queued": 0, "running": 0, "done": 0, "failed": 0})[status] = count
+        return {
+            "enabled": True,
+            "db_path": self._db_path,
+            "started": bool(self._threads),
+            "oldest_queued_s": round(time.time() - oldest, 1) if oldest else None,
+            "lanes": lanes,
+        }
+
+
+audio_job_queue = AudioJobQueue()
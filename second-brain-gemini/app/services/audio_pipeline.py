@@ -51,6 +51,9 @@ def process_audio_core(
      10. WhatsApp notification (formatted expert summary)
      11. Cleanup slice files
 
+    Everything after the Gemini analysis is declared as StageDAG stages
+    (see stage_dag.py) and runs concurrently where dependencies allow.
+
     Args:
         tmp_path: Path to the audio file on disk
         from_number: User's phone number (without +)
@@ -68,6 +71,7 @@ def process_audio_core(
 
     slice_files_to_cleanup = []
     reference_voices = []
+    upload_prefetch = None
     result_info = {"success": False, "source": source}
 
     # ============================================================
@@ -176,18 +180,24 @@ def process_audio_core(
                     else:
                         print(f"   🧠 Routing to Conversation Engine...")
 
+                        from app.services.response_streamer import STREAM_REPLIES, StreamingReply
+
+                        reply = StreamingReply(
+                            send=lambda m: whatsapp_provider.send_whatsapp(message=m, to=f"+{from_number}"),
+                            label=from_number[-4:],
+                        ) if whatsapp_provider else None
+                        if reply:
+                            reply.start()
                         ai_response = conversation_engine.process_message(
                             phone=from_number,
-                            message=transcribed_text
+                            message=transcribed_text,
+                            on_text=reply.feed if reply and STREAM_REPLIES else None,
                         )
 
                         print(f"   🤖 Response: {ai_response[:200]}{'...' if len(ai_response) > 200 else ''}")
 
-                        if whatsapp_provider and ai_response:
-                            reply_result = whatsapp_provider.send_whatsapp(
-                                message=ai_response,
-                                to=f"+{from_number}"
-                            )
+                        if reply and ai_response:
+                            reply_result = reply.finish(ai_response)
                             if reply_result.get('success'):
                                 print(f"   ✅ [Voice Router] Response sent successfully")
                             else:
@@ -225,6 +235,27 @@ def process_audio_core(
             except Exception:
                 duration_sec = 0
 
+        # ============================================================
+        # SPECULATIVE GEMINI UPLOAD — overlaps pyannote
+        # analyze_day needs the recording uploaded and ACTIVE. Start that
+        # now, so upload + server-side processing run while pyannote
+        # diarizes; analyze_day's own upload then reuses the handle via
+        # file_registry and the inference call goes out as soon as both
+        # are ready. Skipped when the recording will be transcribed in
+        # chunks (the chunks are uploaded, not the whole file).
+        # ============================================================
+        try:
+            from app.services.chunked_transcription import CHUNKED_TRANSCRIPTION_ENABLED, MIN_CHUNKED_SECONDS
+            from app.services.pyannote_service import is_available as pyannote_ready
+            likely_chunked = (CHUNKED_TRANSCRIPTION_ENABLED and duration_sec >= MIN_CHUNKED_SECONDS
+                              and pyannote_ready())
+        except Exception:
+            likely_chunked = False
+        if not likely_chunked:
+            upload_prefetch = gemini_service.prefetch_uploads([tmp_path])
+            if upload_prefetch is not None:
+                print("📤 [Gemini] Upload started in parallel with diarization")
+
         # ============================================================
         # Step 1: pyannote DIARIZATION + SPEAKER IDENTIFICATION
         # If available: pre-compute who speaks when + match to known voices
@@ -455,11 +486,22 @@ def process_audio_core(
         speaker_sentiment = transcript_json.get('speaker_sentiment', {})
 
         # ============================================================
-        # Step 3: SEND WHATSAPP IMMEDIATELY (before Drive saves!)
-        # Critical: user gets analysis even if Drive/container crashes
+        # POST-ANALYSIS STAGES (StageDAG)
+        # Everything below needs only the Gemini result. Each step is a
+        # stage with its own dependencies, timeout and retry policy, run
+        # concurrently on a per-run stage pool (see stage_dag.py).
+        # User-facing messages stay in order (summary → text infographic
+        # → clips → fact confirmation), and the Drive saves run alongside.
+        #
+        #   summary ──► guaranteed_infographic ──► clips ─┐
+        #                           └────────────► notebooklm
+        #   facts ────────────────────────────────────────┴─► facts_confirm
+        #   transcript ──► memory, identity_graph
+        #   working_memory
         # ============================================================
-        print("📱 [WhatsApp] Sending analysis FIRST (before Drive saves)...")
+        from app.services.stage_dag import StageDAG
 
+        # Speaker tally (summary header + legacy clip path)
         all_speakers_set = set()
         for seg in segments:
             speaker = seg.get('speaker', '')
@@ -483,115 +525,8 @@ def process_audio_core(
             else:
                 identified_speakers.append(speaker)
 
-        if whatsapp_provider:
-            source_header = ""
-            if source == "drive_inbox":
-                filename = audio_metadata.get('filename', '')
-                source_header = f"📥 *הקלטה חדשה מתיקיית Inbox:*\n📁 {filename}\n\n"
-
-            if expert_analysis_result and expert_analysis_result.get('success'):
-                from app.services.expert_analysis_service import expert_analysis_service
-                expert_message = expert_analysis_service.format_for_whatsapp(expert_analysis_result)
-
-                header = source_header
-                header += "✅ *ההקלטה נשמרה ונותחה!*\n\n"
-                header += "👥 *משתתפים:* "
-                if identified_speakers:
-                    header += ", ".join(sorted(identified_speakers))
-                if unidentified_count > 0:
-                    header += f" (+{unidentified_count} לא מזוהים)"
-                if not identified_speakers and unidentified_count == 0:
-                    header += "(לא זוהו)"
-                header += "\n\n"
-
-                full_message = header + expert_message
-                print(f"   📤 Total message length: {len(full_message)} chars")
-
-                reply_result = whatsapp_provider.send_whatsapp(
-                    message=full_message,
-                    to=f"+{from_number}"
-                )
-                if reply_result.get('success'):
-                    print("✅ [WhatsApp] Expert Summary sent IMMEDIATELY")
-                else:
-                    print(f"⚠️  [WhatsApp] Failed to send expert summary: {reply_result.get('error')}")
-            else:
-                reply_message = source_header
-                reply_message += "✅ *ההקלטה נשמרה!*\n\n"
-                reply_message += "👥 *משתתפים:* "
-                if identified_speakers:
-                    reply_message += ", ".join(sorted(identified_speakers))
-                if unidentified_count > 0:
-                    if identified_speakers:
-                        reply_message += f" (+{unidentified_count} לא מזוהים)"
-                    else:
-                        reply_message += f"{unidentified_count} דוברים לא מזוהים"
-                if not identified_speakers and unidentified_count == 0:
-                    reply_message += "(לא זוהו)"
-                reply_message += "\n\n"
-                if summary_text and len(summary_text.strip()) > 20:
-                    reply_message += f"📝 *סיכום:*\n{summary_text}\n\n"
-                else:
-                    reply_message += "📝 *סיכום:* לא הצלחתי לייצר סיכום מפורט.\n\n"
-                reply_message += "📈 *קאיזן:*\n"
-                reply_message += "✓ לשימור: השיחה התקיימה והוקלטה\n"
-                reply_message += "→ לשיפור: בדוק את איכות ההקלטה\n\n"
-                reply_message += "📄 התמלול המלא זמין בדרייב."
-
-                reply_result = whatsapp_provider.send_whatsapp(
-                    message=reply_message,
-                    to=f"+{from_number}"
-                )
-                if reply_result.get('success'):
-                    print("✅ [WhatsApp] Fallback Summary sent IMMEDIATELY")
-                else:
-                    print(f"⚠️  [WhatsApp] Failed to send fallback: {reply_result.get('error')}")
-
-        # ============================================================
-        # Step 3.1: GUARANTEED TEXT INFOGRAPHIC — sent IMMEDIATELY
-        # This ensures the user ALWAYS receives a structured analysis,
-        # even if the container dies during the long NotebookLM call later.
-        # The PNG infographic from NotebookLM is a BONUS sent later.
-        # ============================================================
-        guaranteed_infographic_sent = False
-        if whatsapp_provider and expert_summary and len(expert_summary.strip()) > 30:
-            try:
-                print("📓 [Guaranteed Infographic] Building structured analysis...")
-                infographic_parts = ["📓 *ניתוח מעמיק:*\n"]
-
-                if summary_text and len(summary_text.strip()) > 20:
-                    infographic_parts.append(f"📌 *תמצית:*\n{summary_text}\n")
-
-                if speaker_names:
-                    infographic_parts.append(f"👥 *דוברים:* {', '.join(sorted(speaker_names))}\n")
-
-                if topics:
-                    infographic_parts.append("📋 *נושאים:*")
-                    for t in topics[:6]:
-                        infographic_parts.append(f"  • {t}")
-                    infographic_parts.append("")
-
-                infographic_text = "\n".join(infographic_parts)
-                if len(infographic_text.strip()) > 40:
-                    gi_result = whatsapp_provider.send_whatsapp(
-                        message=infographic_text,
-                        to=f"+{from_number}"
-                    )
-                    if gi_result.get('success'):
-                        print("📓 [Guaranteed Infographic] Text infographic sent ✅")
-                        guaranteed_infographic_sent = True
-                    else:
-                        print(f"⚠️ [Guaranteed Infographic] Send failed: {gi_result.get('error')}")
-            except Exception as gi_err:
-                print(f"⚠️ [Guaranteed Infographic] Error: {gi_err}")
-
-        # ============================================================
-        # Step 3a: Unknown Speaker Clip Extraction & Send
-        # IMMEDIATELY after analysis — before any Drive saves!
-        # Critical: clips sent even if container crashes during Drive ops
-        # ============================================================
+        # Clip state shared with the clips stage
         unknown_speakers_processed = []
-        slice_files_to_cleanup = []
         try:
             from app.main import pending_identifications, _voice_map_cache, _save_pending_identifications
         except ImportError:
@@ -702,101 +637,216 @@ def process_audio_core(
                     return False
             return False
 
-        # ══════════════════════════════════════════════════════════════
-        # PATH A: pyannote-powered clip extraction (PREFERRED)
-        # pyannote already found the best segment per speaker — use it!
-        # ══════════════════════════════════════════════════════════════
-        _used_pyannote_clips = False
+        # ============================================================
+        # Step 3: SEND WHATSAPP IMMEDIATELY (never waits for Drive saves!)
+        # Critical: user gets analysis even if Drive/container crashes
+        # ============================================================
+        def _summary_stage(inputs):
+            if not whatsapp_provider:
+                return False
+            print("📱 [WhatsApp] Sending analysis FIRST (Drive saves run alongside)...")
 
-        if pyannote_speaker_results:
-            try:
-                from pydub import AudioSegment
-                audio_segment = AudioSegment.from_file(tmp_path)
-                audio_len_ms = len(audio_segment)
+            source_header = ""
+            if source == "drive_inbox":
+                filename = audio_metadata.get('filename', '')
+                source_header = f"📥 *הקלטה חדשה מתיקיית Inbox:*\n📁 {filename}\n\n"
 
-                unknown_pyannote = {
-                    spk: info for spk, info in pyannote_speaker_results.items()
-                    if info.get("status") == "unknown"
-                }
+            if expert_analysis_result and expert_analysis_result.get('success'):
+                from app.services.expert_analysis_service import expert_analysis_service
+                expert_message = expert_analysis_service.format_for_whatsapp(expert_analysis_result)
 
-                if unknown_pyannote:
-                    _used_pyannote_clips = True
-                    print(f"\n{'='*60}")
-                    print(f"🎯 [pyannote] DIRECT CLIP EXTRACTION for {len(unknown_pyannote)} unknown speaker(s)")
-                    print(f"{'='*60}")
-
-                    for spk_label, info in unknown_pyannote.items():
-                        best_seg = info.get("best_segment", {})
-                        start_sec = best_seg.get("start", 0)
-                        end_sec = best_seg.get("end", 0)
-                        duration_sec = best_seg.get("duration", end_sec - start_sec)
-                        embedding = info.get("embedding")
-
-                        # Get the friendly name from diarization_hints
-                        friendly_name = "Unknown Speaker"
-                        if diarization_hints:
-                            friendly_name = diarization_hints.get("speakers", {}).get(spk_label, {}).get("name", spk_label)
-
-                        # Skip self
-                        if friendly_name.lower() in self_names:
-                            print(f"   🔇 Skipping self: {friendly_name}")
-                            continue
+                header = source_header
+                header += "✅ *ההקלטה נשמרה ונותחה!*\n\n"
+                header += "👥 *משתתפים:* "
+                if identified_speakers:
+                    header += ", ".join(sorted(identified_speakers))
+                if unidentified_count > 0:
+                    header += f" (+{unidentified_count} לא מזוהים)"
+                if not identified_speakers and unidentified_count == 0:
+                    header += "(לא זוהו)"
+                header += "\n\n"
 
-                        print(f"\n   🎤 {friendly_name} ({spk_label})")
-                        print(f"      📍 Best segment: {start_sec:.1f}s → {end_sec:.1f}s ({duration_sec:.1f}s)")
+                full_message = header + expert_message
+                print(f"   📤 Total message length: {len(full_message)} chars")
 
-                        if duration_sec < 0.5:
-                            print(f"      ⚠️  Segment too short ({duration_sec:.1f}s < 0.5s) — skipping")
-                            continue
+                reply_result = whatsapp_provider.send_whatsapp(
+                    message=full_message,
+                    to=f"+{from_number}"
+                )
+                if reply_result.get('success'):
+                    print("✅ [WhatsApp] Expert Summary sent IMMEDIATELY")
+                else:
+                    raise RuntimeError(f"Failed to send expert summary: {reply_result.get('error')}")
+            else:
+                reply_message = source_header
+                reply_message += "✅ *ההקלטה נשמרה!*\n\n"
+                reply_message += "👥 *משתתפים:* "
+                if identified_speakers:
+                    reply_message += ", ".join(sorted(identified_speakers))
+                if unidentified_count > 0:
+                    if identified_speakers:
+                        reply_message += f" (+{unidentified_count} לא מזוהים)"
+                    else:
+                        reply_message += f"{unidentified_count} דוברים לא מזוהים"
+                if not identified_speakers and unidentified_count == 0:
+                    reply_message += "(לא זוהו)"
+                reply_message += "\n\n"
+                if summary_text and len(summary_text.strip()) > 20:
+                    reply_message += f"📝 *סיכום:*\n{summary_text}\n\n"
+                else:
+                    reply_message += "📝 *סיכום:* לא הצלחתי לייצר סיכום מפורט.\n\n"
+                reply_message += "📈 *קאיזן:*\n"
+                reply_message += "✓ לשימור: השיחה התקיימה והוקלטה\n"
+                reply_message += "→ לשיפור: בדוק את איכות ההקלטה\n\n"
+                reply_message += "📄 התמלול המלא זמין בדרייב."
 
-                        # Convert to ms and apply bounds
-                        start_ms = int(start_sec * 1000)
-                        end_ms = int(end_sec * 1000)
+                reply_result = whatsapp_provider.send_whatsapp(
+                    message=reply_message,
+                    to=f"+{from_number}"
+                )
+                if reply_result.get('success'):
+                    print("✅ [WhatsApp] Fallback Summary sent IMMEDIATELY")
+                else:
+                    raise RuntimeError(f"Failed to send fallback summary: {reply_result.get('error')}")
+            return True
 
-                        # Cap at 7 seconds, centered on segment
-                        TARGET_MAX_MS = 7000
-                        if (end_ms - start_ms) > TARGET_MAX_MS:
-                            center = (start_ms + end_ms) // 2
-                            start_ms = center - TARGET_MAX_MS // 2
-                            end_ms = center + TARGET_MAX_MS // 2
+        # ============================================================
+        # Step 3.1: GUARANTEED TEXT INFOGRAPHIC — sent IMMEDIATELY
+        # This ensures the user ALWAYS receives a structured analysis,
+        # even if the container dies during the long NotebookLM call later.
+        # The PNG infographic from NotebookLM is a BONUS sent later.
+        # ============================================================
+        def _guaranteed_infographic_stage(inputs):
+            if whatsapp_provider and expert_summary and len(expert_summary.strip()) > 30:
+                print("📓 [Guaranteed Infographic] Building structured analysis...")
+                infographic_parts = ["📓 *ניתוח מעמיק:*\n"]
 
-                        start_ms = max(0, start_ms)
-                        end_ms = min(audio_len_ms, end_ms)
+                if summary_text and len(summary_text.strip()) > 20:
+                    infographic_parts.append(f"📌 *תמצית:*\n{summary_text}\n")
 
-                        print(f"      ✂️  Clip window: {start_ms}ms → {end_ms}ms ({end_ms - start_ms}ms)")
+                if speaker_names:
+                    infographic_parts.append(f"👥 *דוברים:* {', '.join(sorted(speaker_names))}\n")
 
-                        audio_slice = audio_segment[start_ms:end_ms]
-                        print(f"      🔊 Volume: {audio_slice.dBFS:.1f} dBFS | Duration: {len(audio_slice)}ms")
+                if topics:
+                    infographic_parts.append("📋 *נושאים:*")
+                    for t in topics[:6]:
+                        infographic_parts.append(f"  • {t}")
+                    infographic_parts.append("")
 
-                        if _export_and_send_clip(audio_slice, friendly_name, f"pyannote-direct", embedding=embedding):
-                            print(f"      ✅ Clip sent for {friendly_name}")
-                        else:
-                            print(f"      ❌ Failed to send clip for {friendly_name}")
-                else:
-                    print("✅ [pyannote] All speakers identified — no clips needed")
+                infographic_text = "\n".join(infographic_parts)
+                if len(infographic_text.strip()) > 40:
+                    gi_result = whatsapp_provider.send_whatsapp(
+                        message=infographic_text,
+                        to=f"+{from_number}"
+                    )
+                    if gi_result.get('success'):
+                        print("📓 [Guaranteed Infographic] Text infographic sent ✅")
+                        return True
+                    else:
+                        raise RuntimeError(f"Send failed: {gi_result.get('error')}")
+            return False
 
-            except ImportError:
-                print("⚠️  pydub not installed — cannot extract clips")
-            except Exception as pya_clip_err:
-                print(f"⚠️  [pyannote] Clip extraction error: {pya_clip_err}")
-                traceback.print_exc()
+        # ============================================================
+        # Step 3a: Unknown Speaker Clip Extraction & Send
+        # Right after the summary — never waits for Drive saves!
+        # Critical: clips sent even if container crashes during Drive ops
+        # ============================================================
+        def _clips_stage(inputs):
+            # ══════════════════════════════════════════════════════════════
+            # PATH A: pyannote-powered clip extraction (PREFERRED)
+            # pyannote already found the best segment per speaker — use it!
+            # ══════════════════════════════════════════════════════════════
+            _used_pyannote_clips = False
+
+            if pyannote_speaker_results:
+                try:
+                    from pydub import AudioSegment
+                    audio_segment = AudioSegment.from_file(tmp_path)
+                    audio_len_ms = len(audio_segment)
+
+                    unknown_pyannote = {
+                        spk: info for spk, info in pyannote_speaker_results.items()
+                        if info.get("status") == "unknown"
+                    }
+
+                    if unknown_pyannote:
+                        _used_pyannote_clips = True
+                        print(f"\n{'='*60}")
+                        print(f"🎯 [pyannote] DIRECT CLIP EXTRACTION for {len(unknown_pyannote)} unknown speaker(s)")
+                        print(f"{'='*60}")
+
+                        for spk_label, info in unknown_pyannote.items():
+                            best_seg = info.get("best_segment", {})
+                            start_sec = best_seg.get("start", 0)
+                            end_sec = best_seg.get("end", 0)
+                            duration_sec = best_seg.get("duration", end_sec - start_sec)
+                            embedding = info.get("embedding")
+
+                            # Get the friendly name from diarization_hints
+                            friendly_name = "Unknown Speaker"
+                            if diarization_hints:
+                                friendly_name = diarization_hints.get("speakers", {}).get(spk_label, {}).get("name", spk_label)
+
+                            # Skip self
+                            if friendly_name.lower() in self_names:
+                                print(f"   🔇 Skipping self: {friendly_name}")
+                                continue
+
+                            print(f"\n   🎤 {friendly_name} ({spk_label})")
+                            print(f"      📍 Best segment: {start_sec:.1f}s → {end_sec:.1f}s ({duration_sec:.1f}s)")
+
+                            if duration_sec < 0.5:
+                                print(f"      ⚠️  Segment too short ({duration_sec:.1f}s < 0.5s) — skipping")
+                                continue
+
+                            # Convert to ms and apply bounds
+                            start_ms = int(start_sec * 1000)
+                            end_ms = int(end_sec * 1000)
+
+                            # Cap at 7 seconds, centered on segment
+                            TARGET_MAX_MS = 7000
+                            if (end_ms - start_ms) > TARGET_MAX_MS:
+                                center = (start_ms + end_ms) // 2
+                                start_ms = center - TARGET_MAX_MS // 2
+                                end_ms = center + TARGET_MAX_MS // 2
+
+                            start_ms = max(0, start_ms)
+                            end_ms = min(audio_len_ms, end_ms)
+
+                            print(f"      ✂️  Clip window: {start_ms}ms → {end_ms}ms ({end_ms - start_ms}ms)")
+
+                            audio_slice = audio_segment[start_ms:end_ms]
+                            print(f"      🔊 Volume: {audio_slice.dBFS:.1f} dBFS | Duration: {len(audio_slice)}ms")
+
+                            if _export_and_send_clip(audio_slice, friendly_name, f"pyannote-direct", embedding=embedding):
+                                print(f"      ✅ Clip sent for {friendly_name}")
+                            else:
+                                print(f"      ❌ Failed to send clip for {friendly_name}")
+                    else:
+                        print("✅ [pyannote] All speakers identified — no clips needed")
 
-        # PATH B: Legacy VAD Smart Slicer (when pyannote is NOT available)
-        if not _used_pyannote_clips and unidentified_count > 0:
-            print("ℹ️  [Legacy] Using VAD Smart Slicer (pyannote not available or no unknowns from pyannote)")
-            # Legacy clip extraction runs later if needed (Step 5)
+                except ImportError:
+                    print("⚠️  pydub not installed — cannot extract clips")
+                except Exception as pya_clip_err:
+                    print(f"⚠️  [pyannote] Clip extraction error: {pya_clip_err}")
+                    traceback.print_exc()
 
-        print(f"✅ [Clips] {len(unknown_speakers_processed)} unknown speaker clip(s) sent to user")
+            # PATH B: Legacy VAD Smart Slicer (when pyannote is NOT available)
+            if not _used_pyannote_clips and unidentified_count > 0:
+                print("ℹ️  [Legacy] Using VAD Smart Slicer (pyannote not available or no unknowns from pyannote)")
+                # Legacy clip extraction runs later if needed (Step 5)
+
+            print(f"✅ [Clips] {len(unknown_speakers_processed)} unknown speaker clip(s) sent to user")
+            return len(unknown_speakers_processed)
 
         # ============================================================
         # Step 3.5: Save transcript + memory (Drive operations)
-        # Non-critical: wrapped in try/except so crashes don't lose analysis
+        # Non-critical: a failed stage is logged and its dependents still
+        # run, so Drive errors never lose the analysis
         # ============================================================
 
         # Save FULL transcript as separate file in Transcripts/
-        transcript_file_id = None
-
-        try:
+        def _transcript_stage(inputs):
             transcript_save_data = {
                 "timestamp": recording_date_iso,
                 "timestamp_is_estimated": recording_date_is_estimated,
@@ -834,11 +884,11 @@ def process_audio_core(
                 print(f"📄 [Transcript] Saved to Transcripts/ folder (ID: {transcript_file_id})")
             else:
                 print("⚠️  [Transcript] Failed to save to Transcripts/ — continuing anyway")
-        except Exception as transcript_err:
-            print(f"⚠️  [Transcript] Error saving: {transcript_err}")
+            return transcript_file_id
 
         # Save SLIM entry to memory.json (summary + reference only)
-        try:
+        def _memory_stage(inputs):
+            transcript_file_id = inputs["transcript"]
             print("💾 [Drive Upload] Saving slim audio interaction to memory...")
             audio_interaction = {
                 "timestamp": recording_date_iso,
@@ -869,106 +919,109 @@ def process_audio_core(
 
             drive_memory_service.update_memory(audio_interaction)
             print("✅ Saved slim audio interaction to memory")
-        except Exception as mem_err:
-            print(f"⚠️  [Drive] Memory save failed (non-fatal, analysis already sent): {mem_err}")
 
         # ============================================================
         # Step 3.5: UPDATE SPEAKER IDENTITY GRAPH
         # ============================================================
-        try:
-            from app.services.speaker_identity_service import speaker_identity_service
+        def _identity_graph_stage(inputs):
+            transcript_file_id = inputs["transcript"]
+            try:
+                from app.services.speaker_identity_service import speaker_identity_service
 
-            if pyannote_speaker_results:
-                israel_date = recording_date_israel.strftime('%Y-%m-%d')
+                if pyannote_speaker_results:
+                    israel_date = recording_date_israel.strftime('%Y-%m-%d')
 
-                for spk_label, info in pyannote_speaker_results.items():
-                    person_id = info.get("person_id")
-                    if not person_id:
-                        continue
-
-                    # Add conversation entry for each identified speaker
-                    speaker_sentiment_data = speaker_sentiment.get(
-                        speaker_identity_service.get_person_canonical_name(person_id) or spk_label,
-                        {}
-                    )
-                    sentiment_score = speaker_sentiment_data.get("score") if isinstance(speaker_sentiment_data, dict) else None
+                    for spk_label, info in pyannote_speaker_results.items():
+                        person_id = info.get("person_id")
+                        if not person_id:
+                            continue
 
-                    speaker_identity_service.add_conversation(
-                        person_id=person_id,
+                        # Add conversation entry for each identified speaker
+                        speaker_sentiment_data = speaker_sentiment.get(
+                            speaker_identity_service.get_person_canonical_name(person_id) or spk_label,
+                            {}
+                        )
+                        sentiment_score = speaker_sentiment_data.get("score") if isinstance(speaker_sentiment_data, dict) else None
+
+                        speaker_identity_service.add_conversation(
+                            person_id=person_id,
+                            date=israel_date,
+                            transcript_id=transcript_file_id,
+                            audio_file_id=audio_metadata.get('file_id', ''),
+                            topics=topics,
+                            sentiment=sentiment_score,
+                            summary=summary_text[:500] if summary_text else None
+                        )
+                        print(f"   📊 [SIG] Updated conversation index for {person_id}")
+
+                    # Record voice mapping for this session
+                    mapping_record = {}
+                    for spk_label, info in pyannote_speaker_results.items():
+                        mapping_record[spk_label] = {
+                            "person_id": info.get("person_id"),
+                            "confidence": info.get("confidence", 0)
+                        }
+                    speaker_identity_service.record_voice_mapping(
                         date=israel_date,
-                        transcript_id=transcript_file_id,
                         audio_file_id=audio_metadata.get('file_id', ''),
-                        topics=topics,
-                        sentiment=sentiment_score,
-                        summary=summary_text[:500] if summary_text else None
+                        mappings=mapping_record
                     )
-                    print(f"   📊 [SIG] Updated conversation index for {person_id}")
-
-                # Record voice mapping for this session
-                mapping_record = {}
-                for spk_label, info in pyannote_speaker_results.items():
-                    mapping_record[spk_label] = {
-                        "person_id": info.get("person_id"),
-                        "confidence": info.get("confidence", 0)
-                    }
-                speaker_identity_service.record_voice_mapping(
-                    date=israel_date,
-                    audio_file_id=audio_metadata.get('file_id', ''),
-                    mappings=mapping_record
-                )
 
-                # Save to Drive
-                speaker_identity_service.save_if_dirty()
-                print(f"✅ [SIG] Speaker Identity Graph updated and saved")
+                    # Save to Drive
+                    speaker_identity_service.save_if_dirty()
+                    print(f"✅ [SIG] Speaker Identity Graph updated and saved")
 
-        except ImportError:
-            pass  # SpeakerIdentityService not available
-        except Exception as sig_err:
-            print(f"⚠️ [SIG] Error updating Speaker Identity Graph (non-fatal): {sig_err}")
-            traceback.print_exc()
+            except ImportError:
+                pass  # SpeakerIdentityService not available
 
         # UPDATE WORKING MEMORY for Zero Latency RAG
-        try:
-            from app.main import update_last_session_context, _voice_map_cache as vm_cache
-            update_last_session_context(
-                summary=summary_text,
-                speakers=list(speaker_names),
-                timestamp=recording_date_iso,
-                transcript_file_id=audio_metadata.get('file_id', ''),
-                segments=segments,
-                full_transcript=transcript_json,
-                identified_speakers=vm_cache.copy(),
-                expert_analysis=expert_analysis_result if expert_analysis_result and expert_analysis_result.get('success') else None
-            )
-        except Exception as wm_legacy_err:
-            print(f"⚠️  [WorkingMemory] Legacy update failed: {wm_legacy_err}")
-
-        # Inject Working Memory into Conversation Engine
-        try:
-            expert_snippet = ""
-            if expert_analysis_result and expert_analysis_result.get('success'):
-                expert_snippet = expert_analysis_result.get("raw_analysis", "")[:500]
+        def _working_memory_stage(inputs):
+            try:
+                from app.main import update_last_session_context, _voice_map_cache as vm_cache
+                update_last_session_context(
+                    summary=summary_text,
+                    speakers=list(speaker_names),
+                    timestamp=recording_date_iso,
+                    transcript_file_id=audio_metadata.get('file_id', ''),
+                    segments=segments,
+                    full_transcript=transcript_json,
+                    identified_speakers=vm_cache.copy(),
+                    expert_analysis=expert_analysis_result if expert_analysis_result and expert_analysis_result.get('success') else None
+                )
+            except Exception as wm_legacy_err:
+                print(f"⚠️  [WorkingMemory] Legacy update failed: {wm_legacy_err}")
 
-            conversation_engine.inject_session_context(
-                phone=from_number,
-                summary=summary_text,
-                speakers=speaker_names,
-                segments=segments,
-                expert_analysis=expert_snippet,
-                timestamp=recording_date_iso,
-            )
-            print("💾 [ConvEngine] Working memory injected for next chat interaction")
-        except Exception as wm_err:
-            print(f"⚠️  [ConvEngine] Working memory injection failed: {wm_err}")
+            # Inject Working Memory into Conversation Engine
+            try:
+                expert_snippet = ""
+                if expert_analysis_result and expert_analysis_result.get('success'):
+                    expert_snippet = expert_analysis_result.get("raw_analysis", "")[:500]
+
+                conversation_engine.inject_session_context(
+                    phone=from_number,
+                    summary=summary_text,
+                    speakers=speaker_names,
+                    segments=segments,
+                    expert_analysis=expert_snippet,
+                    timestamp=recording_date_iso,
+                )
+                print("💾 [ConvEngine] Working memory injected for next chat interaction")
+            except Exception as wm_err:
+                print(f"⚠️  [ConvEngine] Working memory injection failed: {wm_err}")
 
         # ============================================================
         # Step 4: PROACTIVE FACT IDENTIFICATION
         # ============================================================
-        try:
+        def _facts_stage(inputs):
             from app.services.context_writer_service import context_writer
 
             print("🧠 [FactID] Scanning transcript for new facts...")
-            new_facts = context_writer.identify_facts(summary_text, segments)
+            return context_writer.identify_facts(summary_text, segments)
+
+        def _facts_confirm_stage(inputs):
+            from app.services.context_writer_service import context_writer
+
+            new_facts = inputs["facts"]
 
             if new_facts:
                 confirmation_msg = context_writer.format_fact_confirmation(new_facts)
@@ -982,145 +1035,81 @@ def process_audio_core(
                     print(f"   ✅ [FactID] Sent {len(new_facts)} fact(s) for confirmation")
             else:
                 print("   ℹ️ [FactID] No new facts detected")
-        except Exception as fact_err:
-            print(f"   ⚠️ [FactID] Error: {fact_err}")
-            traceback.print_exc()
 
         # ============================================================
-        # Step 5: NOTEBOOKLM DEEP ANALYSIS + INFOGRAPHIC
+        # Step 5: NOTEBOOKLM DEEP ANALYSIS + INFOGRAPHIC (post-processing queue)
+        # The Pro analysis, infographic rendering/sending and the Drive
+        # save run on post_processing_queue, so this pipeline finishes as
+        # soon as the user-facing summary has been sent.
         # Always attempts to send a visual or text infographic.
         # If NotebookLM fails, falls back to text-based infographic
         # from the expert analysis already available.
         # ============================================================
-        notebooklm_analysis = None
-        infographic_sent = False
-        try:
-            from app.services.notebooklm_service import notebooklm_service
-
-            if notebooklm_service.is_enabled and whatsapp_provider:
-                print("📓 [NotebookLM] Starting deep analysis...")
-
-                # Build full transcript text from segments
-                full_transcript_text = "\n".join(
-                    f"{seg.get('speaker', '?')}: {seg.get('text', '')}"
-                    for seg in segments
-                    if seg.get('text')
-                )
-
-                nb_metadata = {
-                    "filename": audio_metadata.get('filename', ''),
-                    "timestamp": recording_date_israel.strftime('%d/%m/%Y %H:%M'),
-                    "source": source,
-                    "file_id": audio_metadata.get('file_id', ''),
-                }
-
-                notebooklm_analysis = notebooklm_service.analyze_recording(
-                    transcript_text=full_transcript_text,
-                    expert_summary=expert_summary if expert_summary else "",
-                    speakers=list(speaker_names),
-                    segments=segments,
-                    metadata=nb_metadata,
-                    drive_memory_service=drive_memory_service,
-                )
-
-                if notebooklm_analysis:
-                    print(f"📓 [NotebookLM] Analysis complete — generating infographic...")
-                    print(f"   Analysis keys: {list(notebooklm_analysis.keys()) if isinstance(notebooklm_analysis, dict) else type(notebooklm_analysis)}")
-
-                    # Attempt 1: PNG infographic image
-                    try:
-                        from app.services.infographic_generator import generate_infographic
-                        print("📓 [NotebookLM] Calling generate_infographic()...")
-                        infographic_path = generate_infographic(notebooklm_analysis)
-                        print(f"📓 [NotebookLM] Infographic path: {infographic_path}")
-                        if infographic_path:
-                            file_size = os.path.getsize(infographic_path) if os.path.exists(infographic_path) else 0
-                            print(f"📓 [NotebookLM] Infographic file size: {file_size} bytes")
-                        if infographic_path and hasattr(whatsapp_provider, 'send_image'):
-                            print(f"📓 [NotebookLM] Sending image via WhatsApp...")
-                            img_result = whatsapp_provider.send_image(
-                                image_path=infographic_path,
-                                caption="📓 ניתוח מעמיק — Second Brain",
-                                to=f"+{from_number}"
-                            )
-                            if img_result.get('success'):
-                                print("🖼️ [NotebookLM] Infographic IMAGE sent via WhatsApp ✅")
-                                infographic_sent = True
-                            else:
-                                print(f"⚠️ [NotebookLM] Image send failed: {img_result}")
-                            # Cleanup temp file
-                            try:
-                                os.remove(infographic_path)
-                            except Exception:
-                                pass
-                        elif not infographic_path:
-                            print("⚠️ [NotebookLM] generate_infographic returned None/empty")
-                        elif not hasattr(whatsapp_provider, 'send_image'):
-                            print("⚠️ [NotebookLM] WhatsApp provider missing send_image method")
-                    except Exception as img_err:
-                        print(f"⚠️ [NotebookLM] Image generation failed: {img_err}")
-                        traceback.print_exc()
-
-                    # Attempt 2: text infographic (always try if image failed)
-                    if not infographic_sent:
-                        try:
-                            print("📓 [NotebookLM] Falling back to text infographic...")
-                            infographic_msg = notebooklm_service.format_infographic(notebooklm_analysis)
-                            if infographic_msg and len(infographic_msg.strip()) > 20:
-                                nb_result = whatsapp_provider.send_whatsapp(
-                                    message=infographic_msg,
-                                    to=f"+{from_number}"
-                                )
-                                if nb_result.get('success'):
-                                    print("📓 [NotebookLM] Text infographic sent (fallback) ✅")
-                                    infographic_sent = True
-                                else:
-                                    print(f"⚠️ [NotebookLM] Text fallback send failed: {nb_result.get('error')}")
-                            else:
-                                print("⚠️ [NotebookLM] format_infographic returned empty/short text")
-                        except Exception as txt_err:
-                            print(f"⚠️ [NotebookLM] Text infographic failed: {txt_err}")
-                else:
-                    print("⚠️ [NotebookLM] Analysis returned None — Gemini call may have failed")
-            elif not notebooklm_service.is_enabled:
-                print("ℹ️ [NotebookLM] Disabled — skipping deep analysis")
-
-        except Exception as nb_err:
-            print(f"⚠️ [NotebookLM] Error (non-fatal): {nb_err}")
-            traceback.print_exc()
-
-        # ── GUARANTEED FALLBACK: if NotebookLM failed AND the early ──
-        # ── text infographic also wasn't sent, send one now            ──
-        if not infographic_sent and not guaranteed_infographic_sent and whatsapp_provider and expert_summary:
+        def _notebooklm_stage(inputs):
+            post_processing = None
+            guaranteed_infographic_sent = bool(inputs["guaranteed_infographic"])
+            fallback_args = (whatsapp_provider, from_number, summary_text, speaker_names, topics,
+                             expert_summary, guaranteed_infographic_sent)
             try:
-                print("📓 [Infographic Fallback] Last resort — building from expert analysis...")
-                fallback_parts = ["📓 *ניתוח מעמיק:*\n"]
-
-                if summary_text:
-                    fallback_parts.append(f"📌 *תמצית:*\n{summary_text}\n")
-
-                if speaker_names:
-                    fallback_parts.append(f"👥 *דוברים:* {', '.join(sorted(speaker_names))}\n")
+                from app.services.notebooklm_service import notebooklm_service
+                from app.services.post_processing_queue import post_processing_queue, PRIORITY_NORMAL
+
+                if notebooklm_service.is_enabled and whatsapp_provider:
+                    # Build full transcript text from segments
+                    full_transcript_text = "\n".join(
+                        f"{seg.get('speaker', '?')}: {seg.get('text', '')}"
+                        for seg in segments
+                        if seg.get('text')
+                    )
 
-                if topics:
-                    fallback_parts.append("📋 *נושאים:*")
-                    for t in topics[:6]:
-                        fallback_parts.append(f"  • {t}")
-                    fallback_parts.append("")
+                    nb_metadata = {
+                        "filename": audio_metadata.get('filename', ''),
+                        "timestamp": recording_date_israel.strftime('%d/%m/%Y %H:%M'),
+                        "source": source,
+                        "file_id": audio_metadata.get('file_id', ''),
+                    }
 
-                fallback_msg = "\n".join(fallback_parts)
-                if len(fallback_msg.strip()) > 30:
-                    fb_result = whatsapp_provider.send_whatsapp(
-                        message=fallback_msg,
-                        to=f"+{from_number}"
+                    job_args = (full_transcript_text, expert_summary if expert_summary else "", list(speaker_names),
+                                segments, nb_metadata, drive_memory_service, fallback_args)
+                    future = post_processing_queue.submit(
+                        "analysis", _notebooklm_job, *job_args,
+                        priority=PRIORITY_NORMAL, label=nb_metadata["filename"] or from_number[-4:],
                     )
-                    if fb_result.get('success'):
-                        print("📓 [Infographic Fallback] Basic summary sent ✅")
-                        infographic_sent = True
+                    if future is None:
+                        print("⚠️ [NotebookLM] Post-processing queue full — running deep analysis inline")
+                        _notebooklm_job(*job_args)
+                        post_processing = "inline"
                     else:
-                        print(f"⚠️ [Infographic Fallback] Send failed: {fb_result.get('error')}")
-            except Exception as fb_err:
-                print(f"⚠️ [Infographic Fallback] Error: {fb_err}")
+                        print("📓 [NotebookLM] Deep analysis queued for post-processing")
+                        post_processing = "queued"
+                else:
+                    if not notebooklm_service.is_enabled:
+                        print("ℹ️ [NotebookLM] Disabled — skipping deep analysis")
+                    _send_fallback_infographic(*fallback_args)
+
+            except Exception as nb_err:
+                print(f"⚠️ [NotebookLM] Error (non-fatal): {nb_err}")
+                traceback.print_exc()
+                _send_fallback_infographic(*fallback_args)
+            return post_processing
+
+        dag = StageDAG(label=audio_metadata.get('filename', '') or from_number[-4:])
+        dag.add("summary", _summary_stage, timeout=120)     # No retry: a send is not idempotent
+        dag.add("guaranteed_infographic", _guaranteed_infographic_stage, deps=["summary"], timeout=60)
+        # A clip stage that outlives its timeout finishes after the cleanup
+        # in `finally` has run, so it deletes the slices it left behind itself
+        dag.add("clips", _clips_stage, deps=["guaranteed_infographic"], timeout=600,
+                on_late=lambda _: _remove_files(slice_files_to_cleanup))
+        dag.add("transcript", _transcript_stage, timeout=300)
+        dag.add("memory", _memory_stage, deps=["transcript"], timeout=300)
+        dag.add("identity_graph", _identity_graph_stage, deps=["transcript"], timeout=300)
+        dag.add("working_memory", _working_memory_stage, timeout=60)
+        dag.add("facts", _facts_stage, timeout=180, retries=1)
+        dag.add("facts_confirm", _facts_confirm_stage, deps=["facts", "clips"], timeout=60)
+        dag.add("notebooklm", _notebooklm_stage, deps=["guaranteed_infographic"], timeout=900)
+        stage_results = dag.run()
+        transcript_file_id = stage_results["transcript"]
+        post_processing = stage_results["notebooklm"]
 
         print(f"\n{'='*60}")
         print(f"✅ AUDIO PROCESSING COMPLETED (source: {source})")
@@ -1134,7 +1123,8 @@ def process_audio_core(
             "transcript_file_id": transcript_file_id,
             "summary": summary_text,
             "expert_analysis": expert_analysis_result,
-            "notebooklm_analysis": notebooklm_analysis,
+            "notebooklm": post_processing,
+            "stages": dag.get_spans(),
             "diarization_engine": "pyannote" if diarization_hints else "gemini",
             "pyannote_speakers": {
                 k: {"person_id": v.get("person_id"), "status": v.get("status"), "confidence": v.get("confidence")}
@@ -1157,13 +1147,11 @@ def process_audio_core(
                 pass
 
     finally:
+        # The speculative upload stays registered for reuse; drop our lease
+        gemini_service.release_prefetch(upload_prefetch)
+
         # Cleanup slice files
-        for f in slice_files_to_cleanup:
-            try:
-                if os.path.exists(f):
-                    os.unlink(f)
-            except Exception:
-                pass
+        _remove_files(slice_files_to_cleanup)
 
         # Cleanup reference voice temp files
         for rv in reference_voices:
@@ -1175,3 +1163,174 @@ def process_audio_core(
                 pass
 
     return result_info
+
+
+def _remove_files(paths: List[str]):
+    """Delete temp files; a stage that is still running may append to paths meanwhile."""
+    for f in list(paths):
+        try:
+            if os.path.exists(f):
+                os.unlink(f)
+        except Exception:
+            pass
+
+
+# ============================================================
+# POST-PROCESSING JOBS (run on post_processing_queue)
+# ============================================================
+
+def _notebooklm_job(
+    transcript_text: str,
+    expert_summary: str,
+    speaker_names: List[str],
+    segments: List[Dict[str, Any]],
+    nb_metadata: Dict[str, Any],
+    drive_memory_service,
+    fallback_args: tuple,
+) -> Optional[Dict[str, Any]]:
+    """
+    NotebookLM deep analysis for one recording. On success, queues the
+    infographic (user-facing) and the Drive save (background) as their
+    own jobs; on failure, sends the fallback infographic.
+    """
+    from app.services.notebooklm_service import notebooklm_service
+    from app.services.post_processing_queue import (post_processing_queue, PRIORITY_USER_FACING,
+                                                    PRIORITY_BACKGROUND)
+
+    notebooklm_analysis = None
+    try:
+        print("📓 [NotebookLM] Starting deep analysis...")
+        notebooklm_analysis = notebooklm_service.analyze_recording(
+            transcript_text=transcript_text,
+            expert_summary=expert_summary,
+            speakers=speaker_names,
+            segments=segments,
+            metadata=nb_metadata,
+        )
+    except Exception as nb_err:
+        print(f"⚠️ [NotebookLM] Error (non-fatal): {nb_err}")
+        traceback.print_exc()
+
+    if not notebooklm_analysis:
+        print("⚠️ [NotebookLM] Analysis returned None — Gemini call may have failed")
+        _send_fallback_infographic(*fallback_args)
+        return None
+
+    label = nb_metadata.get("filename", "")
+    if post_processing_queue.submit("render", _infographic_job, notebooklm_analysis, fallback_args,
+                                    priority=PRIORITY_USER_FACING, label=label) is None:
+        _infographic_job(notebooklm_analysis, fallback_args)
+    if drive_memory_service:
+        if post_processing_queue.submit("drive", notebooklm_service.save_analysis, notebooklm_analysis,
+                                        nb_metadata, drive_memory_service,
+                                        priority=PRIORITY_BACKGROUND, label=label) is None:
+            notebooklm_service.save_analysis(notebooklm_analysis, nb_metadata, drive_memory_service)
+    return notebooklm_analysis
+
+
+def _infographic_job(notebooklm_analysis: Dict[str, Any], fallback_args: tuple) -> bool:
+    """Render and send the NotebookLM infographic (PNG, else text, else fallback)."""
+    from app.services.notebooklm_service import notebooklm_service
+
+    whatsapp_provider, from_number = fallback_args[0], fallback_args[1]
+    infographic_sent = False
+    print(f"📓 [NotebookLM] Analysis complete — generating infographic...")
+    print(f"   Analysis keys: {list(notebooklm_analysis.keys()) if isinstance(notebooklm_analysis, dict) else type(notebooklm_analysis)}")
+
+    # Attempt 1: PNG infographic image
+    try:
+        from app.services.infographic_generator import generate_infographic
+        print("📓 [NotebookLM] Calling generate_infographic()...")
+        infographic_path = generate_infographic(notebooklm_analysis)
+        print(f"📓 [NotebookLM] Infographic path: {infographic_path}")
+        if infographic_path:
+            file_size = os.path.getsize(infographic_path) if os.path.exists(infographic_path) else 0
+            print(f"📓 [NotebookLM] Infographic file size: {file_size} bytes")
+        if infographic_path and hasattr(whatsapp_provider, 'send_image'):
+            print(f"📓 [NotebookLM] Sending image via WhatsApp...")
+            img_result = whatsapp_provider.send_image(
+                image_path=infographic_path,
+                caption="📓 ניתוח מעמיק — Second Brain",
+                to=f"+{from_number}"
+            )
+            if img_result.get('success'):
+                print("🖼️ [NotebookLM] Infographic IMAGE sent via WhatsApp ✅")
+                infographic_sent = True
+            else:
+                print(f"⚠️ [NotebookLM] Image send failed: {img_result}")
+            # Cleanup temp file
+            try:
+                os.remove(infographic_path)
+            except Exception:
+                pass
+        elif not infographic_path:
+            print("⚠️ [NotebookLM] generate_infographic returned None/empty")
+        elif not hasattr(whatsapp_provider, 'send_image'):
+            print("⚠️ [NotebookLM] WhatsApp provider missing send_image method")
+    except Exception as img_err:
+        print(f"⚠️ [NotebookLM] Image generation failed: {img_err}")
+        traceback.print_exc()
+
+    # Attempt 2: text infographic (always try if image failed)
+    if not infographic_sent:
+        try:
+            print("📓 [NotebookLM] Falling back to text infographic...")
+            infographic_msg = notebooklm_service.format_infographic(notebooklm_analysis)
+            if infographic_msg and len(infographic_msg.strip()) > 20:
+                nb_result = whatsapp_provider.send_whatsapp(
+                    message=infographic_msg,
+                    to=f"+{from_number}"
+                )
+                if nb_result.get('success'):
+                    print("📓 [NotebookLM] Text infographic sent (fallback) ✅")
+                    infographic_sent = True
+                else:
+                    print(f"⚠️ [NotebookLM] Text fallback send failed: {nb_result.get('error')}")
+            else:
+                print("⚠️ [NotebookLM] format_infographic returned empty/short text")
+        except Exception as txt_err:
+            print(f"⚠️ [NotebookLM] Text infographic failed: {txt_err}")
+
+    if not infographic_sent:
+        infographic_sent = _send_fallback_infographic(*fallback_args)
+    return infographic_sent
+
+
+def _send_fallback_infographic(whatsapp_provider, from_number: str, summary_text: str,
+                               speaker_names: List[str], topics: List[str], expert_summary: str,
+                               guaranteed_infographic_sent: bool) -> bool:
+    """
+    GUARANTEED FALLBACK: if NotebookLM failed AND the early text
+    infographic also wasn't sent, send a basic one from the expert analysis.
+    """
+    if guaranteed_infographic_sent or not whatsapp_provider or not expert_summary:
+        return False
+    try:
+        print("📓 [Infographic Fallback] Last resort — building from expert analysis...")
+        fallback_parts = ["📓 *ניתוח מעמיק:*\n"]
+
+        if summary_text:
+            fallback_parts.append(f"📌 *תמצית:*\n{summary_text}\n")
+
+        if speaker_names:
+            fallback_parts.append(f"👥 *דוברים:* {', '.join(sorted(speaker_names))}\n")
+
+        if topics:
+            fallback_parts.append("📋 *נושאים:*")
+            for t in topics[:6]:
+                fallback_parts.append(f"  • {t}")
+            fallback_parts.append("")
+
+        fallback_msg = "\n".join(fallback_parts)
+        if len(fallback_msg.strip()) > 30:
+            fb_result = whatsapp_provider.send_whatsapp(
+                message=fallback_msg,
+                to=f"+{from_number}"
+            )
+            if fb_result.get('success'):
+                print("📓 [Infographic Fallback] Basic summary sent ✅")
+                return True
+            print(f"⚠️ [Infographic Fallback] Send failed: {fb_result.get('error')}")
+    except Exception as fb_err:
+        print(f"⚠️ [Infographic Fallback] Error: {fb_err}")
+    return False
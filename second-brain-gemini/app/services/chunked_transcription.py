@@ -0,0 +1,286 @@
+"""
+Chunked Transcription — long recordings as parallel Gemini calls
+
+analyze_day sent a multi-hour recording to one Gemini call that had to
+transcribe and analyze it in a single response. Long transcripts hit
+max_output_tokens (hence the JSON repair code), and latency grew with the
+recording and varied a lot from call to call.
+
+When pyannote diarization hints are available and the recording is
+longer than MIN_CHUNKED_SECONDS, GeminiService transcribes it in pieces:
+  - plan_chunks() cuts about every CHUNK_TARGET_SECONDS. Each cut goes in
+    the widest pause between diarization segments within
+    ±CUT_WINDOW_FRACTION of the target, so no turn is split. With no
+    pause in the window it cuts at the nearest turn end, and with no turn
+    end at the target itself.
+  - cut_chunk() extracts one piece with ffmpeg (seek + encode of that
+    piece only; the whole recording is never decoded into memory).
+  - chunk_hints() gives each chunk the diarization segments it overlaps,
+    shifted to chunk-relative time.
+  - check_chunk_transcript() rejects a chunk whose transcript came back
+    with no segments although its hints show at least
+    MIN_CHUNK_SPEECH_SECONDS of speech (an unparseable or truncated
+    response), so that chunk fails instead of silently leaving a gap.
+  - run_chunks() runs one job per chunk on a shared pool of CHUNK_WORKERS
+    threads and returns results in chunk order. One failed chunk fails
+    the run: chunks not started yet are cancelled, running ones are
+    waited for (their uploads and temp files are released before the
+    caller falls back to the single call), and ChunkRunError carries the
+    timing of the attempt.
+  - merge_chunks() shifts each chunk's timestamps by its start offset.
+  - reconcile_speakers() relabels every merged segment with the
+    diarization speaker that overlaps it most. Chunks are transcribed
+    independently, so a model-chosen label can drift between chunks;
+    pyannote's labels are global to the recording.
+The expert summary then runs once over the merged transcript text.
+
+Recordings without diarization hints stay on the single call: Gemini
+labels speakers per call in that mode, so labels from different chunks
+could not be matched up.
+
+Kill switch: CHUNKED_TRANSCRIPTION_ENABLED=false.
+"""
+
+import bisect
+import logging
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNKED_TRANSCRIPTION_ENABLED = os.environ.get("CHUNKED_TRANSCRIPTION_ENABLED", "true").lower() == "true"
+CHUNK_TARGET_SECONDS = float(os.environ.get("CHUNK_TARGET_SECONDS", "600"))
+MIN_CHUNKED_SECONDS = float(os.environ.get("MIN_CHUNKED_SECONDS", "1200"))
+CHUNK_WORKERS = int(os.environ.get("CHUNK_WORKERS", "4"))
+CUT_WINDOW_FRACTION = 0.25
+CUT_TIMEOUT_SECONDS = 300
+MIN_CHUNK_SPEECH_SECONDS = 5.0    # Hinted speech above which an empty transcript is a failure
+
+_chunk_executor = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="gemini-chunk")
+
+
+@dataclass
+class Chunk:
+    """One piece of the recording: [start, end) in seconds; end=None runs to the end."""
+    index: int
+    start: float
+    end: Optional[float]
+
+    @property
+    def label(self) -> str:
+        end = f"{self.end:.0f}s" if self.end is not None else "end"
+        return f"#{self.index + 1} {self.start:.0f}s-{end}"
+
+
+def _turns(segments: List[Dict[str, Any]]) -> List[Tuple[float, float, str]]:
+    turns = []
+    for seg in segments or []:
+        try:
+            start, end = float(seg["start"]), float(seg["end"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if end > start:
+            turns.append((start, end, seg.get("speaker", "")))
+    turns.sort()
+    return turns
+
+
+def plan_chunks(segments: List[Dict[str, Any]], duration: Optional[float] = None,
+                target: float = CHUNK_TARGET_SECONDS,
+                min_duration: float = MIN_CHUNKED_SECONDS) -> List[Chunk]:
+    """
+    Split points for a recording from its diarization segments.
+
+    duration defaults to the end of the last segment. Returns a single
+    chunk covering everything when the recording is shorter than
+    min_duration.
+    """
+    turns = _turns(segments)
+    if duration is None:
+        duration = max((end for _, end, _ in turns), default=0.0)
+    if not turns or duration < min_duration or duration <= target * (1 + CUT_WINDOW_FRACTION):
+        return [Chunk(0, 0.0, None)]
+
+    # Pauses between turns (turns may overlap, so track how far speech reaches)
+    pauses = []
+    reach = turns[0][1]
+    for start, end, _ in turns[1:]:
+        if start > reach:
+            pauses.append((reach, start))
+        reach = max(reach, end)
+    turn_ends = sorted(end for _, end, _ in turns)
+
+    cuts = []
+    last = 0.0
+    while duration - last > target * (1 + CUT_WINDOW_FRACTION):
+        want = last + target
+        low, high = want - target * CUT_WINDOW_FRACTION, want + target * CUT_WINDOW_FRACTION
+        in_window = [p for p in pauses if low <= (p[0] + p[1]) / 2 <= high]
+        if in_window:
+            a, b = max(in_window, key=lambda p: (p[1] - p[0], -abs((p[0] + p[1]) / 2 - want)))
+            cut = (a + b) / 2
+        else:
+            ends = turn_ends[bisect.bisect_left(turn_ends, low):bisect.bisect_right(turn_ends, high)]
+            cut = min(ends, key=lambda e: abs(e - want)) if ends else want
+        cuts.append(round(cut, 2))
+        last = cut
+
+    bounds = [0.0] + cuts
+    return [Chunk(i, start, bounds[i + 1] if i + 1 < len(bounds) else None)
+            for i, start in enumerate(bounds)]
+
+
+def chunk_hints(diarization_hints: Dict[str, Any], chunk: Chunk) -> Dict[str, Any]:
+    """The diarization hints that fall inside chunk, in chunk-relative time."""
+    segments = []
+    for seg in diarization_hints.get("segments", []):
+        start, end = seg.get("start"), seg.get("end")
+        if not isinstance(start, (int, float)) or not isinstance(end, (int, float)):
+            continue
+        if end <= chunk.start or (chunk.end is not None and start >= chunk.end):
+            continue
+        if chunk.end is not None:
+            end = min(end, chunk.end)
+        shifted = dict(seg)
+        shifted["start"] = round(max(start, chunk.start) - chunk.start, 2)
+        shifted["end"] = round(end - chunk.start, 2)
+        segments.append(shifted)
+    return {"segments": segments, "speakers": diarization_hints.get("speakers", {})}
+
+
+def check_chunk_transcript(chunk: Chunk, hints: Dict[str, Any], transcript: Dict[str, Any]):
+    """Raise if transcript has no segments but hints (chunk-relative) show speech in the chunk."""
+    if (transcript or {}).get("segments"):
+        return
+    speech = sum(max(0.0, seg["end"] - seg["start"]) for seg in hints.get("segments", []))
+    if speech >= MIN_CHUNK_SPEECH_SECONDS:
+        raise RuntimeError(f"chunk {chunk.label} returned no segments for {speech:.0f}s of speech")
+
+
+def cut_chunk(audio_path: str, chunk: Chunk) -> str:
+    """Extract chunk into a temporary OGG/Opus file; the caller deletes it."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".ogg") as out:
+        out_path = out.name
+    cmd = ["ffmpeg", "-y", "-v", "error", "-ss", f"{chunk.start:.2f}"]
+    if chunk.end is not None:
+        cmd += ["-t", f"{chunk.end - chunk.start:.2f}"]
+    cmd += ["-i", audio_path, "-vn", "-ac", "1", "-c:a", "libopus", "-b:a", "48k", out_path]
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=CUT_TIMEOUT_SECONDS)
+    except Exception:
+        os.remove(out_path)
+        raise
+    if result.returncode != 0 or not os.path.getsize(out_path):
+        os.remove(out_path)
+        stderr = result.stderr.decode(errors="ignore")[-200:]
+        raise RuntimeError(f"ffmpeg could not cut chunk {chunk.label}: {stderr}")
+    return out_path
+
+
+class ChunkRunError(RuntimeError):
+    """A chunk failed; .timing describes the attempt (None for chunks that did not finish)."""
+
+    def __init__(self, message: str, timing: Dict[str, Any]):
+        super().__init__(message)
+        self.timing = timing
+
+
+def run_chunks(chunks: List[Chunk], job: Callable[[Chunk], Any]) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Run job(chunk) for every chunk on the shared chunk pool.
+
+    Returns (results in chunk order, timing). The first failure cancels
+    the chunks that have not started, waits for the running ones and
+    raises ChunkRunError (chained to the chunk's exception).
+    """
+    def _timed(chunk: Chunk):
+        started = time.time()
+        result = job(chunk)
+        return result, time.time() - started
+
+    def _timing(seconds: List[Optional[float]]) -> Dict[str, Any]:
+        finished = [s for s in seconds if s is not None]
+        return {
+            "chunks": len(chunks),
+            "workers": CHUNK_WORKERS,
+            "wall_s": round(time.time() - started, 2),
+            "sequential_estimate_s": round(sum(finished), 2),
+            "chunk_s": seconds,
+        }
+
+    started = time.time()
+    futures = [_chunk_executor.submit(_timed, chunk) for chunk in chunks]
+    done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+    failed = [i for i, f in enumerate(futures) if f in done and f.exception() is not None]
+    if failed:
+        for future in not_done:
+            future.cancel()
+        wait(not_done)      # Running chunks can't be interrupted — let them clean up first
+        seconds = [round(f.result()[1], 2) if not f.cancelled() and f.exception() is None else None
+                   for f in futures]
+        error = futures[failed[0]].exception()
+        raise ChunkRunError(f"chunk {chunks[failed[0]].label} failed: {error}", _timing(seconds)) from error
+
+    outcomes = [f.result() for f in futures]
+    return [result for result, _ in outcomes], _timing([round(s, 2) for _, s in outcomes])
+
+
+def merge_chunks(chunks: List[Chunk], results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Concatenate each chunk's segments with timestamps shifted by its offset."""
+    merged = []
+    for chunk, result in zip(chunks, results):
+        for seg in (result or {}).get("segments", []):
+            start, end = seg.get("start"), seg.get("end")
+            if not isinstance(start, (int, float)) or not isinstance(end, (int, float)):
+                continue        # Dropped by segment validation anyway
+            shifted = dict(seg)
+            shifted["start"] = round(start + chunk.start, 2)
+            shifted["end"] = round(end + chunk.start, 2)
+            merged.append(shifted)
+    return merged
+
+
+def reconcile_speakers(segments: List[Dict[str, Any]], diarization_segments: List[Dict[str, Any]]) -> int:
+    """
+    Set each segment's speaker to the diarization speaker that overlaps it
+    most. Segments that overlap no diarization turn keep their label.
+    Returns the number of segments relabeled.
+    """
+    turns = _turns(diarization_segments)
+    if not turns:
+        return 0
+    starts = [start for start, _, _ in turns]
+    longest = max(end - start for start, end, _ in turns)
+    changed = 0
+    for seg in segments:
+        seg_start, seg_end = seg.get("start"), seg.get("end")
+        if not isinstance(seg_start, (int, float)) or not isinstance(seg_end, (int, float)):
+            continue
+        overlap: Dict[str, float] = {}
+        i = bisect.bisect_left(starts, seg_end) - 1
+        while i >= 0 and starts[i] >= seg_start - longest:
+            start, end, speaker = turns[i]
+            shared = min(seg_end, end) - max(seg_start, start)
+            if shared > 0:
+                overlap[speaker] = overlap.get(speaker, 0.0) + shared
+            i -= 1
+        if overlap:
+            best = max(overlap, key=overlap.get)
+            if seg.get("speaker") != best:
+                seg["speaker"] = best
+                changed += 1
+    return changed
+
+
+def transcript_text(segments: List[Dict[str, Any]]) -> str:
+    """Merged segments as "[mm:ss] speaker: text" lines for the expert prompt."""
+    lines = []
+    for seg in segments:
+        start = int(seg.get("start") or 0)
+        lines.append(f"[{start // 60:02d}:{start % 60:02d}] {seg.get('speaker', 'Unknown')}: {seg.get('text', '')}")
+    return "\n".join(lines)
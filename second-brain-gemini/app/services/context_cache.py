@@ -0,0 +1,222 @@
+"""
+Context Cache — Gemini explicit caching for the KB system instruction
+
+The Conversation Engine's system instruction embeds the whole KB block and
+the user profile (~80K chars). With a plain GenerativeModel it is re-sent
+and re-billed as input on every message.
+
+ContextCacheManager puts the system instruction and tool declarations in
+a Gemini cachedContents resource, and builds the model with
+GenerativeModel.from_cached_content(). Every chat session that starts from
+that model refers to the cache, so each message carries only the history
+and the new turn.
+
+  - Key: sha256 of model + system instruction + tool names. The cache's
+    display_name is "second-brain-kb-<key>", so after a restart an
+    existing cache with the same content is reused instead of re-created.
+  - Refresh: only when the key changes, i.e. when the KB snapshot or
+    profile changes (refresh_system_instruction). The engine moves its
+    live sessions to the new model. The previous cache is deleted after
+    RETIRE_GRACE_SECONDS, so requests already in flight still resolve it.
+  - Lifetime: caches are created with CONTEXT_CACHE_TTL_SECONDS.
+    keep_alive() extends the TTL when less than REFRESH_MARGIN_SECONDS
+    remain. It is called before each message and costs nothing otherwise.
+  - Fallback: if caching is disabled (CONV_CONTEXT_CACHE=false), fails, or
+    the prompt is under the API minimum, a plain model with
+    system_instruction is used. Creation is retried for the same key only
+    after RETRY_AFTER_SECONDS.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CACHE_ENABLED = os.environ.get("CONV_CONTEXT_CACHE", "true").lower() == "true"
+CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("CONV_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+REFRESH_MARGIN_SECONDS = 300
+RETRY_AFTER_SECONDS = 600
+RETIRE_GRACE_SECONDS = 120
+MIN_CACHE_CHARS = 4000          # Below ~1K tokens the API refuses to cache
+DISPLAY_NAME_PREFIX = "second-brain-kb-"
+
+
+def content_key(model_name: str, system_instruction: str, tool_names: List[str]) -> str:
+    """Stable hash of everything that goes into the cache."""
+    digest = hashlib.sha256()
+    for piece in [model_name, system_instruction, *sorted(tool_names)]:
+        digest.update(piece.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _tool_names(tools: List[Any]) -> List[str]:
+    names = []
+    for tool in tools or []:
+        for decl in getattr(tool, "function_declarations", []) or []:
+            names.append(getattr(decl, "name", ""))
+    return names
+
+
+class ContextCacheManager:
+    """Owns the current KB cachedContents resource and the model built from it."""
+
+    def __init__(self, enabled: bool = CONTEXT_CACHE_ENABLED,
+                 ttl_seconds: int = CONTEXT_CACHE_TTL_SECONDS):
+        self._enabled = enabled
+        self._ttl = ttl_seconds
+        self._lock = Lock()
+        self._key: Optional[str] = None
+        self._cache = None
+        self._failed: Dict[str, float] = {}     # key → last failure time
+        self._retired: List[tuple] = []         # (cache, retired_at) awaiting deletion
+        self._stats = {"created": 0, "reused": 0, "extended": 0, "failures": 0, "fallbacks": 0}
+
+    # ─── Gemini backend (overridable in tests) ───────────────────
+
+    def _create_cache(self, model_name: str, display_name: str, system_instruction: str, tools: List[Any]):
+        from google.generativeai import caching
+        return caching.CachedContent.create(
+            model=model_name, display_name=display_name,
+            system_instruction=system_instruction, tools=tools,
+            ttl=timedelta(seconds=self._ttl),
+        )
+
+    def _list_caches(self):
+        from google.generativeai import caching
+        return list(caching.CachedContent.list(page_size=100))
+
+    def _model_from_cache(self, cache):
+        import google.generativeai as genai
+        return genai.GenerativeModel.from_cached_content(cached_content=cache)
+
+    def _plain_model(self, model_name: str, system_instruction: str, tools: List[Any]):
+        import google.generativeai as genai
+        return genai.GenerativeModel(model_name=model_name, tools=tools,
+                                     system_instruction=system_instruction)
+
+    # ─── Public API ──────────────────────────────────────────────
+
+    @property
+    def is_active(self) -> bool:
+        return self._cache is not None
+
+    def get_model(self, model_name: str, system_instruction: str, tools: List[Any]):
+        """
+        Model for this system instruction, backed by a context cache when possible.
+
+        Returns the same cache while the content key is unchanged; otherwise
+        creates (or finds) the cache for the new key and retires the old one.
+        """
+        key = content_key(model_name, system_instruction, _tool_names(tools))
+        with self._lock:
+            if self._cache is not None and key == self._key:
+                return self._model_from_cache(self._cache)
+            if not self._enabled or len(system_instruction) < MIN_CACHE_CHARS or \
+                    time.time() - self._failed.get(key, 0) < RETRY_AFTER_SECONDS:
+                self._retire_current_locked()
+                self._stats["fallbacks"] += 1
+                return self._plain_model(model_name, system_instruction, tools)
+
+            start = time.time()
+            try:
+                cache = self._find_cache(key)
+                if cache is not None:
+                    self._stats["reused"] += 1
+                else:
+                    cache = self._create_cache(model_name, DISPLAY_NAME_PREFIX + key,
+                                               system_instruction, tools)
+                    self._stats["created"] += 1
+                model = self._model_from_cache(cache)
+            except Exception as e:
+                self._failed[key] = time.time()
+                self._retire_current_locked()
+                self._stats["failures"] += 1
+                self._stats["fallbacks"] += 1
+                logger.warning(f"[ContextCache] Cache unavailable, using plain model: {e}")
+                print(f"⚠️ [ContextCache] Caching failed ({str(e)[:80]}) — system instruction sent per request")
+                return self._plain_model(model_name, system_instruction, tools)
+
+            self._retire_current_locked()
+            self._cache, self._key = cache, key
+            tokens = getattr(getattr(cache, "usage_metadata", None), "total_token_count", "?")
+            print(f"🧊 [ContextCache] KB cached as {getattr(cache, 'name', '?')} "
+                  f"({tokens} tokens, {int((time.time() - start) * 1000)}ms)")
+        return model
+
+    def _retire_current_locked(self):
+        if self._cache is not None:
+            self._retired.append((self._cache, time.time()))
+        self._cache, self._key = None, None
+
+    def keep_alive(self) -> bool:
+        """
+        Extend the cache TTL when it is close to expiry.
+
+        Returns False if the cache is gone, and the caller must then rebuild
+        its model with get_model(). Returns True when no cache is in use.
+        """
+        self._delete_retired()
+        cache = self._cache
+        if cache is None:
+            return True
+        expire_time = getattr(cache, "expire_time", None)
+        if expire_time is not None and \
+                expire_time - datetime.now(timezone.utc) > timedelta(seconds=REFRESH_MARGIN_SECONDS):
+            return True
+        try:
+            cache.update(ttl=timedelta(seconds=self._ttl))
+            self._stats["extended"] += 1
+            return True
+        except Exception as e:
+            logger.warning(f"[ContextCache] Could not extend cache: {e}")
+            with self._lock:
+                if self._cache is cache:
+                    self._cache, self._key = None, None
+            return False
+
+    def _find_cache(self, key: str):
+        """An existing, not-about-to-expire cache for key (e.g. from before a restart)."""
+        wanted = DISPLAY_NAME_PREFIX + key
+        now = datetime.now(timezone.utc)
+        for cache in self._list_caches():
+            if getattr(cache, "display_name", "") != wanted:
+                continue
+            expire_time = getattr(cache, "expire_time", None)
+            if expire_time is None or expire_time - now > timedelta(seconds=REFRESH_MARGIN_SECONDS):
+                return cache
+        return None
+
+    def _delete_retired(self):
+        """Delete replaced caches once no in-flight request can still need them."""
+        if not self._retired:
+            return
+        with self._lock:
+            cutoff = time.time() - RETIRE_GRACE_SECONDS
+            due = [c for c, retired_at in self._retired if retired_at <= cutoff]
+            self._retired = [(c, t) for c, t in self._retired if t > cutoff]
+        for cache in due:
+            try:
+                cache.delete()
+                print(f"🗑️ [ContextCache] Deleted previous cache {getattr(cache, 'name', '?')}")
+            except Exception as e:
+                logger.debug(f"[ContextCache] Delete failed (will expire by TTL): {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        cache = self._cache
+        expire_time = getattr(cache, "expire_time", None) if cache else None
+        return {
+            "enabled": self._enabled,
+            "active": cache is not None,
+            "key": self._key,
+            "retired_pending": len(self._retired),
+            "name": getattr(cache, "name", None) if cache else None,
+            "expires_in_seconds": int((expire_time - datetime.now(timezone.utc)).total_seconds())
+            if expire_time else None,
+            **self._stats,
+        }
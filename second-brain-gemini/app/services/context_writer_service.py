@@ -31,6 +31,8 @@ from typing import Optional, Dict, Any, List, Tuple
 from threading import Lock
 from dataclasses import dataclass, field
 
+from app.services.tool_cache import bump_data_version
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -592,6 +594,7 @@ Return ONLY the JSON array. No explanations."""
             from app.services import knowledge_base_service as kb
             kb._cache_timestamp = 0
             kb._cached_context = None
+            bump_data_version("kb", "facts written")
             print("   🔄 [Writer] KB cache invalidated — will reload on next query")
         except Exception:
             pass
@@ -43,21 +43,31 @@ import json
 import logging
 import os
 import time
-from typing import Optional, Dict, Any, List, Tuple
-from threading import Lock
+from typing import Optional, Callable, Dict, Any, List, Tuple
 
 import google.generativeai as genai
 from google.generativeai.types import content_types
 
+from app.services.context_cache import ContextCacheManager
+from app.services.history_compactor import HISTORY_TOKEN_BUDGET, compact_history, strip_request_parts
+from app.services.session_checkpoint import SessionCheckpointStore, serialize_history
+from app.services.session_store import TTLSessionStore
+from app.services.tool_cache import bump_data_version, tool_cache
+from app.services.tool_runner import run_tool_calls
+from app.services.user_message_queue import UserMessageQueue
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════
-SESSION_TTL_SECONDS = 1800  # 30 minutes — chat sessions expire after inactivity
-MAX_SESSIONS = 200          # Cap to prevent unbounded memory growth
-MAX_HISTORY_TURNS = 20      # Keep last 20 turns (40 messages) per session
+SESSION_TTL_SECONDS = int(os.environ.get("CONV_SESSION_TTL_SECONDS", "1800"))  # 30 minutes — expire after inactivity
+MAX_SESSIONS = int(os.environ.get("CONV_MAX_SESSIONS", "200"))                 # Cap to prevent unbounded memory growth
+MAX_HISTORY_TURNS = 20      # Turns kept in session checkpoints (live history is token-budgeted)
 TOOL_CALL_MAX_RETRIES = 3   # Max tool-call round-trips per message
+MESSAGE_WORKERS = int(os.environ.get("CONV_MESSAGE_WORKERS", "8"))          # Users processed in parallel
+MAX_PENDING_PER_USER = int(os.environ.get("CONV_MAX_PENDING_PER_USER", "5"))  # Backpressure threshold per phone
+KB_SUPPLEMENT_HEADER = "[📚 קטעים רלוונטיים מבסיס הידע:]"  # Per-request part, never kept in history
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -178,6 +188,14 @@ _TOOL_DECLARATIONS = [
                     type=genai.protos.Type.STRING,
                     description="Optional: specific speaker to search for (e.g. 'Yuval', 'יובל')"
                 ),
+                "date_from": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Optional: earliest recording date, YYYY-MM-DD (inclusive)"
+                ),
+                "date_to": genai.protos.Schema(
+                    type=genai.protos.Type.STRING,
+                    description="Optional: latest recording date, YYYY-MM-DD (inclusive)"
+                ),
             },
             required=["query"]
         )
@@ -284,6 +302,8 @@ def _execute_tool(function_name: str, args: Dict[str, Any]) -> str:
             return _tool_search_meetings(
                 query=args.get("query", ""),
                 speaker_name=args.get("speaker_name", ""),
+                date_from=args.get("date_from", ""),
+                date_to=args.get("date_to", ""),
             )
 
         elif function_name == "search_notebook":
@@ -309,6 +329,11 @@ def _execute_tool(function_name: str, args: Dict[str, Any]) -> str:
         return json.dumps({"error": str(e)}, ensure_ascii=False)
 
 
+def _execute_tool_cached(function_name: str, args: Dict[str, Any]) -> str:
+    """_execute_tool behind the tool-result cache (read-only tools only)."""
+    return tool_cache.call(function_name, args, _execute_tool)
+
+
 def _tool_search_person(name: str) -> str:
     """Search for a person across org structure and family tree."""
     from app.services.knowledge_base_service import search_people, get_all_reports_under
@@ -389,13 +414,13 @@ def _tool_get_reports(manager_name: str) -> str:
     manager = matches[0]
     canonical = manager.get("canonical_name", manager_name)
 
-    # Get ALL reports (recursive)
+    # Get ALL reports (direct + indirect, from the cached closure)
     all_reports = get_all_reports_under(canonical)
 
     # Get direct reports from the identity graph
     graph = get_identity_graph()
     people = graph.get("people", {}) if graph else {}
-    direct_reports = manager.get("direct_reports", [])
+    direct_reports = set(manager.get("direct_reports", []))
 
     # Build detailed report list
     report_details = []
@@ -502,103 +527,21 @@ def _tool_list_org_stats() -> str:
     }, ensure_ascii=False, default=str)
 
 
-def _tool_search_meetings(query: str, speaker_name: str = "") -> str:
-    """Search past meeting transcripts for a query and/or speaker."""
-    dms = conversation_engine._drive_memory_service
-    if not dms:
-        return json.dumps({"error": "Drive service not available. Cannot search transcripts."}, ensure_ascii=False)
-
-    # 1. Try Transcripts folder first (dedicated files)
-    search_terms = [t.strip() for t in query.split() if t.strip()]
-    if speaker_name:
-        search_terms.append(speaker_name)
-
-    results = dms.search_transcripts(search_terms, limit=5) if search_terms else []
-
-    # 2. Also search persistent last-session memory (always available, never popped)
-    last_sessions = conversation_engine._last_session
-    wm_matches = []
-    for phone, mem in last_sessions.items():
-        summary = mem.get("summary", "")
-        speakers = mem.get("speakers", [])
-        # Check if query matches summary or speaker
-        q_lower = query.lower()
-        if (q_lower and q_lower in summary.lower()) or \
-           any(speaker_name.lower() in s.lower() for s in speakers if speaker_name):
-            wm_matches.append({
-                "source": "working_memory (latest session)",
-                "timestamp": mem.get("timestamp", ""),
-                "speakers": speakers,
-                "summary": summary,
-            })
-
-    # 3. Also search chat_history in second_brain_memory.json
-    # This covers older meetings saved in the memory file
-    memory_matches = []
-    try:
-        memory = dms.get_memory()
-        chat_history = memory.get("chat_history", [])
-        for entry in reversed(chat_history):
-            if entry.get("type") != "audio":
-                continue
-            # Check against transcript, speakers, and expert analysis
-            entry_speakers = entry.get("speakers", [])
-            transcript = entry.get("transcript", {})
-            segments = transcript.get("segments", []) if isinstance(transcript, dict) else []
-            expert = entry.get("expert_analysis", {})
-            raw_analysis = expert.get("raw_analysis", "") if expert else ""
-            summary_text = ""
-            for seg in segments:
-                summary_text += seg.get("text", "") + " "
-            summary_text += raw_analysis
-
-            match_found = False
-            if query:
-                q_lower = query.lower()
-                if q_lower in summary_text.lower():
-                    match_found = True
-            if speaker_name:
-                for s in entry_speakers:
-                    if speaker_name.lower() in s.lower():
-                        match_found = True
-                        break
-
-            if match_found:
-                # Extract a concise summary instead of dumping everything
-                key_segments = []
-                for seg in segments:
-                    seg_text = seg.get("text", "")
-                    if query and query.lower() in seg_text.lower():
-                        key_segments.append({
-                            "speaker": seg.get("speaker", ""),
-                            "text": seg_text[:200],
-                        })
-                    elif speaker_name and speaker_name.lower() in seg.get("speaker", "").lower():
-                        key_segments.append({
-                            "speaker": seg.get("speaker", ""),
-                            "text": seg_text[:200],
-                        })
-
-                match_entry = {
-                    "source": "second_brain_memory (archived)",
-                    "timestamp": entry.get("timestamp", ""),
-                    "speakers": entry_speakers,
-                    "segment_count": len(segments),
-                    "key_segments": key_segments[:10],
-                    "expert_summary": raw_analysis[:500] if raw_analysis else "",
-                }
-                # Flag if the timestamp is the processing date, not the actual recording date
-                if entry.get("timestamp_is_estimated"):
-                    match_entry["timestamp_note"] = "⚠️ This timestamp is the PROCESSING date, NOT the actual recording date. The original recording date could not be determined from the file metadata."
-                memory_matches.append(match_entry)
-
-                if len(memory_matches) >= 5:
-                    break
-    except Exception as e:
-        logger.error(f"[search_meetings] Error searching memory: {e}")
+def _tool_search_meetings(query: str, speaker_name: str = "",
+                          date_from: str = "", date_to: str = "") -> str:
+    """Ranked search over transcripts, session summaries and expert analyses."""
+    from app.services.meeting_search import meeting_search_service
+
+    result = meeting_search_service.search(
+        query=query,
+        speaker_name=speaker_name,
+        date_from=date_from,
+        date_to=date_to,
+        drive_memory_service=conversation_engine._drive_memory_service,
+        last_sessions=conversation_engine._last_session,
+    )
 
-    total_found = len(results) + len(wm_matches) + len(memory_matches)
-    if total_found == 0:
+    if not result["meetings"]:
         return json.dumps({
             "found": False,
             "message": f"No meetings found matching '{query}'{f' with speaker {speaker_name}' if speaker_name else ''}.",
@@ -607,10 +550,8 @@ def _tool_search_meetings(query: str, speaker_name: str = "") -> str:
 
     return json.dumps({
         "found": True,
-        "total_matches": total_found,
-        "from_transcripts_folder": results[:5],
-        "from_working_memory": wm_matches,
-        "from_chat_history": memory_matches[:5],
+        "total_matches": result["total_matches"],
+        "meetings": result["meetings"],
     }, ensure_ascii=False, default=str)
 
 
@@ -729,9 +670,6 @@ class UserSession:
         self.last_activity: float = time.time()
         self.message_count: int = 0
 
-    def is_expired(self) -> bool:
-        return (time.time() - self.last_activity) > SESSION_TTL_SECONDS
-
     def touch(self):
         self.last_activity = time.time()
         self.message_count += 1
@@ -751,16 +689,28 @@ class ConversationEngine:
     """
 
     def __init__(self):
-        self._sessions: Dict[str, UserSession] = {}
-        self._lock = Lock()
+        # Expiry + LRU eviction handled by the store (O(1) per call)
+        self._sessions: TTLSessionStore[UserSession] = TTLSessionStore(
+            ttl_seconds=SESSION_TTL_SECONDS, max_entries=MAX_SESSIONS, name="ConvEngine",
+        )
         self._model = None
         self._model_name: str = ""
         self._kb_system_instruction: str = ""
+        # KB system instruction lives in a Gemini context cache, keyed by content hash
+        self._context_cache = ContextCacheManager()
         self._initialized = False
         self._user_profile: Dict[str, Any] = {}          # Phase 1: Personal profile
         self._drive_memory_service = None                 # Phase 2B: For search_meetings
         self._working_memory: Dict[str, Dict[str, Any]] = {}  # Phase 3: Per-user latest session (pending injection)
         self._last_session: Dict[str, Dict[str, Any]] = {}    # Phase 3b: Persistent last session (always available for tools)
+        # Durable per-phone state (history, working memory) — survives restarts
+        self._checkpoints = SessionCheckpointStore(history_ttl_seconds=SESSION_TTL_SECONDS)
+        # Per-phone FIFO: one message per user at a time, users in parallel
+        self._message_queue = UserMessageQueue(
+            max_workers=MESSAGE_WORKERS,
+            max_pending_per_user=MAX_PENDING_PER_USER,
+            name="conv-engine",
+        )
 
     def initialize(self, user_profile: Dict[str, Any] = None, drive_memory_service=None):
         """Initialize the engine (called once on startup after KB is loaded)."""
@@ -792,6 +742,8 @@ class ConversationEngine:
         # Load KB data. Included in system instruction as a FALLBACK reference —
         # the model is instructed to always use tools (search_person etc.) but
         # having the data helps when the identity graph has loading issues.
+        # This is the budgeted default block (KB_CONTEXT_TOKEN_BUDGET); each
+        # message adds the matching passages it left out (get_query_supplement).
         kb_block = get_system_instruction_block()
         print(f"   📚 KB loaded: {len(kb_block)} chars")
 
@@ -882,7 +834,7 @@ class ConversationEngine:
 • get_reports(manager_name) → כל הכפופים למנהל (ישירים + עקיפים)
 • save_fact(person_name, field, value) → שמירת עובדה (עבודה או משפחה) לבסיס הידע
 • list_org_stats() → סטטיסטיקות כלליות על הארגון
-• search_meetings(query, speaker_name) → חיפוש בתמלולי פגישות קודמות
+• search_meetings(query, speaker_name, date_from, date_to) → חיפוש מדורג בתמלולי פגישות קודמות, סיכומים וניתוחים
 • search_notebook(query) → חיפוש בניתוחי NotebookLM מעמיקים (החלטות, משימות, ציטוטים, נושאים)
 • search_flights(destination, max_price_eur, date_from, date_to, nights_from, nights_to) → חיפוש טיסות ישירות הלוך-חזור מת״א
 
@@ -903,18 +855,14 @@ class ConversationEngine:
 
 {kb_block}"""
 
-        # Create the model with tools
-        tools = genai.protos.Tool(function_declarations=_TOOL_DECLARATIONS)
-
+        # Create the model with tools (backed by the KB context cache)
         try:
-            self._model = genai.GenerativeModel(
-                model_name=self._model_name,
-                tools=[tools],
-                system_instruction=self._kb_system_instruction,
-            )
+            self._install_model()
             self._initialized = True
+            self._restore_checkpointed_memory()
             print(f"✅ [ConvEngine] Initialized with model: {self._model_name}")
-            print(f"   System instruction: {len(self._kb_system_instruction)} chars")
+            print(f"   System instruction: {len(self._kb_system_instruction)} chars"
+                  f"{' (context-cached)' if self._context_cache.is_active else ''}")
             print(f"   Tools: {[d.name for d in _TOOL_DECLARATIONS]}")
         except Exception as e:
             logger.error(f"[ConvEngine] Init failed: {e}")
@@ -977,46 +925,96 @@ class ConversationEngine:
         self._working_memory[phone] = session_data
         # Persistent — always available for tool calls (search_meetings etc.)
         self._last_session[phone] = session_data
+        self._checkpoints.update(phone, working_memory=session_data, last_session=session_data)
+        bump_data_version("meetings", "session injected")
         print(f"💾 [ConvEngine] Working memory injected for {phone[-4:]}: {len(summary)} chars, {len(speakers)} speakers")
 
     def _get_or_create_session(self, phone: str) -> UserSession:
         """Get existing session or create a new one for this phone number."""
-        with self._lock:
-            # Cleanup expired sessions
-            expired = [p for p, s in self._sessions.items() if s.is_expired()]
-            for p in expired:
-                del self._sessions[p]
-                print(f"🗑️ [ConvEngine] Expired session for {p[-4:]}")
-
-            # Cap sessions
-            if len(self._sessions) >= MAX_SESSIONS:
-                oldest = min(self._sessions, key=lambda p: self._sessions[p].last_activity)
-                del self._sessions[oldest]
-                print(f"🗑️ [ConvEngine] Evicted oldest session for {oldest[-4:]}")
-
-            # Return existing or create new
-            if phone in self._sessions and not self._sessions[phone].is_expired():
-                session = self._sessions[phone]
-                session.touch()
-                return session
-
-            # Create a new chat session
-            chat = self._model.start_chat(history=[])
-            session = UserSession(chat=chat, model_name=self._model_name)
-            self._sessions[phone] = session
-            print(f"🆕 [ConvEngine] New chat session for {phone[-4:]}")
-            return session
-
-    def process_message(self, phone: str, message: str) -> str:
+        session, created = self._sessions.get_or_create(phone, lambda: self._new_session(phone))
+        if created:
+            print(f"🆕 [ConvEngine] New chat session for {phone[-4:]}"
+                  + (f" (rehydrated {len(session.chat.history) // 2} turns)" if session.chat.history else ""))
+        else:
+            session.touch()
+        return session
+
+    def _new_session(self, phone: str) -> UserSession:
+        """Start a chat session, rehydrated from the last checkpoint if it is still within the TTL."""
+        history = []
+        message_count = 0
+        record = self._checkpoints.get(phone)
+        if record and record.get("history") and \
+                time.time() - record.get("history_updated_at", 0) < self._sessions.ttl_seconds:
+            try:
+                history = [
+                    genai.protos.Content(role=turn["role"],
+                                         parts=[genai.protos.Part(text=t) for t in turn["parts"]])
+                    for turn in record["history"]
+                ]
+                message_count = record.get("message_count", 0)
+            except Exception as e:
+                print(f"⚠️ [ConvEngine] Could not rehydrate session for {phone[-4:]}: {e}")
+                history = []
+        session = UserSession(chat=self._model.start_chat(history=history), model_name=self._model_name)
+        session.message_count = message_count
+        return session
+
+    def _checkpoint_session(self, phone: str, session: UserSession):
+        """Record the session's compact history for the next background checkpoint."""
+        try:
+            self._checkpoints.update(
+                phone,
+                history=serialize_history(session.chat.history, MAX_HISTORY_TURNS),
+                history_updated_at=time.time(),
+                message_count=session.message_count,
+                working_memory=self._working_memory.get(phone),
+            )
+        except Exception as e:
+            logger.warning(f"[ConvEngine] Checkpoint update failed for {phone[-4:]}: {e}")
+
+    def _restore_checkpointed_memory(self):
+        """Restore Phase 3 working memory / last session for every phone, start checkpointing."""
+        restored = 0
+        for phone, record in self._checkpoints.all_records().items():
+            if record.get("last_session"):
+                self._last_session.setdefault(phone, record["last_session"])
+                restored += 1
+            if record.get("working_memory"):
+                self._working_memory.setdefault(phone, record["working_memory"])
+        if restored:
+            print(f"   💾 Restored last-session memory for {restored} users")
+        self._checkpoints.start_checkpointing()
+
+    def flush_sessions(self) -> bool:
+        """Write pending session checkpoints to disk now (e.g. on shutdown)."""
+        return self._checkpoints.flush()
+
+    def configure_sessions(self, ttl_seconds: Optional[int] = None, max_sessions: Optional[int] = None):
+        """Change session TTL / cap at runtime (applies to existing sessions immediately)."""
+        self._sessions.configure(ttl_seconds=ttl_seconds, max_entries=max_sessions)
+        if ttl_seconds is not None:
+            self._checkpoints.history_ttl_seconds = ttl_seconds
+
+    def process_message(self, phone: str, message: str,
+                        on_text: Optional[Callable[[Optional[str]], None]] = None) -> str:
         """
         Process a user message through the Gemini Chat Session.
 
         This is the SINGLE entry point for all text messages.
         Gemini decides everything: intent, entity extraction, tool calling.
 
+        Messages from the same phone are processed strictly in arrival order
+        (never concurrently on one ChatSession); different phones run in
+        parallel on the engine's worker pool. Blocks until the answer is ready.
+
         Args:
             phone: User's phone number (session key)
             message: The user's text message
+            on_text: Optional callback for streaming. The final answer's text
+                     is passed to it in pieces as Gemini generates it (on the
+                     worker thread); None means "drop what was passed so far,
+                     it preceded a tool call". See response_streamer.StreamingReply.
 
         Returns:
             The AI's response text
@@ -1024,6 +1022,65 @@ class ConversationEngine:
         if not self._initialized or self._model is None:
             return "⚠️ המערכת עדיין בטעינה, נסה שוב בעוד כמה שניות."
 
+        future = self.submit_message(phone, message, on_text)
+        if future is None:
+            return "⏳ אני עדיין עונה על ההודעות הקודמות שלך — שלח שוב בעוד רגע."
+        return future.result()
+
+    def submit_message(self, phone: str, message: str,
+                       on_text: Optional[Callable[[Optional[str]], None]] = None):
+        """Queue a message behind earlier ones from the same phone.
+
+        Returns a Future resolving to the response text, or None when the
+        user's queue is full (backpressure).
+        """
+        return self._message_queue.submit(phone, self._process_message_now, phone, message, on_text)
+
+    def get_queue_metrics(self) -> Dict[str, Any]:
+        """Per-user queue depth, wait time and backpressure counters."""
+        return self._message_queue.get_metrics()
+
+    @staticmethod
+    def _send_to_chat(chat, content, on_text: Optional[Callable[[Optional[str]], None]] = None):
+        """
+        chat.send_message, streamed when on_text is set.
+
+        Text is forwarded as it arrives, until the turn produces a function
+        call. A function call can follow some text in the same round (a
+        preamble such as "let me check"). In that case on_text(None) tells
+        the streamer to drop the round's unsent text, because the answer is
+        the final round's text only. A preamble long enough to pass the
+        first-message threshold has already been sent and cannot be
+        recalled. The returned response is fully consumed, and its
+        .candidates hold the aggregated turn.
+        """
+        if on_text is None:
+            return chat.send_message(content)
+
+        response = chat.send_message(content, stream=True)
+        tool_round = False
+        forwarded = False
+        for chunk in response:
+            if not chunk.candidates:
+                continue
+            for part in chunk.candidates[0].content.parts:
+                if getattr(part, "function_call", None) and part.function_call.name:
+                    if forwarded and not tool_round:
+                        on_text(None)
+                    tool_round = True
+                elif not tool_round and getattr(part, "text", ""):
+                    forwarded = True
+                    on_text(part.text)
+        return response
+
+    def _process_message_now(self, phone: str, message: str,
+                             on_text: Optional[Callable[[Optional[str]], None]] = None) -> str:
+        """Run one message through the user's chat session (called by the user's queue worker)."""
+
+        # Extend the KB context cache before it expires; rebuild if it is gone
+        if not self._context_cache.keep_alive():
+            self._install_model()
+
         session = self._get_or_create_session(phone)
         chat = session.chat
 
@@ -1102,8 +1159,22 @@ class ConversationEngine:
             except Exception as ctx_err:
                 print(f"   ⚠️ Entity context injection failed: {ctx_err}")
 
+            # ── Query-specific KB passages ──
+            # The cached system instruction holds only the budgeted default KB
+            # block; passages it left out that match this message ride along
+            # in a separate part, stripped from the history after this turn.
+            outgoing = enriched_message
+            try:
+                from app.services.knowledge_base_service import get_query_supplement
+                kb_supplement = get_query_supplement(message)
+                if kb_supplement:
+                    outgoing = [enriched_message, f"{KB_SUPPLEMENT_HEADER}\n{kb_supplement}"]
+                    print(f"   📚 KB supplement: {len(kb_supplement)} chars")
+            except Exception as kb_err:
+                print(f"   ⚠️ KB supplement failed: {kb_err}")
+
             # Send message to Gemini
-            response = chat.send_message(enriched_message)
+            response = self._send_to_chat(chat, outgoing, on_text)
 
             # Handle tool calls (iterative — Gemini may call multiple tools)
             round_count = 0
@@ -1124,15 +1195,18 @@ class ConversationEngine:
                 round_count += 1
                 print(f"   🔧 [ConvEngine] Tool call round {round_count}:")
 
-                # Execute all function calls and collect responses
-                tool_responses = []
+                # Execute all function calls of this turn concurrently, then
+                # collect responses in the order Gemini issued them
+                calls = []
                 for fc in function_calls:
-                    fn_name = fc.name
                     fn_args = dict(fc.args) if fc.args else {}
-                    print(f"      → {fn_name}({json.dumps(fn_args, ensure_ascii=False)[:80]})")
+                    print(f"      → {fc.name}({json.dumps(fn_args, ensure_ascii=False)[:80]})")
+                    calls.append((fc.name, fn_args))
+                tool_results = run_tool_calls(calls, _execute_tool_cached)
 
-                    result_str = _execute_tool(fn_name, fn_args)
-                    print(f"      ← {result_str[:100]}{'...' if len(result_str) > 100 else ''}")
+                tool_responses = []
+                for (fn_name, fn_args), result_str in zip(calls, tool_results):
+                    print(f"      ← {fn_name}: {result_str[:100]}{'...' if len(result_str) > 100 else ''}")
 
                     # ── Track last-mentioned person for pronoun resolution ──
                     if fn_name == "search_person":
@@ -1171,8 +1245,8 @@ class ConversationEngine:
                     )
 
                 # Send tool results back to Gemini for interpretation
-                response = chat.send_message(
-                    genai.protos.Content(parts=tool_responses)
+                response = self._send_to_chat(
+                    chat, genai.protos.Content(parts=tool_responses), on_text
                 )
 
             # Extract final text response
@@ -1186,7 +1260,9 @@ class ConversationEngine:
                 final_text = "⚠️ לא הצלחתי לייצר תשובה. נסה לנסח אחרת."
 
             # Trim history if too long
+            strip_request_parts(chat.history, KB_SUPPLEMENT_HEADER)
             self._trim_history(chat)
+            self._checkpoint_session(phone, session)
 
             print(f"   ✅ [ConvEngine] Response: {final_text[:120]}{'...' if len(final_text) > 120 else ''}")
             print(f"{'='*60}\n")
@@ -1197,6 +1273,7 @@ class ConversationEngine:
             logger.error(f"[ConvEngine] Error processing message: {e}")
             import traceback
             traceback.print_exc()
+            strip_request_parts(chat.history, KB_SUPPLEMENT_HEADER)
 
             # On error, try to reset the session and fall back
             try:
@@ -1213,10 +1290,10 @@ class ConversationEngine:
         from app.services.model_discovery import gemini_v1_generate, MODEL_MAPPING
         from app.services.knowledge_base_service import get_kb_query_context
 
-        kb_context = get_kb_query_context()
+        kb_context = get_kb_query_context(message)
         prompt = f"""אתה עוזר ארגוני. ענה בעברית.
 
-{f'בסיס ידע:{chr(10)}{kb_context[:8000]}' if kb_context else ''}
+{f'בסיס ידע:{chr(10)}{kb_context}' if kb_context else ''}
 
 שאלה: {message}
 
@@ -1239,43 +1316,55 @@ class ConversationEngine:
         return None
 
     def _trim_history(self, chat):
-        """Trim chat history to prevent token overflow."""
+        """Compact chat history to the token budget (elide old tool payloads, drop oldest exchanges)."""
         try:
-            if len(chat.history) > MAX_HISTORY_TURNS * 2:
-                # Keep only the last N turns
-                chat.history[:] = chat.history[-(MAX_HISTORY_TURNS * 2):]
-                print(f"   ✂️ [ConvEngine] Trimmed history to {len(chat.history)} entries")
-        except Exception:
-            pass
+            stats = compact_history(chat.history, HISTORY_TOKEN_BUDGET)
+            if stats["elided"] or stats["dropped"]:
+                print(f"   ✂️ [ConvEngine] Compacted history: ~{stats['before']}→{stats['after']} tokens "
+                      f"({stats['elided']} tool results elided, {stats['dropped']} entries dropped)")
+        except Exception as e:
+            logger.warning(f"[ConvEngine] History compaction failed: {e}")
 
     def clear_session(self, phone: str):
         """Clear a user's chat session."""
-        with self._lock:
-            if phone in self._sessions:
-                del self._sessions[phone]
-                print(f"🗑️ [ConvEngine] Cleared session for {phone[-4:]}")
+        if self._sessions.pop(phone) is not None:
+            print(f"🗑️ [ConvEngine] Cleared session for {phone[-4:]}")
+        self._checkpoints.update(phone, history=[], message_count=0)
 
     def get_session_info(self, phone: str) -> Dict[str, Any]:
         """Get info about a user's current session."""
-        with self._lock:
-            if phone not in self._sessions:
-                return {"active": False}
-            session = self._sessions[phone]
-            return {
-                "active": not session.is_expired(),
-                "message_count": session.message_count,
-                "model": session.model_name,
-                "history_turns": len(session.chat.history) // 2,
-                "age_seconds": int(time.time() - session.last_activity),
-            }
+        session = self._sessions.get(phone, touch=False)
+        if session is None:
+            return {"active": False}
+        return {
+            "active": True,
+            "message_count": session.message_count,
+            "model": session.model_name,
+            "history_turns": len(session.chat.history) // 2,
+            "age_seconds": int(time.time() - session.last_activity),
+        }
+
+    def _install_model(self) -> int:
+        """Build the model for the current system instruction and move live sessions onto it.
+
+        The model comes from the context cache manager (cachedContents when
+        possible). Sessions keep their ChatSession and history; only
+        chat.model is swapped, so no session keeps pointing at a replaced
+        cache. Returns the number of sessions rebound.
+        """
+        tools = genai.protos.Tool(function_declarations=_TOOL_DECLARATIONS)
+        self._model = self._context_cache.get_model(self._model_name, self._kb_system_instruction, [tools])
+        sessions = self._sessions.items()
+        for _, session in sessions:
+            session.chat.model = self._model
+        return len(sessions)
 
     def refresh_system_instruction(self):
         """Reload KB context into system instruction (e.g., after KB update).
         
         IMPORTANT: Does NOT clear existing sessions. Active chat sessions
-        keep their history intact. New sessions will use the updated KB data.
-        Only the model template is rebuilt — existing ChatSession objects
-        continue working with their accumulated context.
+        keep their history intact and switch to the rebuilt model, so they
+        see the updated KB data too.
         """
         from app.services.model_discovery import configure_genai, MODEL_MAPPING
         from app.services.knowledge_base_service import get_system_instruction_block
@@ -1321,17 +1410,12 @@ class ConversationEngine:
 
 {kb_block}"""
 
-        # Rebuild the model with updated system instruction
-        tools = genai.protos.Tool(function_declarations=_TOOL_DECLARATIONS)
+        # Rebuild the model with updated system instruction (new context cache
+        # only if the content actually changed)
         try:
-            self._model = genai.GenerativeModel(
-                model_name=self._model_name,
-                tools=[tools],
-                system_instruction=self._kb_system_instruction,
-            )
-            active_sessions = len(self._sessions)
+            active_sessions = self._install_model()
             print(f"🔄 [ConvEngine] System instruction refreshed ({old_len}→{len(self._kb_system_instruction)} chars)")
-            print(f"   ✅ {active_sessions} active sessions PRESERVED (not cleared)")
+            print(f"   ✅ {active_sessions} active sessions PRESERVED (history kept, now on the refreshed KB)")
         except Exception as e:
             print(f"❌ [ConvEngine] Refresh failed: {e}")
 
@@ -1339,4 +1423,5 @@ class ConversationEngine:
 # ═══════════════════════════════════════════════════════════════════════
 # SINGLETON
 # ═══════════════════════════════════════════════════════════════════════
-conversation_engine = ConversationEngine()
+from app.services.service_registry import service
+conversation_engine = service("conversation_engine")
@@ -26,6 +26,8 @@ import threading
 from threading import Lock
 from dateutil import parser as date_parser
 
+from app.services.tool_cache import bump_data_version
+
 
 # ─── SSL / Network Retry Decorator ────────────────────────────────────────────
 # Cloud Run → Google Drive API occasionally throws transient SSL errors:
@@ -420,6 +422,7 @@ class DriveMemoryService:
             
             file_id = file.get('id')
             logger.info(f"✅ Saved transcript to Drive: {filename} (ID: {file_id})")
+            bump_data_version("meetings", "transcript saved")
             return file_id
             
         except Exception as e:
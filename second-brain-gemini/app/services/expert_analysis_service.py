@@ -1050,5 +1050,6 @@ class ExpertAnalysisService:
             return None
 
 
-# Singleton instance
-expert_analysis_service = ExpertAnalysisService()
+# Singleton instance (built on first use / by startup warm-up)
+from app.services.service_registry import service
+expert_analysis_service = service("expert_analysis_service")
@@ -0,0 +1,374 @@
+"""
+Gemini File Registry — content-addressed reuse of uploaded files
+
+GeminiService.upload_and_wait uploaded the same bytes again on every
+call: reference voice files for every legacy-mode meeting, the same org
+chart PDF on every KB reload, the same audio on every retry. Uploaded
+files were only tracked in GeminiService.uploaded_files, which grew on
+the singleton because cleanup_files() was never called.
+
+GeminiFileRegistry maps sha256(file bytes) → Gemini file handle:
+  - acquire(path, upload) returns an existing handle for the same
+    bytes if it has at least REUSE_MARGIN_SECONDS of its server-side
+    lifetime (48h) left; otherwise it calls upload() and records the new
+    handle. Concurrent acquires of the same bytes share one upload.
+  - Each acquire adds a reference, and release() removes it. A reference
+    older than MAX_LEASE_SECONDS is treated as leaked and ignored.
+  - Uploads made through the registry carry a DISPLAY_NAME_PREFIX
+    display name (see registry_display_name). Files with that prefix that
+    were uploaded before a restart are adopted once, by matching the
+    sha256_hash the Files API reports, so they are reused instead of
+    uploaded again. Adopted files are never deleted by the janitor: an
+    overlapping deploy on the same API key may still be using them, and
+    the server deletes them at expiry. Files without the prefix (direct
+    genai.upload_file calls) are never touched.
+  - A janitor thread runs every JANITOR_INTERVAL_SECONDS. It forgets
+    expired entries and deletes unreferenced files that have been idle
+    for IDLE_DELETE_SECONDS, at most JANITOR_BATCH_SIZE per run, with the
+    deletes in that batch running in parallel.
+
+    file_ref = file_registry.acquire(path, upload=lambda: upload_and_poll(path))
+    try:
+        model.generate_content([file_ref, prompt])
+    finally:
+        file_registry.release(file_ref)
+"""
+
+import base64
+import hashlib
+import logging
+import os
+import string
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FILE_REUSE_ENABLED = os.environ.get("GEMINI_FILE_REUSE", "true").lower() == "true"
+FILE_LIFETIME_SECONDS = 48 * 3600          # Files API deletes uploads after 48h
+REUSE_MARGIN_SECONDS = 2 * 3600            # Don't hand out a file that expires mid-request
+IDLE_DELETE_SECONDS = int(os.environ.get("GEMINI_FILE_IDLE_SECONDS", str(6 * 3600)))
+MAX_LEASE_SECONDS = 2 * 3600
+JANITOR_INTERVAL_SECONDS = 600
+JANITOR_BATCH_SIZE = 20
+JANITOR_WORKERS = 4
+HASH_CHUNK_BYTES = 1024 * 1024
+DISPLAY_NAME_PREFIX = "sb-registry/"
+
+
+def registry_display_name(name: str) -> str:
+    """Display name for an upload made through acquire(), so it can be adopted after a restart."""
+    return name if name.startswith(DISPLAY_NAME_PREFIX) else DISPLAY_NAME_PREFIX + name
+
+
+def content_hash(path: str) -> str:
+    """Hex sha256 of the file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _normalize_api_hash(value: Any) -> Optional[str]:
+    """
+    The Files API reports sha256_hash as bytes whose content is the hex
+    digest (base64 on the wire). Accept hex, raw digest or base64 of either.
+    """
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        if len(value) == 32:
+            return value.hex()
+        value = value.decode("ascii", errors="ignore")
+    value = value.strip()
+    if len(value) == 64 and all(c in string.hexdigits for c in value):
+        return value.lower()
+    try:
+        return _normalize_api_hash(base64.b64decode(value, validate=True))
+    except Exception:
+        return None
+
+
+def _state_name(file_ref: Any) -> str:
+    state = getattr(file_ref, "state", None)
+    return getattr(state, "name", None) or str(state)
+
+
+def _expires_at(file_ref: Any) -> float:
+    expiration = getattr(file_ref, "expiration_time", None)
+    if isinstance(expiration, datetime):
+        return expiration.timestamp()
+    return time.time() + FILE_LIFETIME_SECONDS
+
+
+@dataclass
+class _Entry:
+    digest: str
+    file_ref: Any
+    expires_at: float
+    last_used: float = field(default_factory=time.time)
+    leases: List[float] = field(default_factory=list)   # acquire times of live references
+    uses: int = 0
+    adopted: bool = False       # Uploaded by an earlier process — reused, never deleted here
+
+    @property
+    def name(self) -> str:
+        return getattr(self.file_ref, "name", "")
+
+    def live_leases(self, now: float) -> int:
+        self.leases = [t for t in self.leases if now - t < MAX_LEASE_SECONDS]
+        return len(self.leases)
+
+
+class GeminiFileRegistry:
+    """Thread-safe sha256 → uploaded-file registry with a background janitor."""
+
+    def __init__(self, enabled: bool = FILE_REUSE_ENABLED):
+        self._enabled = enabled
+        self._lock = Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._by_name: Dict[str, str] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._adopted = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"uploads": 0, "reused": 0, "adopted": 0, "deleted": 0,
+                       "expired": 0, "delete_failures": 0}
+
+    # ─── Gemini backend (overridable in tests) ───────────────────
+
+    def _list_files(self):
+        import google.generativeai as genai
+        return list(genai.list_files())
+
+    def _delete_file(self, name: str):
+        import google.generativeai as genai
+        genai.delete_file(name)
+
+    # ─── Public API ──────────────────────────────────────────────
+
+    @property
+    def is_enabled(self) -> bool:
+        """False when every acquire() uploads afresh (GEMINI_FILE_REUSE=false)."""
+        return self._enabled
+
+    def acquire(self, path: str, upload: Callable[[], Any], label: str = "") -> Any:
+        """
+        ACTIVE file handle for path's bytes, uploading only when no usable
+        handle exists. The caller must release() the handle when done.
+        """
+        if not self._enabled:
+            return upload()
+        self.start_janitor()
+        digest = content_hash(path)
+        label = label or os.path.basename(path)
+
+        while True:
+            with self._lock:
+                entry = self._usable_entry_locked(digest)
+                if entry is not None:
+                    return self._lease_locked(entry, reused=True, label=label)
+                event = self._inflight.get(digest)
+                if event is None:
+                    self._inflight[digest] = threading.Event()
+                    break
+            event.wait()    # Another thread is uploading the same bytes
+
+        try:
+            self._adopt_existing_once()
+            with self._lock:
+                entry = self._usable_entry_locked(digest)
+                if entry is not None:
+                    return self._lease_locked(entry, reused=True, label=label)
+
+            file_ref = upload()
+            with self._lock:
+                entry = _Entry(digest=digest, file_ref=file_ref, expires_at=_expires_at(file_ref))
+                self._store_locked(entry)
+                self._stats["uploads"] += 1
+                return self._lease_locked(entry, reused=False, label=label)
+        finally:
+            with self._lock:
+                self._inflight.pop(digest).set()
+
+    def release(self, file_ref: Any):
+        """Drop one reference to file_ref (no-op for unknown handles)."""
+        name = getattr(file_ref, "name", file_ref)
+        with self._lock:
+            entry = self._entries.get(self._by_name.get(name, ""))
+            if entry is None:
+                return
+            if entry.leases:
+                entry.leases.pop(0)
+            entry.last_used = time.time()
+
+    def release_all(self, file_refs: List[Any]):
+        for file_ref in file_refs:
+            self.release(file_ref)
+
+    def refresh(self, file_ref: Any):
+        """Store a re-fetched handle (e.g. now ACTIVE) in place of the uploaded one."""
+        with self._lock:
+            entry = self._entries.get(self._by_name.get(getattr(file_ref, "name", ""), ""))
+            if entry is not None:
+                entry.file_ref = file_ref
+                entry.expires_at = _expires_at(file_ref) if \
+                    getattr(file_ref, "expiration_time", None) else entry.expires_at
+
+    def discard(self, file_ref: Any):
+        """Forget a handle that can never become usable (FAILED)."""
+        with self._lock:
+            digest = self._by_name.pop(getattr(file_ref, "name", ""), None)
+            if digest is not None:
+                self._entries.pop(digest, None)
+
+    # ─── Internals ───────────────────────────────────────────────
+
+    def _usable_entry_locked(self, digest: str) -> Optional[_Entry]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        # PROCESSING handles are shared too — the caller polls until ACTIVE
+        if entry.expires_at - time.time() < REUSE_MARGIN_SECONDS or \
+                _state_name(entry.file_ref) not in ("ACTIVE", "PROCESSING"):
+            return None
+        return entry
+
+    def _lease_locked(self, entry: _Entry, reused: bool, label: str) -> Any:
+        now = time.time()
+        entry.leases.append(now)
+        entry.last_used = now
+        entry.uses += 1
+        if reused:
+            self._stats["reused"] += 1
+            hours_left = (entry.expires_at - now) / 3600
+            print(f"♻️  [FileRegistry] Reusing {entry.name} for {label} ({hours_left:.0f}h left)")
+        return entry.file_ref
+
+    def _store_locked(self, entry: _Entry):
+        previous = self._entries.get(entry.digest)
+        if previous is not None:
+            self._by_name.pop(previous.name, None)
+        self._entries[entry.digest] = entry
+        self._by_name[entry.name] = entry.digest
+
+    def _adopt_existing_once(self):
+        """Index files uploaded before this process started (once)."""
+        if self._adopted:
+            return
+        self._adopted = True
+        try:
+            files = self._list_files()
+        except Exception as e:
+            logger.warning(f"[FileRegistry] Could not list existing files: {e}")
+            return
+        adopted = 0
+        with self._lock:
+            for file_ref in files:
+                if not str(getattr(file_ref, "display_name", "") or "").startswith(DISPLAY_NAME_PREFIX):
+                    continue    # Not uploaded through a registry
+                digest = _normalize_api_hash(getattr(file_ref, "sha256_hash", None))
+                if not digest or digest in self._entries or _state_name(file_ref) != "ACTIVE":
+                    continue
+                self._store_locked(_Entry(digest=digest, file_ref=file_ref,
+                                          expires_at=_expires_at(file_ref), adopted=True))
+                adopted += 1
+            self._stats["adopted"] += adopted
+        if adopted:
+            print(f"📎 [FileRegistry] Adopted {adopted} files uploaded before restart")
+
+    # ─── Janitor ─────────────────────────────────────────────────
+
+    def start_janitor(self):
+        """Start the background cleanup loop (idempotent)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            def _loop():
+                while True:
+                    time.sleep(JANITOR_INTERVAL_SECONDS)
+                    try:
+                        self.run_janitor()
+                    except Exception as e:
+                        logger.warning(f"[FileRegistry] Janitor run failed: {e}")
+
+            self._thread = threading.Thread(target=_loop, name="gemini-file-janitor", daemon=True)
+            self._thread.start()
+
+    def run_janitor(self, idle_seconds: Optional[float] = None, drain: bool = False) -> int:
+        """
+        Forget expired entries and delete up to JANITOR_BATCH_SIZE idle,
+        unreferenced files (every idle file, batch by batch, with drain=True).
+        Returns the number of files deleted.
+        """
+        deleted = self._janitor_batch(idle_seconds)
+        while drain and deleted[1]:
+            more = self._janitor_batch(idle_seconds)
+            deleted = (deleted[0] + more[0], more[1])
+        return deleted[0]
+
+    def _janitor_batch(self, idle_seconds: Optional[float]) -> tuple:
+        """(files deleted, idle files left for another batch)."""
+        idle_seconds = IDLE_DELETE_SECONDS if idle_seconds is None else idle_seconds
+        now = time.time()
+        with self._lock:
+            for digest, entry in list(self._entries.items()):
+                if entry.expires_at <= now:
+                    del self._entries[digest]
+                    self._by_name.pop(entry.name, None)
+                    self._stats["expired"] += 1
+            idle = [e for e in self._entries.values()
+                    if not e.adopted and e.live_leases(now) == 0 and now - e.last_used >= idle_seconds
+                    and e.digest not in self._inflight]
+            idle.sort(key=lambda e: e.last_used)
+            batch = idle[:JANITOR_BATCH_SIZE]
+            for entry in batch:
+                del self._entries[entry.digest]
+                self._by_name.pop(entry.name, None)
+
+        if not batch:
+            return 0, 0
+        with ThreadPoolExecutor(max_workers=JANITOR_WORKERS) as pool:
+            results = list(pool.map(self._delete_quietly, batch))
+        deleted = sum(results)
+        with self._lock:
+            self._stats["deleted"] += deleted
+            self._stats["delete_failures"] += len(batch) - deleted
+        print(f"🗑️  [FileRegistry] Janitor deleted {deleted}/{len(batch)} idle files "
+              f"({len(idle) - len(batch)} left for the next run)")
+        return deleted, len(idle) - len(batch)
+
+    def _delete_quietly(self, entry: _Entry) -> bool:
+        try:
+            self._delete_file(entry.name)
+            return True
+        except Exception as e:
+            # Already gone or transient — the server deletes it at expiry anyway
+            logger.debug(f"[FileRegistry] Delete {entry.name} failed: {e}")
+            return False
+
+    def get_status(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.values())
+            referenced = sum(1 for e in entries if e.live_leases(now))
+            stats = dict(self._stats)
+        return {
+            "enabled": self._enabled,
+            "files": len(entries),
+            "referenced": referenced,
+            "janitor_running": self._thread is not None,
+            **stats,
+        }
+
+
+# Singleton instance
+file_registry = GeminiFileRegistry()
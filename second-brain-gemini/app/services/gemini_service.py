@@ -5,101 +5,31 @@ Service for handling Google Gemini AI operations.
 import json
 import os
 import time
-from typing import List, Optional, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import google.generativeai as genai
 
 from app.core.config import settings
 from app.prompts import (SYSTEM_PROMPT, AUDIO_ANALYSIS_PROMPT, AUDIO_ANALYSIS_PROMPT_BASE,
                          FORENSIC_ANALYST_PROMPT, COMBINED_DIARIZATION_EXPERT_PROMPT,
-                         PYANNOTE_ASSISTED_PROMPT)
+                         PYANNOTE_ASSISTED_PROMPT, CHUNK_TRANSCRIPTION_PROMPT, CHUNKED_EXPERT_PROMPT)
+from app.services.chunked_transcription import (CHUNKED_TRANSCRIPTION_ENABLED, CHUNK_TARGET_SECONDS, CHUNK_WORKERS,
+                                                Chunk, ChunkRunError, check_chunk_transcript, chunk_hints, cut_chunk,
+                                                merge_chunks, plan_chunks, reconcile_speakers, run_chunks,
+                                                transcript_text)
+from app.services.file_registry import file_registry, registry_display_name
+from app.services.json_stream import parse_tolerant
 from app.services.knowledge_base_service import get_system_instruction_block as get_kb_context
+from app.services.upload_poller import UploadBatch, file_state, pending_file, upload_all
+
+# Speculative uploads started before the request that needs them is built
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gemini-prefetch")
 
 
 class GeminiService:
     """Service for Google Gemini AI operations."""
     
-    @staticmethod
-    def _fix_incomplete_json(text: str) -> str:
-        """
-        Try to fix incomplete JSON by removing incomplete properties.
-        
-        Strategy: If we're in the middle of a string, find the last complete property
-        and remove everything after it, then close the JSON structure properly.
-        
-        Args:
-            text: Incomplete JSON text
-            
-        Returns:
-            Fixed JSON text
-        """
-        # Check if we're in the middle of a string
-        quote_count = text.count('"')
-        in_string = quote_count % 2 != 0
-        
-        if in_string:
-            # We're in the middle of a string - need to remove the incomplete property
-            # Find the last complete property by looking for the last comma before the incomplete string
-            
-            # Find the last colon (property value separator)
-            last_colon = text.rfind(':')
-            if last_colon > 0:
-                # Find the property name (quote before colon)
-                prop_start = text.rfind('"', 0, last_colon)
-                if prop_start >= 0:
-                    # Find the comma before this property (or opening brace if it's the first)
-                    comma_before = text.rfind(',', 0, prop_start)
-                    if comma_before >= 0:
-                        # Remove everything from the comma onwards
-                        text = text[:comma_before]
-                    else:
-                        # This is the first property in an object/array
-                        # Find the opening brace or bracket
-                        brace_before = text.rfind('{', 0, prop_start)
-                        bracket_before = text.rfind('[', 0, prop_start)
-                        if bracket_before > brace_before:
-                            # Inside an array
-                            text = text[:bracket_before + 1]
-                        elif brace_before >= 0:
-                            # Inside an object
-                            text = text[:brace_before + 1]
-        
-        # Remove any trailing commas
-        import re
-        text = re.sub(r',\s*$', '', text)
-        
-        # Count braces and brackets (after removing incomplete properties)
-        brace_count = text.count('{') - text.count('}')
-        bracket_count = text.count('[') - text.count(']')
-        
-        # Close unclosed arrays first (they're inside objects)
-        text += ']' * bracket_count
-        
-        # Then close unclosed objects
-        text += '}' * brace_count
-        
-        return text
-    
-    @staticmethod
-    def _fix_json_errors(text: str) -> str:
-        """
-        Try to fix common JSON errors.
-        
-        Args:
-            text: JSON text with potential errors
-            
-        Returns:
-            Fixed JSON text
-        """
-        import re
-        # Remove trailing commas before } or ]
-        text = re.sub(r',(\s*[}\]])', r'\1', text)
-        
-        # Try to close unclosed strings
-        text = GeminiService._fix_incomplete_json(text)
-        
-        return text
-    
     def __init__(self):
         """Initialize Gemini service with API key and dynamic model discovery."""
         if not settings.google_api_key:
@@ -130,35 +60,119 @@ class GeminiService:
         # Strip "models/" prefix if present (GenerativeModel handles it)
         self.model = genai.GenerativeModel(model_name)
         print(f"✅ Initialized Gemini model: {model_name}")
-        self.uploaded_files = []
     
     def upload_and_wait(self, file_path: str, display_name: Optional[str] = None, mime_type: Optional[str] = None, max_wait: int = 300):
         """
-        Upload a file and wait for it to be processed.
+        ACTIVE Gemini file for file_path, reusing an earlier upload of the same bytes.
+        
+        Goes through file_registry (content hash → file handle). Release the
+        returned handle with file_registry.release() once the request that
+        uses it is done; the registry's janitor deletes idle files.
+        """
+        return self.upload_many([(file_path, display_name, mime_type)], max_wait=max_wait).refs_or_raise()[0]
+    
+    def upload_many(self, files: List[Tuple[str, Optional[str], Optional[str]]], max_wait: int = 300) -> UploadBatch:
+        """
+        Upload (or reuse) several files concurrently and wait for all of them in one polling loop.
         
         Args:
-            file_path: Path to the file to upload
-            display_name: Display name for the file (safe to pass)
-            mime_type: MIME type of the file (auto-detected if None)
-            max_wait: Maximum time to wait for processing in seconds
+            files: (file_path, display_name, mime_type) tuples; display_name and
+                   mime_type may be None
+            max_wait: Maximum time to wait for uploads + processing in seconds
         
         Returns:
-            Refreshed File object with state='ACTIVE'
+            UploadBatch: refs (File objects with state='ACTIVE', None where that
+            file failed) in input order, per-file errors and a timing breakdown
         """
-        path = Path(file_path)
-        display_name = display_name or path.name
-        
-        # Auto-detect MIME type if not provided
-        if not mime_type:
-            if path.suffix.lower() in ['.mp3', '.wav', '.m4a', '.ogg']:
-                mime_type = f'audio/{path.suffix[1:]}'
-            elif path.suffix.lower() in ['.jpg', '.jpeg']:
-                mime_type = 'image/jpeg'
-            elif path.suffix.lower() == '.png':
-                mime_type = 'image/png'
+        def _upload_one(spec):
+            file_path, display_name, mime_type = spec
+            display_name = display_name or Path(file_path).name
+            mime_type = mime_type or self._guess_mime_type(file_path)
+            uploaded = {}
+            
+            def _upload():
+                file_ref = self._upload_file(file_path, registry_display_name(display_name), mime_type)
+                uploaded["at"] = time.time()
+                return file_ref
+            
+            file_ref = file_registry.acquire(file_path, upload=_upload, label=display_name)
+            # Only fresh uploads teach the poller how long processing takes
+            return pending_file(file_ref, file_path, display_name, mime_type,
+                                uploaded_at=uploaded.get("at"), learn="at" in uploaded)
+        
+        # An upload that finishes after max_wait holds a lease nobody else will release
+        batch = upload_all(files, _upload_one, get_file=self._get_file, max_wait=max_wait,
+                           on_late=lambda item: file_registry.release(item.file_ref))
+        for file_ref in batch.refs:
+            if file_ref is not None:
+                file_registry.refresh(file_ref)
+        for i in batch.errors:
+            item = batch.pending.get(i)
+            if item is None:
+                continue    # Upload itself failed — nothing was acquired
+            if file_state(item.file_ref) == "FAILED":
+                file_registry.discard(item.file_ref)
             else:
-                mime_type = 'application/octet-stream'
+                file_registry.release(item.file_ref)
+        
+        timing = batch.timing
+        print(f"📦 Uploads ready in {timing['ready_s']}s for {len(files)} files "
+              f"(sequential would be ~{timing['sequential_estimate_s']}s, {timing['failed']} failed)")
+        return batch
+    
+    def prefetch_uploads(self, paths: List[str]) -> Optional[Future]:
+        """
+        Start uploading paths in the background and return a Future of the UploadBatch.
+        
+        A later upload_many / analyze_day for the same bytes gets the same
+        handle from file_registry (waiting for the in-flight upload if it
+        has not finished), so upload + server-side processing overlap
+        whatever the caller does meanwhile. Returns None when file reuse is
+        off, since the later call would upload again anyway. Hand the future
+        to release_prefetch() once the real request is done.
+        """
+        if not self.is_configured or not file_registry.is_enabled or not paths:
+            return None
+        return _prefetch_executor.submit(self.upload_many, [(path, Path(path).name, None) for path in paths])
+    
+    @staticmethod
+    def release_prefetch(prefetch: Optional[Future]):
+        """Release a prefetch's leases now, or when it finishes if it is still uploading."""
+        if prefetch is None:
+            return
+        
+        def _release(done: Future):
+            try:
+                batch = done.result()
+            except Exception:
+                return      # Nothing was acquired
+            file_registry.release_all([ref for ref in batch.refs if ref is not None])
+        
+        prefetch.add_done_callback(_release)
+    
+    @staticmethod
+    def _get_file(name: str):
+        # The API expects just the ID, not 'files/ID'
+        return genai.get_file(name[6:] if name.startswith('files/') else name)
+    
+    @staticmethod
+    def _guess_mime_type(file_path: str) -> str:
+        suffix = Path(file_path).suffix.lower()
+        if suffix in ['.mp3', '.wav', '.m4a', '.ogg']:
+            return f'audio/{suffix[1:]}'
+        elif suffix in ['.jpg', '.jpeg']:
+            return 'image/jpeg'
+        elif suffix == '.png':
+            return 'image/png'
+        return 'application/octet-stream'
+    
+    def _upload_file(self, file_path: str, display_name: str, mime_type: str):
+        """
+        Upload a file (retrying transient connection errors) without waiting for processing.
         
+        Returns:
+            The File object as returned by the upload (usually state='PROCESSING')
+        """
         # Step 1: Upload - Let Google generate the ID (do NOT pass name=...)
         # Retry upload on transient SSL/connection errors
         print(f"📤 Uploading {display_name}...")
@@ -184,166 +198,14 @@ class GeminiService:
         if file_ref is None:
             raise RuntimeError(f"Failed to upload {display_name} after 3 attempts")
         
-        # Step 2: Get the file ID from the returned object's name property
-        # According to user instructions: "get the file.name property (this is the ID like 'files/123')"
-        # We need to access .name to get the ID, but this might trigger get_file() internally
-        # So we'll extract the ID from the name and use it for subsequent calls
-        try:
-            # Get the file ID - file_ref.name is like 'files/123'
-            full_file_id = file_ref.name  # e.g., 'files/5ie9zz0xtcqc'
-        except Exception as e:
-            # If accessing .name fails, try extracting from URI as fallback
-            print(f"   [WARN] Could not access file_ref.name, trying URI: {e}")
-            uri = file_ref.uri
-            if '/files/' in uri:
-                file_id_only = uri.split('/files/')[-1].split('?')[0]
-                full_file_id = f'files/{file_id_only}'
-            else:
-                raise ValueError(f"Could not extract file ID from name or URI")
-        
-        # Extract just the ID part (without 'files/' prefix) for get_file()
-        if full_file_id.startswith('files/'):
-            file_id_only = full_file_id[6:]  # Extract just '5ie9zz0xtcqc'
-        else:
-            file_id_only = full_file_id
-        
-        # Verify ID is not too long
+        # Step 2: Verify the file ID from the returned object's name property ('files/123')
+        full_file_id = file_ref.name
+        file_id_only = full_file_id[6:] if full_file_id.startswith('files/') else full_file_id
         if len(file_id_only) > 40:
             raise ValueError(f"File ID too long: {len(file_id_only)} characters (max 40). ID: {file_id_only[:50]}")
         
-        print(f"   File ID: {full_file_id} (ID only: {file_id_only}, length: {len(file_id_only)})")
-        
-        # Step 3: Wait for processing using just the ID part (without 'files/' prefix)
-        # The API expects just the ID, not 'files/ID'
-        start_time = time.time()
-        while time.time() - start_time < max_wait:
-            print(f"   [DEBUG] Calling genai.get_file with ID: '{file_id_only}'")
-            import sys
-            sys.stdout.flush()
-            
-            # Refresh the object using just the ID part (without 'files/' prefix)
-            try:
-                file_ref = genai.get_file(file_id_only)
-            except Exception as e:
-                print(f"   [ERROR] genai.get_file failed with: {e}")
-                print(f"   [ERROR] file_id_only = '{file_id_only}' (length: {len(file_id_only)})")
-                raise
-            
-            # Check state
-            state = file_ref.state
-            if hasattr(state, 'name'):
-                state_name = state.name
-            else:
-                state_name = str(state)
-            
-            if state_name == "ACTIVE":
-                print(f"✅ File {display_name} is ready (state: ACTIVE)")
-                self.uploaded_files.append(file_ref)
-                return file_ref
-            elif state_name == "FAILED":
-                raise ValueError(f"File {display_name} failed to process.")
-            
-            print(f"⏳ Processing {display_name}... (state: {state_name})")
-            time.sleep(2)
-        
-        raise TimeoutError(f"File {display_name} processing timeout after {max_wait} seconds")
-    
-    def wait_for_processing(self, file_uri: str, max_wait: int = 300) -> bool:
-        """
-        Wait for an audio file to be processed (state='ACTIVE').
-        
-        Args:
-            file_uri: URI of the uploaded file (or File object)
-            max_wait: Maximum time to wait in seconds
-        
-        Returns:
-            True if file is ready, False if timeout
-        """
-        start_time = time.time()
-        
-        # Debug: log what we received
-        print(f"[WAIT] Entry - file_uri type: {type(file_uri)}")
-        print(f"[WAIT] Has 'name': {hasattr(file_uri, 'name')}")
-        print(f"[WAIT] Has 'uri': {hasattr(file_uri, 'uri')}")
-        if hasattr(file_uri, 'name'):
-            print(f"[WAIT] file_uri.name: '{file_uri.name}' (length: {len(file_uri.name)})")
-        if hasattr(file_uri, 'uri'):
-            print(f"[WAIT] file_uri.uri: '{file_uri.uri}'")
-        
-        # Extract file ID from File object or URI
-        # genai.get_file() expects the full 'files/FILE_ID' format (not just FILE_ID)
-        if hasattr(file_uri, 'name'):
-            # File object - use the 'name' attribute directly (it's 'files/FILE_ID')
-            file_name = file_uri.name
-            # Use the full name (with 'files/' prefix) for get_file
-            file_id_for_get = file_name
-        elif hasattr(file_uri, 'uri'):
-            # Has URI - extract file ID from URI and construct 'files/FILE_ID'
-            uri = file_uri.uri
-            if '/files/' in uri:
-                file_id = uri.split('/files/')[-1].split('?')[0]  # Extract just the ID
-                file_id_for_get = f'files/{file_id}'  # Add 'files/' prefix
-            else:
-                file_id_for_get = uri
-        else:
-            # String - extract file ID
-            file_uri_str = str(file_uri)
-            if '/files/' in file_uri_str:
-                file_id = file_uri_str.split('/files/')[-1].split('?')[0]
-                file_id_for_get = f'files/{file_id}'  # Add 'files/' prefix
-            elif file_uri_str.startswith('files/'):
-                file_id_for_get = file_uri_str  # Already has 'files/' prefix
-            else:
-                file_id_for_get = f'files/{file_uri_str}'  # Add 'files/' prefix
-        
-        # Extract just the ID part for logging (without 'files/' prefix)
-        if file_id_for_get.startswith('files/'):
-            file_id_only = file_id_for_get[6:]
-        else:
-            file_id_only = file_id_for_get
-        
-        # Ensure file_id_only is not too long (Gemini API limit is 40 chars)
-        if len(file_id_only) > 40:
-            raise ValueError(f"File ID too long: {len(file_id_only)} characters (max 40). File ID: {file_id_only[:50]}")
-        
-        print(f"[WAIT] Using file_id_for_get: '{file_id_for_get}' (ID only: '{file_id_only}', length: {len(file_id_only)})")
-        import sys
-        sys.stdout.flush()
-        
-        # Double-check: make sure we're not passing display_name by mistake
-        if hasattr(file_uri, 'display_name'):
-            print(f"[WAIT] WARNING: file_uri has display_name: '{file_uri.display_name}' (length: {len(file_uri.display_name)})")
-            if len(file_uri.display_name) > 40:
-                print(f"[WAIT] ERROR: display_name is longer than 40 chars! This might be the issue.")
-        
-        while time.time() - start_time < max_wait:
-            # genai.get_file() can accept either 'files/FILE_ID' or just 'FILE_ID'
-            # Based on our tests, both work. Let's try with just the ID first.
-            print(f"[WAIT] Calling genai.get_file with file_id_only: '{file_id_only}' (length: {len(file_id_only)})")
-            sys.stdout.flush()
-            try:
-                # Try with just the file_id (without 'files/' prefix) first
-                file = genai.get_file(file_id_only)
-            except Exception as e:
-                error_str = str(e)
-                # Handle connection errors with retry
-                if 'Connection reset' in error_str or '503' in error_str or 'recvmsg' in error_str:
-                    print(f"[WAIT] ⚠️  Connection error (will retry): {error_str}")
-                    time.sleep(5)  # Wait before retry
-                    continue  # Retry the loop
-                print(f"[WAIT] ❌ Error calling get_file('{file_id}'): {e}")
-                raise
-            
-            if file.state == 'ACTIVE':
-                print(f"✅ File ready: {file_id}")
-                return True
-            elif file.state == 'FAILED':
-                raise ValueError(f"File processing failed: {file_id}")
-            
-            print(f"⏳ Waiting for file processing... ({file.state})")
-            time.sleep(2)
-        
-        raise TimeoutError(f"File processing timeout: {file_id}")
+        print(f"   File ID: {full_file_id}")
+        return file_ref
     
     def chat_with_memory(
         self,
@@ -494,8 +356,8 @@ Summary: {summary}
             
             print(f"📚 Recent transcripts injected ({len(recent_transcripts)} files)")
         
-        # Inject Knowledge Base context into regular chat as well
-        kb_block = get_kb_context()
+        # Inject Knowledge Base context into regular chat as well (retrieved for this message)
+        kb_block = get_kb_context(query=user_message)
         if kb_block:
             system_instruction += "\n" + kb_block
             print(f"📚 Knowledge Base context injected into chat ({len(kb_block)} chars)")
@@ -825,8 +687,27 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
             text_inputs: List of text notes/inputs
         
         Returns:
-            Structured JSON response with analysis
+            Structured JSON response with analysis, plus "timing": seconds per
+            stage (upload, prepare, inference, parse) and per uploaded file
         """
+        timing: Dict[str, Any] = {}
+        start = time.time()
+        result = self._analyze_day(audio_paths, image_paths, text_inputs, chat_history,
+                                   audio_file_metadata, reference_voices, diarization_hints, timing)
+        timing["total_s"] = round(time.time() - start, 2)
+        timing["parse_s"] = round(timing["total_s"] - sum(
+            timing.get(k, 0) for k in ("upload_s", "prepare_s", "inference_s"))
+            - timing.get("chunked_attempt", {}).get("elapsed_s", 0), 2)
+        print(f"⏱️  analyze_day: upload {timing.get('upload_s', 0)}s, prepare {timing.get('prepare_s', 0)}s, "
+              f"inference {timing.get('inference_s', 0)}s, parse {timing['parse_s']}s, total {timing['total_s']}s")
+        if isinstance(result, dict):
+            result["timing"] = timing
+        return result
+    
+    def _analyze_day(self, audio_paths, image_paths, text_inputs, chat_history,
+                     audio_file_metadata, reference_voices, diarization_hints,
+                     timing: Dict[str, Any]) -> Dict[str, Any]:
+        """analyze_day body; fills timing with each stage's duration as it goes."""
         audio_paths = audio_paths or []
         image_paths = image_paths or []
         text_inputs = text_inputs or []
@@ -840,36 +721,68 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
                 "The server started successfully, but Gemini analysis requires the API key."
             )
         
-        # Upload all files and wait for processing
-        uploaded_files = []  # Store refreshed File objects with state='ACTIVE'
-        reference_voice_files = []  # Store reference voice File objects separately
-        
-        # Upload and wait for audio files (main audio to transcribe)
-        for audio_path in audio_paths:
-            path = Path(audio_path)
-            file_ref = self.upload_and_wait(audio_path, display_name=path.name)
-            uploaded_files.append(file_ref)
-        
-        # Upload and wait for reference voice files (for speaker identification)
+        # Long pyannote-assisted recordings: transcribe ~10-minute chunks in parallel
+        if CHUNKED_TRANSCRIPTION_ENABLED and diarization_hints and len(audio_paths) == 1 \
+                and not image_paths and not text_inputs:
+            chunks = plan_chunks(diarization_hints.get("segments", []))
+            if len(chunks) > 1:
+                chunked_start = time.time()
+                try:
+                    return self._analyze_chunked(audio_paths[0], chunks, audio_file_metadata,
+                                                 diarization_hints, timing)
+                except Exception as e:
+                    print(f"⚠️  [Chunked] Failed ({str(e)[:200]}) — falling back to a single call")
+                    # Keep the attempt's timings (including per-chunk) under their own key
+                    attempt = dict(timing)
+                    if isinstance(e, ChunkRunError):
+                        attempt["chunks"] = e.timing
+                    attempt["error"] = str(e)[:200]
+                    attempt["elapsed_s"] = round(time.time() - chunked_start, 2)
+                    timing.clear()
+                    timing["chunked_attempt"] = attempt
+        
+        # Upload all files, then wait for processing in one polling loop
+        # Order: main audio, reference voices, images
+        upload_specs = [(audio_path, Path(audio_path).name, None) for audio_path in audio_paths]
+        
+        # Reference voice files (for speaker identification)
         # Skip when pyannote provides diarization hints — no need for Gemini voice comparison
+        reference_names = []
         if not diarization_hints:
             for ref_voice in reference_voices:
                 person_name = ref_voice.get('name', 'Unknown')
                 file_path = ref_voice.get('file_path')
                 if file_path and os.path.exists(file_path):
-                    path = Path(file_path)
-                    file_ref = self.upload_and_wait(file_path, display_name=f"Reference_Voice_{person_name}.mp3")
-                    reference_voice_files.append({
-                        'file_ref': file_ref,
-                        'name': person_name
-                    })
-                    print(f"✅ Uploaded reference voice for '{person_name}'")
-        
-        # Upload and wait for image files
-        for image_path in image_paths:
-            path = Path(image_path)
-            file_ref = self.upload_and_wait(image_path, display_name=path.name)
-            uploaded_files.append(file_ref)
+                    upload_specs.append((file_path, f"Reference_Voice_{person_name}.mp3", None))
+                    reference_names.append(person_name)
+        
+        upload_specs += [(image_path, Path(image_path).name, None) for image_path in image_paths]
+        
+        stage_start = time.time()
+        batch = self.upload_many(upload_specs)
+        timing["upload_s"] = round(time.time() - stage_start, 2)
+        timing["uploads"] = batch.timing
+        file_refs = batch.refs
+        n_audio, n_refs = len(audio_paths), len(reference_names)
+        
+        # The recording itself is required; a missing reference voice or image is not
+        audio_errors = [batch.errors[i] for i in range(n_audio) if i in batch.errors]
+        if audio_errors:
+            file_registry.release_all([ref for ref in file_refs if ref is not None])
+            raise audio_errors[0]
+        for i, error in sorted(batch.errors.items()):
+            print(f"⚠️  Skipping {upload_specs[i][1]}: {str(error)[:150]}")
+        
+        # Store refreshed File objects with state='ACTIVE' (reference voices separately)
+        uploaded_files = file_refs[:n_audio] + [ref for ref in file_refs[n_audio + n_refs:] if ref is not None]
+        reference_voice_files = [
+            {'file_ref': file_ref, 'name': person_name}
+            for file_ref, person_name in zip(file_refs[n_audio:n_audio + n_refs], reference_names)
+            if file_ref is not None
+        ]
+        for rv in reference_voice_files:
+            print(f"✅ Uploaded reference voice for '{rv['name']}'")
+        stage_start = time.time()
         
         # Build the contents list for Gemini
         # model.generate_content expects a single list of parts (strings and File objects)
@@ -888,28 +801,7 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
                 print("🎤 Using PYANNOTE-ASSISTED prompt (diarization pre-computed)")
 
                 # Build diarization info string for the prompt
-                diar_segments = diarization_hints.get("segments", [])
-                speaker_map = diarization_hints.get("speakers", {})
-
-                # Group segments by speaker for readable format
-                speaker_times = {}
-                for seg in diar_segments:
-                    spk = seg.get("speaker", "Unknown")
-                    if spk not in speaker_times:
-                        speaker_times[spk] = []
-                    speaker_times[spk].append(
-                        f"{seg['start']:.1f}s-{seg['end']:.1f}s"
-                    )
-
-                diar_info_lines = []
-                for spk, times in speaker_times.items():
-                    name = speaker_map.get(spk, {}).get("name", spk)
-                    confidence = speaker_map.get(spk, {}).get("confidence", 0)
-                    conf_str = f" ({confidence:.0%} confidence)" if confidence > 0 else ""
-                    diar_info_lines.append(
-                        f"- **{name}**{conf_str} speaks at: {', '.join(times)}"
-                    )
-                diar_info = "\n".join(diar_info_lines)
+                diar_info, speakers = self._format_diarization_info(diarization_hints)
 
                 prompt = PYANNOTE_ASSISTED_PROMPT.replace("{diarization_info}", diar_info)
 
@@ -917,7 +809,7 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
                     prompt += "\n" + kb_context
                     print(f"   📚 Knowledge Base injected ({len(kb_context)} chars)")
 
-                print(f"   📊 Pre-computed speakers: {list(speaker_times.keys())}")
+                print(f"   📊 Pre-computed speakers: {speakers}")
                 contents.append(prompt)
 
             else:
@@ -1021,26 +913,112 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
         print(f"   Types: {[type(x).__name__ for x in contents]}")
         print(f"   Files: {len(uploaded_files)}, Text parts: {len(contents) - len(uploaded_files)}")
         
+        timing["prepare_s"] = round(time.time() - stage_start, 2)
+        
         # Generate response with retry logic for connection errors
-        max_retries = 3
-        retry_delay = 5
+        stage_start = time.time()
         response = None
         
+        try:
+            # Use generation_config with maximum output tokens for long audio files
+            response = self._generate_with_retries(
+                contents,
+                generation_config={'max_output_tokens': 65536},  # Maximum for Gemini 1.5 Pro (allows long transcripts)
+            )
+        finally:
+            timing["inference_s"] = round(time.time() - stage_start, 2)
+            # Uploads stay registered for reuse; the janitor deletes them once idle
+            file_registry.release_all(uploaded_files + [rv['file_ref'] for rv in reference_voice_files])
+        
+        if response is None:
+            raise RuntimeError("Failed to generate content after all retries")
+        
+        response_text = self._response_text(response)
+        
+        original_length = len(response_text)
+        print(f"📄 Response length: {original_length} characters")
+        
+        # Check if this is an audio analysis response (should be JSON with segments + expert_summary)
+        if audio_paths:
+            # Parse audio analysis response (JSON format with segments + expert_summary)
+            print("🎤 Detected audio analysis response - parsing JSON transcript + expert summary...")
+            transcript_json = self._parse_audio_response(response_text)
+            
+            # Extract expert_summary from the combined response
+            expert_summary = transcript_json.get('expert_summary', '')
+            
+            # Return structured audio analysis result with expert summary
+            result = {
+                "type": "audio_analysis",
+                "transcript": transcript_json,  # Full JSON object with segments
+                "summary": transcript_json.get('summary', ''),  # Extract basic summary (if any)
+                "expert_summary": expert_summary,  # NEW: Full expert analysis from combined prompt
+                "audio_file_metadata": audio_file_metadata or []
+            }
+            
+            print("✅ Audio analysis complete!")
+            print(f"   Segments: {len(transcript_json.get('segments', []))} segments")
+            print(f"   Expert Summary: {len(expert_summary)} chars" if expert_summary else "   Expert Summary: (none)")
+            if expert_summary:
+                print(f"   First 100 chars: {expert_summary[:100]}...")
+            
+            return result
+        
+        # Regular JSON response (for non-audio analysis)
+        # One tolerant pass: skips code fences, repairs trailing commas and
+        # closes a truncated tail
+        result, parser = parse_tolerant(response_text, stream_path=())
+        if not isinstance(result, dict):
+            print(f"❌ JSON parsing error: no JSON object in response ({len(response_text)} chars)")
+            raise ValueError("Failed to parse JSON response: no JSON object found")
+        if parser.repairs or parser.truncated:
+            print(f"🔧 Repaired JSON response ({parser.repairs} repairs, truncated={parser.truncated})")
+        
+        print("✅ Analysis complete!")
+        
+        return result
+    
+    @staticmethod
+    def _format_diarization_info(diarization_hints: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """Diarization hints as "- **name** speaks at: ..." prompt lines, plus the speaker labels."""
+        diar_segments = diarization_hints.get("segments", [])
+        speaker_map = diarization_hints.get("speakers", {})
+
+        # Group segments by speaker for readable format
+        speaker_times = {}
+        for seg in diar_segments:
+            spk = seg.get("speaker", "Unknown")
+            if spk not in speaker_times:
+                speaker_times[spk] = []
+            speaker_times[spk].append(
+                f"{seg['start']:.1f}s-{seg['end']:.1f}s"
+            )
+
+        diar_info_lines = []
+        for spk, times in speaker_times.items():
+            name = speaker_map.get(spk, {}).get("name", spk)
+            confidence = speaker_map.get(spk, {}).get("confidence", 0)
+            conf_str = f" ({confidence:.0%} confidence)" if confidence > 0 else ""
+            diar_info_lines.append(
+                f"- **{name}**{conf_str} speaks at: {', '.join(times)}"
+            )
+        return "\n".join(diar_info_lines), list(speaker_times.keys())
+    
+    def _generate_with_retries(self, contents: List[Any], generation_config: Dict[str, Any],
+                               timeout: int = 600, max_retries: int = 3):
+        """generate_content with exponential-backoff retries on connection errors."""
+        retry_delay = 5
         for attempt in range(max_retries):
             try:
                 print(f"🤖 Attempt {attempt + 1}/{max_retries}: Calling model.generate_content...")
                 # Increase timeout for large files (default is 60s, we need more for audio processing)
-                # Use generation_config with maximum output tokens for long audio files
-                generation_config = {
-                    'max_output_tokens': 65536,  # Maximum for Gemini 1.5 Pro (allows long transcripts)
-                }
                 response = self.model.generate_content(
                     contents,
                     generation_config=generation_config,
-                    request_options={'timeout': 600}  # 10 minutes timeout
+                    request_options={'timeout': timeout}
                 )
                 print(f"✅ Successfully received response from Gemini")
-                break  # Success, exit retry loop
+                return response
             except Exception as e:
                 error_str = str(e)
                 # Check if it's a connection error that we should retry
@@ -1057,7 +1035,7 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
                     'BrokenPipe' in error_str or
                     'broken pipe' in error_str.lower()
                 )
-                
+            
                 if is_connection_error and attempt < max_retries - 1:
                     print(f"⚠️  Connection error (attempt {attempt + 1}/{max_retries}): {error_str[:200]}")
                     print(f"⏳ Retrying in {retry_delay} seconds...")
@@ -1068,14 +1046,18 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
                     # Not a connection error or out of retries
                     print(f"❌ Error generating content: {error_str}")
                     raise
-        
-        if response is None:
-            raise RuntimeError("Failed to generate content after all retries")
-        
-        # Extract response text with proper error handling
+        return None
+    
+    @staticmethod
+    def _response_text(response) -> str:
+        """
+        Response text, or the partial text of the first candidate when the
+        .text accessor fails (incomplete response). Raises RuntimeError for
+        blocked or empty responses.
+        """
         # Gemini may return empty/blocked responses that don't have .text available
         try:
-            response_text = response.text.strip()
+            return response.text.strip()
         except ValueError as e:
             # This happens when response.text accessor fails (blocked/empty response)
             print(f"⚠️  Gemini response.text accessor failed: {e}")
@@ -1100,8 +1082,8 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
                         partial_text = ''.join(part.text for part in parts if hasattr(part, 'text'))
                         if partial_text.strip():
                             print(f"⚠️  Using partial response ({len(partial_text)} chars) - finish_reason: {finish_reason}")
-                            response_text = partial_text.strip()
                             # Don't raise error - use the partial content
+                            return partial_text.strip()
                         else:
                             raise RuntimeError(f"Gemini response incomplete with no usable content: {finish_reason}")
                     else:
@@ -1111,119 +1093,100 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
             else:
                 # If we can't get text, raise the original error
                 raise RuntimeError(f"Failed to extract text from Gemini response: {e}")
-        
-        original_length = len(response_text)
-        print(f"📄 Response length: {original_length} characters")
-        
-        # Check if this is an audio analysis response (should be JSON with segments + expert_summary)
-        if audio_paths:
-            # Parse audio analysis response (JSON format with segments + expert_summary)
-            print("🎤 Detected audio analysis response - parsing JSON transcript + expert summary...")
-            transcript_json = self._parse_audio_response(response_text)
-            
-            # Extract expert_summary from the combined response
-            expert_summary = transcript_json.get('expert_summary', '')
-            
-            # Return structured audio analysis result with expert summary
-            result = {
-                "type": "audio_analysis",
-                "transcript": transcript_json,  # Full JSON object with segments
-                "summary": transcript_json.get('summary', ''),  # Extract basic summary (if any)
-                "expert_summary": expert_summary,  # NEW: Full expert analysis from combined prompt
-                "audio_file_metadata": audio_file_metadata or []
-            }
-            
-            print("✅ Audio analysis complete!")
-            print(f"   Segments: {len(transcript_json.get('segments', []))} segments")
-            print(f"   Expert Summary: {len(expert_summary)} chars" if expert_summary else "   Expert Summary: (none)")
-            if expert_summary:
-                print(f"   First 100 chars: {expert_summary[:100]}...")
-            
-            return result
-        
-        # Regular JSON response (for non-audio analysis)
+    
+    # ─── Chunked transcription (long pyannote-assisted recordings) ───
+    
+    def _analyze_chunked(self, audio_path: str, chunks: List[Chunk], audio_file_metadata,
+                         diarization_hints: Dict[str, Any], timing: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Transcribe chunks in parallel, merge them, then run the expert
+        analysis once over the merged transcript. Same result shape as the
+        single-call audio path.
+        """
+        print(f"✂️  [Chunked] {len(chunks)} chunks of ~{CHUNK_TARGET_SECONDS / 60:.0f} min, "
+              f"{CHUNK_WORKERS} workers: {[chunk.label for chunk in chunks]}")
+        stage_start = time.time()
+        results, chunk_timing = run_chunks(
+            chunks, lambda chunk: self._transcribe_chunk(audio_path, chunk, len(chunks), diarization_hints))
+        timing["inference_s"] = round(time.time() - stage_start, 2)
+        timing["chunks"] = chunk_timing
+        print(f"✅ [Chunked] Transcribed {len(chunks)} chunks in {chunk_timing['wall_s']}s "
+              f"(sequential estimate {chunk_timing['sequential_estimate_s']}s)")
+        
+        segments = merge_chunks(chunks, results)
+        relabeled = reconcile_speakers(segments, diarization_hints.get("segments", []))
+        print(f"   🔗 Merged {len(segments)} segments, {relabeled} speaker labels reconciled with pyannote")
+        
+        stage_start = time.time()
+        analysis = self._summarize_transcript(segments)
+        timing["summary_s"] = round(time.time() - stage_start, 2)
+        timing["inference_s"] = round(timing["inference_s"] + timing["summary_s"], 2)
+        
+        expert_summary = analysis.get("expert_summary") or ""
+        transcript_json = {
+            "speaker_count": len({seg.get("speaker") for seg in segments}),
+            "segments": segments,
+            "topics": analysis.get("topics", []),
+            "speaker_sentiment": analysis.get("speaker_sentiment", {}),
+            "recording_date_hint": analysis.get("recording_date_hint"),
+            "expert_summary": expert_summary,
+        }
+        print("✅ Audio analysis complete (chunked)!")
+        print(f"   Segments: {len(segments)} segments")
+        print(f"   Expert Summary: {len(expert_summary)} chars" if expert_summary else "   Expert Summary: (none)")
+        return {
+            "type": "audio_analysis",
+            "transcript": transcript_json,
+            "summary": analysis.get("summary", ""),
+            "expert_summary": expert_summary,
+            "audio_file_metadata": audio_file_metadata or [],
+        }
+    
+    def _transcribe_chunk(self, audio_path: str, chunk: Chunk, parts: int,
+                          diarization_hints: Dict[str, Any]) -> Dict[str, Any]:
+        """Cut, upload and transcribe one chunk; segments are chunk-relative."""
+        chunk_path = cut_chunk(audio_path, chunk)
+        file_ref = None
         try:
-            # Clean JSON: Remove markdown code blocks before parsing
-            clean_text = response_text.replace('```json', '').replace('```', '').strip()
-            
-            # Try to extract JSON if wrapped in markdown code blocks
-            if "```json" in response_text:
-                response_text = response_text.split("```json")[1].split("```")[0].strip()
-                print("📄 Extracted JSON from ```json block")
-            elif "```" in response_text:
-                response_text = response_text.split("```")[1].split("```")[0].strip()
-                print("📄 Extracted JSON from ``` block")
-            else:
-                # Use cleaned text if no code blocks found
-                response_text = clean_text
-                print("📄 Using cleaned text (no code blocks detected)")
-            
-            # Try to find JSON object boundaries
-            # Look for first { and try to find matching }
-            # We need to be careful about strings - don't count braces inside strings
-            if response_text.startswith('{'):
-                brace_count = 0
-                in_string = False
-                escape_next = False
-                last_valid_pos = -1
-                
-                for i, char in enumerate(response_text):
-                    if escape_next:
-                        escape_next = False
-                        continue
-                    
-                    if char == '\\':
-                        escape_next = True
-                        continue
-                    
-                    if char == '"' and not escape_next:
-                        in_string = not in_string
-                        continue
-                    
-                    if not in_string:
-                        if char == '{':
-                            brace_count += 1
-                        elif char == '}':
-                            brace_count -= 1
-                            if brace_count == 0:
-                                last_valid_pos = i + 1
-                                break
-                
-                if last_valid_pos > 0:
-                    response_text = response_text[:last_valid_pos]
-                    print(f"📄 Trimmed JSON to valid boundaries (position {last_valid_pos})")
-                else:
-                    print("⚠️  Could not find closing brace (likely incomplete), trying to fix JSON...")
-                    # Try to remove incomplete properties and close structures
-                    response_text = self._fix_incomplete_json(response_text)
-                    print(f"📄 Fixed JSON length: {len(response_text)} characters")
-            
-            # Parse JSON
-            result = json.loads(response_text)
-            
-            print("✅ Analysis complete!")
-            
-            return result
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parsing error: {e}")
-            print(f"Error position: line {e.lineno}, column {e.colno}")
-            # Verbose response logging removed - check logs in debug mode if needed
-            
-            # Try to fix common JSON issues
+            file_ref = self.upload_and_wait(
+                chunk_path, display_name=f"{Path(audio_path).stem}_part{chunk.index + 1}.ogg",
+                mime_type="audio/ogg")
+            hints = chunk_hints(diarization_hints, chunk)
+            diar_info, _ = self._format_diarization_info(hints)
+            prompt = CHUNK_TRANSCRIPTION_PROMPT.format(
+                part=chunk.index + 1, parts=parts, diarization_info=diar_info or "(no speech detected)")
+            response = self._generate_with_retries(
+                [prompt, "\n\n[AUDIO PART TO TRANSCRIBE]:\n", file_ref],
+                generation_config={'max_output_tokens': 32768},
+            )
+            if response is None:
+                raise RuntimeError(f"Failed to transcribe chunk {chunk.label} after all retries")
+            transcript = self._parse_audio_response(self._response_text(response))
+            # An unparseable response parses to no segments — fail so the whole recording falls back
+            check_chunk_transcript(chunk, hints, transcript)
+            print(f"   ✂️  Chunk {chunk.label}: {len(transcript.get('segments', []))} segments")
+            return transcript
+        finally:
+            if file_ref is not None:
+                file_registry.release(file_ref)
             try:
-                fixed_text = self._fix_json_errors(response_text)
-                result = json.loads(fixed_text)
-                print("✅ Fixed JSON errors and parsed successfully!")
-                return result
-            except Exception as fix_error:
-                print(f"❌ Failed to fix JSON: {fix_error}")
-                raise ValueError(f"Failed to parse JSON response: {e}")
+                os.remove(chunk_path)
+            except OSError:
+                pass
+    
+    def _summarize_transcript(self, segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Expert analysis, topics and sentiment over a merged transcript (text only)."""
+        prompt = CHUNKED_EXPERT_PROMPT.format(transcript=transcript_text(segments))
+        kb_context = get_kb_context()
+        if kb_context:
+            prompt += "\n" + kb_context
+        try:
+            response = self._generate_with_retries([prompt], generation_config={'max_output_tokens': 16384})
+            analysis, _ = parse_tolerant(self._response_text(response), stream_path=()) if response else (None, None)
         except Exception as e:
-            print(f"❌ Error processing response: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
+            print(f"⚠️  [Chunked] Expert analysis failed: {e}")
+            analysis = None
+        return analysis if isinstance(analysis, dict) else {}
     
     def _parse_audio_response(self, response_text: str) -> Dict[str, Any]:
         """
@@ -1251,137 +1214,68 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
             # Note: Raw response logging removed to reduce log noise
             # If debugging needed, uncomment: print(f"RAW: {response_text[:500]}...")
             
-            # Try to extract JSON from response (might be wrapped in markdown code blocks)
-            text = response_text.strip()
-            
-            # Clean JSON: Remove markdown code blocks before parsing
-            if text.startswith("```json"):
-                text = text[7:]  # Remove ```json
-            elif text.startswith("```"):
-                text = text[3:]  # Remove ```
+            # One tolerant pass over the response: skips code fences and prose,
+            # keeps raw control characters inside strings, closes a truncated
+            # tail and keeps only complete segments
+            transcript_json, parser = parse_tolerant(response_text, stream_path=("segments",))
             
-            if text.endswith("```"):
-                text = text[:-3]  # Remove closing ```
+            if isinstance(transcript_json, dict) and isinstance(transcript_json.get("segments"), list):
+                if parser.repairs or parser.truncated:
+                    print(f"🔧 Repaired transcript JSON ({parser.repairs} repairs, truncated={parser.truncated})")
+                print(f"✅ Successfully parsed JSON transcript with {len(transcript_json['segments'])} segments")
+                return transcript_json
             
-            # Final cleanup: remove any remaining markdown artifacts
-            text = text.replace('```json', '').replace('```', '').strip()
+            print("⚠️  No JSON transcript with 'segments' found in response")
+            text = response_text.strip()
+            # Fallback: Try to extract expert_summary from raw text even if JSON failed
+            # This handles cases where the expert_summary contains characters that break JSON
+            print("🔍 Attempting to extract expert_summary from raw text...")
+            expert_summary = ""
             
-            # ROBUST JSON EXTRACTION: Use regex to find JSON object
+            # Try to find expert_summary content using regex
+            # Look for common patterns like "🧠 הכובע שנבחר" which starts the expert section
             import re
-            json_match = re.search(r'\{.*\}', text, re.DOTALL)
-            if json_match:
-                json_text = json_match.group(0)
-            else:
-                json_text = text
-                print(f"⚠️  No JSON object found via regex")
             
-            # SANITIZE: Remove invalid control characters that break JSON parsing
-            # Control characters (0x00-0x1F except \t, \n, \r) are invalid in JSON strings
-            def sanitize_json_string(s):
-                """Remove invalid control characters from JSON string."""
-                # Replace problematic control chars with space
-                import re
-                # Match control chars except tab, newline, carriage return
-                s = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f]', ' ', s)
-                # Also fix unescaped newlines inside strings by finding quoted sections
-                # This is a simplified approach - replace literal newlines with \n
-                return s
+            # Pattern 1: Look for expert_summary field in broken JSON
+            expert_match = re.search(r'"expert_summary"\s*:\s*"(.*?)"(?:\s*}|,\s*")', text, re.DOTALL)
+            if expert_match:
+                expert_summary = expert_match.group(1)
+                # Unescape JSON escapes
+                expert_summary = expert_summary.replace('\\n', '\n').replace('\\"', '"')
+                print(f"   ✅ Extracted expert_summary via JSON field: {len(expert_summary)} chars")
             
-            json_text = sanitize_json_string(json_text)
-            
-            # Try to parse as JSON
-            try:
-                transcript_json = json.loads(json_text)
-                
-                # Validate structure
-                if not isinstance(transcript_json, dict):
-                    raise ValueError("Response is not a JSON object")
-                
-                if "segments" not in transcript_json:
-                    raise ValueError("Response missing 'segments' key")
-                
-                if not isinstance(transcript_json["segments"], list):
-                    raise ValueError("'segments' must be a list")
-                
-                print(f"✅ Successfully parsed JSON transcript with {len(transcript_json['segments'])} segments")
-                return transcript_json
+            # Pattern 2: Look for Hebrew expert format directly
+            if not expert_summary:
+                # Find the expert section by looking for the emoji header
+                expert_start = text.find('🧠 הכובע שנבחר')
+                if expert_start == -1:
+                    expert_start = text.find('🧠 הכובע')
                 
-            except json.JSONDecodeError as e:
-                print(f"⚠️  JSON decode error: {e}")
-                print(f"   Error position: char {e.pos if hasattr(e, 'pos') else 'unknown'}")
-                
-                # Try additional sanitization: escape unescaped newlines in strings
-                # Find the problematic area and try to fix it
-                try:
-                    # More aggressive sanitization: replace all newlines with escaped versions
-                    sanitized = json_text.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
-                    transcript_json = json.loads(sanitized)
-                    if "segments" in transcript_json:
-                        print(f"✅ Aggressive sanitization worked! Parsed {len(transcript_json['segments'])} segments")
-                        return transcript_json
-                except:
-                    pass
-                
-                # Try to fix incomplete JSON using existing helper
-                fixed_text = self._fix_incomplete_json(json_text)
-                fixed_text = sanitize_json_string(fixed_text)
-                try:
-                    transcript_json = json.loads(fixed_text)
-                    if "segments" in transcript_json:
-                        print(f"✅ Fixed incomplete JSON and parsed {len(transcript_json['segments'])} segments")
-                        return transcript_json
-                except Exception as fix_error:
-                    print(f"⚠️  Failed to fix JSON: {fix_error}")
-                
-                # Fallback: Try to extract expert_summary from raw text even if JSON failed
-                # This handles cases where the expert_summary contains characters that break JSON
-                print("🔍 Attempting to extract expert_summary from raw text...")
-                expert_summary = ""
-                
-                # Try to find expert_summary content using regex
-                # Look for common patterns like "🧠 הכובע שנבחר" which starts the expert section
-                import re
-                
-                # Pattern 1: Look for expert_summary field in broken JSON
-                expert_match = re.search(r'"expert_summary"\s*:\s*"(.*?)"(?:\s*}|,\s*")', text, re.DOTALL)
-                if expert_match:
-                    expert_summary = expert_match.group(1)
-                    # Unescape JSON escapes
-                    expert_summary = expert_summary.replace('\\n', '\n').replace('\\"', '"')
-                    print(f"   ✅ Extracted expert_summary via JSON field: {len(expert_summary)} chars")
-                
-                # Pattern 2: Look for Hebrew expert format directly
-                if not expert_summary:
-                    # Find the expert section by looking for the emoji header
-                    expert_start = text.find('🧠 הכובע שנבחר')
-                    if expert_start == -1:
-                        expert_start = text.find('🧠 הכובע')
+                if expert_start > 0:
+                    # Find end - usually before the closing JSON brace or end of text
+                    expert_end = text.find('"}', expert_start)
+                    if expert_end == -1:
+                        expert_end = len(text)
                     
-                    if expert_start > 0:
-                        # Find end - usually before the closing JSON brace or end of text
-                        expert_end = text.find('"}', expert_start)
-                        if expert_end == -1:
-                            expert_end = len(text)
-                        
-                        expert_summary = text[expert_start:expert_end]
-                        # Clean up JSON artifacts
-                        expert_summary = expert_summary.replace('\\n', '\n').replace('\\"', '"')
-                        print(f"   ✅ Extracted expert_summary via emoji marker: {len(expert_summary)} chars")
-                
-                if expert_summary and len(expert_summary) > 50:
-                    print(f"   📝 Expert preview: {expert_summary[:100]}...")
-                    return {
-                        "segments": [],
-                        "expert_summary": expert_summary
-                    }
-                
-                # No expert summary found
-                print("⚠️  Could not parse JSON or extract expert_summary")
-                print("   Returning empty result - speaker identification will be skipped")
+                    expert_summary = text[expert_start:expert_end]
+                    # Clean up JSON artifacts
+                    expert_summary = expert_summary.replace('\\n', '\n').replace('\\"', '"')
+                    print(f"   ✅ Extracted expert_summary via emoji marker: {len(expert_summary)} chars")
+            
+            if expert_summary and len(expert_summary) > 50:
+                print(f"   📝 Expert preview: {expert_summary[:100]}...")
                 return {
-                    "segments": []
+                    "segments": [],
+                    "expert_summary": expert_summary
                 }
             
+            # No expert summary found
+            print("⚠️  Could not parse JSON or extract expert_summary")
+            print("   Returning empty result - speaker identification will be skipped")
+            return {
+                "segments": []
+            }
+        
         except Exception as e:
             print(f"⚠️  Error parsing audio response: {e}")
             import traceback
@@ -1398,39 +1292,11 @@ STEP 5 — RESPONSE FORMATTING (פורמט תשובה):
             }
     
     def cleanup_files(self):
-        """Delete all uploaded files from Google's storage."""
-        for uploaded_file in self.uploaded_files:
-            try:
-                # uploaded_file is a File object
-                # Extract file ID (without 'files/' prefix)
-                if hasattr(uploaded_file, 'name'):
-                    # 'name' is 'files/FILE_ID', extract just FILE_ID
-                    file_name = uploaded_file.name
-                    if file_name.startswith('files/'):
-                        file_id = file_name[6:]  # Remove 'files/' prefix
-                    else:
-                        file_id = file_name
-                elif hasattr(uploaded_file, 'uri'):
-                    # Extract file ID from URI
-                    uri = uploaded_file.uri
-                    if '/files/' in uri:
-                        file_id = uri.split('/files/')[-1].split('?')[0]  # Remove query params
-                    else:
-                        file_id = uri
-                else:
-                    # If it's already a file_id string
-                    file_id = uploaded_file
-                    if file_id.startswith('files/'):
-                        file_id = file_id[6:]  # Remove 'files/' prefix
-                
-                # genai.delete_file() expects just the file ID (without 'files/' prefix)
-                genai.delete_file(file_id)
-                print(f"🗑️  Deleted: {file_id}")
-            except Exception as e:
-                print(f"⚠️  Failed to delete {uploaded_file}: {e}")
-        
-        self.uploaded_files = []
+        """Delete every uploaded file that no request is using right now."""
+        deleted = file_registry.run_janitor(idle_seconds=0, drain=True)
+        print(f"🗑️  Deleted {deleted} uploaded files")
 
 
-# Singleton instance
-gemini_service = GeminiService()
+# Singleton instance (built on first use / by startup warm-up)
+from app.services.service_registry import service
+gemini_service = service("gemini_service")
@@ -0,0 +1,228 @@
+"""
+Hedged Calls — race a slow primary model against a backup
+
+gemini_v1_generate used to wait up to 90s for Pro and fell back to Flash
+only after a non-200 response. A Pro call that is slow but succeeds set
+the tail latency for every KB answer.
+
+hedged_call() starts the primary call. If it has not returned a usable
+answer by the hedge deadline, the backup starts in parallel and the
+first usable answer wins. A primary that fails or returns an unusable
+answer before the deadline starts the backup at once, which keeps the old
+"Pro failed → Flash" behavior.
+
+The hedge deadline is the primary model's observed p90 latency
+(LatencyHistogram per model), clamped to
+[MIN_HEDGE_AFTER_SECONDS, MAX_HEDGE_AFTER_SECONDS]. DEFAULT_HEDGE_AFTER_SECONDS
+is used until MIN_SAMPLES calls have been observed. Every call that
+completes is recorded, including a loser that finishes after the race
+was decided, so the histogram is not biased toward fast calls.
+Histograms decay (all counts halve every DECAY_EVERY samples), so the
+deadline follows shifts in API latency.
+
+    text, winner = hedged_call("gemini-2.5-pro", lambda: post(pro),
+                               "gemini-2.0-flash", lambda: post(flash),
+                               timeout=90)
+"""
+
+import bisect
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEDGE_WORKERS = 8
+MIN_SAMPLES = 20
+HEDGE_QUANTILE = 0.9
+DEFAULT_HEDGE_AFTER_SECONDS = 20.0
+MIN_HEDGE_AFTER_SECONDS = 3.0
+MAX_HEDGE_AFTER_SECONDS = 60.0
+DECAY_EVERY = 400
+
+# Bucket upper bounds in seconds (roughly log-spaced, last bucket is open-ended)
+LATENCY_BUCKETS = [0.25, 0.5, 1, 1.5, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30, 40, 50, 60, 90, 120]
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="gemini-hedge")
+
+
+class LatencyHistogram:
+    """Bucketed latency distribution with periodic decay."""
+
+    def __init__(self, bounds: List[float] = LATENCY_BUCKETS):
+        self._bounds = list(bounds)
+        self._counts = [0.0] * (len(self._bounds) + 1)
+        self._observed = 0
+        self._failures = 0
+        self._lock = Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self._bounds, seconds)] += 1
+            self._observed += 1
+            if self._observed % DECAY_EVERY == 0:
+                self._counts = [c / 2 for c in self._counts]
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+
+    @property
+    def samples(self) -> int:
+        return self._observed
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated latency quantile in seconds (linear within a bucket)."""
+        with self._lock:
+            total = sum(self._counts)
+            if not total:
+                return None
+            target, cumulative = q * total, 0.0
+            for i, count in enumerate(self._counts):
+                if count and cumulative + count >= target:
+                    low = self._bounds[i - 1] if i > 0 else 0.0
+                    high = self._bounds[i] if i < len(self._bounds) else self._bounds[-1] * 2
+                    return low + (high - low) * (target - cumulative) / count
+                cumulative += count
+            return self._bounds[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p90, p99 = (self.quantile(q) for q in (0.5, 0.9, 0.99))
+        with self._lock:
+            labels = [f"≤{b}s" for b in self._bounds] + [f">{self._bounds[-1]}s"]
+            return {
+                "samples": self._observed,
+                "failures": self._failures,
+                "p50_s": round(p50, 2) if p50 is not None else None,
+                "p90_s": round(p90, 2) if p90 is not None else None,
+                "p99_s": round(p99, 2) if p99 is not None else None,
+                "buckets": {label: round(c, 1) for label, c in zip(labels, self._counts) if c},
+            }
+
+
+_histograms: Dict[str, LatencyHistogram] = {}
+_histograms_lock = Lock()
+_hedge_stats = {"calls": 0, "hedged": 0, "backup_won": 0, "primary_failed": 0}
+
+
+def _count(key: str):
+    with _histograms_lock:
+        _hedge_stats[key] += 1
+
+
+def histogram(model: str) -> LatencyHistogram:
+    with _histograms_lock:
+        if model not in _histograms:
+            _histograms[model] = LatencyHistogram()
+        return _histograms[model]
+
+
+def timed(model: str, fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Wrap fn so that its latency (or failure) is recorded for model."""
+    def _run():
+        start = time.time()
+        try:
+            result = fn()
+        except Exception:
+            histogram(model).failure()
+            raise
+        histogram(model).observe(time.time() - start)
+        return result
+    return _run
+
+
+def hedge_deadline(model: str) -> float:
+    """Seconds to wait for model before starting the backup."""
+    hist = histogram(model)
+    p = hist.quantile(HEDGE_QUANTILE) if hist.samples >= MIN_SAMPLES else None
+    if p is None:
+        return DEFAULT_HEDGE_AFTER_SECONDS
+    return min(MAX_HEDGE_AFTER_SECONDS, max(MIN_HEDGE_AFTER_SECONDS, p))
+
+
+def hedged_call(primary_model: str, primary: Callable[[], Any],
+                backup_model: str, backup: Callable[[], Any],
+                timeout: float,
+                is_usable: Callable[[Any], bool] = bool) -> Tuple[Any, str]:
+    """
+    Return (result, model) from the first usable answer.
+
+    Raises the last error when both calls fail. If both answer but neither
+    answer is usable, the primary's answer is returned. Raises TimeoutError
+    when nothing arrives within timeout.
+    """
+    start = time.time()
+    deadline = hedge_deadline(primary_model)
+    _count("calls")
+
+    futures = {_hedge_executor.submit(timed(primary_model, primary)): primary_model}
+    backup_started = False
+    errors: List[Exception] = []
+    unusable: Dict[str, Any] = {}
+
+    def _start_backup(reason: str):
+        nonlocal backup_started
+        if backup_started:
+            return
+        backup_started = True
+        _count("hedged")
+        print(f"   🏁 [Hedge] {primary_model} {reason} after {time.time() - start:.1f}s "
+              f"— racing {backup_model}")
+        futures[_hedge_executor.submit(timed(backup_model, backup))] = backup_model
+
+    processed = set()
+    while True:
+        for future in [f for f in futures if f.done() and f not in processed]:
+            processed.add(future)
+            model = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(e)
+                if model == primary_model:
+                    _count("primary_failed")
+                    logger.warning(f"[Hedge] {primary_model} failed: {e}")
+                continue
+            if is_usable(result):
+                if model != primary_model:
+                    _count("backup_won")
+                    print(f"   🏁 [Hedge] {backup_model} won in {time.time() - start:.1f}s")
+                return result, model
+            unusable[model] = result
+
+        pending = [f for f in futures if not f.done()]
+        if not pending:
+            if backup_started:
+                break
+            _start_backup("failed" if errors else "gave no usable answer")
+            continue
+
+        elapsed = time.time() - start
+        if elapsed >= timeout:
+            break
+        if not backup_started and elapsed >= deadline:
+            _start_backup(f"slower than p{int(HEDGE_QUANTILE * 100)} ({deadline:.1f}s)")
+            continue
+        wait_for = timeout - elapsed if backup_started else min(timeout, deadline) - elapsed
+        wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+    if unusable:
+        model = primary_model if primary_model in unusable else backup_model
+        return unusable[model], model
+    if errors and not any(not f.done() for f in futures):
+        raise errors[-1]
+    raise TimeoutError(f"No answer from {primary_model}/{backup_model} within {timeout}s")
+
+
+def get_latency_report() -> Dict[str, Any]:
+    """Per-model latency histograms, current hedge deadlines and race counters."""
+    with _histograms_lock:
+        models = list(_histograms)
+        hedging = dict(_hedge_stats)
+    return {
+        "models": {m: {**histogram(m).snapshot(), "hedge_after_s": round(hedge_deadline(m), 2)}
+                   for m in models},
+        "hedging": hedging,
+    }
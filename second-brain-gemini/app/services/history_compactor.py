@@ -0,0 +1,158 @@
+"""
+History Compactor — keep chat history under a token budget
+
+_trim_history used to keep the last MAX_HISTORY_TURNS*2 entries whatever
+their size. One search_meetings response can be many KB of JSON, and it
+was re-sent with every following message.
+
+compact_history() works on a Gemini chat history in place
+(genai.protos.Content, or anything with .role/.parts):
+  1. Measure each entry's tokens: text, function-call args and
+     function-response payloads.
+  2. Elide older tool responses. Any function_response outside the
+     recent window that is larger than TOOL_RESULT_KEEP_TOKENS is cut to
+     a short head plus an "[elided …]" marker. The model's own answer to
+     that tool call stays verbatim.
+  3. Drop whole exchanges from the front until the total fits the
+     budget. The history always starts on a real user message, so no
+     function_response is ever left without its function_call.
+
+strip_request_parts() removes text parts that were meant for one
+request only (e.g. the per-message KB passages), so they are neither
+re-sent with later messages nor checkpointed.
+"""
+
+import json
+import logging
+import os
+from typing import Any, List
+
+logger = logging.getLogger(__name__)
+
+HISTORY_TOKEN_BUDGET = int(os.environ.get("CONV_HISTORY_TOKEN_BUDGET", "8000"))
+TOOL_RESULT_KEEP_TOKENS = 300   # Older tool payloads are cut to roughly this size
+KEEP_RECENT_ENTRIES = 4         # Never compact the last 2 exchanges
+CHARS_PER_TOKEN = 3             # Same heuristic as the KB budget (Hebrew-heavy text)
+ELIDED_MARKER = "[elided"
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN if text else 0
+
+
+def _function_response(part: Any):
+    fr = getattr(part, "function_response", None)
+    return fr if fr is not None and getattr(fr, "name", "") else None
+
+
+def _function_call(part: Any):
+    fc = getattr(part, "function_call", None)
+    return fc if fc is not None and getattr(fc, "name", "") else None
+
+
+def _response_text(fr: Any) -> str:
+    response = getattr(fr, "response", None) or {}
+    try:
+        result = response.get("result") if hasattr(response, "get") else None
+        if isinstance(result, str):
+            return result
+        return json.dumps(dict(response), ensure_ascii=False, default=str)
+    except Exception:
+        return str(response)
+
+
+def entry_tokens(content: Any) -> int:
+    """Estimated token cost of one history entry."""
+    total = 0
+    for part in getattr(content, "parts", []):
+        text = getattr(part, "text", "")
+        if text:
+            total += _estimate_tokens(text)
+        fc = _function_call(part)
+        if fc is not None:
+            try:
+                args = json.dumps(dict(fc.args or {}), ensure_ascii=False, default=str)
+            except Exception:
+                args = str(fc.args)
+            total += _estimate_tokens(fc.name) + _estimate_tokens(args)
+        fr = _function_response(part)
+        if fr is not None:
+            total += _estimate_tokens(fr.name) + _estimate_tokens(_response_text(fr))
+    return total
+
+
+def _is_user_message(content: Any) -> bool:
+    """A real user turn (text), as opposed to a role='user' function_response."""
+    if getattr(content, "role", "") != "user":
+        return False
+    parts = getattr(content, "parts", [])
+    return any(getattr(p, "text", "") for p in parts) and not any(_function_response(p) for p in parts)
+
+
+def _elide_tool_payloads(entries: List[Any]) -> int:
+    """Cut large function_response payloads in-place. Returns the number elided."""
+    keep_chars = TOOL_RESULT_KEEP_TOKENS * CHARS_PER_TOKEN
+    elided = 0
+    for content in entries:
+        for part in getattr(content, "parts", []):
+            fr = _function_response(part)
+            if fr is None:
+                continue
+            payload = _response_text(fr)
+            if payload.startswith(ELIDED_MARKER) or len(payload) <= keep_chars:
+                continue
+            fr.response = {
+                "result": f"{ELIDED_MARKER} {len(payload)} chars — older tool result, head only] "
+                          f"{payload[:keep_chars]}"
+            }
+            elided += 1
+    return elided
+
+
+def strip_request_parts(history: List[Any], prefix: str) -> int:
+    """Remove user text parts starting with prefix, in place. Returns the number removed."""
+    removed = 0
+    for content in history:
+        if getattr(content, "role", "") != "user":
+            continue
+        parts = getattr(content, "parts", [])
+        for i in reversed(range(len(parts))):
+            if (getattr(parts[i], "text", "") or "").startswith(prefix):
+                del parts[i]
+                removed += 1
+    return removed
+
+
+def compact_history(history: List[Any], token_budget: int = HISTORY_TOKEN_BUDGET) -> dict:
+    """
+    Compact history in place so its estimated size fits token_budget.
+
+    Returns stats: {"before", "after", "elided", "dropped"} (tokens / counts).
+    """
+    before = sum(entry_tokens(c) for c in history)
+    stats = {"before": before, "after": before, "elided": 0, "dropped": 0}
+    if before <= token_budget:
+        return stats
+
+    older = history[:-KEEP_RECENT_ENTRIES] if len(history) > KEEP_RECENT_ENTRIES else []
+    stats["elided"] = _elide_tool_payloads(older)
+    sizes = [entry_tokens(c) for c in history]
+    total = sum(sizes)
+
+    # Drop whole exchanges from the front — cut only where a real user message
+    # starts, and never inside the recent window.
+    limit = len(history) - KEEP_RECENT_ENTRIES if total > token_budget else 0
+    cut, dropped_tokens, prefix = 0, 0, 0
+    for i in range(1, limit + 1):
+        prefix += sizes[i - 1]
+        if _is_user_message(history[i]):
+            cut, dropped_tokens = i, prefix
+            if total - prefix <= token_budget:
+                break
+    if cut:
+        del history[:cut]
+        total -= dropped_tokens
+        stats["dropped"] = cut
+
+    stats["after"] = total
+    return stats
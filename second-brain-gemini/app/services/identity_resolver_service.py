@@ -25,19 +25,21 @@ Usage (in main.py):
 """
 
 import logging
+import os
 import time
 import re
 from typing import Optional, Dict, Any, List, Tuple
-from threading import Lock
 from dataclasses import dataclass, field
 
+from app.services.session_store import TTLSessionStore
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════════
-SESSION_TTL_SECONDS = 600  # 10 minutes
-MAX_SESSIONS = 200         # Cap to prevent unbounded memory growth
+SESSION_TTL_SECONDS = int(os.environ.get("RESOLVER_SESSION_TTL_SECONDS", "600"))  # 10 minutes
+MAX_SESSIONS = int(os.environ.get("RESOLVER_MAX_SESSIONS", "200"))                # Cap to prevent unbounded memory growth
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -54,9 +56,6 @@ class SessionContext:
     pending_query: str = ""            # The original question waiting for disambiguation
     last_activity: float = 0.0         # timestamp of last interaction
 
-    def is_expired(self) -> bool:
-        return (time.time() - self.last_activity) > SESSION_TTL_SECONDS
-
     def touch(self):
         self.last_activity = time.time()
 
@@ -76,29 +75,29 @@ class ResolvedSelection:
 class IdentityResolverService:
     """
     Manages per-user session context for intelligent name disambiguation.
-    Thread-safe via a single lock.
+    Thread-safe; sessions expire SESSION_TTL_SECONDS after the last update.
     """
 
     def __init__(self):
-        self._sessions: Dict[str, SessionContext] = {}
-        self._lock = Lock()
+        self._sessions: TTLSessionStore[SessionContext] = TTLSessionStore(
+            ttl_seconds=SESSION_TTL_SECONDS, max_entries=MAX_SESSIONS, name="Resolver",
+        )
 
     # ── Session management ──────────────────────────────────────────
 
-    def _get_session(self, phone: str) -> SessionContext:
-        """Get or create a session for a phone number. Auto-evicts expired."""
-        with self._lock:
-            # Evict expired sessions periodically
-            if len(self._sessions) > MAX_SESSIONS:
-                expired = [k for k, v in self._sessions.items() if v.is_expired()]
-                for k in expired:
-                    del self._sessions[k]
-
-            session = self._sessions.get(phone)
-            if session is None or session.is_expired():
-                session = SessionContext(last_activity=time.time())
-                self._sessions[phone] = session
-            return session
+    def _get_session(self, phone: str, touch: bool = False) -> SessionContext:
+        """Get or create a session for a phone number. Expired sessions come back fresh.
+
+        Pass touch=True when updating the session — only updates extend the TTL.
+        """
+        session, _ = self._sessions.get_or_create(
+            phone, lambda: SessionContext(last_activity=time.time()), touch=touch
+        )
+        return session
+
+    def configure_sessions(self, ttl_seconds: Optional[int] = None, max_sessions: Optional[int] = None):
+        """Change session TTL / cap at runtime."""
+        self._sessions.configure(ttl_seconds=ttl_seconds, max_entries=max_sessions)
 
     def update_context(
         self, phone: str, department: str = "", manager: str = "",
@@ -112,7 +111,7 @@ class IdentityResolverService:
             entity: Full person dict (canonical_name, title, department, etc.)
                     Stored as last_mentioned_entity for pronoun resolution.
         """
-        session = self._get_session(phone)
+        session = self._get_session(phone, touch=True)
         session.touch()
         if department:
             session.last_department_mentioned = department
@@ -127,7 +126,7 @@ class IdentityResolverService:
     def get_last_entity(self, phone: str) -> Optional[Dict[str, Any]]:
         """Get the last-mentioned entity for a phone number (if session is active)."""
         session = self._get_session(phone)
-        if session.is_expired() or not session.last_mentioned_entity:
+        if not session.last_mentioned_entity:
             return None
         return session.last_mentioned_entity
 
@@ -242,7 +241,7 @@ class IdentityResolverService:
             return None
 
         session = self._get_session(phone)
-        if session.is_expired() or not session.last_options_list:
+        if not session.last_options_list:
             return None
 
         digit = int(message.strip())
@@ -322,7 +321,7 @@ class IdentityResolverService:
 
         Returns the formatted Hebrew message string to send to the user.
         """
-        session = self._get_session(phone)
+        session = self._get_session(phone, touch=True)
         session.touch()
 
         scored = self._score_matches(matches, session)
@@ -0,0 +1,346 @@
+"""
+JSON Stream — incremental, tolerant JSON parser for model output
+
+Gemini transcript and NotebookLM responses are large JSON documents that
+are often broken: wrapped in ``` fences or prose, with raw newlines or
+control characters inside strings, with trailing commas, or cut off by
+max_output_tokens. The old repair code (_parse_audio_response,
+_fix_incomplete_json, _fix_json_errors, NotebookLM._repair_json /
+_close_json_stack) made several regex passes and whole-string rewrites,
+including re.search(r'\\{.*\\}', text, re.DOTALL), then retried
+json.loads after each one. On a truncated 200KB response that meant many
+full passes, and the trim-and-retry loop could still drop everything.
+
+StreamingJSONParser reads the text once, left to right. It accepts it in
+any number of chunks, for example as a streamed response arrives:
+  - Text before the first '{' or '[' and after the root value closes is
+    ignored (fences, "Here is the JSON:", trailing notes).
+  - Raw control characters inside strings are kept, and invalid escapes
+    keep the escaped character.
+  - Trailing commas, missing commas between values, stray characters and
+    mismatched closers are repaired in place. Each repair is counted.
+  - Every element of the array at stream_path (default: the top-level
+    "segments" key) is returned by feed() as soon as its closing bracket
+    has been read, so callers can use segments before the response ends.
+  - finish() closes whatever is still open. A truncated string value
+    keeps its partial text, a key without a value is dropped, and a
+    partial element of the streamed array is dropped, so only whole
+    segments are returned.
+
+    parser = StreamingJSONParser()
+    for chunk in response:
+        for segment in parser.feed(chunk.text):
+            ...
+    transcript = parser.finish()
+
+parse_tolerant(text) is the one-shot form and returns (value, parser).
+"""
+
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+_STRING_RUN = re.compile(r'[^"\\]+')
+_WHITESPACE = re.compile(r'\s+')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_NUMBER_CHARS = re.compile(r'[-+0-9.eE]+')
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_COMPACT_AFTER = 1 << 16
+
+# Frame expectations
+_KEY, _COLON, _VALUE, _COMMA = "key", "colon", "value", "comma"
+
+
+class _Frame:
+    __slots__ = ("container", "is_object", "expect", "key", "path", "streamed")
+
+    def __init__(self, container, path: Tuple[str, ...], streamed: bool):
+        self.container = container
+        self.is_object = isinstance(container, dict)
+        self.expect = _KEY if self.is_object else _VALUE
+        self.key: Optional[str] = None
+        self.path = path
+        self.streamed = streamed        # container is an element of the streamed array
+
+
+class StreamingJSONParser:
+    """Single-pass tolerant JSON parser that accepts input in chunks."""
+
+    def __init__(self, stream_path: Tuple[str, ...] = ("segments",),
+                 on_item: Optional[Callable[[Any], None]] = None):
+        self._stream_path = tuple(stream_path)
+        self._on_item = on_item
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._root: Any = None
+        self._started = False
+        self._finished = False
+        self._string: Optional[List[str]] = None     # parts of the string being read
+        self._string_is_key = False
+        self._ready: List[Any] = []
+        self.complete = False       # root value closed normally
+        self.truncated = False      # input ended with open structures
+        self.repairs = 0
+        self.items = 0
+        self.chars = 0
+
+    # ─── Public API ──────────────────────────────────────────────
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume a chunk; return streamed-array elements completed by it."""
+        if chunk and not self.complete:
+            self.chars += len(chunk)
+            self._buf += chunk
+            self._run(final=False)
+        ready, self._ready = self._ready, []
+        return ready
+
+    def finish(self) -> Any:
+        """Consume the rest, close anything still open and return the root value."""
+        if not self._finished:
+            self._finished = True
+            if not self.complete:
+                self._run(final=True)
+                self._close_all()
+        return self._root
+
+    # ─── Scanner ─────────────────────────────────────────────────
+
+    def _run(self, final: bool):
+        buf = self._buf
+        pos = self._pos
+        n = len(buf)
+        while pos < n and not self.complete:
+            if self._string is not None:
+                pos = self._read_string(buf, pos, final)
+                if self._string is not None:
+                    break       # Need more input
+                continue
+
+            if not self._started:
+                start = min((i for i in (buf.find("{", pos), buf.find("[", pos)) if i >= 0), default=-1)
+                if start < 0:
+                    pos = n
+                    break
+                pos = start
+                self._started = True
+
+            match = _WHITESPACE.match(buf, pos)
+            if match:
+                pos = match.end()
+                continue
+            ch = buf[pos]
+            frame = self._stack[-1] if self._stack else None
+
+            if ch in "}]":
+                pos += 1
+                self._close(ch)
+                continue
+            if ch == ",":
+                pos += 1
+                if frame is None or frame.expect != _COMMA:
+                    self.repairs += 1       # Doubled or leading comma
+                    continue
+                frame.expect = _KEY if frame.is_object else _VALUE
+                continue
+            if ch == ":":
+                pos += 1
+                if frame is not None and frame.expect == _COLON:
+                    frame.expect = _VALUE
+                else:
+                    self.repairs += 1
+                continue
+
+            if frame is not None and frame.expect == _COMMA:
+                # Missing comma between two values / members
+                self.repairs += 1
+                frame.expect = _KEY if frame.is_object else _VALUE
+            if frame is not None and frame.expect == _COLON:
+                self.repairs += 1           # Missing colon after a key
+                frame.expect = _VALUE
+
+            if frame is not None and frame.is_object and frame.expect == _KEY:
+                if ch == '"':
+                    self._string, self._string_is_key = [], True
+                    pos += 1
+                else:
+                    self.repairs += 1       # Unquoted key or garbage — skip it
+                    pos += 1
+                continue
+
+            # A value
+            if ch == '"':
+                self._string, self._string_is_key = [], False
+                pos += 1
+            elif ch == "{" or ch == "[":
+                pos += 1
+                self._open({} if ch == "{" else [])
+            else:
+                new_pos = self._read_scalar(buf, pos, final)
+                if new_pos is None:
+                    break           # Need more input
+                pos = new_pos
+
+        if self.complete:
+            pos = n
+        self._pos = pos
+        if pos > _COMPACT_AFTER:
+            self._buf, self._pos = buf[pos:], 0
+
+    def _read_string(self, buf: str, pos: int, final: bool) -> int:
+        n = len(buf)
+        parts = self._string
+        while pos < n:
+            match = _STRING_RUN.match(buf, pos)
+            if match:
+                parts.append(match.group())
+                pos = match.end()
+                continue
+            ch = buf[pos]
+            if ch == '"':
+                self._string = None
+                value = "".join(parts)
+                if self._string_is_key:
+                    frame = self._stack[-1]
+                    frame.key, frame.expect = value, _COLON
+                else:
+                    self._value(value)
+                return pos + 1
+            # Backslash escape
+            if pos + 1 >= n:
+                if final:
+                    return n
+                return pos
+            esc = buf[pos + 1]
+            if esc == "u":
+                hex_digits = buf[pos + 2:pos + 6]
+                if len(hex_digits) < 4:
+                    return n if final else pos      # Truncated \uXXXX: drop it / wait
+                if all(c in "0123456789abcdefABCDEF" for c in hex_digits):
+                    parts.append(chr(int(hex_digits, 16)))
+                    pos += 6
+                else:
+                    self.repairs += 1
+                    parts.append("u")
+                    pos += 2
+                continue
+            if esc not in _ESCAPES:
+                self.repairs += 1
+            parts.append(_ESCAPES.get(esc, esc))
+            pos += 2
+        return pos
+
+    def _read_scalar(self, buf: str, pos: int, final: bool) -> Optional[int]:
+        run = _NUMBER_CHARS.match(buf, pos)
+        if run and run.end() == len(buf) and not final:
+            return None             # The number may continue in the next chunk
+        match = _NUMBER.match(buf, pos)
+        if match:
+            text = match.group()
+            self._value(float(text) if any(c in text for c in ".eE") else int(text))
+            return match.end()
+        for word, value in _LITERALS.items():
+            if buf.startswith(word, pos):
+                self._value(value)
+                return pos + len(word)
+            if not final and word.startswith(buf[pos:pos + len(word)]) and pos + len(word) > len(buf):
+                return None         # Partial literal at the end of the chunk
+        self.repairs += 1           # Unexpected character — skip it
+        return pos + 1
+
+    # ─── Tree building ───────────────────────────────────────────
+
+    def _child_path(self) -> Tuple[Tuple[str, ...], bool]:
+        if not self._stack:
+            return (), False
+        frame = self._stack[-1]
+        if frame.is_object:
+            return frame.path + (frame.key,), False
+        return frame.path + ("*",), frame.path == self._stream_path
+
+    def _attach(self, value: Any):
+        if not self._stack:
+            self._root = value
+            return
+        frame = self._stack[-1]
+        if frame.is_object:
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+        frame.expect = _COMMA
+
+    def _open(self, container):
+        path, streamed = self._child_path()
+        self._attach(container)
+        self._stack.append(_Frame(container, path, streamed))
+
+    def _value(self, value: Any):
+        streamed = bool(self._stack) and not self._stack[-1].is_object and \
+            self._stack[-1].path == self._stream_path
+        self._attach(value)
+        if not self._stack:
+            self.complete = True
+        elif streamed:
+            self._emit(value)
+
+    def _close(self, closer: str):
+        if not self._stack:
+            self.repairs += 1
+            return
+        want_object = closer == "}"
+        if self._stack[-1].is_object != want_object:
+            # Mismatched closer: close the inner container if the outer one matches
+            if len(self._stack) > 1 and self._stack[-2].is_object == want_object:
+                self.repairs += 1
+                self._pop()
+            else:
+                self.repairs += 1
+                return
+        frame = self._stack[-1]
+        if frame.is_object and frame.expect in (_COLON, _VALUE) and frame.key is not None:
+            self.repairs += 1       # "key": } — drop the dangling key
+            frame.container.pop(frame.key, None)
+        elif frame.expect in (_KEY, _VALUE) and frame.container:
+            self.repairs += 1       # Trailing comma before the closer
+        self._pop()
+
+    def _pop(self):
+        frame = self._stack.pop()
+        if not self._stack:
+            self.complete = True
+        elif frame.streamed:
+            self._emit(frame.container)
+
+    def _emit(self, item: Any):
+        self.items += 1
+        self._ready.append(item)
+        if self._on_item:
+            self._on_item(item)
+
+    def _close_all(self):
+        """End of input with open structures: keep what is whole, close the rest."""
+        if self._string is not None:
+            value, is_key = "".join(self._string), self._string_is_key
+            self._string = None
+            self.truncated = True
+            if not is_key and self._stack:
+                frame = self._stack[-1]
+                if frame.is_object or frame.path != self._stream_path:
+                    self._attach(value)     # Keep a truncated text value
+        while self._stack:
+            self.truncated = True
+            frame = self._stack.pop()
+            if frame.is_object and frame.expect in (_COLON, _VALUE):
+                frame.container.pop(frame.key, None)    # Key without a value
+            if frame.streamed and self._stack:
+                parent = self._stack[-1].container
+                if parent and parent[-1] is frame.container:
+                    parent.pop()            # Drop a partial streamed element
+
+
+def parse_tolerant(text: str, stream_path: Tuple[str, ...] = ("segments",)) -> Tuple[Any, StreamingJSONParser]:
+    """Parse a whole response in one pass; returns (value or None, parser)."""
+    parser = StreamingJSONParser(stream_path=stream_path)
+    parser.feed(text or "")
+    return parser.finish(), parser
@@ -16,25 +16,58 @@ Cache lifecycle:
   - Raw files: 1-hour cache (CACHE_TTL_SECONDS)
   - Vision-parsed graph JSON: 24-hour cache (separate)
   - Unified identity graph: rebuilt when either source changes
-  - Cleared on restart/deployment
+  - Passage index (BM25): rebuilt with every context load
+  - Cleared on restart/deployment, EXCEPT the local snapshot below
+
+Cold start:
+  After every successful Drive load, the identity graph, name index and KB
+  sections are written to a versioned local snapshot (KB_SNAPSHOT_PATH).
+  On boot, load_snapshot() restores them in milliseconds and
+  revalidate_in_background() re-reads Drive without blocking readers.
+
+Context assembly:
+  Loaded files are split into passages and indexed (BM25). Prompt blocks are
+  assembled per call under an explicit token budget — relevance-ranked when a
+  query is given, priority-ranked (identity/org data first) otherwise.
 """
 
 import json
+import hashlib
+import math
 import os
 import io
 import logging
+import pickle
+import re
+import threading
 import time
+from collections import Counter
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from threading import Lock
 
+from app.services.file_registry import file_registry, registry_display_name
+from app.services.tool_cache import bump_data_version
+
 logger = logging.getLogger(__name__)
 
 # ── Configuration ──
 CACHE_TTL_SECONDS = 3600     # 1 hour cache for raw files
-MAX_CONTEXT_CHARS = 80000    # Gemini 2.5 Pro supports 1M+ tokens — 80K chars is safe
 LOCAL_KB_DIR = Path(__file__).parent.parent / "knowledge_base"
 
+# ── Token budgets for assembled KB blocks ──
+KB_CONTEXT_TOKEN_BUDGET = int(os.environ.get("KB_CONTEXT_TOKEN_BUDGET", "12000"))  # System-instruction block (no query)
+KB_QUERY_TOKEN_BUDGET = int(os.environ.get("KB_QUERY_TOKEN_BUDGET", "4000"))       # Per-query retrieval block
+KB_SUPPLEMENT_TOKEN_BUDGET = int(os.environ.get("KB_SUPPLEMENT_TOKEN_BUDGET", "1500"))  # Per-message passages missing from the default block
+PASSAGE_MAX_CHARS = 1200     # Passage size for the BM25 index
+CHARS_PER_TOKEN = 3          # Conservative estimate for mixed Hebrew/English text
+
+# ── Local snapshot for instant cold starts ──
+KB_SNAPSHOT_SCHEMA_VERSION = 1   # Bump when the snapshot payload shape changes
+KB_SNAPSHOT_PATH = Path(os.environ.get(
+    "KB_SNAPSHOT_PATH", str(Path(__file__).parent.parent.parent / ".kb_snapshot.pkl")
+))
+
 # ── In-memory cache (thread-safe) ──
 _cache_lock = Lock()
 _cached_context: Optional[str] = None
@@ -43,6 +76,10 @@ _cached_file_count: int = 0
 _cache_timestamp: float = 0
 _drive_connected: bool = False
 
+# ── Chunked KB store: full (untruncated) sections + BM25 passage index ──
+_kb_sections: List[str] = []
+_passage_index: Optional["_PassageIndex"] = None
+
 # ── Vision-parsed graph cache (24h, cleared on restart) ──
 # Key: file_id, Value: {"graph_json": str, "parsed_data": dict, "timestamp": float}
 _vision_graph_cache: Dict[str, Dict[str, Any]] = {}
@@ -53,11 +90,23 @@ VISION_CACHE_TTL = 86400  # 24 hours
 # ── Unified Identity Graph (built from all sources) ──
 _identity_graph: Optional[Dict[str, Any]] = None
 _identity_graph_timestamp: float = 0
+_identity_graph_version: int = 0   # Bumped on every rebuild/merge — keys derived caches
+
+# ── Reporting-line index (derived from the identity graph, rebuilt on version change) ──
+# manager -> direct reports (by reports_to), and manager -> ALL reports (transitive closure)
+_reports_index_version: int = -1
+_manager_map: Dict[str, List[str]] = {}
+_reports_closure: Dict[str, List[str]] = {}
 
 # ── Structured JSON Data Cache (raw parsed org_structure + family_tree) ──
 _org_structure_data: Optional[Dict[str, Any]] = None
 _family_tree_data: Optional[Dict[str, Any]] = None
 
+# ── State being built by load_context (None outside a load) ──
+# The graph mutators write here during a load, and _commit_build() swaps the
+# finished state in at once, so lock-free readers never see a half-built graph.
+_staged: Optional[Dict[str, Any]] = None
+
 
 # ═══════════════════════════════════════════════════════════════════════
 # GOOGLE DRIVE ACCESS
@@ -191,6 +240,9 @@ def _extract_pdf_with_vision(raw_bytes: bytes, file_id: str = "", file_name: str
         cached = _get_cached_vision_graph(file_id)
         if cached:
             print(f"   📋 [Vision] Using cached vision graph for {file_name} (no re-extraction)")
+            # Every load builds a fresh identity graph — re-apply the cached org chart to it
+            if _vision_graph_cache[file_id].get('parsed_data'):
+                _rebuild_identity_graph(_vision_graph_cache[file_id]['parsed_data'])
             return f"── Vision-Parsed Organizational Graph (Source of Truth) ──\n{cached}"
     
     # ── Step 2: Vision analysis with Gemini 1.5 Pro (forced) ──
@@ -208,6 +260,24 @@ def _extract_pdf_with_vision(raw_bytes: bytes, file_id: str = "", file_name: str
     return "[PDF — could not extract content via vision or text]"
 
 
+def _upload_for_vision(path: str, display_name: str, mime_type: str, max_wait: int):
+    """Upload a file for a vision call and wait until Gemini has processed it."""
+    import google.generativeai as genai
+    
+    print(f"   👁️ [Vision] Uploading {display_name} for visual analysis")
+    file_ref = genai.upload_file(path=path, display_name=display_name, mime_type=mime_type)
+    start = time.time()
+    while time.time() - start < max_wait:
+        file_ref = genai.get_file(file_ref.name)
+        state = file_ref.state.name if hasattr(file_ref.state, 'name') else str(file_ref.state)
+        if state == "ACTIVE":
+            break
+        elif state == "FAILED":
+            raise ValueError(f"Gemini could not process {display_name}")
+        time.sleep(2)
+    return file_ref
+
+
 def _get_cached_vision_graph(file_id: str) -> Optional[str]:
     """Get cached vision-parsed graph JSON."""
     if file_id in _vision_graph_cache:
@@ -244,28 +314,16 @@ def _vision_analyze_pdf(raw_bytes: bytes, file_id: str = "", file_name: str = ""
             tmp.write(raw_bytes)
             tmp_path = tmp.name
         
+        file_ref = None
         try:
-            # Upload to Gemini
-            print(f"   👁️ [Vision] Uploading PDF for visual analysis: {file_name}")
-            file_ref = genai.upload_file(
-                path=tmp_path,
-                display_name=file_name or "document.pdf",
-                mime_type="application/pdf"
+            # Upload to Gemini (reuses the previous upload of the same PDF bytes)
+            file_ref = file_registry.acquire(
+                tmp_path,
+                upload=lambda: _upload_for_vision(tmp_path, registry_display_name(file_name or "document.pdf"),
+                                                  "application/pdf", max_wait=90),
+                label=file_name or "document.pdf",
             )
             
-            # Wait for processing
-            max_wait = 90
-            start = time.time()
-            while time.time() - start < max_wait:
-                file_ref = genai.get_file(file_ref.name)
-                state = file_ref.state.name if hasattr(file_ref.state, 'name') else str(file_ref.state)
-                if state == "ACTIVE":
-                    break
-                elif state == "FAILED":
-                    print(f"   ❌ [Vision] File processing failed")
-                    return ""
-                time.sleep(2)
-            
             # ── Model selection: use MODEL_MAPPING static aliases (no models/ prefix) ──
             # Vision analysis still uses the SDK for file upload + generate_content
             # because file_ref objects require the SDK pipeline.
@@ -476,10 +534,8 @@ CRITICAL RULES — READ CAREFULLY:
                 os.unlink(tmp_path)
             except Exception:
                 pass
-            try:
-                genai.delete_file(file_ref.name)
-            except Exception:
-                pass
+            if file_ref is not None:
+                file_registry.release(file_ref)
     
     except Exception as e:
         print(f"   ❌ [Vision] Error: {e}")
@@ -530,27 +586,15 @@ def _extract_image_with_vision(raw_bytes: bytes, file_id: str = "", file_name: s
             tmp.write(raw_bytes)
             tmp_path = tmp.name
         
+        file_ref = None
         try:
-            print(f"   👁️ [Vision] Uploading image for analysis: {file_name}")
-            file_ref = genai.upload_file(
-                path=tmp_path,
-                display_name=file_name or f"image{ext}",
-                mime_type=mime_type
+            file_ref = file_registry.acquire(
+                tmp_path,
+                upload=lambda: _upload_for_vision(tmp_path, registry_display_name(file_name or f"image{ext}"),
+                                                  mime_type, max_wait=60),
+                label=file_name or f"image{ext}",
             )
             
-            # Wait for processing
-            max_wait = 60
-            start = time.time()
-            while time.time() - start < max_wait:
-                file_ref = genai.get_file(file_ref.name)
-                state = file_ref.state.name if hasattr(file_ref.state, 'name') else str(file_ref.state)
-                if state == "ACTIVE":
-                    break
-                elif state == "FAILED":
-                    print(f"   ❌ [Vision] Image processing failed")
-                    return ""
-                time.sleep(2)
-            
             model_name = MODEL_MAPPING["pro"]
             print(f"   👁️ [Vision] Using MODEL_MAPPING['pro']: {model_name}")
             model = genai.GenerativeModel(model_name)
@@ -643,6 +687,8 @@ CRITICAL RULES:
                 os.unlink(tmp_path)
             except Exception:
                 pass
+            if file_ref is not None:
+                file_registry.release(file_ref)
     
     except Exception as e:
         print(f"   ❌ [Vision] Image analysis error: {e}")
@@ -720,7 +766,7 @@ def _rebuild_identity_graph(org_data: Dict[str, Any] = None):
     - Hebrew ↔ English name mappings
     - Nickname resolution
     """
-    global _identity_graph, _identity_graph_timestamp
+    global _identity_graph, _identity_graph_timestamp, _identity_graph_version
     
     graph = {
         "people": {},        # name -> {roles, contexts, aliases}
@@ -751,7 +797,7 @@ def _rebuild_identity_graph(org_data: Dict[str, Any] = None):
                 "title": title,
                 "department": dept,
                 "reports_to": reports_to,
-                "direct_reports": [],
+                "direct_reports": set(),
                 "node_id": node_id,
             })
             
@@ -786,22 +832,18 @@ def _rebuild_identity_graph(org_data: Dict[str, Any] = None):
                 if first_en and first_en.lower() not in graph["name_map"]:
                     graph["name_map"][first_en.lower()] = v
         
-        # Process edges to build direct_reports
+        # Process edges to build direct_reports — O(N+E) via id→name lookup
+        # (later nodes win on duplicate ids, same as a linear scan would)
+        id_to_name = {
+            node.get('id'): node.get('full_name_english') or node.get('full_name')
+            for node in org_data.get('nodes', [])
+        }
         for edge in org_data.get('edges', []):
-            from_id = edge.get('from_id')
-            to_id = edge.get('to_id')
-            # Find names by node_id
-            from_name = None
-            to_name = None
-            for node in org_data.get('nodes', []):
-                if node.get('id') == from_id:
-                    from_name = node.get('full_name_english') or node.get('full_name')
-                if node.get('id') == to_id:
-                    to_name = node.get('full_name_english') or node.get('full_name')
+            from_name = id_to_name.get(edge.get('from_id'))
+            to_name = id_to_name.get(edge.get('to_id'))
             
             if from_name and to_name and from_name in graph["people"]:
-                if to_name not in graph["people"][from_name].get("direct_reports", []):
-                    graph["people"][from_name].setdefault("direct_reports", []).append(to_name)
+                graph["people"][from_name]["direct_reports"].add(to_name)
         
         graph["work_hierarchy"] = org_data.get('hierarchy_tree', {})
     
@@ -809,9 +851,16 @@ def _rebuild_identity_graph(org_data: Dict[str, Any] = None):
     for person in graph["people"].values():
         if isinstance(person.get("aliases"), set):
             person["aliases"] = list(person["aliases"])
+        if isinstance(person.get("direct_reports"), set):
+            person["direct_reports"] = sorted(person["direct_reports"])
     
-    _identity_graph = graph
-    _identity_graph_timestamp = time.time()
+    if _staged is not None:
+        _staged["identity_graph"] = graph
+    else:
+        _identity_graph = graph
+        _identity_graph_timestamp = time.time()
+        _identity_graph_version += 1
+        bump_data_version("kb", "identity graph rebuilt")
     
     people_count = len(graph["people"])
     alias_count = len(graph["name_map"])
@@ -850,23 +899,35 @@ def _merge_json_into_identity_graph(data: Dict[str, Any], source_file_name: str
     
     Also caches the raw structured data for financial/hierarchy queries.
     """
-    global _identity_graph, _org_structure_data, _family_tree_data
+    global _identity_graph, _org_structure_data, _family_tree_data, _identity_graph_version
     
-    if _identity_graph is None:
-        _identity_graph = {
+    target = _staged
+    graph = target.get("identity_graph") if target is not None else _identity_graph
+    if graph is None:
+        graph = {
             "people": {},
             "name_map": {},
             "work_hierarchy": {},
             "family_tree": {},
         }
+        if target is not None:
+            target["identity_graph"] = graph
+        else:
+            _identity_graph = graph
     
     # ── Cache raw structured data by source type ──
     source_lower = source_file_name.lower() if source_file_name else ""
     if 'org_structure' in source_lower or 'org_chart' in source_lower or 'employees' in source_lower:
-        _org_structure_data = data
+        if target is not None:
+            target["org_structure_data"] = data
+        else:
+            _org_structure_data = data
         print(f"   💾 [Identity] Cached org_structure data from {source_file_name}")
     elif 'family' in source_lower:
-        _family_tree_data = data
+        if target is not None:
+            target["family_tree_data"] = data
+        else:
+            _family_tree_data = data
         print(f"   💾 [Identity] Cached family_tree data from {source_file_name}")
     
     # Look for people/members/family arrays
@@ -881,7 +942,7 @@ def _merge_json_into_identity_graph(data: Dict[str, Any], source_file_name: str
     
     # Check for nested family tree structure
     if 'family_tree' in data:
-        _identity_graph["family_tree"] = data['family_tree']
+        graph["family_tree"] = data['family_tree']
     
     for person_data in people_arrays:
         if not isinstance(person_data, dict):
@@ -892,7 +953,7 @@ def _merge_json_into_identity_graph(data: Dict[str, Any], source_file_name: str
         if not name:
             continue
         
-        person = _identity_graph["people"].setdefault(name, {
+        person = graph["people"].setdefault(name, {
             "canonical_name": name,
             "aliases": [],
             "contexts": [],
@@ -938,21 +999,24 @@ def _merge_json_into_identity_graph(data: Dict[str, Any], source_file_name: str
             person.setdefault("contexts", []).append(context)
         
         # Name mappings
-        _identity_graph["name_map"][name.lower()] = name
+        graph["name_map"][name.lower()] = name
         for alias_field in ['aliases', 'nicknames', 'כינויים', 'english_name', 'hebrew_name']:
             aliases = person_data.get(alias_field, [])
             if isinstance(aliases, str):
                 aliases = [aliases]
             for alias in aliases:
                 if alias:
-                    _identity_graph["name_map"][alias.lower()] = name
+                    graph["name_map"][alias.lower()] = name
                     if alias not in person.get("aliases", []):
                         person.setdefault("aliases", []).append(alias)
         
         # First name mapping
         first = name.split()[0] if ' ' in name else name
-        _identity_graph["name_map"][first.lower()] = name
+        graph["name_map"][first.lower()] = name
     
+    if target is None:
+        _identity_graph_version += 1
+        bump_data_version("kb", "identity graph merged")
     print(f"   🔗 [Identity Graph] Merged JSON data ({len(people_arrays)} people entries from {source_file_name or 'unknown'})")
 
 
@@ -960,10 +1024,10 @@ def _merge_json_into_identity_graph(data: Dict[str, Any], source_file_name: str
 # LOCAL FALLBACK
 # ═══════════════════════════════════════════════════════════════════════
 
-def _load_from_local_fallback() -> str:
-    """Fallback: Load from local app/knowledge_base/ folder."""
+def _load_from_local_fallback() -> List[str]:
+    """Fallback: Load sections from local app/knowledge_base/ folder."""
     if not LOCAL_KB_DIR.exists():
-        return ""
+        return []
     
     supported_ext = {'.txt', '.json', '.pdf', '.md', '.text'}
     files = sorted([
@@ -972,7 +1036,7 @@ def _load_from_local_fallback() -> str:
     ])
     
     if not files:
-        return ""
+        return []
     
     sections = []
     for filepath in files:
@@ -991,13 +1055,41 @@ def _load_from_local_fallback() -> str:
         except Exception as e:
             logger.warning(f"[KB] Could not read local file {filepath.name}: {e}")
     
-    return "\n\n".join(sections)
+    return sections
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # MAIN CONTEXT LOADER
 # ═══════════════════════════════════════════════════════════════════════
 
+def _commit_build(sections: List[str], file_list: List[str], file_count: int, loaded_at: float) -> str:
+    """
+    Swap a finished load in. The passage index and default block are built
+    first; then the identity graph, structured data, sections and context
+    are assigned back to back. Called with _cache_lock held.
+    """
+    global _identity_graph, _identity_graph_timestamp, _identity_graph_version
+    global _org_structure_data, _family_tree_data, _kb_sections, _passage_index
+    global _cached_context, _cached_file_list, _cached_file_count, _cache_timestamp
+    
+    staged = _staged or {}
+    index = _PassageIndex(list(sections))
+    context = _assemble_context(None, KB_CONTEXT_TOKEN_BUDGET, index)
+    
+    _identity_graph = staged.get("identity_graph")
+    _org_structure_data = staged.get("org_structure_data")
+    _family_tree_data = staged.get("family_tree_data")
+    _kb_sections, _passage_index = list(sections), index
+    _cached_context = context
+    _cached_file_list = list(file_list)
+    _cached_file_count = file_count
+    _cache_timestamp = loaded_at
+    _identity_graph_timestamp = loaded_at
+    _identity_graph_version += 1
+    bump_data_version("kb", "context reloaded")
+    return context
+
+
 def load_context(force_reload: bool = False) -> str:
     """
     Load all files from Second_Brain_Context and build unified context.
@@ -1009,10 +1101,18 @@ def load_context(force_reload: bool = False) -> str:
        - JSONs → Parse + merge into identity graph
        - TXT/MD → Raw text
     3. Build unified identity graph
-    4. Cache everything
+    4. Swap everything in at once (_commit_build)
+    
+    If a forced reload cannot reach Drive (no folder, no service, or an
+    error) and a KB is already loaded, the loaded KB is kept as is — a
+    failed revalidation must not replace a good snapshot with the local
+    fallback.
     """
-    global _cached_context, _cached_file_list, _cached_file_count
-    global _cache_timestamp, _drive_connected
+    global _cached_context, _drive_connected, _staged
+    
+    # Fast path without the lock, so readers don't wait behind a background reload
+    if not force_reload and _cached_context is not None and time.time() - _cache_timestamp < CACHE_TTL_SECONDS:
+        return _cached_context
     
     with _cache_lock:
         now = time.time()
@@ -1034,13 +1134,13 @@ def load_context(force_reload: bool = False) -> str:
                         if cache_age < CACHE_TTL_SECONDS:
                             return _cached_context
                     
+                    _staged = {}
+                    
                     if not files:
                         print(f"📚 [KB] Drive folder is empty (ID: {folder_id[:20]}...)")
-                        _cached_context = ""
-                        _cached_file_list = []
-                        _cached_file_count = 0
-                        _cache_timestamp = now
+                        _commit_build([], [], 0, now)
                         _drive_connected = True
+                        _save_snapshot()
                         return ""
                     
                     sections = []
@@ -1065,27 +1165,19 @@ def load_context(force_reload: bool = False) -> str:
                             print(f"   ⚠️ Empty content from: {file_name}")
                     
                     # ── Append Identity Graph summary ──
-                    if _identity_graph and _identity_graph.get("people"):
-                        graph_summary = _format_identity_graph_for_context()
+                    graph = _staged.get("identity_graph")
+                    if graph and graph.get("people"):
+                        graph_summary = _format_identity_graph_for_context(graph)
                         if graph_summary:
                             sections.append(f"══ UNIFIED IDENTITY GRAPH (auto-generated) ══\n{graph_summary}")
                     
-                    # ── Combine and cache ──
-                    if sections:
-                        combined = "\n\n".join(sections)
-                        if len(combined) > MAX_CONTEXT_CHARS:
-                            combined = _smart_truncate(sections, MAX_CONTEXT_CHARS)
-                        _cached_context = combined
-                    else:
-                        _cached_context = ""
-                    
-                    _cached_file_list = loaded_names
-                    _cached_file_count = len(files)
-                    _cache_timestamp = now
+                    # ── Index passages and cache the default (budgeted) block ──
+                    context = _commit_build(sections, loaded_names, len(files), now)
                     _drive_connected = True
                     
-                    print(f"📚 [KB] Loaded {len(loaded_names)} file(s): {loaded_names} ({len(_cached_context)} chars)")
-                    return _cached_context
+                    print(f"📚 [KB] Loaded {len(loaded_names)} file(s): {loaded_names} ({len(context)} chars)")
+                    _save_snapshot()
+                    return context
                     
                 except Exception as e:
                     logger.error(f"[KB] Drive load failed: {e}")
@@ -1093,27 +1185,34 @@ def load_context(force_reload: bool = False) -> str:
                     import traceback
                     traceback.print_exc()
                     _drive_connected = False
+                finally:
+                    _staged = None
+        
+        _drive_connected = False
+        if force_reload and _cached_context is not None:
+            print(f"⚠️ [KB] Reload could not reach Drive — keeping the loaded KB")
+            return _cached_context
         
         # Fallback
         print(f"📚 [KB] Using local fallback")
-        _drive_connected = False
-        local = _load_from_local_fallback()
-        _cached_context = local
-        _cached_file_list = []
-        _cached_file_count = 0
-        _cache_timestamp = now
+        _staged = {}
+        try:
+            local = _commit_build(_load_from_local_fallback(), [], 0, now)
+        finally:
+            _staged = None
         
         if local:
             print(f"📚 [KB] Loaded from local ({len(local)} chars)")
         else:
             print(f"📚 [KB] No context files found")
         
-        return _cached_context
+        return local
 
 
-def _format_identity_graph_for_context() -> str:
-    """Format the identity graph as human-readable text for Gemini context."""
-    if not _identity_graph:
+def _format_identity_graph_for_context(graph: Optional[Dict[str, Any]] = None) -> str:
+    """Format the identity graph (default: the live one) as human-readable text for Gemini context."""
+    graph = _identity_graph if graph is None else graph
+    if not graph:
         return ""
     
     lines = []
@@ -1121,7 +1220,7 @@ def _format_identity_graph_for_context() -> str:
     lines.append("Use this for semantic name resolution, hierarchy navigation, and financial queries.\n")
     
     # Name mappings (critical for Hebrew ↔ English resolution)
-    name_map = _identity_graph.get("name_map", {})
+    name_map = graph.get("name_map", {})
     if name_map:
         lines.append("── Name Mappings (Hebrew ↔ English, Nicknames) ──")
         # Deduplicate: group by canonical name
@@ -1135,7 +1234,7 @@ def _format_identity_graph_for_context() -> str:
         lines.append("")
     
     # People with roles, reporting, and financial data
-    people = _identity_graph.get("people", {})
+    people = graph.get("people", {})
     if people:
         lines.append("── People Directory (roles, hierarchy, financial data) ──")
         for name, info in sorted(people.items()):
@@ -1177,17 +1276,17 @@ def _format_identity_graph_for_context() -> str:
     # ── Hierarchy tree for recursive queries ──
     if people:
         lines.append("\n── Hierarchy Tree (reports_to chains) ──")
-        # Build a flat manager→reports mapping
-        manager_map: Dict[str, List[str]] = {}
-        for name, info in people.items():
-            mgr = info.get('reports_to', '')
-            if mgr:
-                manager_map.setdefault(mgr, []).append(name)
+        manager_map = _build_manager_map(people)
         
         # Find top-level (people who don't report to anyone, or whose manager isn't in people)
         top_level = [n for n, info in people.items() if not info.get('reports_to')]
         
+        printed = set()
+        
         def _print_tree(person_name: str, indent: int = 0):
+            if person_name in printed:  # Guard against reports_to cycles
+                return
+            printed.add(person_name)
             prefix = "  " * indent + ("└─ " if indent > 0 else "")
             info = people.get(person_name, {})
             title = info.get('title', '')
@@ -1202,33 +1301,64 @@ def _format_identity_graph_for_context() -> str:
     return "\n".join(lines)
 
 
-def get_all_reports_under(person_name: str) -> List[str]:
-    """
-    Recursive graph search: get ALL direct + indirect reports under a person.
-    Uses the reports_to field in the identity graph.
-    """
-    if not _identity_graph:
-        return []
-    
-    people = _identity_graph.get("people", {})
-    
-    # Build manager→reports mapping
+def _build_manager_map(people: Dict[str, Any]) -> Dict[str, List[str]]:
+    """manager -> direct reports, from each person's reports_to field."""
     manager_map: Dict[str, List[str]] = {}
     for name, info in people.items():
         mgr = info.get('reports_to', '')
         if mgr:
             manager_map.setdefault(mgr, []).append(name)
+    return manager_map
+
+
+def _get_reports_index() -> tuple:
+    """
+    Return (manager_map, reports_closure) for the current identity graph.
     
-    # Recursive collect
-    result = []
-    
-    def _collect(mgr_name):
-        for sub in manager_map.get(mgr_name, []):
+    Both are derived from the reports_to field and rebuilt only when
+    _identity_graph_version changes, so subtree queries are a dict lookup:
+      manager_map:     manager -> direct reports
+      reports_closure: manager -> ALL direct + indirect reports (pre-order)
+    """
+    global _reports_index_version, _manager_map, _reports_closure
+    
+    if _reports_index_version == _identity_graph_version:
+        return _manager_map, _reports_closure
+    
+    people = _identity_graph.get("people", {}) if _identity_graph else {}
+    manager_map = _build_manager_map(people)
+    
+    # Iterative pre-order DFS per manager; `seen` guards against reports_to cycles
+    closure: Dict[str, List[str]] = {}
+    for mgr_name in manager_map:
+        result = []
+        seen = {mgr_name}
+        stack = list(reversed(manager_map[mgr_name]))
+        while stack:
+            sub = stack.pop()
+            if sub in seen:
+                continue
+            seen.add(sub)
             result.append(sub)
-            _collect(sub)
+            stack.extend(reversed(manager_map.get(sub, [])))
+        closure[mgr_name] = result
     
-    _collect(person_name)
-    return result
+    _manager_map = manager_map
+    _reports_closure = closure
+    _reports_index_version = _identity_graph_version
+    return _manager_map, _reports_closure
+
+
+def get_all_reports_under(person_name: str) -> List[str]:
+    """
+    Get ALL direct + indirect reports under a person.
+    Answered from the cached transitive closure (see _get_reports_index).
+    """
+    if not _identity_graph:
+        return []
+    
+    _, closure = _get_reports_index()
+    return list(closure.get(person_name, []))
 
 
 def get_identity_context_summary() -> str:
@@ -1266,43 +1396,348 @@ def get_identity_context_summary() -> str:
     )
 
 
-def _smart_truncate(sections: List[str], max_chars: int) -> str:
-    """Prioritize JSON/org files, then images/vision, truncate others."""
-    priority_high = []
-    priority_medium = []
-    priority_low = []
-    
-    for section in sections:
-        header = section.split('\n')[0].lower()
-        if any(kw in header for kw in ['.json', 'identity', 'org', 'graph', 'unified']):
-            priority_high.append(section)
-        elif any(kw in header for kw in ['.txt', '.md', 'context', 'family',
-                                          'image', 'vision', 'מערכת', 'schedule',
-                                          '.jpg', '.png', '.webp', '.gif']):
-            priority_medium.append(section)
-        else:
-            priority_low.append(section)
+# ═══════════════════════════════════════════════════════════════════════
+# CHUNKED KB STORE — BM25 passage index + token-budgeted assembly
+# ═══════════════════════════════════════════════════════════════════════
+
+_TOKEN_RE = re.compile(r"\w+")
+_HEBREW_PREFIXES = "והבלמשכ"  # ו/ה/ב/ל/מ/ש/כ — attached prepositions & articles
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (no tokenizer round-trip)."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens; Hebrew words also indexed without a one-letter prefix."""
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if len(tok) < 2:
+            continue
+        tokens.append(tok)
+        if len(tok) > 3 and tok[0] in _HEBREW_PREFIXES:
+            tokens.append(tok[1:])
+    return tokens
+
+
+def _section_priority(header: str) -> int:
+    """0 = JSON/org/identity data, 1 = text/images/family, 2 = everything else."""
+    header = header.lower()
+    if any(kw in header for kw in ['.json', 'identity', 'org', 'graph', 'unified']):
+        return 0
+    if any(kw in header for kw in ['.txt', '.md', 'context', 'family',
+                                    'image', 'vision', 'מערכת', 'schedule',
+                                    '.jpg', '.png', '.webp', '.gif']):
+        return 1
+    return 2
+
+
+def _split_passages(body: str, max_chars: int = PASSAGE_MAX_CHARS) -> List[str]:
+    """Pack whole lines into passages of up to max_chars (long lines are hard-split)."""
+    passages = []
+    current: List[str] = []
+    current_len = 0
+    for line in body.split("\n"):
+        pieces = [line[i:i + max_chars] for i in range(0, len(line), max_chars)] or [""]
+        for piece in pieces:
+            if current and current_len + len(piece) + 1 > max_chars:
+                passages.append("\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 1
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+class _PassageIndex:
+    """BM25 index over KB passages. Built once per context load, read-only afterwards."""
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, sections: List[str]):
+        self.headers: List[str] = []
+        self.passages: List[Dict[str, Any]] = []
+        for section_idx, section in enumerate(sections):
+            header, _, body = section.partition("\n")
+            self.headers.append(header)
+            priority = _section_priority(header)
+            for order, text in enumerate(_split_passages(body)):
+                terms = tokenize(text)
+                self.passages.append({
+                    "section": section_idx,
+                    "order": order,
+                    "priority": priority,
+                    "text": text,
+                    "tokens": _estimate_tokens(text),
+                    "tf": Counter(terms),
+                    "length": len(terms),
+                })
+
+        # Postings: term -> [(passage idx, term frequency)], so a query only
+        # touches the passages that contain its terms
+        self.postings: Dict[str, List[tuple]] = {}
+        for idx, passage in enumerate(self.passages):
+            for term, tf in passage["tf"].items():
+                self.postings.setdefault(term, []).append((idx, tf))
+        total_len = sum(p["length"] for p in self.passages)
+        self.avg_len = total_len / len(self.passages) if self.passages else 0.0
+        self.norms = [
+            self.K1 * (1 - self.B + self.B * p["length"] / (self.avg_len or 1)) for p in self.passages
+        ]
+        self.default_ids: Optional[set] = None   # Passages in the default block (set on first use)
+
+    def score(self, query: str) -> Dict[int, float]:
+        """BM25 score per passage index (only passages with score > 0)."""
+        n = len(self.passages)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for idx, tf in postings:
+                scores[idx] = scores.get(idx, 0.0) + idf * tf * (self.K1 + 1) / (tf + self.norms[idx])
+        return scores
+
+
+def _set_sections(sections: List[str]):
+    """Replace the chunked KB store with freshly loaded sections."""
+    global _kb_sections, _passage_index
+    index = _PassageIndex(list(sections))
+    _kb_sections, _passage_index = list(sections), index
+
+
+def _select_passages(index: "_PassageIndex", query: Optional[str], token_budget: int,
+                     exclude: frozenset = frozenset(), matched_only: bool = False) -> set:
+    """
+    Passage ids for a block under token_budget: passages matching `query`
+    (BM25) first, then by section priority unless matched_only.
+    """
+    ranked: List[int] = []
+    if query:
+        scores = index.score(query)
+        ranked = sorted((i for i in scores if i not in exclude), key=lambda i: -scores[i])
+    if not matched_only:
+        ranked_set = set(ranked)
+        ranked += sorted(
+            (i for i in range(len(index.passages)) if i not in ranked_set and i not in exclude),
+            key=lambda i: (index.passages[i]["priority"], index.passages[i]["section"], index.passages[i]["order"]),
+        )
+    
+    selected = set()
+    open_sections = set()
+    used = 0
+    for i in ranked:
+        passage = index.passages[i]
+        cost = passage["tokens"]
+        if passage["section"] not in open_sections:
+            cost += _estimate_tokens(index.headers[passage["section"]])
+        if used + cost > token_budget:
+            continue
+        selected.add(i)
+        open_sections.add(passage["section"])
+        used += cost
+    return selected
+
+
+def _render_passages(index: "_PassageIndex", selected: set) -> str:
+    """Selected passages in original document order, grouped under their file header."""
+    blocks: Dict[int, List[str]] = {}
+    for i in sorted(selected):
+        passage = index.passages[i]
+        blocks.setdefault(passage["section"], []).append(passage["text"])
+    
+    return "\n\n".join(
+        index.headers[section] + "\n" + "\n".join(texts)
+        for section, texts in sorted(blocks.items())
+    )
+
+
+def _assemble_context(query: Optional[str], token_budget: int,
+                      index: Optional["_PassageIndex"] = None) -> str:
+    """
+    Build a KB block under token_budget.
     
-    result = []
-    remaining = max_chars
+    Passages relevant to `query` (BM25) are taken first, then the remaining
+    budget is filled by section priority. Selected passages are emitted in
+    original document order, grouped under their file header.
+    Uses the live index unless one is given (a load still being built).
+    """
+    index = _passage_index if index is None else index
+    if not index or not index.passages:
+        return ""
+    return _render_passages(index, _select_passages(index, query, token_budget))
+
+
+def get_query_supplement(query: str, token_budget: Optional[int] = None) -> str:
+    """
+    Passages relevant to `query` that the default (system-instruction)
+    block left out, under token_budget (default KB_SUPPLEMENT_TOKEN_BUDGET).
     
-    for section in priority_high + priority_medium + priority_low:
-        if remaining <= 500:
-            break
-        chunk = section[:remaining]
-        result.append(chunk)
-        remaining -= len(chunk)
+    The system instruction is static (it is context-cached), so it carries
+    only the KB_CONTEXT_TOKEN_BUDGET default block. The conversation engine
+    appends this supplement to each message so the rest of the KB is still
+    reachable by query.
+    """
+    load_context()
+    index = _passage_index
+    if not query or not index or not index.passages:
+        return ""
+    if index.default_ids is None:
+        index.default_ids = _select_passages(index, None, KB_CONTEXT_TOKEN_BUDGET)
+    selected = _select_passages(index, query, token_budget or KB_SUPPLEMENT_TOKEN_BUDGET,
+                                exclude=frozenset(index.default_ids), matched_only=True)
+    return _render_passages(index, selected)
+
+
+def build_kb_context(query: Optional[str] = None, token_budget: Optional[int] = None) -> str:
+    """
+    Assemble a KB context block for `query` under `token_budget` tokens.
     
-    return "\n\n".join(result)
+    Without a query this returns the priority-ranked default block
+    (same as the cached system-instruction context).
+    """
+    load_context()  # Ensure the passage index is populated
+    if not query and token_budget is None:
+        return _cached_context or ""
+    if token_budget is None:
+        token_budget = KB_QUERY_TOKEN_BUDGET if query else KB_CONTEXT_TOKEN_BUDGET
+    return _assemble_context(query, token_budget)
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# PERSISTED SNAPSHOT — instant cold starts, revalidated in the background
+# ═══════════════════════════════════════════════════════════════════════
+
+def _context_fingerprint() -> str:
+    """Content hash of the loaded KB (sections + file list) for change detection."""
+    h = hashlib.sha256()
+    for part in _kb_sections + ["\x00"] + _cached_file_list:
+        h.update(part.encode("utf-8", errors="replace"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _save_snapshot() -> bool:
+    """Write the current KB state to KB_SNAPSHOT_PATH (atomic replace). Never raises."""
+    payload = {
+        "schema_version": KB_SNAPSHOT_SCHEMA_VERSION,
+        "saved_at": time.time(),
+        "folder_id": _get_context_folder_id(),
+        "sections": _kb_sections,
+        "file_list": _cached_file_list,
+        "file_count": _cached_file_count,
+        "identity_graph": _identity_graph,
+        "org_structure_data": _org_structure_data,
+        "family_tree_data": _family_tree_data,
+    }
+    tmp_path = KB_SNAPSHOT_PATH.with_suffix(".tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, KB_SNAPSHOT_PATH)
+        print(f"💾 [KB] Snapshot saved ({len(_kb_sections)} sections)")
+        return True
+    except Exception as e:
+        logger.warning(f"[KB] Could not save snapshot: {e}")
+        return False
+
+
+def load_snapshot() -> bool:
+    """
+    Restore the KB from the local snapshot (identity graph, name index,
+    sections + passage index). The restored context is treated as fresh;
+    call revalidate_in_background() to re-sync with Drive.
+    
+    Returns False (and leaves state untouched) if the snapshot is missing,
+    unreadable, from another schema version, or for a different folder.
+    """
+    global _staged
+    
+    if not KB_SNAPSHOT_PATH.exists():
+        return False
+    
+    start = time.time()
+    try:
+        with open(KB_SNAPSHOT_PATH, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"[KB] Could not read snapshot: {e}")
+        return False
+    
+    if not isinstance(payload, dict) or payload.get("schema_version") != KB_SNAPSHOT_SCHEMA_VERSION:
+        print(f"⚠️ [KB] Snapshot schema mismatch — ignoring")
+        return False
+    if payload.get("folder_id") != _get_context_folder_id():
+        print(f"⚠️ [KB] Snapshot is for a different CONTEXT_FOLDER_ID — ignoring")
+        return False
+    
+    with _cache_lock:
+        _staged = {
+            "identity_graph": payload.get("identity_graph"),
+            "org_structure_data": payload.get("org_structure_data"),
+            "family_tree_data": payload.get("family_tree_data"),
+        }
+        try:
+            _commit_build(payload.get("sections", []), payload.get("file_list", []),
+                          payload.get("file_count", 0), time.time())
+        finally:
+            _staged = None
+    
+    age_min = (time.time() - payload.get("saved_at", 0)) / 60
+    print(f"⚡ [KB] Snapshot restored in {(time.time() - start) * 1000:.0f}ms "
+          f"({len(_cached_file_list)} files, age {age_min:.0f} min)")
+    return True
+
+
+def revalidate_in_background(on_change: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """
+    Re-load the KB from Drive on a daemon thread. Readers keep getting the
+    snapshot until the reload finishes, and keep it if Drive can't be
+    reached. `on_change` runs only if the content actually differs from
+    what was served before.
+    """
+    def _run():
+        before = _context_fingerprint()
+        try:
+            load_context(force_reload=True)
+        except Exception as e:
+            logger.error(f"[KB] Background revalidation failed: {e}")
+            return
+        if not _drive_connected:
+            print(f"⚠️ [KB] Revalidation could not reach Drive — still serving the snapshot")
+            return
+        if _context_fingerprint() == before:
+            print(f"✅ [KB] Snapshot revalidated — Drive unchanged")
+            return
+        print(f"🔄 [KB] Drive content changed since snapshot — refreshing")
+        if on_change:
+            try:
+                on_change()
+            except Exception as e:
+                logger.error(f"[KB] on_change callback failed: {e}")
+    
+    thread = threading.Thread(target=_run, name="kb-revalidate", daemon=True)
+    thread.start()
+    return thread
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # PUBLIC API
 # ═══════════════════════════════════════════════════════════════════════
 
-def get_system_instruction_block() -> str:
-    """Returns formatted KB block for Gemini system instructions."""
-    context = load_context()
+def get_system_instruction_block(query: Optional[str] = None, token_budget: Optional[int] = None) -> str:
+    """
+    Returns formatted KB block for Gemini system instructions.
+    
+    With a query, the KB content is retrieved per-query under token_budget
+    (default KB_QUERY_TOKEN_BUDGET); otherwise the cached default block is used.
+    """
+    context = build_kb_context(query, token_budget)
     if not context:
         return ""
     
@@ -1355,9 +1790,9 @@ contexts. Use ALL available data to give a complete answer about their identity.
 """
 
 
-def get_kb_query_context() -> str:
-    """Returns raw KB content for direct organizational queries."""
-    return load_context() or ""
+def get_kb_query_context(query: Optional[str] = None, token_budget: Optional[int] = None) -> str:
+    """Returns raw KB content for direct organizational queries (retrieved per-query when given)."""
+    return build_kb_context(query, token_budget)
 
 
 def force_refresh_pdf_cache(file_id: str = None):
@@ -1396,6 +1831,9 @@ def get_status() -> Dict[str, Any]:
         "file_count": len(_cached_file_list),
         "files": list(_cached_file_list),
         "chars": len(_cached_context) if _cached_context else 0,
+        "total_chars": sum(len(sec) for sec in _kb_sections),
+        "passage_count": len(_passage_index.passages) if _passage_index else 0,
+        "context_token_budget": KB_CONTEXT_TOKEN_BUDGET,
         "cache_age_minutes": round(cache_age / 60, 1) if cache_age >= 0 else -1,
         "vision_cache_count": len(_vision_graph_cache),
         "identity_graph_people": identity_count,
@@ -1464,7 +1902,7 @@ _HEBREW_CHAR_PATTERN = {
 _VOWEL_GAP = '[aeiou]*?'
 
 
-def _hebrew_to_fuzzy_regex(text: str) -> str:
+def hebrew_to_fuzzy_regex(text: str) -> str:
     """
     Convert a Hebrew string into a fuzzy regex pattern that can match
     its English transliteration regardless of vowelization.
@@ -1497,6 +1935,9 @@ def _hebrew_to_fuzzy_regex(text: str) -> str:
     return ''.join(parts) if parts else ''
 
 
+_hebrew_to_fuzzy_regex = hebrew_to_fuzzy_regex   # Older name, kept for existing imports
+
+
 def search_people(query: str) -> List[Dict[str, Any]]:
     """
     Search the identity graph for people matching a name query.
@@ -1566,7 +2007,7 @@ def search_people(query: str) -> List[Dict[str, Any]]:
     # Example: "יובל" → regex [iy][aeiou]*?[uvow][aeiou]*?[bv][aeiou]*?l
     #          This matches "yuval" ✅
     if not matches:
-        fuzzy_pattern = _hebrew_to_fuzzy_regex(query_lower)
+        fuzzy_pattern = hebrew_to_fuzzy_regex(query_lower)
         if fuzzy_pattern:
             print(f"   🔤 Fuzzy regex: '{query}' → /{fuzzy_pattern}/")
             try:
@@ -0,0 +1,358 @@
+"""
+Meeting Search — one ranked index over every recorded meeting
+
+search_meetings used to run three separate scans on every call:
+dms.search_transcripts (download 20 Transcripts/ files), a loop over the
+engine's last sessions, and a pass over memory chat_history that built one
+big string per entry with repeated +=.
+
+MeetingSearchIndex holds one inverted index over three document kinds:
+  - segment  — one transcript segment (speaker + text)
+  - summary  — the meeting summary plus its participants
+  - analysis — the expert analysis text
+Documents are grouped by meeting. The meeting key is the recording
+timestamp, which the audio pipeline writes identically to the transcript
+file, the memory entry and the injected session, so the same meeting from
+several sources merges into one result. Documents that repeat across
+sources are indexed once.
+
+Ranking is BM25, using the same tokenizer as the KB passage index (Hebrew
+one-letter prefixes are stripped). A meeting scores the sum of its top
+three documents, and ties go to the more recent meeting. The speaker
+filter also matches Hebrew ↔ English transliterations (יובל ~ Yuval).
+Date filters are inclusive YYYY-MM-DD bounds on the recording date.
+
+MeetingSearchService rebuilds the index only when the "meetings" data
+version changes (transcript saved, session injected; see tool_cache) or
+after MEETING_INDEX_TTL_SECONDS, which catches edits made directly on
+Drive. A build whose Drive sources failed (or came back with no
+transcripts, which is how get_recent_transcripts reports errors) is kept
+for MEETING_INDEX_RETRY_SECONDS only, so a Drive blip doesn't hide the
+meetings for the full TTL. Results come back as a bounded payload: at most
+MAX_MEETINGS meetings, with capped snippets and a total size cap.
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.knowledge_base_service import hebrew_to_fuzzy_regex, tokenize
+from app.services.tool_cache import data_version
+
+logger = logging.getLogger(__name__)
+
+MEETING_INDEX_TTL_SECONDS = int(os.environ.get("MEETING_INDEX_TTL_SECONDS", "900"))
+MEETING_INDEX_RETRY_SECONDS = 60   # TTL of a build whose Drive sources failed or were empty
+TRANSCRIPTS_TO_INDEX = int(os.environ.get("MEETING_SEARCH_TRANSCRIPTS", "30"))
+MAX_MEETINGS = 5
+MAX_SNIPPETS_PER_MEETING = 6
+SNIPPET_CHARS = 200
+SUMMARY_CHARS = 500
+MAX_PAYLOAD_CHARS = 8000
+
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+ESTIMATED_TIMESTAMP_NOTE = ("⚠️ This timestamp is the PROCESSING date, NOT the actual recording date. "
+                            "The original recording date could not be determined from the file metadata.")
+
+
+def _date_key(timestamp: str) -> str:
+    """'2025-02-04T10:00:00Z' → '2025-02-04' ('' if the format is unknown)."""
+    match = _DATE_RE.match(timestamp or "")
+    return match.group(0) if match else ""
+
+
+def speaker_matches(wanted: str, speaker: str) -> bool:
+    """Case-insensitive substring match, or a Hebrew ↔ English transliteration match."""
+    if not wanted or not speaker:
+        return False
+    wanted_l, speaker_l = wanted.lower().strip(), speaker.lower()
+    if wanted_l in speaker_l or speaker_l in wanted_l:
+        return True
+    for hebrew, latin in ((wanted, speaker), (speaker, wanted)):
+        pattern = hebrew_to_fuzzy_regex(hebrew)
+        if pattern and re.search(pattern, latin, re.IGNORECASE):
+            return True
+    return False
+
+
+class MeetingSearchIndex:
+    """BM25 inverted index over meeting documents. Built once, read-only afterwards."""
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self):
+        self.meetings: Dict[str, Dict[str, Any]] = {}
+        self.docs: List[Dict[str, Any]] = []
+        self.postings: Dict[str, List[tuple]] = {}   # term → [(doc_id, tf), ...]
+        self._seen = set()
+        self._total_len = 0
+
+    # ─── Build ───────────────────────────────────────────────────
+
+    def add_meeting(self, timestamp: str, source: str, speakers: Iterable[str] = (),
+                    segments: Iterable[Dict[str, Any]] = (), summary: str = "",
+                    analysis: str = "", timestamp_is_estimated: bool = False):
+        """Add (or merge into) the meeting recorded at timestamp."""
+        key = timestamp or f"{source}:{len(self.meetings)}"
+        meeting = self.meetings.setdefault(key, {
+            "timestamp": timestamp,
+            "date": _date_key(timestamp),
+            "speakers": [],
+            "sources": [],
+            "segment_count": 0,
+            "summary": "",
+            "timestamp_is_estimated": timestamp_is_estimated,
+        })
+        if source not in meeting["sources"]:
+            meeting["sources"].append(source)
+        for speaker in speakers or ():
+            if speaker and speaker not in meeting["speakers"]:
+                meeting["speakers"].append(speaker)
+
+        segments = list(segments or ())
+        meeting["segment_count"] = max(meeting["segment_count"], len(segments))
+        if summary and not meeting["summary"]:
+            meeting["summary"] = summary
+
+        if summary or meeting["speakers"]:
+            header = " ".join([summary or "", " ".join(meeting["speakers"])])
+            self._add_doc(key, "summary", summary or "", indexed_text=header)
+        if analysis:
+            self._add_doc(key, "analysis", analysis)
+        for seg in segments:
+            text = seg.get("text", "")
+            speaker = seg.get("speaker", "")
+            if speaker and speaker not in meeting["speakers"]:
+                meeting["speakers"].append(speaker)
+            if text:
+                self._add_doc(key, "segment", text, speaker=speaker)
+
+    def _add_doc(self, meeting_key: str, kind: str, text: str, speaker: str = "",
+                 indexed_text: Optional[str] = None):
+        dedup = (meeting_key, kind, speaker, text)
+        if dedup in self._seen:
+            return
+        self._seen.add(dedup)
+
+        terms = Counter(tokenize(indexed_text if indexed_text is not None else text))
+        doc_id = len(self.docs)
+        self.docs.append({"meeting": meeting_key, "kind": kind, "speaker": speaker,
+                          "text": text, "length": sum(terms.values())})
+        self._total_len += self.docs[-1]["length"]
+        for term, tf in terms.items():
+            self.postings.setdefault(term, []).append((doc_id, tf))
+
+    # ─── Query ───────────────────────────────────────────────────
+
+    def _score(self, query: str) -> Dict[int, float]:
+        n = len(self.docs)
+        avg_len = self._total_len / n if n else 0.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.K1 * (1 - self.B + self.B * self.docs[doc_id]["length"] / (avg_len or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        return scores
+
+    def _meeting_allowed(self, meeting: Dict[str, Any], speaker_name: str,
+                         date_from: str, date_to: str) -> bool:
+        if date_from or date_to:
+            if not meeting["date"]:
+                return False
+            if date_from and meeting["date"] < date_from:
+                return False
+            if date_to and meeting["date"] > date_to:
+                return False
+        if speaker_name:
+            return any(speaker_matches(speaker_name, s) for s in meeting["speakers"])
+        return True
+
+    def search(self, query: str = "", speaker_name: str = "", date_from: str = "",
+               date_to: str = "", limit: int = MAX_MEETINGS) -> Dict[str, Any]:
+        """Ranked, trimmed meeting results (see module docstring)."""
+        date_from, date_to = _date_key(date_from or ""), _date_key(date_to or "")
+        allowed = {key for key, meeting in self.meetings.items()
+                   if self._meeting_allowed(meeting, speaker_name, date_from, date_to)}
+
+        doc_scores = self._score(query) if query else {}
+        hits: Dict[str, List[tuple]] = {}
+        if doc_scores:
+            for doc_id, score in doc_scores.items():
+                key = self.docs[doc_id]["meeting"]
+                if key in allowed:
+                    hits.setdefault(key, []).append((score, doc_id))
+        elif speaker_name or date_from or date_to:
+            # Filter-only search ("when did I last talk to X?"): newest first,
+            # showing what the wanted speaker said.
+            for doc_id, doc in enumerate(self.docs):
+                if doc["meeting"] in allowed and doc["kind"] == "segment" and \
+                        (not speaker_name or speaker_matches(speaker_name, doc["speaker"])):
+                    hits.setdefault(doc["meeting"], []).append((0.0, doc_id))
+            for key in allowed:
+                hits.setdefault(key, [])
+
+        ranked = sorted(
+            hits.items(),
+            key=lambda item: (sum(s for s, _ in sorted(item[1], reverse=True)[:3]),
+                              self.meetings[item[0]]["timestamp"]),
+            reverse=True,
+        )
+        return self._payload(ranked, limit)
+
+    def _payload(self, ranked: List[tuple], limit: int) -> Dict[str, Any]:
+        results, size = [], 0
+        for key, doc_hits in ranked[:limit]:
+            meeting = self.meetings[key]
+            doc_hits.sort(key=lambda h: (-h[0], h[1]))
+            entry = {
+                "timestamp": meeting["timestamp"],
+                "speakers": meeting["speakers"],
+                "sources": meeting["sources"],
+                "segment_count": meeting["segment_count"],
+                "summary": meeting["summary"][:SUMMARY_CHARS],
+                "key_segments": [],
+            }
+            if doc_hits:
+                entry["score"] = round(sum(s for s, _ in doc_hits[:3]), 3)
+            for _, doc_id in doc_hits:
+                doc = self.docs[doc_id]
+                if doc["kind"] == "segment" and len(entry["key_segments"]) < MAX_SNIPPETS_PER_MEETING:
+                    entry["key_segments"].append({"speaker": doc["speaker"], "text": doc["text"][:SNIPPET_CHARS]})
+                elif doc["kind"] == "analysis" and "expert_summary" not in entry:
+                    entry["expert_summary"] = doc["text"][:SUMMARY_CHARS]
+            if meeting["timestamp_is_estimated"]:
+                entry["timestamp_note"] = ESTIMATED_TIMESTAMP_NOTE
+
+            entry_size = len(json.dumps(entry, ensure_ascii=False, default=str))
+            if results and size + entry_size > MAX_PAYLOAD_CHARS:
+                break
+            results.append(entry)
+            size += entry_size
+
+        return {"total_matches": len(ranked), "meetings": results}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"meetings": len(self.meetings), "documents": len(self.docs), "terms": len(self.postings)}
+
+
+def build_meeting_index(transcripts: List[Dict[str, Any]],
+                        last_sessions: Dict[str, Dict[str, Any]],
+                        chat_history: List[Dict[str, Any]]) -> MeetingSearchIndex:
+    """
+    Index the three meeting sources.
+
+    transcripts:   DriveMemoryService.get_recent_transcripts() items
+    last_sessions: ConversationEngine._last_session (phone → session dict)
+    chat_history:  memory["chat_history"] (only type="audio" entries are used)
+    """
+    index = MeetingSearchIndex()
+    for transcript in transcripts:
+        content = transcript.get("content", {}) or {}
+        index.add_meeting(
+            timestamp=content.get("timestamp") or transcript.get("created_time", ""),
+            source="transcripts_folder",
+            speakers=content.get("speakers", []),
+            segments=content.get("segments", []),
+            summary=content.get("summary", ""),
+            analysis=content.get("expert_analysis", "") if isinstance(content.get("expert_analysis"), str) else "",
+            timestamp_is_estimated=bool(content.get("timestamp_is_estimated")),
+        )
+
+    for entry in chat_history:
+        if entry.get("type") != "audio":
+            continue
+        transcript = entry.get("transcript", {})
+        expert = entry.get("expert_analysis") or {}
+        index.add_meeting(
+            timestamp=entry.get("timestamp", ""),
+            source="chat_history",
+            speakers=entry.get("speakers", []),
+            segments=transcript.get("segments", []) if isinstance(transcript, dict) else [],
+            summary=entry.get("summary", ""),
+            analysis=expert.get("raw_analysis", "") if isinstance(expert, dict) else "",
+            timestamp_is_estimated=bool(entry.get("timestamp_is_estimated")),
+        )
+
+    for session in last_sessions.values():
+        index.add_meeting(
+            timestamp=session.get("timestamp", ""),
+            source="working_memory",
+            speakers=session.get("speakers", []),
+            summary=session.get("summary", ""),
+            analysis=session.get("expert_analysis_snippet", ""),
+        )
+    return index
+
+
+class MeetingSearchService:
+    """Owns the meeting index and rebuilds it when meeting data changes."""
+
+    def __init__(self):
+        self._index: Optional[MeetingSearchIndex] = None
+        self._built_version = -1
+        self._built_at = 0.0
+        self._ttl = MEETING_INDEX_TTL_SECONDS
+        self._build_ms = 0
+        self._lock = Lock()
+
+    def _ensure_index(self, drive_memory_service, last_sessions) -> MeetingSearchIndex:
+        version = data_version("meetings")
+        with self._lock:
+            if self._index is not None and self._built_version == version and \
+                    time.time() - self._built_at < self._ttl:
+                return self._index
+
+            start = time.time()
+            transcripts, chat_history = [], []
+            degraded = False
+            if drive_memory_service:
+                try:
+                    transcripts = drive_memory_service.get_recent_transcripts(limit=TRANSCRIPTS_TO_INDEX)
+                except Exception as e:
+                    logger.error(f"[MeetingSearch] Could not load transcripts: {e}")
+                degraded = not transcripts
+                try:
+                    chat_history = (drive_memory_service.get_memory() or {}).get("chat_history", [])
+                except Exception as e:
+                    logger.error(f"[MeetingSearch] Could not load memory: {e}")
+                    degraded = True
+
+            self._index = build_meeting_index(transcripts, dict(last_sessions or {}), chat_history)
+            self._built_version = version
+            self._built_at = time.time()
+            self._ttl = MEETING_INDEX_RETRY_SECONDS if degraded else MEETING_INDEX_TTL_SECONDS
+            self._build_ms = int((self._built_at - start) * 1000)
+            stats = self._index.stats()
+            print(f"🗂️ [MeetingSearch] Indexed {stats['meetings']} meetings "
+                  f"({stats['documents']} docs) in {self._build_ms}ms"
+                  + (f" — Drive sources failed or empty, retrying after {self._ttl}s" if degraded else ""))
+            return self._index
+
+    def search(self, query: str, speaker_name: str = "", date_from: str = "", date_to: str = "",
+               drive_memory_service=None, last_sessions=None) -> Dict[str, Any]:
+        index = self._ensure_index(drive_memory_service, last_sessions)
+        return index.search(query=query, speaker_name=speaker_name,
+                            date_from=date_from, date_to=date_to)
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            status = {"built": self._index is not None, "data_version": self._built_version,
+                      "build_ms": self._build_ms, "ttl_seconds": self._ttl,
+                      "age_seconds": int(time.time() - self._built_at) if self._index else None}
+            if self._index is not None:
+                status.update(self._index.stats())
+            return status
+
+
+meeting_search_service = MeetingSearchService()
@@ -334,6 +334,39 @@ class MetaWhatsAppService:
                 "message": "Unexpected error sending WhatsApp via Meta API"
             }
     
+    def send_typing_indicator(self, message_id: str) -> Dict[str, Any]:
+        """
+        Mark an incoming message as read and show the typing indicator.
+        
+        WhatsApp hides the indicator when the next message is sent, or after
+        25 seconds.
+        
+        Args:
+            message_id: The incoming message's wamid
+        
+        Returns:
+            Dictionary with success status
+        """
+        if not self.is_configured_flag or not message_id:
+            return {"success": False, "error": "Meta WhatsApp not configured or no message_id"}
+        
+        try:
+            response = requests.post(
+                f"{self.BASE_URL}/{self.phone_number_id}/messages",
+                json={
+                    "messaging_product": "whatsapp",
+                    "status": "read",
+                    "message_id": message_id,
+                    "typing_indicator": {"type": "text"},
+                },
+                headers={"Authorization": f"Bearer {self.access_token}"},
+                timeout=5,
+            )
+            return {"success": response.status_code == 200,
+                    "error": None if response.status_code == 200 else f"HTTP {response.status_code}"}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
     def verify_webhook(self, mode: str, token: str, challenge: str) -> Optional[str]:
         """
         Verify webhook for Meta WhatsApp Cloud API.
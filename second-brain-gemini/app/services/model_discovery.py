@@ -16,7 +16,7 @@ This module provides:
 3. configure_genai() — sets up SDK transport
 4. discover_models() — lists available models from the API
 5. get_best_model() — finds best match from discovered models
-6. gemini_v1_generate() — direct HTTP calls bypassing SDK
+6. gemini_v1_generate() — direct HTTP calls bypassing SDK (Pro hedged with Flash)
 7. startup_connection_test() — verifies API connectivity at boot
 
 Usage (in ANY service):
@@ -36,6 +36,8 @@ from threading import Lock
 
 import google.generativeai as genai
 
+from app.services.hedged_calls import get_latency_report, hedged_call, timed
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -205,7 +207,8 @@ def startup_connection_test():
         print(f"   🔗 CONNECTION TEST: {alias.upper()} model [{model_name}] on {GEMINI_API_BASE_URL}")
         try:
             start = time.time()
-            result = gemini_v1_generate("Say 'OK' in one word.", model_name=model_name, max_output_tokens=10)
+            result = gemini_v1_generate("Say 'OK' in one word.", model_name=model_name, max_output_tokens=10,
+                                        hedge=False)
             elapsed_ms = int((time.time() - start) * 1000)
             reply = result[:30] if result else "(empty)"
             print(f"   ✅ CONNECTION TEST: {alias.upper()} model [{model_name}] → {elapsed_ms}ms — reply: \"{reply}\"")
@@ -234,6 +237,7 @@ def gemini_v1_generate(
     max_output_tokens: int = 1500,
     is_kb_query: bool = False,
     timeout: int = 90,
+    hedge: bool = True,
 ) -> str:
     """
     Direct HTTP POST to Gemini API — completely bypasses the SDK.
@@ -248,6 +252,8 @@ def gemini_v1_generate(
         max_output_tokens: Maximum response length
         is_kb_query: If True, uses Pro model; otherwise Flash
         timeout: Request timeout in seconds
+        hedge: For the Pro model, start Flash in parallel once Pro is slower
+               than its observed p90 (or fails) and return the first answer
     
     Returns:
         The generated text response
@@ -255,8 +261,6 @@ def gemini_v1_generate(
     Raises:
         Exception with full error details if the request fails
     """
-    import requests as http_requests
-    
     api_key = _get_api_key()
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not set")
@@ -265,8 +269,6 @@ def gemini_v1_generate(
     if model_name is None:
         model_name = MODEL_MAPPING["pro"] if is_kb_query else MODEL_MAPPING["flash"]
     
-    url = f"{GEMINI_API_BASE_URL}/{model_name}:generateContent?key={api_key}"
-    
     # ── Payload (Gemini v1 format) ──
     payload = {
         "contents": [
@@ -288,6 +290,27 @@ def gemini_v1_generate(
         ]
     }
     
+    if hedge and model_name == MODEL_MAPPING["pro"]:
+        # ── Hedged: race Flash when Pro is slower than its p90 or fails ──
+        fallback = MODEL_MAPPING["flash"]
+        try:
+            result, _ = hedged_call(
+                model_name, lambda: _post_generate(model_name, payload, api_key, timeout),
+                fallback, lambda: _post_generate(fallback, payload, api_key, timeout),
+                timeout=timeout,
+            )
+        except Exception as e:
+            raise Exception(f"Both Pro and Flash failed. Last error: {str(e)[:500]}")
+        return result
+
+    return timed(model_name, lambda: _post_generate(model_name, payload, api_key, timeout))()
+
+
+def _post_generate(model_name: str, payload: Dict[str, Any], api_key: str, timeout: int) -> str:
+    """One generateContent POST. Raises on non-200 or a blocked prompt."""
+    import requests as http_requests
+
+    url = f"{GEMINI_API_BASE_URL}/{model_name}:generateContent?key={api_key}"
     headers = {"Content-Type": "application/json"}
     
     print(f"🌐 [Direct HTTP] POST {GEMINI_API_BASE_URL}/{model_name}:generateContent")
@@ -299,21 +322,7 @@ def gemini_v1_generate(
         body = resp.text[:2000]
         print(f"❌ [Direct HTTP] Status {resp.status_code} from {model_name}:")
         print(f"❌ [Direct HTTP] FULL RESPONSE BODY:\n{body}")
-        
-        # If Pro failed, try Flash automatically
-        if model_name == MODEL_MAPPING["pro"]:
-            fallback = MODEL_MAPPING["flash"]
-            print(f"⚠️ [Direct HTTP] Pro failed ({resp.status_code}), falling back to Flash: {fallback}")
-            fallback_url = f"{GEMINI_API_BASE_URL}/{fallback}:generateContent?key={api_key}"
-            resp = http_requests.post(fallback_url, json=payload, headers=headers, timeout=timeout)
-            model_name = fallback
-            if resp.status_code != 200:
-                body2 = resp.text[:2000]
-                print(f"❌ [Direct HTTP] Flash also failed! Status {resp.status_code}:")
-                print(f"❌ [Direct HTTP] FULL RESPONSE BODY:\n{body2}")
-                raise Exception(f"Both Pro and Flash failed. Last status: {resp.status_code}. Body: {body2[:500]}")
-        else:
-            raise Exception(f"Gemini v1 API error {resp.status_code}: {body[:500]}")
+        raise Exception(f"Gemini v1 API error {resp.status_code}: {body[:500]}")
     
     # ── Parse response ──
     data = resp.json()
@@ -450,4 +459,5 @@ def get_model_status_report() -> Dict[str, Any]:
         "flash_models": flash_models,
         "other_models": other_models,
         "all_models": available,
+        "latency": get_latency_report(),
     }
@@ -0,0 +1,217 @@
+"""
+Notebook Map-Reduce — full-coverage NotebookLM analysis of long transcripts
+
+GeminiNotebookProvider.analyze put transcript_text[:15000] and
+expert_summary[:5000] into one Pro prompt. A two-hour meeting is well over
+100K characters, so most of it was never analyzed, and the one response
+had to fit every topic, quote and action item into max_output_tokens.
+
+Transcripts longer than SINGLE_PASS_CHARS now take two steps:
+  - map: split_transcript() cuts the transcript on line boundaries into
+    chunks of at most CHUNK_CHARS. map_chunks() summarizes every chunk
+    with Flash on a shared pool of MAP_WORKERS threads, returning compact
+    JSON (summary, topics, action items, decisions, quotes, speaker notes).
+  - reduce: one Pro call turns the chunk summaries and the full expert
+    summary into the existing analysis schema.
+Every chunk is read by a model, and no single response has to hold more
+than one chunk's worth of findings.
+
+Chunk summaries are cached by content (ChunkSummaryCache). The key is the
+SHA-256 of the map prompt version, the model and the chunk text. The
+cache is an in-memory LRU backed by JSON files in CACHE_DIR. Splitting is
+deterministic, so re-analysing a recording (after a prompt change to the
+reduce step, a failed reduce, or a restart of the same container) reuses
+every chunk and pays only for the reduce call. A summary that was cut off
+by max_output_tokens and repaired is used for this analysis but never
+cached, so the next analysis asks for it again.
+
+A chunk that fails is left out, and coverage is reported in the stats.
+map_chunks() raises only when every chunk fails.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SINGLE_PASS_CHARS = int(os.environ.get("NOTEBOOKLM_SINGLE_PASS_CHARS", "15000"))
+CHUNK_CHARS = int(os.environ.get("NOTEBOOKLM_CHUNK_CHARS", "12000"))
+MAP_WORKERS = int(os.environ.get("NOTEBOOKLM_MAP_WORKERS", "4"))
+CACHE_MAX_ENTRIES = 512
+CACHE_DIR = os.environ.get("NOTEBOOKLM_CHUNK_CACHE_DIR", "/tmp/_notebooklm_chunks")
+MAP_PROMPT_VERSION = "1"        # Bump when the map prompt changes to invalidate cached chunks
+
+_map_executor = ThreadPoolExecutor(max_workers=MAP_WORKERS, thread_name_prefix="notebook-map")
+
+
+def split_transcript(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Cut text into chunks of at most max_chars, on line boundaries.
+
+    A single line longer than max_chars is cut at the last space before
+    the limit (or at the limit if it has none).
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in (text or "").splitlines():
+        while len(line) > max_chars:
+            cut = line.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            head, line = line[:cut], line[cut:].lstrip()
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(head)
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        if line.strip():
+            current.append(line)
+            size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class ChunkSummaryCache:
+    """Content-addressed chunk summaries: in-memory LRU over JSON files on disk."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, directory: Optional[str] = CACHE_DIR):
+        self._max_entries = max_entries
+        self._directory = directory
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(model: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (MAP_PROMPT_VERSION, model, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Optional[str]:
+        return os.path.join(self._directory, f"{key}.json") if self._directory else None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = None
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"[NotebookLM] Unreadable chunk cache file {path}: {e}")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember_locked(key, value)
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._remember_locked(key, value)
+        path = self._path(key)
+        if path:
+            try:
+                os.makedirs(self._directory, exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(value, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"[NotebookLM] Could not persist chunk summary: {e}")
+
+    def _remember_locked(self, key: str, value: Dict[str, Any]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "directory": self._directory}
+
+
+def map_chunks(chunks: List[str], summarize: Callable[[str], Tuple[Dict[str, Any], bool]], model: str,
+               cache: Optional[ChunkSummaryCache] = None) -> Tuple[List[Optional[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Summarize every chunk (cached ones are not sent again).
+
+    summarize(chunk) returns (summary, truncated); truncated summaries are
+    not cached.
+
+    Returns (summary or None per chunk, in order; stats). Raises the first
+    error if no chunk could be summarized.
+    """
+    started = time.time()
+    summaries: List[Optional[Dict[str, Any]]] = [None] * len(chunks)
+    keys = [ChunkSummaryCache.key_for(model, chunk) for chunk in chunks]
+    futures = {}
+    cached = truncated = 0
+    for i, (chunk, key) in enumerate(zip(chunks, keys)):
+        hit = cache.get(key) if cache else None
+        if hit is not None:
+            summaries[i] = hit
+            cached += 1
+        else:
+            futures[i] = _map_executor.submit(summarize, chunk)
+
+    errors: Dict[int, Exception] = {}
+    for i, future in futures.items():
+        try:
+            summaries[i], cut_off = future.result()
+        except Exception as e:
+            errors[i] = e
+            print(f"⚠️ [NotebookLM] Chunk {i + 1}/{len(chunks)} summary failed: {str(e)[:150]}")
+            continue
+        if cut_off:
+            truncated += 1
+            print(f"⚠️ [NotebookLM] Chunk {i + 1}/{len(chunks)} summary was truncated — not cached")
+        elif cache:
+            cache.put(keys[i], summaries[i])
+
+    if chunks and len(errors) == len(chunks):
+        raise errors[min(errors)]
+    stats = {
+        "chunks": len(chunks),
+        "cached": cached,
+        "summarized": len(futures) - len(errors),
+        "truncated": truncated,
+        "failed": sorted(i + 1 for i in errors),
+        "coverage": round((len(chunks) - len(errors)) / len(chunks), 3) if chunks else 1.0,
+        "map_s": round(time.time() - started, 2),
+    }
+    return summaries, stats
+
+
+def format_chunk_summaries(summaries: List[Optional[Dict[str, Any]]]) -> str:
+    """Chunk summaries as numbered compact JSON blocks for the reduce prompt."""
+    blocks = []
+    for i, summary in enumerate(summaries, 1):
+        if summary is None:
+            blocks.append(f"--- קטע {i}/{len(summaries)} (לא זמין) ---")
+        else:
+            blocks.append(f"--- קטע {i}/{len(summaries)} ---\n{json.dumps(summary, ensure_ascii=False)}")
+    return "\n\n".join(blocks)
+
+
+chunk_cache = ChunkSummaryCache()
@@ -9,6 +9,9 @@ Architecture:
   - Provider:     NOTEBOOKLM_PROVIDER (default: "gemini")
   - When Google releases a dedicated NotebookLM API, swap provider to
     "notebooklm_api" — zero code changes needed in callers.
+  - Long transcripts (> NOTEBOOKLM_SINGLE_PASS_CHARS) are analyzed by
+    map-reduce: Flash summarizes every chunk (cached by content), Pro
+    merges the summaries — see notebook_mapreduce.py.
 
 The service is called AFTER the standard audio pipeline completes.
 It takes the transcript + expert analysis and generates:
@@ -35,9 +38,14 @@ import io
 import json
 import logging
 import time
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timezone, timedelta
 
+from app.services.json_stream import parse_tolerant
+from app.services.notebook_mapreduce import (SINGLE_PASS_CHARS, chunk_cache, format_chunk_summaries,
+                                             map_chunks, split_transcript)
+from app.services.tool_cache import bump_data_version
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -49,6 +57,94 @@ NOTEBOOKLM_PROVIDER = os.environ.get("NOTEBOOKLM_PROVIDER", "gemini")
 NOTEBOOKLM_FOLDER_NAME = "NotebookLM_Summaries"
 
 
+# ═══════════════════════════════════════════════════════════════════════
+# PROMPTS
+# ═══════════════════════════════════════════════════════════════════════
+
+ANALYSIS_HEADER_PROMPT = """אתה מנתח שיחות מקצועי ברמה של NotebookLM של גוגל.
+קיבלת תמלול של שיחה/פגישה. הפק ניתוח מעמיק ומובנה.
+
+═══ פרטי ההקלטה ═══
+קובץ: {filename}
+תאריך: {timestamp}
+דוברים: {speakers}
+"""
+
+ANALYSIS_SCHEMA_PROMPT = """═══════════════════════════════════════════════
+הפק את הניתוח הבא בפורמט JSON מדויק (בעברית):
+═══════════════════════════════════════════════
+
+החזר JSON בלבד, בלי markdown, בלי backticks, בפורמט הבא:
+{
+  "executive_summary": "תמצית מנהלים של 2-3 משפטים — מה הנקודה המרכזית של השיחה",
+  "key_topics": [
+    {
+      "topic": "שם הנושא",
+      "details": "פירוט קצר על מה דובר",
+      "speakers_involved": ["שם דובר 1", "שם דובר 2"]
+    }
+  ],
+  "action_items": [
+    {
+      "task": "תיאור המשימה",
+      "owner": "מי אחראי (אם ידוע)",
+      "deadline": "מועד (אם הוזכר)",
+      "priority": "high/medium/low"
+    }
+  ],
+  "decisions_made": [
+    {
+      "decision": "מה הוחלט",
+      "context": "רקע קצר"
+    }
+  ],
+  "notable_quotes": [
+    {
+      "speaker": "שם הדובר",
+      "quote": "הציטוט המדויק",
+      "significance": "למה זה חשוב"
+    }
+  ],
+  "speaker_profiles": [
+    {
+      "name": "שם הדובר",
+      "role_in_conversation": "תפקיד בשיחה (יוזם, מגיב, מקשה...)",
+      "key_contributions": "תרומות עיקריות",
+      "speaking_time_estimate": "הרבה/בינוני/מעט"
+    }
+  ],
+  "follow_up_questions": [
+    "שאלה שכדאי לשאול בפגישה הבאה"
+  ],
+  "mood_and_tone": "תיאור קצר של האווירה הכללית (רשמי, ידידותי, מתוח...)",
+  "infographic_text": "סיכום ויזואלי-טקסטואלי קצר עם אמוג'ים ומבנה ברור — מתאים לשליחה בוואטסאפ"
+}
+
+🔴 חשוב: החזר JSON חוקי בלבד. בלי טקסט לפני או אחרי. בלי ```json.
+אם אין מספיק מידע לסעיף מסוים — החזר רשימה ריקה [] או מחרוזת ריקה "".
+"""
+
+# Map step (long transcripts): one Flash call per transcript chunk
+CHUNK_SUMMARY_PROMPT = """להלן קטע מתוך תמלול של שיחה/פגישה ארוכה (בפורמט "דובר: טקסט").
+סכם את הקטע הזה בלבד. הקפד על פרטים: שמות, מספרים, מועדים והתחייבויות.
+
+═══ קטע התמלול ═══
+{transcript}
+
+החזר JSON בלבד, בלי markdown, בפורמט הבא:
+{{
+  "summary": "3-5 משפטים על מה שקרה בקטע",
+  "topics": [{{"topic": "שם הנושא", "details": "מה נאמר", "speakers_involved": ["שם"]}}],
+  "action_items": [{{"task": "משימה", "owner": "מי", "deadline": "מתי (אם הוזכר)"}}],
+  "decisions": [{{"decision": "מה הוחלט", "context": "רקע"}}],
+  "quotes": [{{"speaker": "שם", "quote": "ציטוט מדויק"}}],
+  "speaker_notes": {{"שם הדובר": "מה הוא תרם בקטע הזה"}},
+  "mood": "האווירה בקטע"
+}}
+אם אין מידע לסעיף — החזר רשימה ריקה [] או מחרוזת ריקה "".
+"""
+
+
 # ═══════════════════════════════════════════════════════════════════════
 # PROVIDER INTERFACE (Abstract)
 # ═══════════════════════════════════════════════════════════════════════
@@ -103,74 +199,39 @@ class GeminiNotebookProvider(NotebookLMProvider):
             speakers_str = ", ".join(speakers) if speakers else "לא זוהו"
             filename = metadata.get("filename", "unknown")
             timestamp = metadata.get("timestamp", "")
+            header = ANALYSIS_HEADER_PROMPT.format(filename=filename, timestamp=timestamp, speakers=speakers_str)
 
-            prompt = f"""אתה מנתח שיחות מקצועי ברמה של NotebookLM של גוגל.
-קיבלת תמלול של שיחה/פגישה. הפק ניתוח מעמיק ומובנה.
-
-═══ פרטי ההקלטה ═══
-קובץ: {filename}
-תאריך: {timestamp}
-דוברים: {speakers_str}
-
+            map_stats = None
+            if len(transcript_text) <= SINGLE_PASS_CHARS:
+                prompt = header + f"""
 ═══ תמלול השיחה ═══
-{transcript_text[:15000]}
+{transcript_text}
 
 ═══ ניתוח מומחה (אם קיים) ═══
 {expert_summary[:5000] if expert_summary else "לא זמין"}
 
-═══════════════════════════════════════════════
-הפק את הניתוח הבא בפורמט JSON מדויק (בעברית):
-═══════════════════════════════════════════════
+""" + ANALYSIS_SCHEMA_PROMPT
+            else:
+                # Long transcript: summarize every chunk with Flash, then reduce with Pro
+                chunks = split_transcript(transcript_text)
+                flash_name = MODEL_MAPPING.get("flash", "gemini-2.0-flash")
+                flash = genai.GenerativeModel(flash_name)
+                print(f"📓 [NotebookLM] Map-reduce: {len(transcript_text)} chars → {len(chunks)} chunks ({flash_name})")
+                summaries, map_stats = map_chunks(
+                    chunks, lambda chunk: self._summarize_chunk(flash, chunk), flash_name, chunk_cache)
+                print(f"📓 [NotebookLM] Map: {map_stats['summarized']} summarized, {map_stats['cached']} cached, "
+                      f"failed {map_stats['failed'] or 'none'} in {map_stats['map_s']}s")
+                prompt = header + f"""
+═══ סיכומי קטעי התמלול ({len(chunks)} קטעים ברצף, מכסים את כל השיחה) ═══
+{format_chunk_summaries(summaries)}
 
-החזר JSON בלבד, בלי markdown, בלי backticks, בפורמט הבא:
-{{
-  "executive_summary": "תמצית מנהלים של 2-3 משפטים — מה הנקודה המרכזית של השיחה",
-  "key_topics": [
-    {{
-      "topic": "שם הנושא",
-      "details": "פירוט קצר על מה דובר",
-      "speakers_involved": ["שם דובר 1", "שם דובר 2"]
-    }}
-  ],
-  "action_items": [
-    {{
-      "task": "תיאור המשימה",
-      "owner": "מי אחראי (אם ידוע)",
-      "deadline": "מועד (אם הוזכר)",
-      "priority": "high/medium/low"
-    }}
-  ],
-  "decisions_made": [
-    {{
-      "decision": "מה הוחלט",
-      "context": "רקע קצר"
-    }}
-  ],
-  "notable_quotes": [
-    {{
-      "speaker": "שם הדובר",
-      "quote": "הציטוט המדויק",
-      "significance": "למה זה חשוב"
-    }}
-  ],
-  "speaker_profiles": [
-    {{
-      "name": "שם הדובר",
-      "role_in_conversation": "תפקיד בשיחה (יוזם, מגיב, מקשה...)",
-      "key_contributions": "תרומות עיקריות",
-      "speaking_time_estimate": "הרבה/בינוני/מעט"
-    }}
-  ],
-  "follow_up_questions": [
-    "שאלה שכדאי לשאול בפגישה הבאה"
-  ],
-  "mood_and_tone": "תיאור קצר של האווירה הכללית (רשמי, ידידותי, מתוח...)",
-  "infographic_text": "סיכום ויזואלי-טקסטואלי קצר עם אמוג'ים ומבנה ברור — מתאים לשליחה בוואטסאפ"
-}}
+═══ ניתוח מומחה (אם קיים) ═══
+{expert_summary if expert_summary else "לא זמין"}
 
-🔴 חשוב: החזר JSON חוקי בלבד. בלי טקסט לפני או אחרי. בלי ```json.
-אם אין מספיק מידע לסעיף מסוים — החזר רשימה ריקה [] או מחרוזת ריקה "".
-"""
+מזג את סיכומי הקטעים לניתוח אחד של השיחה כולה: אחד נושאים חוזרים, אל תשכפל משימות והחלטות,
+ובחר את הציטוטים הבולטים ביותר מכל השיחה.
+
+""" + ANALYSIS_SCHEMA_PROMPT
 
             print(f"📓 [NotebookLM] Generating deep analysis with {model_name}...")
             start_time = time.time()
@@ -193,36 +254,14 @@ class GeminiNotebookProvider(NotebookLMProvider):
             # Parse the JSON response
             raw_text = response.text.strip()
 
-            # Strip markdown code fences if present (robust handling)
-            import re
-            fence_match = re.match(r'^```(?:json)?\s*\n(.*?)```\s*$', raw_text, re.DOTALL)
-            if fence_match:
-                raw_text = fence_match.group(1).strip()
-            elif raw_text.startswith("```"):
-                # Fallback: strip manually
-                first_newline = raw_text.find("\n")
-                if first_newline != -1:
-                    raw_text = raw_text[first_newline + 1:]
-                last_fence = raw_text.rfind("```")
-                if last_fence != -1:
-                    raw_text = raw_text[:last_fence].strip()
-
-            try:
-                analysis = json.loads(raw_text)
-                print(f"📓 [NotebookLM] JSON parsed successfully")
-            except json.JSONDecodeError as e:
-                logger.warning(f"[NotebookLM] JSON parse error: {e}")
+            # One tolerant pass: skips code fences, repairs trailing commas
+            # and closes output truncated by max_output_tokens
+            analysis = self._repair_json(raw_text)
+            if analysis is None:
+                logger.error(f"[NotebookLM] JSON repair failed — building fallback")
                 logger.warning(f"[NotebookLM] Raw (first 300): {raw_text[:300]}")
-
-                # ── Attempt JSON repair (common cause: truncated output) ──
-                analysis = self._repair_json(raw_text)
-
-                if analysis:
-                    print(f"📓 [NotebookLM] JSON repaired successfully after parse error")
-                else:
-                    logger.error(f"[NotebookLM] JSON repair failed — building fallback")
-                    # Extract what we can from the raw text
-                    analysis = self._build_fallback_analysis(raw_text)
+                # Extract what we can from the raw text
+                analysis = self._build_fallback_analysis(raw_text)
 
             # Add metadata
             israel_time = datetime.now(timezone.utc) + timedelta(hours=2)
@@ -234,7 +273,10 @@ class GeminiNotebookProvider(NotebookLMProvider):
                 "source_filename": filename,
                 "speakers": speakers,
                 "transcript_length": len(transcript_text),
+                "mode": "map_reduce" if map_stats else "single_pass",
             }
+            if map_stats:
+                analysis["_metadata"]["map"] = map_stats
 
             print(f"📓 [NotebookLM] Analysis complete:")
             print(f"   Executive summary: {analysis.get('executive_summary', '')[:100]}...")
@@ -252,115 +294,39 @@ class GeminiNotebookProvider(NotebookLMProvider):
             traceback.print_exc()
             return None
 
+    def _summarize_chunk(self, model, chunk: str) -> Tuple[Dict[str, Any], bool]:
+        """Map step: (compact JSON summary of one transcript chunk, cut off by max_output_tokens)."""
+        response = model.generate_content(
+            CHUNK_SUMMARY_PROMPT.format(transcript=chunk),
+            generation_config={
+                "temperature": 0.2,
+                "max_output_tokens": 4096,
+            }
+        )
+        summary, parser = parse_tolerant(response.text, stream_path=())
+        if not isinstance(summary, dict):
+            raise ValueError("chunk summary is not a JSON object")
+        return summary, parser.truncated
+
     # ───────────────────────────────────────────────────────────
     # JSON repair helpers
     # ───────────────────────────────────────────────────────────
 
     def _repair_json(self, raw_text: str) -> Optional[Dict[str, Any]]:
         """
-        Attempt to repair broken JSON (usually truncated by max_output_tokens).
+        Parse possibly broken JSON (usually truncated by max_output_tokens).
 
-        Uses a stack-based parser to understand nesting, then closes
-        unclosed structures in the correct order ({} and [] properly nested).
+        Text around the object and ``` fences is ignored; open strings,
+        arrays and objects are closed in nesting order.
         """
-        import re
-
-        text = raw_text.strip()
-        if not text.startswith("{"):
+        result, parser = parse_tolerant(raw_text, stream_path=())
+        if not isinstance(result, dict):
             return None
-
-        # Quick check — maybe it already parses
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            pass
-
-        # ── Strategy 1: Stack-based closure ──
-        # Walk the text to understand where we are (in-string, nesting depth)
-        repaired = self._close_json_stack(text)
-        if repaired:
-            try:
-                result = json.loads(repaired)
-                if isinstance(result, dict):
-                    print("📓 [NotebookLM] JSON repaired via stack-based closure")
-                    return result
-            except json.JSONDecodeError:
-                pass
-
-        # ── Strategy 2: Trim from end and try stack-closure ──
-        original = raw_text.strip()
-        for trim_chars in [50, 100, 200, 500, 1000]:
-            if len(original) <= trim_chars:
-                break
-            trimmed = original[:len(original) - trim_chars]
-            # Find last complete value boundary
-            last_good = max(
-                trimmed.rfind(","),
-                trimmed.rfind("]"),
-                trimmed.rfind("}"),
-                trimmed.rfind('"'),
-            )
-            if last_good > 0:
-                candidate = trimmed[:last_good + 1]
-                candidate = re.sub(r',\s*$', '', candidate)
-                closed = self._close_json_stack(candidate)
-                if closed:
-                    try:
-                        result = json.loads(closed)
-                        if isinstance(result, dict):
-                            print(f"📓 [NotebookLM] JSON repaired by trimming ~{trim_chars} chars")
-                            return result
-                    except json.JSONDecodeError:
-                        continue
-
-        return None
-
-    @staticmethod
-    def _close_json_stack(text: str) -> Optional[str]:
-        """
-        Walk JSON text, track nesting stack, close any open structures.
-        Returns the repaired text or None if hopeless.
-        """
-        import re
-
-        in_string = False
-        escape_next = False
-        stack = []  # tracks expected closers: '}' or ']'
-
-        for ch in text:
-            if escape_next:
-                escape_next = False
-                continue
-            if ch == '\\' and in_string:
-                escape_next = True
-                continue
-            if ch == '"':
-                in_string = not in_string
-                continue
-            if in_string:
-                continue
-            # Outside string
-            if ch == '{':
-                stack.append('}')
-            elif ch == '[':
-                stack.append(']')
-            elif ch in '}]':
-                if stack and stack[-1] == ch:
-                    stack.pop()
-
-        # Build closure
-        repaired = text
-        if in_string:
-            repaired += '"'  # close open string
-
-        # Remove trailing comma (invalid before closing bracket)
-        repaired = re.sub(r',\s*$', '', repaired)
-
-        # Close remaining structures in correct nesting order
-        while stack:
-            repaired += stack.pop()
-
-        return repaired
+        if parser.truncated or parser.repairs:
+            print(f"📓 [NotebookLM] JSON repaired ({parser.repairs} repairs, truncated={parser.truncated})")
+        else:
+            print(f"📓 [NotebookLM] JSON parsed successfully")
+        return result
 
     def _build_fallback_analysis(self, raw_text: str) -> Dict[str, Any]:
         """
@@ -553,6 +519,11 @@ class NotebookLMService:
 
         return analysis
 
+    def save_analysis(self, analysis: Dict[str, Any], metadata: dict,
+                      drive_memory_service) -> Optional[str]:
+        """Save an analysis to NotebookLM_Summaries/ (run as a background post-processing job)."""
+        return self._save_to_drive(analysis, metadata, drive_memory_service)
+
     def _save_to_drive(self, analysis: Dict[str, Any], metadata: dict,
                        drive_memory_service) -> Optional[str]:
         """Save the analysis as a JSON file to NotebookLM_Summaries/ on Drive."""
@@ -595,6 +566,7 @@ class NotebookLMService:
 
             file_id = file.get('id')
             print(f"📓 [NotebookLM] Saved to Drive: {filename} (ID: {file_id})")
+            bump_data_version("meetings", "NotebookLM analysis saved")
             return file_id
 
         except Exception as e:
@@ -867,10 +839,12 @@ class NotebookLMService:
             "provider": self.provider_name,
             "folder_id": self._folder_id,
             "configured": self._configured,
+            "chunk_cache": chunk_cache.stats(),
         }
 
 
 # ═══════════════════════════════════════════════════════════════════════
 # SINGLETON
 # ═══════════════════════════════════════════════════════════════════════
-notebooklm_service = NotebookLMService()
+from app.services.service_registry import service
+notebooklm_service = service("notebooklm_service")
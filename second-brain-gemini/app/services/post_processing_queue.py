@@ -0,0 +1,195 @@
+"""
+Post-Processing Queue — follow-up work after the user-facing summary
+
+process_audio_core ran NotebookLM deep analysis (a Pro call with a large
+prompt), infographic rendering, the WhatsApp send and the Drive save of
+the analysis inline, after the transcript was saved. The pipeline worker
+stayed busy for minutes, and the next inbox file waited for all of it.
+
+The pipeline now enqueues that work here and returns as soon as the
+summary has been sent. Jobs have a kind, a priority and a Future:
+  - Each kind has its own concurrency limit (KIND_LIMITS). At most two
+    Pro analyses run at once, rendering is CPU-bound, and Drive saves
+    must not crowd out user-facing sends.
+  - Workers take the highest-priority job (lowest number, FIFO within a
+    priority) whose kind has a free slot. PRIORITY_USER_FACING jobs
+    (render + send) jump ahead of queued analyses, and PRIORITY_BACKGROUND
+    jobs (Drive saves) run last.
+  - A job may submit follow-up jobs (analysis → render, Drive save).
+  - Submissions past max_pending are rejected (submit returns None), so
+    a burst of long recordings cannot grow memory without bound.
+Workers are daemon threads started on first use. Pending jobs live in
+memory only and are lost on restart.
+
+    future = post_processing_queue.submit("analysis", run_analysis, rec_id,
+                                          priority=PRIORITY_NORMAL, label=filename)
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+POSTPROC_WORKERS = int(os.environ.get("POSTPROC_WORKERS", "3"))
+POSTPROC_MAX_PENDING = int(os.environ.get("POSTPROC_MAX_PENDING", "100"))
+
+PRIORITY_USER_FACING = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+# kind → max concurrently running jobs of that kind
+KIND_LIMITS: Dict[str, int] = {
+    "analysis": int(os.environ.get("POSTPROC_ANALYSIS_LIMIT", "2")),
+    "render": 1,
+    "drive": 2,
+}
+DEFAULT_KIND_LIMIT = 1
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "kind", "label", "fn", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, priority, seq, kind, label, fn, args, kwargs):
+        self.priority = priority
+        self.seq = seq
+        self.kind = kind
+        self.label = label
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.enqueued_at = time.time()
+
+
+class PostProcessingQueue:
+    """Priority job queue with per-kind concurrency limits on a small worker pool."""
+
+    def __init__(self, max_workers: int = POSTPROC_WORKERS, limits: Optional[Dict[str, int]] = None,
+                 max_pending: int = POSTPROC_MAX_PENDING, name: str = "postproc"):
+        self._max_workers = max_workers
+        self._limits = dict(KIND_LIMITS if limits is None else limits)
+        self._max_pending = max_pending
+        self._name = name
+        self._cond = threading.Condition()
+        self._pending: List[_Job] = []
+        self._running: Dict[str, int] = {}
+        self._threads: List[threading.Thread] = []
+        self._seq = itertools.count()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, priority: int = PRIORITY_NORMAL,
+               label: str = "", **kwargs) -> Optional[Future]:
+        """Enqueue fn(*args, **kwargs); returns its Future, or None when the queue is full."""
+        with self._cond:
+            stats = self._kind_stats_locked(kind)
+            if len(self._pending) >= self._max_pending:
+                stats["rejected"] += 1
+                print(f"🚧 [PostProc] Queue full ({len(self._pending)} pending) — dropped {kind} {label}")
+                return None
+            job = _Job(priority, next(self._seq), kind, label, fn, args, kwargs)
+            self._pending.append(job)
+            stats["submitted"] += 1
+            self._start_workers_locked()
+            self._cond.notify_all()     # wait_idle() callers share this condition with the workers
+        print(f"📥 [PostProc] Queued {kind} {label} (priority {priority}, {len(self._pending)} pending)")
+        return job.future
+
+    # ─── Workers ─────────────────────────────────────────────────
+
+    def _start_workers_locked(self):
+        while len(self._threads) < self._max_workers:
+            thread = threading.Thread(target=self._worker, daemon=True,
+                                      name=f"{self._name}-{len(self._threads)}")
+            self._threads.append(thread)
+            thread.start()
+
+    def _kind_stats_locked(self, kind: str) -> Dict[str, int]:
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                                         "total_wait_ms": 0, "total_run_ms": 0}
+        return stats
+
+    def _take_locked(self) -> Optional[_Job]:
+        """Highest-priority pending job whose kind has a free slot."""
+        best = None
+        for job in self._pending:
+            if self._running.get(job.kind, 0) >= self._limits.get(job.kind, DEFAULT_KIND_LIMIT):
+                continue
+            if best is None or (job.priority, job.seq) < (best.priority, best.seq):
+                best = job
+        if best is not None:
+            self._pending.remove(best)
+            self._running[best.kind] = self._running.get(best.kind, 0) + 1
+        return best
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._take_locked()
+                while job is None:
+                    self._cond.wait()
+                    job = self._take_locked()
+                self._kind_stats_locked(job.kind)["total_wait_ms"] += int((time.time() - job.enqueued_at) * 1000)
+
+            started = time.time()
+            failed = False
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+                except BaseException as e:
+                    failed = True
+                    logger.error(f"[PostProc] {job.kind} {job.label} failed: {e}")
+                    print(f"⚠️ [PostProc] {job.kind} {job.label} failed: {e}")
+                    job.future.set_exception(e)
+
+            with self._cond:
+                self._running[job.kind] -= 1
+                stats = self._kind_stats_locked(job.kind)
+                stats["failed" if failed else "completed"] += 1
+                stats["total_run_ms"] += int((time.time() - started) * 1000)
+                self._cond.notify_all()     # A slot of this kind is free again
+
+    # ─── Introspection ───────────────────────────────────────────
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until nothing is pending or running. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._pending or any(self._running.values()):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            kinds = {}
+            for kind, stats in self._stats.items():
+                done = stats["completed"] + stats["failed"]
+                kinds[kind] = {
+                    "pending": sum(1 for job in self._pending if job.kind == kind),
+                    "running": self._running.get(kind, 0),
+                    "limit": self._limits.get(kind, DEFAULT_KIND_LIMIT),
+                    "submitted": stats["submitted"],
+                    "completed": stats["completed"],
+                    "failed": stats["failed"],
+                    "rejected": stats["rejected"],
+                    "avg_wait_ms": int(stats["total_wait_ms"] / done) if done else 0,
+                    "avg_run_ms": int(stats["total_run_ms"] / done) if done else 0,
+                }
+            return {
+                "pending": len(self._pending),
+                "workers": self._max_workers,
+                "max_pending": self._max_pending,
+                "kinds": kinds,
+            }
+
+
+post_processing_queue = PostProcessingQueue()
@@ -0,0 +1,239 @@
+"""
+Response Streamer — send long Conversation Engine answers as they are generated
+
+Without streaming, the user waited for the whole generation and then for
+one send_whatsapp call, so time-to-first-message equalled total
+generation time.
+
+With CONV_STREAM_REPLIES enabled (the default), ConversationEngine passes
+the final answer's text to StreamingReply.feed() as Gemini streams it.
+ReplyChunker cuts that text into WhatsApp-sized messages:
+  - first message: at the first paragraph or sentence boundary after
+    FIRST_CHUNK_MIN_CHARS, so it goes out as early as possible
+  - later messages: at the last paragraph (or sentence) boundary after
+    CHUNK_MIN_CHARS, so a long answer arrives as a few messages instead
+    of many fragments
+  - never longer than MAX_CHUNK_CHARS (the WhatsApp text limit is 4096)
+A short answer never reaches the first threshold and is still sent as a
+single message by finish().
+
+Text streamed in a tool-call round (a preamble before a function call)
+is discarded when the function call arrives, unless it already passed
+FIRST_CHUNK_MIN_CHARS at a sentence end. Such a preamble has been sent
+and stays in the chat as its own message before the answer.
+
+Messages are sent in order from the thread that feeds them. A typing
+indicator is shown when the reply starts and again after each
+intermediate message. Each reply records time to the first model text,
+to the first sent message and to completion. get_streaming_metrics()
+summarizes the latest replies for /debug/engine-status.
+
+    reply = StreamingReply(send=lambda m: provider.send_whatsapp(m, to=phone),
+                           typing=lambda: provider.send_typing_indicator(msg_id))
+    reply.start()
+    answer = conversation_engine.process_message(phone, text, on_text=reply.feed)
+    result = reply.finish(answer)
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STREAM_REPLIES = os.environ.get("CONV_STREAM_REPLIES", "true").lower() == "true"
+FIRST_CHUNK_MIN_CHARS = 120
+CHUNK_MIN_CHARS = 700
+MAX_CHUNK_CHARS = 3500
+METRICS_WINDOW = 200
+
+_SENTENCE_END = re.compile(r"[.!?…:;](?:[\"')\]]*)(?=\s)|\n")
+
+
+class ReplyChunker:
+    """Incrementally split streamed text into messages at natural boundaries."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._emitted = 0
+
+    def _cut_position(self) -> int:
+        buf = self._buffer
+        min_len = FIRST_CHUNK_MIN_CHARS if self._emitted == 0 else CHUNK_MIN_CHARS
+        if len(buf) < min_len:
+            return 0
+        region = buf[:MAX_CHUNK_CHARS]
+
+        paragraph = region.rfind("\n\n")
+        if paragraph >= min_len:
+            return paragraph + 2
+        sentence_ends = [m.end() for m in _SENTENCE_END.finditer(region) if m.end() >= min_len]
+        if sentence_ends:
+            return sentence_ends[0] if self._emitted == 0 else sentence_ends[-1]
+        if len(buf) > MAX_CHUNK_CHARS:
+            space = region.rfind(" ")
+            return space + 1 if space > 0 else MAX_CHUNK_CHARS
+        return 0
+
+    def feed(self, text: str) -> List[str]:
+        """Add streamed text; return the messages that are ready to send."""
+        self._buffer += text
+        ready = []
+        while True:
+            cut = self._cut_position()
+            if not cut:
+                break
+            chunk, self._buffer = self._buffer[:cut].strip(), self._buffer[cut:].lstrip()
+            if chunk:
+                ready.append(chunk)
+                self._emitted += 1
+        return ready
+
+    def flush(self) -> List[str]:
+        """Whatever is left, split only if it exceeds MAX_CHUNK_CHARS."""
+        ready = []
+        while len(self._buffer) > MAX_CHUNK_CHARS:
+            region = self._buffer[:MAX_CHUNK_CHARS]
+            cut = max(region.rfind("\n"), region.rfind(" ")) + 1 or MAX_CHUNK_CHARS
+            ready.append(self._buffer[:cut].strip())
+            self._buffer = self._buffer[cut:].lstrip()
+        if self._buffer.strip():
+            ready.append(self._buffer.strip())
+        self._buffer = ""
+        self._emitted += len(ready)
+        return ready
+
+
+class StreamingReply:
+    """One streamed answer: chunking, ordered sends, typing indicator and latency."""
+
+    def __init__(self, send: Callable[[str], Dict[str, Any]],
+                 typing: Optional[Callable[[], Any]] = None, label: str = ""):
+        self._send = send
+        self._typing = typing
+        self._label = label
+        self._chunker = ReplyChunker()
+        self._fed = ""
+        self._sent = 0
+        self._errors: List[str] = []
+        self._started_at = time.time()
+        self._first_text_at: Optional[float] = None
+        self._first_message_at: Optional[float] = None
+
+    def start(self):
+        """Show the typing indicator (best effort)."""
+        self._started_at = time.time()
+        self._show_typing()
+
+    def _show_typing(self):
+        if not self._typing:
+            return
+        try:
+            self._typing()
+        except Exception as e:
+            logger.debug(f"[Streamer] Typing indicator failed: {e}")
+
+    def _deliver(self, messages: List[str], more_coming: bool):
+        for message in messages:
+            try:
+                result = self._send(message) or {}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            if result.get("success"):
+                self._sent += 1
+                if self._first_message_at is None:
+                    self._first_message_at = time.time()
+            else:
+                self._errors.append(str(result.get("error", "send failed")))
+        if messages and more_coming:
+            self._show_typing()
+
+    def feed(self, text: Optional[str]):
+        """
+        Streamed answer text from the engine (called on the engine's worker thread).
+
+        None means the text fed so far belonged to a tool-call round: its
+        unsent remainder is dropped, and finish() compares the final answer
+        with the text streamed after it only. Messages already sent from
+        that round cannot be recalled.
+        """
+        if text is None:
+            self._chunker = ReplyChunker()
+            self._fed = ""
+            return
+        if not text:
+            return
+        if self._first_text_at is None:
+            self._first_text_at = time.time()
+        self._fed += text
+        self._deliver(self._chunker.feed(text), more_coming=True)
+
+    def finish(self, final_text: str) -> Dict[str, Any]:
+        """
+        Send whatever has not been sent yet and record latency.
+
+        final_text is the engine's return value. It normally equals the
+        streamed text. If it differs (error fallback mid-stream, busy
+        message, streaming disabled), the unsent part of the aborted stream
+        is dropped and final_text is sent as its own message.
+        """
+        if self._fed and final_text.startswith(self._fed):
+            rest = self._chunker.feed(final_text[len(self._fed):])
+            self._deliver(rest + self._chunker.flush(), more_coming=False)
+        elif final_text:
+            self._deliver([final_text], more_coming=False)
+
+        now = time.time()
+        record = {
+            "streamed": bool(self._fed),
+            "messages": self._sent,
+            "chars": len(final_text or ""),
+            "first_text_ms": int((self._first_text_at - self._started_at) * 1000) if self._first_text_at else None,
+            "first_message_ms": int((self._first_message_at - self._started_at) * 1000) if self._first_message_at else None,
+            "complete_ms": int((now - self._started_at) * 1000),
+        }
+        _record(record)
+        if record["streamed"] and self._sent > 1:
+            print(f"   📤 [Streamer] {self._label} {self._sent} messages — first after "
+                  f"{record['first_message_ms']}ms, complete {record['complete_ms']}ms")
+        return {"success": self._sent > 0 and not self._errors,
+                "error": "; ".join(self._errors) if self._errors else None, **record}
+
+
+# ─── Metrics ────────────────────────────────────────────────────
+
+_recent: "deque[Dict[str, Any]]" = deque(maxlen=METRICS_WINDOW)
+_recent_lock = threading.Lock()
+
+
+def _record(record: Dict[str, Any]):
+    with _recent_lock:
+        _recent.append(record)
+
+
+def _percentile(values: List[int], pct: float) -> Optional[int]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct * (len(values) - 1))))]
+
+
+def get_streaming_metrics() -> Dict[str, Any]:
+    """p50/p95 first-message vs. completion latency over the last METRICS_WINDOW replies."""
+    with _recent_lock:
+        records = list(_recent)
+    streamed = [r for r in records if r["streamed"]]
+    first = [r["first_message_ms"] for r in records if r["first_message_ms"] is not None]
+    complete = [r["complete_ms"] for r in records]
+    return {
+        "enabled": STREAM_REPLIES,
+        "replies": len(records),
+        "streamed": len(streamed),
+        "multi_message": sum(1 for r in streamed if r["messages"] > 1),
+        "first_message_ms": {"p50": _percentile(first, 0.5), "p95": _percentile(first, 0.95)},
+        "complete_ms": {"p50": _percentile(complete, 0.5), "p95": _percentile(complete, 0.95)},
+    }
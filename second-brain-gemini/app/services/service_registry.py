@@ -0,0 +1,161 @@
+"""
+Service Registry — Lazy singletons + background warm-up
+
+Importing a service module used to construct its singleton immediately
+(GeminiService() ran model discovery and a live connection test; Drive
+services refreshed OAuth tokens). Now each singleton is a LazyService
+proxy: it is built on first attribute access, or ahead of time by
+warmup() on a background thread.
+
+Services are declared by import path so that referencing one does NOT
+import its module (and heavy deps like google.generativeai):
+
+    from app.services.service_registry import service
+    gemini_service = service("gemini_service")     # nothing built yet
+    gemini_service.analyze_day(...)                 # built here (once)
+
+Ad-hoc singletons (e.g. main.py's DriveMemoryService) use register().
+"""
+
+import importlib
+import logging
+import threading
+import time
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# name → "module.path:FactoryName" (factory is called with no arguments)
+SERVICE_FACTORIES: Dict[str, str] = {
+    "gemini_service": "app.services.gemini_service:GeminiService",
+    "conversation_engine": "app.services.conversation_engine:ConversationEngine",
+    "notebooklm_service": "app.services.notebooklm_service:NotebookLMService",
+    "expert_analysis_service": "app.services.expert_analysis_service:ExpertAnalysisService",
+    "architecture_audit_service": "app.services.architecture_audit_service:ArchitectureAuditService",
+}
+
+
+def _resolve(path: str) -> Callable[[], Any]:
+    module_path, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_path), attr)
+
+
+class LazyService:
+    """
+    Transparent proxy that builds its target on first use (thread-safe).
+
+    Attribute reads/writes/deletes, bool() and repr() are forwarded to the
+    target (so mock.patch.object works on the proxy).
+    """
+
+    __slots__ = ("_name", "_factory", "_instance", "_lock", "_build_ms")
+
+    def __init__(self, name: str, factory: Union[str, Callable[[], Any]]):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", Lock())
+        object.__setattr__(self, "_build_ms", None)
+
+    def _get(self) -> Any:
+        instance = self._instance
+        if instance is not None:
+            return instance
+        with self._lock:
+            if self._instance is None:
+                factory = self._factory
+                if isinstance(factory, str):
+                    factory = _resolve(factory)
+                start = time.time()
+                instance = factory()
+                object.__setattr__(self, "_build_ms", int((time.time() - start) * 1000))
+                object.__setattr__(self, "_instance", instance)
+                print(f"🧩 [Registry] Built {self._name} in {self._build_ms}ms")
+            return self._instance
+
+    @property
+    def is_built(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._get(), item)
+
+    def __setattr__(self, key: str, value: Any):
+        setattr(self._get(), key, value)
+
+    def __delattr__(self, key: str):
+        delattr(self._get(), key)
+
+    def __bool__(self) -> bool:
+        return bool(self._get())
+
+    def __repr__(self) -> str:
+        if self._instance is None:
+            return f"<LazyService {self._name} (not built)>"
+        return f"<LazyService {self._name} → {self._instance!r}>"
+
+
+_registry: Dict[str, LazyService] = {}
+_registry_lock = Lock()
+
+
+def register(name: str, factory: Union[str, Callable[[], Any]]) -> LazyService:
+    """Register (or replace) a lazy singleton under `name` and return its proxy."""
+    with _registry_lock:
+        proxy = LazyService(name, factory)
+        _registry[name] = proxy
+        return proxy
+
+
+def service(name: str) -> LazyService:
+    """Return the proxy for a declared service (created from SERVICE_FACTORIES on first call)."""
+    with _registry_lock:
+        proxy = _registry.get(name)
+        if proxy is None:
+            if name not in SERVICE_FACTORIES:
+                raise KeyError(f"Unknown service: {name}")
+            proxy = LazyService(name, SERVICE_FACTORIES[name])
+            _registry[name] = proxy
+        return proxy
+
+
+def build(name: str) -> Any:
+    """Build (if needed) and return the real instance behind a service. Raises on failure."""
+    return (_registry.get(name) or service(name))._get()
+
+
+def warmup(names: Optional[List[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+    """
+    Build the named services (default: every registered/declared one).
+
+    Failures are logged and do not stop the remaining builds — the service
+    will retry construction on its next use.
+    """
+    if names is None:
+        names = list(dict.fromkeys(list(SERVICE_FACTORIES) + list(_registry)))
+
+    def _run():
+        for name in names:
+            try:
+                build(name)
+            except Exception as e:
+                logger.error(f"[Registry] Warm-up of {name} failed: {e}")
+                print(f"⚠️  [Registry] Warm-up of {name} failed: {e}")
+
+    if not background:
+        _run()
+        return None
+    thread = threading.Thread(target=_run, name="service-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_status() -> Dict[str, Any]:
+    """Build state of every known service (for health/debug endpoints)."""
+    with _registry_lock:
+        proxies = dict(_registry)
+    return {
+        name: {"built": proxy.is_built, "build_ms": proxy._build_ms}
+        for name, proxy in proxies.items()
+    }
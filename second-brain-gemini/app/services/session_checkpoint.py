@@ -0,0 +1,188 @@
+"""
+Session Checkpoints — durable, rehydratable conversation state
+
+Gemini ChatSession objects live only in memory. Without checkpoints a
+deploy or container recycle wipes every user's context: chat history,
+the pending working memory and the last processed audio session.
+
+Per-phone state is kept as a compact JSON record:
+  - history: text-only turns as {"role", "parts": [str, ...]}, trimmed to
+    the last MAX_HISTORY_TURNS turns. Tool call and response parts are
+    dropped, since the final model text already holds the answer.
+  - message_count, history_updated_at
+  - working_memory / last_session: ConversationEngine Phase 3 dicts
+
+Records are marked dirty in memory on every change. A daemon thread
+writes them to CONV_SESSION_STORE_PATH every CHECKPOINT_INTERVAL_SECONDS
+(atomic replace), and flush() writes immediately (used at shutdown).
+Each flush first prunes expired state: history older than the session
+TTL can never be rehydrated and is dropped, and records untouched for
+CHECKPOINT_RETENTION_SECONDS are removed entirely.
+ConversationEngine rehydrates a session lazily when the user's next
+message arrives.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_PATH = Path(os.environ.get(
+    "CONV_SESSION_STORE_PATH", str(Path(__file__).parent.parent.parent / ".conv_sessions.json")
+))
+CHECKPOINT_INTERVAL_SECONDS = int(os.environ.get("CONV_CHECKPOINT_INTERVAL_SECONDS", "30"))
+CHECKPOINT_RETENTION_SECONDS = int(os.environ.get("CONV_CHECKPOINT_RETENTION_SECONDS", str(7 * 24 * 3600)))
+SESSION_STORE_SCHEMA_VERSION = 1
+
+
+def serialize_history(history: List[Any], max_turns: int) -> List[Dict[str, Any]]:
+    """
+    Compact a Gemini chat history into [{"role": ..., "parts": [text, ...]}].
+
+    Works on genai.protos.Content (or anything with .role/.parts[].text).
+    Turns with no text (pure tool calls/responses) are dropped, the result
+    is trimmed to the last max_turns*2 entries and always starts on a user turn.
+    """
+    compact = []
+    for content in history:
+        texts = [p.text for p in getattr(content, "parts", []) if getattr(p, "text", "")]
+        if texts:
+            compact.append({"role": content.role, "parts": texts})
+
+    compact = compact[-(max_turns * 2):]
+    while compact and compact[0]["role"] != "user":
+        compact.pop(0)
+    return compact
+
+
+class SessionCheckpointStore:
+    """Thread-safe per-phone records with periodic background checkpoints."""
+
+    def __init__(self, path: Optional[Path] = None,
+                 interval_seconds: int = CHECKPOINT_INTERVAL_SECONDS,
+                 history_ttl_seconds: Optional[int] = None,
+                 retention_seconds: int = CHECKPOINT_RETENTION_SECONDS):
+        self._path = Path(path) if path else SESSION_STORE_PATH
+        self._interval = interval_seconds
+        self.history_ttl_seconds = history_ttl_seconds     # None = history never expires
+        self._retention = retention_seconds
+        self._records: Optional[Dict[str, Dict[str, Any]]] = None   # Loaded lazily
+        self._dirty = False
+        self._lock = Lock()
+        self._flush_lock = Lock()    # Serializes writers so an older payload never lands last
+        self._thread: Optional[threading.Thread] = None
+
+    # ─── Load / save ─────────────────────────────────────────────
+
+    def _ensure_loaded_locked(self):
+        if self._records is not None:
+            return
+        self._records = {}
+        if not self._path.exists():
+            return
+        try:
+            payload = json.loads(self._path.read_text(encoding="utf-8"))
+            if payload.get("schema_version") != SESSION_STORE_SCHEMA_VERSION:
+                print(f"ℹ️  [Sessions] Ignoring checkpoint with schema {payload.get('schema_version')}")
+                return
+            self._records = payload.get("sessions", {})
+            print(f"📂 [Sessions] Loaded {len(self._records)} checkpointed sessions")
+        except Exception as e:
+            logger.warning(f"[Sessions] Could not read checkpoint: {e}")
+
+    def _prune_expired_locked(self, now: float) -> int:
+        """Drop stale records and expired history. Returns how many records changed."""
+        changed = 0
+        for phone in list(self._records):
+            record = self._records[phone]
+            if now - record.get("updated_at", now) > self._retention:
+                del self._records[phone]
+                changed += 1
+            elif self.history_ttl_seconds is not None and record.get("history") and \
+                    now - record.get("history_updated_at", 0) >= self.history_ttl_seconds:
+                record["history"] = []
+                record["message_count"] = 0
+                changed += 1
+        return changed
+
+    def flush(self) -> bool:
+        """Prune expired state and write dirty records to disk now (atomic replace). Never raises."""
+        with self._flush_lock:
+            with self._lock:
+                if self._records is None:
+                    return False
+                if self._prune_expired_locked(time.time()):
+                    self._dirty = True
+                if not self._dirty:
+                    return False
+                try:
+                    payload = json.dumps({
+                        "schema_version": SESSION_STORE_SCHEMA_VERSION,
+                        "saved_at": time.time(),
+                        "sessions": self._records,
+                    }, ensure_ascii=False)
+                except Exception as e:
+                    # Stays dirty — the next checkpoint tries again
+                    logger.warning(f"[Sessions] Could not serialize checkpoint: {e}")
+                    return False
+                self._dirty = False
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self._path.parent,
+                                                prefix=self._path.name + ".", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp_path, self._path)
+                return True
+            except Exception as e:
+                logger.warning(f"[Sessions] Checkpoint failed: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                with self._lock:
+                    self._dirty = True
+                return False
+
+    def start_checkpointing(self):
+        """Start the background checkpoint loop (idempotent)."""
+        if self._thread is not None:
+            return
+
+        def _loop():
+            while True:
+                time.sleep(self._interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.warning(f"[Sessions] Checkpoint loop error: {e}")
+
+        self._thread = threading.Thread(target=_loop, name="session-checkpoint", daemon=True)
+        self._thread.start()
+
+    # ─── Records ─────────────────────────────────────────────────
+
+    def get(self, phone: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded_locked()
+            record = self._records.get(phone)
+            return dict(record) if record else None
+
+    def update(self, phone: str, **fields):
+        """Merge fields into the phone's record and mark it for the next checkpoint."""
+        with self._lock:
+            self._ensure_loaded_locked()
+            record = self._records.setdefault(phone, {})
+            record.update(fields)
+            record["updated_at"] = time.time()
+            self._dirty = True
+
+    def all_records(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self._ensure_loaded_locked()
+            return {phone: dict(record) for phone, record in self._records.items()}
@@ -0,0 +1,186 @@
+"""
+TTL-LRU Session Store — O(1) touch, expiry and eviction
+
+Shared by ConversationEngine (Gemini chat sessions) and
+IdentityResolverService (disambiguation context). Both used to scan every
+session on each call to find expired ones, then use min() to find the
+eviction victim.
+
+Every entry shares the same TTL, so the least-recently-touched entry is
+also the next one to expire. A single OrderedDict, kept in touch order,
+therefore doubles as the LRU list and the expiry queue:
+  - touch    → move_to_end                      O(1)
+  - expiry   → pop from the front while stale   amortized O(1)
+  - eviction → pop the front when over the cap  O(1)
+A change to the TTL keeps this order, because expiry is always computed
+as last_touch + current TTL.
+
+    store = TTLSessionStore(ttl_seconds=600, max_entries=200, name="Resolver")
+    session, created = store.get_or_create(phone, SessionContext)
+    store.configure(ttl_seconds=1800)           # runtime reconfiguration
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class TTLSessionStore(Generic[V]):
+    """Thread-safe mapping with a uniform idle TTL and an LRU size cap."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int, name: str = "Sessions",
+                 on_evict: Optional[Callable[[str, V, str], None]] = None):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._name = name
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[V, float]]" = OrderedDict()  # key → (value, last_touch)
+        self._lock = Lock()
+        self._expired_count = 0
+        self._evicted_count = 0
+
+    # ─── Internal (caller holds the lock) ────────────────────────
+
+    def _purge_expired_locked(self, now: float) -> List[Tuple[str, V]]:
+        removed = []
+        cutoff = now - self._ttl
+        while self._entries:
+            key, (value, touched) = next(iter(self._entries.items()))
+            if touched > cutoff:
+                break
+            self._entries.popitem(last=False)
+            removed.append((key, value))
+        self._expired_count += len(removed)
+        return removed
+
+    def _enforce_cap_locked(self) -> List[Tuple[str, V]]:
+        removed = []
+        while len(self._entries) > self._max_entries:
+            key, (value, _) = self._entries.popitem(last=False)
+            removed.append((key, value))
+        self._evicted_count += len(removed)
+        return removed
+
+    def _notify(self, expired: List[Tuple[str, V]], evicted: List[Tuple[str, V]]):
+        """Run eviction callbacks outside the lock."""
+        for reason, items in (("expired", expired), ("evicted", evicted)):
+            for key, value in items:
+                print(f"🗑️ [{self._name}] {reason.capitalize()} session for {key[-4:]}")
+                if self._on_evict:
+                    try:
+                        self._on_evict(key, value, reason)
+                    except Exception as e:
+                        logger.error(f"[{self._name}] on_evict failed for {key[-4:]}: {e}")
+
+    # ─── Public API ──────────────────────────────────────────────
+
+    def get(self, key: str, touch: bool = True) -> Optional[V]:
+        """Return the live value for key (refreshing its TTL), or None if absent/expired."""
+        now = time.time()
+        with self._lock:
+            expired = self._purge_expired_locked(now)
+            entry = self._entries.get(key)
+            value = None
+            if entry is not None:
+                value = entry[0]
+                if touch:
+                    self._entries[key] = (value, now)
+                    self._entries.move_to_end(key)
+        self._notify(expired, [])
+        return value
+
+    def put(self, key: str, value: V):
+        """Insert or replace key as the most recently used entry."""
+        now = time.time()
+        with self._lock:
+            expired = self._purge_expired_locked(now)
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            evicted = self._enforce_cap_locked()
+        self._notify(expired, evicted)
+
+    def get_or_create(self, key: str, factory: Callable[[], V],
+                      touch: bool = True) -> Tuple[V, bool]:
+        """
+        Atomically return (value, created). New entries are always fresh;
+        touch=False leaves an existing entry's TTL untouched.
+        factory() runs under the lock — keep it cheap.
+        """
+        now = time.time()
+        evicted = []
+        with self._lock:
+            expired = self._purge_expired_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, created = entry[0], False
+            else:
+                value, created = factory(), True
+            if created or touch:
+                self._entries[key] = (value, now)
+                self._entries.move_to_end(key)
+                evicted = self._enforce_cap_locked()
+        self._notify(expired, evicted)
+        return value, created
+
+    def pop(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def idle_seconds(self, key: str) -> Optional[float]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return (time.time() - entry[1]) if entry else None
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            expired = self._purge_expired_locked(time.time())
+        self._notify(expired, [])
+        return len(expired)
+
+    def items(self) -> List[Tuple[str, V]]:
+        """Snapshot of live (key, value) pairs, least recently used first."""
+        with self._lock:
+            expired = self._purge_expired_locked(time.time())
+            items = [(k, v) for k, (v, _) in self._entries.items()]
+        self._notify(expired, [])
+        return items
+
+    def configure(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        """Change TTL and/or cap at runtime; applies immediately."""
+        with self._lock:
+            if ttl_seconds is not None:
+                self._ttl = ttl_seconds
+            if max_entries is not None:
+                self._max_entries = max_entries
+            expired = self._purge_expired_locked(time.time())
+            evicted = self._enforce_cap_locked()
+        self._notify(expired, evicted)
+        print(f"⚙️  [{self._name}] Session store: ttl={self._ttl}s, max={self._max_entries}")
+
+    @property
+    def ttl_seconds(self) -> float:
+        return self._ttl
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active": len(self._entries),
+                "ttl_seconds": self._ttl,
+                "max_entries": self._max_entries,
+                "expired_total": self._expired_count,
+                "evicted_total": self._evicted_count,
+            }
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, touch=False) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
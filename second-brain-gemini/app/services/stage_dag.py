@@ -0,0 +1,236 @@
+"""
+Stage DAG — per-recording pipeline stages with dependencies
+
+After the Gemini analysis, process_audio_core ran every step one after
+another: WhatsApp summary → text infographic → clip export → transcript
+save → memory save → identity graph update → working memory → fact
+identification → NotebookLM. Most of these only need the Gemini result,
+so a recording paid for the sum of several Drive round-trips, a Flash
+fact scan and a pydub decode before its pipeline worker was free.
+
+The pipeline now declares those steps as stages with dependencies, and
+StageDAG runs them on a thread pool of its own. A stage starts as soon as
+every stage it depends on has finished. The wall time becomes the
+longest dependency chain instead of the sum.
+
+    dag = StageDAG(label=filename)
+    dag.add("transcript", save_transcript, timeout=300)
+    dag.add("memory", save_memory, deps=["transcript"])
+    results = dag.run()            # blocks until every stage finished
+
+Each stage has its own policy and timing span:
+  - fn(inputs) gets {dep name: dep result} for its declared deps only.
+  - retries: an exception re-runs the stage after retry_delay seconds,
+    doubling each time. Only give retries to idempotent stages.
+  - timeout: the whole stage, retries included, counted from when it is
+    submitted. A thread cannot be killed, so a stage that times out keeps
+    running in the background; its late result is dropped and on_late
+    (if given) is called with it, so the stage can release what it made.
+    Each run has its own pool with one thread per stage, so a hung
+    Drive or WhatsApp call never holds a worker that a later recording
+    needs, and a submitted stage never waits for a thread.
+  - Every stage gets a span (offset from the run start, duration,
+    attempts, status) for result_info["stages"] and the summary log line.
+
+As in the startup orchestrator, a failed or timed-out stage does not
+cancel its dependents. They run with None for that input, because every
+post-analysis step here is non-fatal. Order-sensitive user messages
+(summary → infographic → clips) are chained with deps.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("ok", "failed", "timeout")
+
+
+class Stage:
+    __slots__ = ("name", "fn", "deps", "timeout", "retries", "retry_delay", "on_late",
+                 "status", "attempts", "started_at", "duration_ms", "error", "result")
+
+    def __init__(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: List[str],
+                 timeout: Optional[float], retries: int, retry_delay: float,
+                 on_late: Optional[Callable[[Any], None]]):
+        self.name = name
+        self.fn = fn
+        self.deps = deps
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.on_late = on_late
+        self.status = "pending"     # pending → running → ok | failed | timeout
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.duration_ms: Optional[int] = None
+        self.error: Optional[str] = None
+        self.result: Any = None
+
+
+class StageDAG:
+    """One pipeline run: declared stages executed as a dependency DAG."""
+
+    def __init__(self, label: str = ""):
+        self._label = label
+        self._stages: Dict[str, Stage] = {}
+        self._cond = threading.Condition()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    # ─── Declaration ─────────────────────────────────────────────
+
+    def add(self, name: str, fn: Callable[[Dict[str, Any]], Any], deps: Optional[List[str]] = None,
+            timeout: Optional[float] = None, retries: int = 0, retry_delay: float = 2.0,
+            on_late: Optional[Callable[[Any], None]] = None) -> "StageDAG":
+        """Declare a stage. Must be called before run()."""
+        if self._started_at is not None:
+            raise RuntimeError("Cannot add stages after run()")
+        if name in self._stages:
+            raise ValueError(f"Duplicate pipeline stage '{name}'")
+        self._stages[name] = Stage(name, fn, list(deps or []), timeout, retries, retry_delay, on_late)
+        return self
+
+    def _validate(self):
+        for stage in self._stages.values():
+            for dep in stage.deps:
+                if dep not in self._stages:
+                    raise ValueError(f"Pipeline stage '{stage.name}' depends on unknown stage '{dep}'")
+        # Cycle check (Kahn): every stage must be reachable in topological order
+        indegree = {name: len(stage.deps) for name, stage in self._stages.items()}
+        ready = [name for name, deg in indegree.items() if deg == 0]
+        seen = 0
+        while ready:
+            current = ready.pop()
+            seen += 1
+            for stage in self._stages.values():
+                if current in stage.deps:
+                    indegree[stage.name] -= 1
+                    if indegree[stage.name] == 0:
+                        ready.append(stage.name)
+        if seen != len(self._stages):
+            raise ValueError("Pipeline stage graph contains a cycle")
+
+    # ─── Execution ───────────────────────────────────────────────
+
+    def run(self) -> Dict[str, Any]:
+        """Run every stage; returns {stage name: result (None if it failed or timed out)}."""
+        self._validate()
+        self._started_at = time.time()
+        executor = ThreadPoolExecutor(max_workers=max(len(self._stages), 1),
+                                      thread_name_prefix="pipeline-stage")
+        try:
+            with self._cond:
+                while True:
+                    self._schedule_ready_locked(executor)
+                    expired, next_deadline = self._expire_locked()
+                    if expired:
+                        continue        # Dependents of an expired stage may be ready now
+                    if all(stage.status in FINISHED for stage in self._stages.values()):
+                        break
+                    wait_s = None if next_deadline is None else max(next_deadline - time.time(), 0.01)
+                    self._cond.wait(wait_s)
+        finally:
+            # Timed-out stages keep their threads until they return; don't wait for them
+            executor.shutdown(wait=False)
+        self._finished_at = time.time()
+
+        total_ms = int((self._finished_at - self._started_at) * 1000)
+        serial_ms = sum(stage.duration_ms or 0 for stage in self._stages.values())
+        failed = [s.name for s in self._stages.values() if s.status != "ok"]
+        print(f"🏁 [Pipeline] {self._label}: {len(self._stages)} stages in {total_ms}ms "
+              f"(sequential would be ~{serial_ms}ms)" + (f" — not ok: {', '.join(failed)}" if failed else ""))
+        return {name: stage.result for name, stage in self._stages.items()}
+
+    def _schedule_ready_locked(self, executor: ThreadPoolExecutor):
+        for stage in self._stages.values():
+            if stage.status == "pending" and all(self._stages[d].status in FINISHED for d in stage.deps):
+                stage.status = "running"
+                stage.started_at = time.time()
+                inputs = {d: self._stages[d].result for d in stage.deps}
+                executor.submit(self._run_stage, stage, inputs)
+
+    def _expire_locked(self) -> Tuple[bool, Optional[float]]:
+        """Mark running stages past their timeout; return (any expired, nearest remaining deadline)."""
+        now = time.time()
+        expired = False
+        nearest = None
+        for stage in self._stages.values():
+            if stage.status != "running" or stage.timeout is None:
+                continue
+            deadline = stage.started_at + stage.timeout
+            if now >= deadline:
+                expired = True
+                stage.status = "timeout"
+                stage.duration_ms = int((now - stage.started_at) * 1000)
+                stage.error = f"timed out after {stage.timeout:.0f}s"
+                logger.error(f"[Pipeline] Stage {stage.name} timed out after {stage.timeout:.0f}s")
+                print(f"⏰ [Pipeline] {stage.name}: timeout after {stage.duration_ms}ms "
+                      f"(attempt {stage.attempts}) — dependents continue without it")
+            elif nearest is None or deadline < nearest:
+                nearest = deadline
+        return expired, nearest
+
+    def _run_stage(self, stage: Stage, inputs: Dict[str, Any]):
+        delay = stage.retry_delay
+        result, error = None, None
+        while True:
+            stage.attempts += 1
+            try:
+                result, error = stage.fn(inputs), None
+                break
+            except BaseException as e:
+                # Anything escaping stage.fn must still settle the stage, or run() waits forever
+                error = e
+                if not isinstance(e, Exception):
+                    break
+                remaining = None if stage.timeout is None else stage.started_at + stage.timeout - time.time()
+                if stage.attempts > stage.retries or (remaining is not None and remaining <= delay):
+                    break
+                print(f"🔁 [Pipeline] {stage.name} attempt {stage.attempts} failed: {e} — retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay *= 2
+
+        with self._cond:
+            late = stage.status != "running"
+            if not late:
+                stage.duration_ms = int((time.time() - stage.started_at) * 1000)
+                if error is None:
+                    stage.status, stage.result = "ok", result
+                else:
+                    stage.status, stage.error = "failed", str(error)
+                    logger.error(f"[Pipeline] Stage {stage.name} failed: {error}")
+            self._cond.notify_all()
+        if late:
+            print(f"⚠️ [Pipeline] {stage.name} finished after its timeout — result dropped")
+            if stage.on_late:
+                try:
+                    stage.on_late(result)
+                except Exception as e:
+                    logger.error(f"[Pipeline] on_late for {stage.name} failed: {e}")
+            return
+        icon = "✅" if error is None else "⚠️ "
+        print(f"{icon} [Pipeline] {stage.name}: {stage.status} in {stage.duration_ms}ms"
+              + (f" — {error}" if error is not None else ""))
+
+    # ─── Introspection ───────────────────────────────────────────
+
+    def get_spans(self) -> List[Dict[str, Any]]:
+        """Per-stage timing spans, in start order (for result_info and debugging)."""
+        with self._cond:
+            spans = [
+                {
+                    "stage": stage.name,
+                    "status": stage.status,
+                    "deps": stage.deps,
+                    "start_ms": int((stage.started_at - self._started_at) * 1000) if stage.started_at else None,
+                    "duration_ms": stage.duration_ms,
+                    "attempts": stage.attempts,
+                    "error": stage.error,
+                }
+                for stage in self._stages.values()
+            ]
+        return sorted(spans, key=lambda s: (s["start_ms"] is None, s["start_ms"] or 0))
@@ -0,0 +1,235 @@
+"""
+Startup Orchestrator — Parallel warm-up DAG with readiness gate
+
+startup_event used to run memory pre-warm → KB load → profile load →
+conversation-engine init one after another, so cold start cost the SUM
+of every step while /health already answered "healthy".
+
+Warm-ups are now declared as tasks with dependencies. Independent tasks
+run concurrently on a thread pool; a task starts as soon as all of its
+dependencies have finished. Cold start costs the longest dependency
+chain instead of the sum.
+
+    orchestrator.add("kb", load_kb)
+    orchestrator.add("engine", init_engine, deps=["kb"])
+    orchestrator.start()           # returns immediately
+    orchestrator.is_ready          # True once every CRITICAL task finished
+
+A failed task is logged and recorded. Its dependents still run, because
+every warm-up in this app is non-fatal. The original services retry
+lazily on first use. A failed CRITICAL task is also retried in the
+background with exponential backoff (STARTUP_RETRY_BASE_SECONDS, capped
+at STARTUP_RETRY_MAX_SECONDS). get_status()["healthy"] (what /ready
+reports) stays False until the retry succeeds, so one transient Drive or
+API error does not leave the instance unready for good.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+STARTUP_MAX_WORKERS = 6
+STARTUP_RETRY_BASE_SECONDS = float(os.environ.get("STARTUP_RETRY_BASE_SECONDS", "5"))
+STARTUP_RETRY_MAX_SECONDS = float(os.environ.get("STARTUP_RETRY_MAX_SECONDS", "300"))
+
+
+class StartupOrchestrator:
+    """Runs registered warm-up tasks as a dependency DAG (thread pool)."""
+
+    def __init__(self, max_workers: int = STARTUP_MAX_WORKERS,
+                 retry_base: float = STARTUP_RETRY_BASE_SECONDS,
+                 retry_max: float = STARTUP_RETRY_MAX_SECONDS):
+        self._max_workers = max_workers
+        self._retry_base = retry_base
+        self._retry_max = retry_max
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._critical_done = threading.Event()
+        self._all_done = threading.Event()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._finishing = False
+
+    # ─── Registration ────────────────────────────────────────────
+
+    def add(self, name: str, fn: Callable[[], Any],
+            deps: Optional[List[str]] = None, critical: bool = True):
+        """Register a warm-up task. Must be called before start()."""
+        if self._started_at is not None:
+            raise RuntimeError("Cannot add tasks after start()")
+        self._tasks[name] = {
+            "fn": fn,
+            "deps": list(deps or []),
+            "critical": critical,
+            "status": "pending",     # pending → running → ok | failed
+            "started_at": None,
+            "duration_ms": None,
+            "error": None,
+            "attempts": 0,
+        }
+
+    def _validate(self):
+        for name, task in self._tasks.items():
+            for dep in task["deps"]:
+                if dep not in self._tasks:
+                    raise ValueError(f"Startup task '{name}' depends on unknown task '{dep}'")
+        # Cycle check (Kahn): every task must be reachable in topological order
+        indegree = {name: len(task["deps"]) for name, task in self._tasks.items()}
+        ready = [name for name, deg in indegree.items() if deg == 0]
+        seen = 0
+        while ready:
+            current = ready.pop()
+            seen += 1
+            for name, task in self._tasks.items():
+                if current in task["deps"]:
+                    indegree[name] -= 1
+                    if indegree[name] == 0:
+                        ready.append(name)
+        if seen != len(self._tasks):
+            raise ValueError("Startup task graph contains a cycle")
+
+    # ─── Execution ───────────────────────────────────────────────
+
+    def start(self) -> "StartupOrchestrator":
+        """Launch the DAG in the background and return immediately."""
+        self._validate()
+        self._started_at = time.time()
+        if not self._tasks:
+            self._finish()
+            return self
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                            thread_name_prefix="startup")
+        print(f"🚦 [Startup] Launching {len(self._tasks)} warm-up tasks "
+              f"({sum(t['critical'] for t in self._tasks.values())} critical)")
+        self._schedule_ready_tasks()
+        self._check_critical()
+        return self
+
+    def _schedule_ready_tasks(self):
+        with self._lock:
+            runnable = [
+                name for name, task in self._tasks.items()
+                if task["status"] == "pending"
+                and all(self._tasks[d]["status"] in ("ok", "failed") for d in task["deps"])
+            ]
+            for name in runnable:
+                self._tasks[name]["status"] = "running"
+        for name in runnable:
+            self._executor.submit(self._run_task, name)
+
+    def _execute(self, name: str) -> str:
+        """Run the task's fn once and record the outcome. Returns "ok" or "failed"."""
+        task = self._tasks[name]
+        task["started_at"] = time.time()
+        try:
+            task["fn"]()
+            status, error = "ok", None
+        except Exception as e:
+            status, error = "failed", str(e)
+            logger.error(f"[Startup] Task {name} failed: {e}")
+        duration_ms = int((time.time() - task["started_at"]) * 1000)
+        with self._lock:
+            task["attempts"] += 1
+            task["duration_ms"] = duration_ms
+            task["error"] = error
+            task["status"] = status
+        icon = "✅" if status == "ok" else "⚠️ "
+        attempt = f" (attempt {task['attempts']})" if task["attempts"] > 1 else ""
+        print(f"{icon} [Startup] {name}: {status} in {duration_ms}ms{attempt}"
+              + (f" — {error}" if error else ""))
+        if status == "failed" and task["critical"]:
+            self._schedule_retry(name)
+        return status
+
+    def _schedule_retry(self, name: str):
+        """Re-run a failed critical task after a backoff, on its own timer thread."""
+        attempts = self._tasks[name]["attempts"]
+        delay = min(self._retry_max, self._retry_base * (2 ** (attempts - 1)))
+        print(f"🔁 [Startup] Retrying critical task {name} in {delay:.0f}s")
+        timer = threading.Timer(delay, self._execute, args=(name,))
+        timer.daemon = True
+        timer.start()
+
+    def _run_task(self, name: str):
+        self._execute(name)
+        self._check_critical()
+        self._schedule_ready_tasks()
+        with self._lock:
+            all_finished = (not self._finishing and
+                            all(t["status"] in ("ok", "failed") for t in self._tasks.values()))
+            if all_finished:
+                self._finishing = True
+        if all_finished:
+            self._finish()
+            self._executor.shutdown(wait=False)
+
+    def _check_critical(self):
+        with self._lock:
+            critical_finished = all(
+                t["status"] in ("ok", "failed")
+                for t in self._tasks.values() if t["critical"]
+            )
+            newly_ready = critical_finished and not self._critical_done.is_set()
+            if newly_ready:
+                self._critical_done.set()
+        if newly_ready:
+            elapsed_ms = int((time.time() - self._started_at) * 1000)
+            print(f"🟢 [Startup] Critical path ready in {elapsed_ms}ms")
+
+    def _finish(self):
+        self._finished_at = time.time()
+        self._critical_done.set()
+        self._all_done.set()
+        total_ms = int((self._finished_at - self._started_at) * 1000)
+        serial_ms = sum(t["duration_ms"] or 0 for t in self._tasks.values())
+        print(f"🏁 [Startup] All warm-ups finished in {total_ms}ms "
+              f"(sequential would be ~{serial_ms}ms)")
+
+    # ─── Readiness ───────────────────────────────────────────────
+
+    @property
+    def is_ready(self) -> bool:
+        return self._critical_done.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._critical_done.wait(timeout)
+
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        return self._all_done.wait(timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Per-task status and timing (for /ready and debugging)."""
+        with self._lock:
+            tasks = {
+                name: {
+                    "status": t["status"],
+                    "critical": t["critical"],
+                    "deps": t["deps"],
+                    "duration_ms": t["duration_ms"],
+                    "error": t["error"],
+                    "attempts": t["attempts"],
+                }
+                for name, t in self._tasks.items()
+            }
+        elapsed_end = self._finished_at or time.time()
+        failed_critical = [name for name, t in tasks.items()
+                           if t["critical"] and t["status"] == "failed"]
+        return {
+            "ready": self.is_ready,
+            # Finished is not enough: a failed critical task leaves the app unable to serve
+            "healthy": self.is_ready and not failed_critical,
+            "failed_critical": failed_critical,
+            "complete": self._all_done.is_set(),
+            "elapsed_ms": int((elapsed_end - self._started_at) * 1000) if self._started_at else 0,
+            "tasks": tasks,
+        }
+
+
+# Singleton — populated and started by main.startup_event
+startup_orchestrator = StartupOrchestrator()
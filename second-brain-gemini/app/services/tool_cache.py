@@ -0,0 +1,142 @@
+"""
+Tool Cache — memoized ConversationEngine tool results
+
+Follow-ups about the same person ("מי זה יובל?" → "ומי המנהל שלו?")
+re-ran search_person / get_reports from scratch, and search_meetings /
+search_notebook went back to Drive for every call.
+
+Read-only tools are memoized under (tool, normalized args, data version).
+Each tool depends on one or more data domains:
+  - "kb"       — identity graph / KB context. Bumped when the graph is
+                 rebuilt, merged or loaded from a snapshot, and by
+                 ContextWriter._invalidate_kb_cache (every successful save_fact).
+  - "meetings" — transcripts, archived audio sessions and NotebookLM
+                 analyses. Bumped by DriveMemoryService.save_transcript,
+                 ConversationEngine.inject_session_context and NotebookLM's
+                 Drive save.
+A bump changes the key of every dependent entry, so stale results are
+never served and simply age out of the LRU. Tools that are not listed in
+TOOL_DEPENDENCIES (save_fact, search_flights) are never cached, and error
+payloads are not stored.
+
+    result = tool_cache.call("search_person", {"name": "יובל"}, execute)
+    bump_data_version("kb", "save_fact")
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOOL_CACHE_TTL_SECONDS = int(os.environ.get("CONV_TOOL_CACHE_TTL_SECONDS", "900"))
+TOOL_CACHE_MAX_ENTRIES = int(os.environ.get("CONV_TOOL_CACHE_MAX_ENTRIES", "512"))
+
+TOOL_DEPENDENCIES = {
+    "search_person": ("kb",),
+    "get_reports": ("kb",),
+    "list_org_stats": ("kb",),
+    "search_meetings": ("meetings",),
+    "search_notebook": ("meetings",),
+}
+
+_versions: Dict[str, int] = {"kb": 0, "meetings": 0}
+_versions_lock = Lock()
+
+
+def bump_data_version(domain: str, reason: str = "") -> int:
+    """Invalidate every cached result that depends on domain. Never raises."""
+    with _versions_lock:
+        _versions[domain] = _versions.get(domain, 0) + 1
+        version = _versions[domain]
+    print(f"   🔄 [ToolCache] {domain} v{version}" + (f" ({reason})" if reason else ""))
+    return version
+
+
+def data_version(domain: str) -> int:
+    with _versions_lock:
+        return _versions.get(domain, 0)
+
+
+def normalize_args(args: Dict[str, Any]) -> str:
+    """Stable JSON for args: sorted keys, collapsed whitespace, empty values dropped."""
+    normalized = {}
+    for key, value in (args or {}).items():
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        if value in ("", None):
+            continue
+        normalized[key] = value
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _is_error(result: str) -> bool:
+    return result.lstrip().startswith('{"error"')
+
+
+class ToolResultCache:
+    """Thread-safe LRU of tool results with a TTL backstop."""
+
+    def __init__(self, ttl_seconds: float = TOOL_CACHE_TTL_SECONDS,
+                 max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[str, float]]" = OrderedDict()  # key → (result, stored_at)
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def cache_key(name: str, args: Dict[str, Any]) -> Tuple:
+        versions = tuple(data_version(d) for d in TOOL_DEPENDENCIES[name])
+        return name, normalize_args(args), versions
+
+    def call(self, name: str, args: Dict[str, Any],
+             execute: Callable[[str, Dict[str, Any]], str]) -> str:
+        """Return execute(name, args), served from cache when the data is unchanged."""
+        if name not in TOOL_DEPENDENCIES:
+            return execute(name, args)
+
+        key = self.cache_key(name, args)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self._ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                print(f"      💾 {name} served from cache")
+                return entry[0]
+            self._misses += 1
+
+        result = execute(name, args)
+        if isinstance(result, str) and not _is_error(result):
+            with self._lock:
+                self._entries[key] = (result, time.time())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "ttl_seconds": self._ttl,
+                "max_entries": self._max_entries,
+                "data_versions": dict(_versions),
+            }
+
+
+tool_cache = ToolResultCache()
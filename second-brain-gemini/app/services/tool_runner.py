@@ -0,0 +1,73 @@
+"""
+Tool Runner — concurrent execution of one Gemini turn's function calls
+
+When Gemini returns several function calls in one response (e.g.
+search_person for two names + search_meetings), they are independent.
+Running them one after another made a multi-tool turn cost sum(tool);
+run_tool_calls() dispatches them on a shared pool so it costs max(tool).
+
+    results = run_tool_calls([("search_person", {"name": "יובל"}),
+                              ("search_meetings", {"query": "יובל"})],
+                             execute=_execute_tool)
+
+Each call gets its own timeout (TOOL_TIMEOUTS / DEFAULT_TOOL_TIMEOUT).
+A call that times out returns an error payload, so Gemini can still
+answer from the other results. The worker thread cannot be killed and
+finishes in the background. Writes (SERIAL_TOOLS) run in order on the
+caller's thread.
+"""
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOOL_WORKERS = 8            # Shared across all users' turns
+DEFAULT_TOOL_TIMEOUT = 20   # Seconds per tool call
+TOOL_TIMEOUTS = {           # Drive / network-heavy tools get longer
+    "search_meetings": 40,
+    "search_notebook": 40,
+    "search_flights": 45,
+}
+SERIAL_TOOLS = {"save_fact"}   # Writes — never run concurrently
+
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="conv-tool")
+
+
+def run_tool_calls(calls: List[Tuple[str, Dict[str, Any]]],
+                   execute: Callable[[str, Dict[str, Any]], str]) -> List[str]:
+    """Execute (name, args) calls concurrently; return result strings in call order."""
+    if len(calls) == 1 and calls[0][0] in SERIAL_TOOLS:
+        return [execute(*calls[0])]
+
+    start = time.time()
+    futures = {
+        i: _tool_executor.submit(execute, name, args)
+        for i, (name, args) in enumerate(calls)
+        if name not in SERIAL_TOOLS
+    }
+    results: List[Optional[str]] = [None] * len(calls)
+    for i, (name, args) in enumerate(calls):
+        if name in SERIAL_TOOLS:
+            results[i] = execute(name, args)
+
+    for i, future in futures.items():
+        name = calls[i][0]
+        timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+        try:
+            results[i] = future.result(timeout=max(0.0, start + timeout - time.time()))
+        except FutureTimeoutError:
+            logger.error(f"[ToolRunner] {name} timed out after {timeout}s")
+            print(f"      ⏱️ {name} timed out after {timeout}s")
+            results[i] = json.dumps({"error": f"Tool {name} timed out after {timeout}s"},
+                                    ensure_ascii=False)
+        except Exception as e:
+            logger.error(f"[ToolRunner] {name} failed: {e}")
+            results[i] = json.dumps({"error": str(e)}, ensure_ascii=False)
+
+    if len(calls) > 1:
+        print(f"      ⚡ {len(calls)} tools in {int((time.time() - start) * 1000)}ms (parallel)")
+    return results
@@ -0,0 +1,343 @@
+"""
+Upload Poller — adaptive readiness polling for Gemini file uploads
+
+upload_and_wait polled genai.get_file every 2 seconds for up to 300s,
+with debug prints and a stdout flush on every iteration. A short voice
+clip that is ACTIVE after 300ms still waited 2s, and a long recording
+made one request every 2s for minutes. Files uploaded together
+(analyze_day's audio, reference voices and images) were polled one
+after another.
+
+poll_until_active() waits for any number of uploads in one loop:
+  - The first check for each file is scheduled at FIRST_CHECK_FRACTION of
+    its predicted processing time. ProcessingTimeModel predicts it from
+    size and MIME family (audio / image / pdf / other), starting from
+    DEFAULT_PROFILES and refitting from observed processing times.
+  - After that, checks back off exponentially from INITIAL_INTERVAL_SECONDS
+    (×BACKOFF_FACTOR, capped at MAX_INTERVAL_SECONDS).
+  - The loop sleeps until the earliest due check and polls only the
+    files that are due. Transient get_file errors are retried on the
+    next check. A FAILED state raises ValueError, and max_wait raises
+    TimeoutError.
+
+upload_all() also runs the uploads themselves concurrently on a shared
+pool of UPLOAD_WORKERS threads. Each file joins the polling loop as soon
+as its own upload finishes, so pre-inference latency is roughly the
+slowest file's upload + processing rather than the sum over all files.
+Errors stay per file: a failed upload, FAILED processing or timeout is
+reported for that file, and the other files still complete. The result
+includes a per-file and overall timing breakdown.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INITIAL_INTERVAL_SECONDS = 0.2
+BACKOFF_FACTOR = 1.6
+MAX_INTERVAL_SECONDS = 10.0
+FIRST_CHECK_FRACTION = 0.8
+MAX_FIRST_CHECK_SECONDS = 60.0
+HISTORY_PER_KIND = 50
+MIN_FIT_SAMPLES = 5
+UPLOAD_WORKERS = 4
+
+# kind → (base seconds, seconds per MB) until enough samples are observed
+DEFAULT_PROFILES: Dict[str, Tuple[float, float]] = {
+    "audio": (1.0, 0.4),
+    "image": (0.5, 0.1),
+    "pdf": (1.0, 0.3),
+    "other": (1.0, 0.3),
+}
+
+
+def mime_kind(mime_type: str) -> str:
+    mime_type = (mime_type or "").lower()
+    if mime_type.startswith("audio/"):
+        return "audio"
+    if mime_type.startswith("image/"):
+        return "image"
+    if mime_type == "application/pdf":
+        return "pdf"
+    return "other"
+
+
+class ProcessingTimeModel:
+    """Per-kind linear model: processing seconds ≈ base + rate × MB."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._samples: Dict[str, Deque[Tuple[float, float]]] = {}
+
+    def observe(self, mime_type: str, size_bytes: int, seconds: float):
+        kind = mime_kind(mime_type)
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=HISTORY_PER_KIND)).append(
+                (size_bytes / 1e6, seconds))
+
+    def _profile(self, kind: str) -> Tuple[float, float]:
+        with self._lock:
+            samples = list(self._samples.get(kind, ()))
+        default = DEFAULT_PROFILES.get(kind, DEFAULT_PROFILES["other"])
+        if len(samples) < MIN_FIT_SAMPLES:
+            return default
+        n = len(samples)
+        mean_x = sum(x for x, _ in samples) / n
+        mean_y = sum(y for _, y in samples) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+        if var_x < 1e-6:
+            # All files about the same size — keep the default rate, fit the base
+            return max(0.0, mean_y - default[1] * mean_x), default[1]
+        rate = max(0.0, sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x)
+        return max(0.0, mean_y - rate * mean_x), rate
+
+    def predict(self, mime_type: str, size_bytes: int) -> float:
+        base, rate = self._profile(mime_kind(mime_type))
+        return base + rate * size_bytes / 1e6
+
+    def first_check_delay(self, mime_type: str, size_bytes: int) -> float:
+        delay = FIRST_CHECK_FRACTION * self.predict(mime_type, size_bytes)
+        return min(MAX_FIRST_CHECK_SECONDS, max(INITIAL_INTERVAL_SECONDS, delay))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = {kind: len(samples) for kind, samples in self._samples.items()}
+        result = {}
+        for kind in sorted(set(DEFAULT_PROFILES) | set(counts)):
+            base, rate = self._profile(kind)
+            result[kind] = {"samples": counts.get(kind, 0),
+                            "base_s": round(base, 2), "s_per_mb": round(rate, 3)}
+        return result
+
+
+processing_model = ProcessingTimeModel()
+
+
+@dataclass
+class PendingFile:
+    """An uploaded file that is not ACTIVE yet."""
+    file_ref: Any
+    display_name: str
+    mime_type: str
+    size_bytes: int
+    uploaded_at: float = field(default_factory=time.time)
+    learn: bool = True      # False for reused uploads (uploaded_at is only a guess)
+    upload_seconds: float = 0.0
+    next_check: float = 0.0
+    interval: float = INITIAL_INTERVAL_SECONDS
+    checks: int = 0
+    ready_at: Optional[float] = None
+
+
+def file_state(file_ref: Any) -> str:
+    state = getattr(file_ref, "state", None)
+    return getattr(state, "name", None) or str(state)
+
+
+class ReadinessPoller:
+    """Files waiting for ACTIVE, each on its own adaptive check schedule."""
+
+    def __init__(self, get_file: Callable[[str], Any], model: Optional[ProcessingTimeModel] = None):
+        self._get_file = get_file
+        self._model = model or processing_model
+        self.items: Dict[int, PendingFile] = {}
+        self.waiting: Dict[int, PendingFile] = {}
+        self.ready: Dict[int, PendingFile] = {}
+        self.errors: Dict[int, Exception] = {}
+
+    def add(self, key: int, item: PendingFile):
+        self.items[key] = item
+        if file_state(item.file_ref) == "ACTIVE":
+            item.ready_at = time.time()
+            self.ready[key] = item
+            return
+        item.next_check = item.uploaded_at + self._model.first_check_delay(item.mime_type, item.size_bytes)
+        self.waiting[key] = item
+
+    def next_check_at(self) -> Optional[float]:
+        return min((item.next_check for item in self.waiting.values()), default=None)
+
+    def poll_due(self):
+        """Check every file whose next check is due."""
+        now = time.time()
+        for key in [k for k, item in self.waiting.items() if item.next_check <= now]:
+            item = self.waiting[key]
+            item.checks += 1
+            try:
+                item.file_ref = self._get_file(item.file_ref.name)
+            except Exception as e:
+                logger.warning(f"[Poller] get_file({item.file_ref.name}) failed, will retry: {e}")
+            state = file_state(item.file_ref)
+            if state == "ACTIVE":
+                item.ready_at = time.time()
+                elapsed = item.ready_at - item.uploaded_at
+                if item.learn:
+                    self._model.observe(item.mime_type, item.size_bytes, elapsed)
+                print(f"✅ File {item.display_name} is ready ({elapsed:.1f}s, {item.checks} checks)")
+                self.ready[key] = self.waiting.pop(key)
+            elif state == "FAILED":
+                self.errors[key] = ValueError(f"File {item.display_name} failed to process.")
+                del self.waiting[key]
+            else:
+                item.next_check = time.time() + item.interval
+                item.interval = min(MAX_INTERVAL_SECONDS, item.interval * BACKOFF_FACTOR)
+
+    def time_out(self, max_wait: float):
+        for key, item in self.waiting.items():
+            self.errors[key] = TimeoutError(
+                f"File {item.display_name} processing timeout after {max_wait} seconds")
+        self.waiting.clear()
+
+
+def poll_until_active(pending: List[PendingFile], get_file: Callable[[str], Any],
+                      max_wait: float = 300,
+                      model: Optional[ProcessingTimeModel] = None,
+                      sleep: Callable[[float], None] = time.sleep) -> List[Any]:
+    """
+    Wait until every pending file is ACTIVE; return the refreshed handles
+    in input order. Raises the first FAILED / timeout error.
+    """
+    start = time.time()
+    poller = ReadinessPoller(get_file, model)
+    for i, item in enumerate(pending):
+        poller.add(i, item)
+    while poller.waiting and not poller.errors:
+        now = time.time()
+        if now - start > max_wait:
+            poller.time_out(max_wait)
+            break
+        sleep(max(0.0, min(poller.next_check_at(), start + max_wait + 0.01) - now))
+        poller.poll_due()
+    if poller.errors:
+        raise poller.errors[min(poller.errors)]
+    return [poller.ready[i].file_ref for i in range(len(pending))]
+
+
+def pending_file(file_ref: Any, path: str, display_name: str, mime_type: str,
+                 uploaded_at: Optional[float] = None, learn: bool = True) -> PendingFile:
+    """PendingFile for an upload of path that finished at uploaded_at (default: now)."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return PendingFile(file_ref=file_ref, display_name=display_name, mime_type=mime_type,
+                       size_bytes=size, uploaded_at=uploaded_at or time.time(), learn=learn)
+
+
+# ─── Concurrent upload + readiness ──────────────────────────────
+
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="gemini-upload")
+
+
+@dataclass
+class UploadBatch:
+    """Outcome of upload_all(): per-file handle or error, plus timings."""
+    refs: List[Any]
+    errors: Dict[int, Exception]
+    timing: Dict[str, Any]
+    pending: Dict[int, PendingFile] = field(default_factory=dict)   # every file whose upload returned
+
+    def refs_or_raise(self) -> List[Any]:
+        if self.errors:
+            raise self.errors[min(self.errors)]
+        return self.refs
+
+
+def _late_upload(future, on_late: Callable[[PendingFile], None]):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_late(future.result())
+    except Exception as e:
+        logger.error(f"[Uploads] on_late for a timed-out upload failed: {e}")
+
+
+def upload_all(items: List[Any], upload: Callable[[Any], PendingFile],
+               get_file: Callable[[str], Any], max_wait: float = 300,
+               model: Optional[ProcessingTimeModel] = None,
+               on_late: Optional[Callable[[PendingFile], None]] = None) -> UploadBatch:
+    """
+    Upload items concurrently on the shared upload pool and wait for all of
+    them to become ACTIVE in one loop.
+
+    upload(item) uploads (or reuses) one file and returns its PendingFile.
+    Files are polled from the moment their own upload finishes. A failed
+    upload, FAILED processing or timeout is recorded for that file only;
+    the others still complete.
+
+    An upload still running at max_wait is reported as timed out, but its
+    thread keeps going; if it later succeeds, on_late(pending) is called
+    with it (e.g. to release what upload() acquired), since it never
+    reaches the batch.
+    """
+    start = time.time()
+    poller = ReadinessPoller(get_file, model)
+    errors: Dict[int, Exception] = {}
+
+    def _timed_upload(item):
+        t0 = time.time()
+        pending = upload(item)
+        pending.upload_seconds = time.time() - t0
+        return pending
+
+    futures = {_upload_executor.submit(_timed_upload, item): i for i, item in enumerate(items)}
+    uploads_done_at = start
+    while futures or poller.waiting:
+        now = time.time()
+        if now - start > max_wait:
+            for future, i in futures.items():
+                errors[i] = TimeoutError(f"Upload {i} not finished after {max_wait} seconds")
+                if on_late:
+                    future.add_done_callback(lambda f: _late_upload(f, on_late))
+            futures.clear()
+            poller.time_out(max_wait)
+            break
+        deadline = min(filter(None, [poller.next_check_at(), start + max_wait + 0.01]))
+        if futures:
+            done, _ = wait(list(futures), timeout=max(0.0, deadline - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures.pop(future)
+                try:
+                    poller.add(i, future.result())
+                except Exception as e:
+                    print(f"   ⚠️  Upload of input {i + 1}/{len(items)} failed: {str(e)[:150]}")
+                    errors[i] = e
+            if not futures:
+                uploads_done_at = time.time()
+        else:
+            time.sleep(max(0.0, deadline - now))
+        poller.poll_due()
+
+    errors.update(poller.errors)
+    refs = [poller.ready[i].file_ref if i in poller.ready else None for i in range(len(items))]
+    files = []
+    for i in range(len(items)):
+        item = poller.items.get(i)
+        if item is None:
+            files.append({"ok": False, "error": str(errors[i])[:120]})
+            continue
+        files.append({
+            "name": item.display_name,
+            "ok": i in poller.ready,
+            "error": str(errors[i])[:120] if i in errors else None,
+            "reused": not item.learn,
+            "upload_s": round(item.upload_seconds, 2),
+            "processing_s": round(item.ready_at - item.uploaded_at, 2) if item.ready_at else None,
+            "checks": item.checks,
+        })
+    sequential = sum(f.get("upload_s", 0) + (f.get("processing_s") or 0) for f in files)
+    timing = {
+        "files": files,
+        "uploads_s": round(uploads_done_at - start, 2),
+        "ready_s": round(time.time() - start, 2),
+        "sequential_estimate_s": round(sequential, 2),
+        "failed": len(errors),
+    }
+    return UploadBatch(refs=refs, errors=errors, timing=timing, pending=dict(poller.items))
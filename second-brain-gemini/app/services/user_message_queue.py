@@ -0,0 +1,151 @@
+"""
+Per-User Message Queue — ordered per phone, parallel across phones
+
+Each user (phone) gets a FIFO mailbox. At most one worker drains a given
+mailbox at a time, so two quick messages from the same user never touch
+the same ChatSession concurrently and are answered in the order sent.
+Mailboxes of different users are drained in parallel on a bounded
+worker pool.
+
+    queue = UserMessageQueue(max_workers=8, max_pending_per_user=5)
+    future = queue.submit(phone, handler, phone, text)
+    if future is None:
+        ...  # backpressure — this user already has too much queued
+    answer = future.result()
+
+A worker drains at most DRAIN_BATCH items before re-queuing the mailbox
+behind other users, so one chatty user cannot starve the pool.
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DRAIN_BATCH = 4   # Items processed per mailbox turn before yielding the worker
+
+
+class _Mailbox:
+    __slots__ = ("items", "scheduled", "processed", "rejected", "max_depth", "total_wait_ms")
+
+    def __init__(self):
+        self.items: deque = deque()
+        self.scheduled = False       # True while a worker owns (or is about to own) this mailbox
+        self.processed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.total_wait_ms = 0
+
+
+class UserMessageQueue:
+    """Per-key FIFO actor queues on a shared bounded thread pool."""
+
+    def __init__(self, max_workers: int = 8, max_pending_per_user: int = 5,
+                 max_pending_total: int = 200, name: str = "user-queue"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._max_workers = max_workers
+        self._max_pending_per_user = max_pending_per_user
+        self._max_pending_total = max_pending_total
+        self._mailboxes: Dict[str, _Mailbox] = {}
+        self._lock = Lock()
+        self._pending_total = 0
+        self._active_workers = 0
+
+    def submit(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Optional[Future]:
+        """
+        Enqueue fn(*args, **kwargs) behind any earlier work for `key`.
+
+        Returns a Future with the result, or None when the user's mailbox
+        (or the whole queue) is full — callers should tell the user to wait.
+        """
+        future: Future = Future()
+        with self._lock:
+            box = self._mailboxes.get(key)
+            if box is None:
+                box = self._mailboxes[key] = _Mailbox()
+            if (len(box.items) >= self._max_pending_per_user
+                    or self._pending_total >= self._max_pending_total):
+                box.rejected += 1
+                print(f"🚧 [UserQueue] Backpressure for {key[-4:]}: "
+                      f"{len(box.items)} queued, {self._pending_total} total")
+                return None
+            box.items.append((fn, args, kwargs, future, time.time()))
+            box.max_depth = max(box.max_depth, len(box.items))
+            self._pending_total += 1
+            schedule = not box.scheduled
+            box.scheduled = True
+        if schedule:
+            self._executor.submit(self._drain, key)
+        return future
+
+    def _drain(self, key: str):
+        with self._lock:
+            self._active_workers += 1
+        try:
+            for _ in range(DRAIN_BATCH):
+                with self._lock:
+                    box = self._mailboxes[key]
+                    if not box.items:
+                        box.scheduled = False
+                        return
+                    fn, args, kwargs, future, enqueued_at = box.items.popleft()
+                    self._pending_total -= 1
+                    box.total_wait_ms += int((time.time() - enqueued_at) * 1000)
+
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as e:
+                        logger.error(f"[UserQueue] Task for {key[-4:]} failed: {e}")
+                        future.set_exception(e)
+
+                with self._lock:
+                    box.processed += 1
+
+            # Batch exhausted — yield the worker to other users if more work remains
+            with self._lock:
+                if not box.items:
+                    box.scheduled = False
+                    return
+            self._executor.submit(self._drain, key)
+        finally:
+            with self._lock:
+                self._active_workers -= 1
+                box = self._mailboxes.get(key)
+                if box is not None and not box.items and not box.scheduled:
+                    self._maybe_forget(key, box)
+
+    def _maybe_forget(self, key: str, box: _Mailbox):
+        """Drop idle mailboxes once there are many users (metrics are best-effort)."""
+        if len(self._mailboxes) > self._max_pending_total:
+            del self._mailboxes[key]
+
+    def depth(self, key: str) -> int:
+        with self._lock:
+            box = self._mailboxes.get(key)
+            return len(box.items) if box else 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue-depth and throughput metrics, per user (full key) and overall."""
+        with self._lock:
+            users = {
+                key: {
+                    "depth": len(box.items),
+                    "max_depth": box.max_depth,
+                    "processed": box.processed,
+                    "rejected": box.rejected,
+                    "avg_wait_ms": int(box.total_wait_ms / box.processed) if box.processed else 0,
+                }
+                for key, box in self._mailboxes.items()
+            }
+            return {
+                "pending_total": self._pending_total,
+                "active_workers": self._active_workers,
+                "max_workers": self._max_workers,
+                "max_pending_per_user": self._max_pending_per_user,
+                "users": users,
+            }
@@ -50,6 +50,18 @@ class WhatsAppProvider(ABC):
         """
         pass
 
+    def send_typing_indicator(self, message_id: str) -> Dict[str, Any]:
+        """
+        Show a typing indicator in reply to an incoming message.
+        
+        Args:
+            message_id: ID of the incoming message being answered
+            
+        Returns:
+            Dictionary with success status
+        """
+        return {"success": False, "error": "Typing indicator not supported by this provider"}
+
     def send_image(self, image_path: str, caption: str = "", to: Optional[str] = None) -> Dict[str, Any]:
         """
         Send an image file via WhatsApp.
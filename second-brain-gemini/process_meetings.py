@@ -3,10 +3,13 @@
 Inbox Poller — Process new audio files from Google Drive inbox.
 
 This module is called by the APScheduler cron inside main.py every 5 minutes.
-When a new audio file appears in the DRIVE_INBOX_ID folder, it goes through
+When a new audio file appears in the DRIVE_INBOX_ID folder, it is queued as a
+"drive_inbox" job on the audio job queue's meeting lane (keyed by file_id, so
+later polls that still see the file don't queue it twice). The job goes through
 the EXACT same pipeline as a WhatsApp audio message (via audio_pipeline.py):
 
-  1. Download from Drive → temp file
+  1. Download from Drive → temp file (a failed download is retried by the queue;
+     the file stays in the inbox meanwhile)
   2. Delegate to process_audio_core() (the SINGLE SOURCE OF TRUTH)
   3. Move processed file to archive
 
@@ -34,12 +37,13 @@ AUDIO_MIME_TYPES = {
 }
 
 
-def check_inbox_and_process():
+def check_inbox_and_process(use_queue: bool = True):
     """
     Main entry point — called by APScheduler every 5 minutes.
     
-    Checks DRIVE_INBOX_ID for new audio files and processes each one
-    through the unified audio pipeline (same as WhatsApp >30s flow).
+    Checks DRIVE_INBOX_ID for new audio files and queues each one for the
+    unified audio pipeline (same as WhatsApp >30s flow). With use_queue=False,
+    or when the audio job queue is disabled, files are processed here, in order.
     """
     inbox_folder_id = os.environ.get("DRIVE_INBOX_ID", "")
     archive_folder_id = os.environ.get("DRIVE_ARCHIVE_ID", "")
@@ -79,7 +83,20 @@ def check_inbox_and_process():
         
         logger.info(f"📥 [InboxPoller] Found {len(audio_files)} audio file(s) to process")
         
+        from app.services.audio_job_queue import audio_job_queue
         for file_meta in audio_files:
+            if use_queue and audio_job_queue.enqueue(
+                "drive_inbox",
+                key=f"drive:{file_meta['id']}",
+                payload={
+                    "file_meta": file_meta,
+                    "inbox_folder_id": inbox_folder_id,
+                    "archive_folder_id": archive_folder_id,
+                },
+                lane="meeting",
+                rearm_failed=True,      # Still in the inbox after a failed run — try again
+            ) is not None:
+                continue
             try:
                 _process_inbox_file(
                     drive_service=drive_service,
@@ -99,6 +116,41 @@ def check_inbox_and_process():
         traceback.print_exc()
 
 
+def process_inbox_job(payload: Dict[str, Any], attempt: int):
+    """Audio job handler for one inbox file (meeting lane)."""
+    from app.services.drive_memory_service import DriveMemoryService
+    
+    drive_service = DriveMemoryService()
+    if not drive_service.is_configured or not drive_service.service:
+        raise RuntimeError("Drive service not configured")
+    drive_service._refresh_credentials_if_needed()
+    _process_inbox_file(
+        drive_service=drive_service,
+        file_meta=payload["file_meta"],
+        inbox_folder_id=payload["inbox_folder_id"],
+        archive_folder_id=payload["archive_folder_id"],
+    )
+
+
+def notify_inbox_job_failure(payload: Dict[str, Any], error: str):
+    """on_failure hook: tell the owner an inbox recording failed (it stays in the inbox)."""
+    file_name = payload.get("file_meta", {}).get("name", "unknown")
+    logger.error(f"❌ [InboxPoller] Giving up on {file_name} for now: {error}")
+    phone = os.environ.get("MY_PHONE_NUMBER", "").lstrip("+")
+    if not phone:
+        return
+    try:
+        from app.services.whatsapp_provider import WhatsAppProviderFactory
+        wp = WhatsAppProviderFactory.create_provider(fallback=False)
+        wp.send_whatsapp(
+            message=f"⚠️ לא הצלחתי לעבד את ההקלטה {file_name} מתיקיית ה-Inbox. "
+                    f"הקובץ נשאר בתיקייה ואנסה שוב בהמשך.",
+            to=f"+{phone}",
+        )
+    except Exception as e:
+        logger.error(f"❌ [InboxPoller] Could not send failure notice: {e}")
+
+
 def _process_inbox_file(
     drive_service,
     file_meta: Dict[str, Any],
@@ -125,6 +177,7 @@ def _process_inbox_file(
     
     tmp_path = None
     processing_succeeded = False
+    downloaded = False
     
     try:
         # ── Step 1: Download audio from Drive ──
@@ -141,6 +194,7 @@ def _process_inbox_file(
         audio_buffer.seek(0)
         audio_bytes = audio_buffer.read()
         print(f"✅ Downloaded: {len(audio_bytes)} bytes")
+        downloaded = True
         
         # ── Step 2: Save to temp file ──
         file_ext = Path(file_name).suffix or '.ogg'
@@ -185,6 +239,10 @@ def _process_inbox_file(
         print(f"\n✅ [InboxPoller] Successfully processed: {file_name}")
         
     except Exception as processing_err:
+        if not downloaded:
+            # Nothing was processed — leave the file in the inbox; the job queue retries
+            print(f"⚠️  [InboxPoller] Download failed for {file_name}: {processing_err}")
+            raise
         print(f"⚠️  [InboxPoller] Processing error for {file_name}: {processing_err}")
         import traceback
         traceback.print_exc()
@@ -193,11 +251,11 @@ def _process_inbox_file(
         processing_succeeded = True  # Move to archive to avoid re-processing
     
     finally:
-        # ── Step 5: ALWAYS move to archive (even if processing failed) ──
+        # ── Step 5: ALWAYS move to archive once downloaded (even if processing failed) ──
         # This prevents the inbox poller from re-processing the same file
         # on the next cycle. The user already got their analysis (it's sent
         # before Drive saves), so re-processing would be wasteful.
-        if archive_folder_id:
+        if archive_folder_id and downloaded:
             try:
                 # Refresh credentials (processing may have taken 5+ minutes)
                 drive_service._refresh_credentials_if_needed()
@@ -227,7 +285,7 @@ def _process_inbox_file(
                     print(f"📝 Renamed file to prevent re-processing")
                 except Exception:
                     print(f"⚠️  Could not rename file either — may be re-processed")
-        else:
+        elif downloaded:
             print("ℹ️  No DRIVE_ARCHIVE_ID configured — file stays in inbox")
         
         print(f"{'='*60}\n")
@@ -249,5 +307,8 @@ if __name__ == "__main__":
         handlers=[logging.StreamHandler(sys.stdout)]
     )
     print("🚀 Starting inbox processing (standalone mode)...")
-    check_inbox_and_process()
+    check_inbox_and_process(use_queue=False)
+    # Deep analysis / infographics run on daemon workers — let them finish before exiting
+    from app.services.post_processing_queue import post_processing_queue
+    post_processing_queue.wait_idle()
     print("✅ Done.")
@@ -0,0 +1,129 @@
+"""
+Unit tests for the durable audio job queue.
+
+Each test uses its own SQLite file under tmp_path; handlers are plain
+callables with sleeps standing in for downloads and Gemini calls.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.audio_job_queue import AudioJobQueue
+
+
+def _queue(tmp_path, lanes=None, retry_base=0.05, rearm_after=0):
+    return AudioJobQueue(db_path=str(tmp_path / "jobs.sqlite3"),
+                         lanes=lanes or {"voice": 1, "meeting": 1},
+                         enabled=True, retry_base=retry_base, rearm_after=rearm_after)
+
+
+@pytest.mark.unit
+class TestAudioJobQueue:
+
+    def test_duplicate_key_is_processed_once(self, tmp_path):
+        calls = []
+        queue = _queue(tmp_path)
+        queue.register("whatsapp_audio", lambda payload, attempt: calls.append(payload["media_id"]))
+        first = queue.enqueue("whatsapp_audio", key="wamid.1", payload={"media_id": "m1"}, lane="voice")
+        again = queue.enqueue("whatsapp_audio", key="wamid.1", payload={"media_id": "m1"}, lane="voice")
+        assert first == again
+        queue.start()
+        assert queue.wait_idle(timeout=5)
+        queue.enqueue("whatsapp_audio", key="wamid.1", payload={"media_id": "m1"}, lane="voice")
+        assert queue.wait_idle(timeout=5)
+        assert calls == ["m1"]
+
+    def test_voice_lane_not_blocked_by_meeting(self, tmp_path):
+        release, done = threading.Event(), []
+        queue = _queue(tmp_path)
+        queue.register("meeting", lambda payload, attempt: release.wait(5))
+        queue.register("voice", lambda payload, attempt: done.append(time.time()))
+        queue.start()
+        queue.enqueue("meeting", key="drive:f1", payload={}, lane="meeting")
+        started = time.time()
+        queue.enqueue("voice", key="wamid.2", payload={}, lane="voice")
+        deadline = time.time() + 2
+        while not done and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        assert done and done[0] - started < 1
+        assert queue.wait_idle(timeout=5)
+
+    def test_retry_with_backoff_then_failure_hook(self, tmp_path):
+        attempts, failures = [], []
+
+        def flaky(payload, attempt):
+            attempts.append((attempt, time.time()))
+            raise ConnectionError("media download reset")
+
+        queue = _queue(tmp_path)
+        queue.register("whatsapp_audio", flaky, on_failure=lambda payload, error: failures.append(error))
+        queue.start()
+        queue.enqueue("whatsapp_audio", key="wamid.3", payload={}, lane="voice", max_attempts=3)
+        assert queue.wait_idle(timeout=5)
+        assert [a for a, _ in attempts] == [1, 2, 3]
+        assert attempts[2][1] - attempts[1][1] >= attempts[1][1] - attempts[0][1] >= 0.04
+        assert len(failures) == 1 and "media download reset" in failures[0]
+        job = queue.list_jobs()[0]
+        assert job["status"] == "failed" and job["attempts"] == 3
+
+    def test_failed_job_rearmed_by_a_later_enqueue(self, tmp_path):
+        attempts, drive_up = [], threading.Event()
+
+        def download(payload, attempt):
+            attempts.append(attempt)
+            if not drive_up.is_set():
+                raise ConnectionError("Drive 503")
+
+        queue = _queue(tmp_path)
+        queue.register("drive_inbox", download)
+        queue.start()
+        queue.enqueue("drive_inbox", key="drive:f9", payload={}, lane="meeting", max_attempts=2)
+        assert queue.wait_idle(timeout=5)
+        assert queue.list_jobs()[0]["status"] == "failed"
+
+        # A plain duplicate stays ignored; the inbox poller re-arms it
+        queue.enqueue("drive_inbox", key="drive:f9", payload={}, lane="meeting", max_attempts=2)
+        assert queue.wait_idle(timeout=5) and attempts == [1, 2]
+        drive_up.set()
+        queue.enqueue("drive_inbox", key="drive:f9", payload={}, lane="meeting", max_attempts=2,
+                      rearm_failed=True)
+        assert queue.wait_idle(timeout=5)
+        assert attempts == [1, 2, 1]
+        assert queue.list_jobs()[0]["status"] == "done"
+
+    def test_recent_failure_not_rearmed(self, tmp_path):
+        queue = _queue(tmp_path, rearm_after=3600)
+        queue.register("drive_inbox", lambda payload, attempt: 1 / 0)
+        queue.start()
+        queue.enqueue("drive_inbox", key="drive:f8", payload={}, lane="meeting", max_attempts=1)
+        assert queue.wait_idle(timeout=5)
+        queue.enqueue("drive_inbox", key="drive:f8", payload={}, lane="meeting", rearm_failed=True)
+        assert queue.wait_idle(timeout=5)
+        job = queue.list_jobs()[0]
+        assert job["status"] == "failed" and job["attempts"] == 1
+
+    def test_interrupted_jobs_resume_after_restart(self, tmp_path):
+        crashed = _queue(tmp_path)
+        crashed.enqueue("meeting", key="drive:f2", payload={"file_id": "f2"}, lane="meeting")
+        crashed.enqueue("meeting", key="drive:f3", payload={"file_id": "f3"}, lane="meeting", max_attempts=1)
+        with crashed._cond:
+            # Both jobs were claimed by a worker when the container died
+            assert crashed._claim_locked("meeting")["key"] == "drive:f2"
+            assert crashed._claim_locked("meeting")["key"] == "drive:f3"
+
+        seen = []
+        restarted = _queue(tmp_path)
+        restarted.register("meeting", lambda payload, attempt: seen.append((payload["file_id"], attempt)))
+        restarted.start()
+        assert restarted.wait_idle(timeout=5)
+        assert seen == [("f2", 2)]
+        statuses = {job["key"]: job["status"] for job in restarted.list_jobs()}
+        assert statuses == {"drive:f2": "done", "drive:f3": "failed"}
+        assert restarted.get_status()["lanes"]["meeting"]["done"] == 1
+
+    def test_disabled_queue_returns_none(self, tmp_path):
+        queue = AudioJobQueue(db_path=str(tmp_path / "jobs.sqlite3"), enabled=False)
+        assert queue.enqueue("whatsapp_audio", key="wamid.4", payload={}, lane="voice") is None
+        assert queue.get_status() == {"enabled": False}
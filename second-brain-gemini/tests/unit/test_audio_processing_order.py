@@ -355,10 +355,10 @@ class TestRecordingDatePipeline:
 
     def test_search_results_include_timestamp_note_for_estimated_dates(self):
         """search_meetings results must flag estimated timestamps."""
-        source = _read_source(os.path.join(APP_ROOT, "app", "services", "conversation_engine.py"))
+        source = _read_source(os.path.join(APP_ROOT, "app", "services", "meeting_search.py"))
 
         assert "timestamp_note" in source, (
-            "conversation_engine.py must include 'timestamp_note' in search results "
+            "meeting_search.py must include 'timestamp_note' in search results "
             "when the timestamp is estimated, so Gemini tells the user the date "
             "might be wrong instead of confidently stating the processing date."
         )
@@ -0,0 +1,151 @@
+"""
+Unit tests for chunked long-audio transcription.
+
+Diarization segments are synthetic turns; chunk jobs are plain callables
+standing in for the per-chunk Gemini calls.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import chunked_transcription as ct
+
+
+def _turns(duration, turn=20.0, pause_every=7, pause=3.0):
+    """Alternating speakers; every pause_every-th turn is followed by a pause."""
+    segments, t, i = [], 0.0, 0
+    while t < duration:
+        end = min(t + turn, duration)
+        segments.append({"speaker": ["דנה", "יוסי"][i % 2], "start": round(t, 2), "end": round(end, 2)})
+        t = end + (pause if i % pause_every == pause_every - 1 else 0.5)
+        i += 1
+    return segments
+
+
+@pytest.mark.unit
+class TestPlanChunks:
+
+    def test_short_recording_is_one_chunk(self):
+        chunks = ct.plan_chunks(_turns(900), target=600, min_duration=1200)
+        assert len(chunks) == 1 and chunks[0].start == 0 and chunks[0].end is None
+
+    def test_long_recording_cut_in_pauses_near_target(self):
+        segments = _turns(3 * 3600)
+        chunks = ct.plan_chunks(segments, target=600, min_duration=1200)
+        assert 15 <= len(chunks) <= 22
+        assert chunks[-1].end is None
+        for prev, nxt in zip(chunks, chunks[1:]):
+            assert prev.end == nxt.start
+            assert 450 <= prev.end - prev.start <= 750
+            # No turn is split by a cut
+            assert not any(seg["start"] < prev.end < seg["end"] for seg in segments)
+
+    def test_widest_pause_in_window_wins(self):
+        segments = [{"speaker": "A", "start": float(t), "end": float(t + 9)} for t in range(0, 2000, 10)]
+        # A long pause near, but not at, the target
+        segments = [s for s in segments if not 640 <= s["start"] < 680]
+        chunks = ct.plan_chunks(segments, target=600, min_duration=1200)
+        assert chunks[0].end == pytest.approx((639 + 680) / 2)
+
+    def test_no_pause_cuts_at_turn_end_or_target(self):
+        back_to_back = [{"speaker": "A", "start": float(t), "end": float(t + 30)} for t in range(0, 1800, 30)]
+        chunks = ct.plan_chunks(back_to_back, target=600, min_duration=1200)
+        assert chunks[0].end == 600
+        one_turn = [{"speaker": "A", "start": 0.0, "end": 1800.0}]
+        assert ct.plan_chunks(one_turn, target=600, min_duration=1200)[0].end == 600
+
+
+@pytest.mark.unit
+class TestChunkHintsAndMerge:
+
+    def test_hints_are_clipped_and_shifted(self):
+        hints = {"segments": [{"speaker": "A", "start": 590.0, "end": 610.0},
+                              {"speaker": "B", "start": 620.0, "end": 630.0},
+                              {"speaker": "A", "start": 1210.0, "end": 1220.0}],
+                 "speakers": {"SPEAKER_00": {"name": "A"}}}
+        chunk = ct.Chunk(1, 600.0, 1200.0)
+        local = ct.chunk_hints(hints, chunk)
+        assert [(s["speaker"], s["start"], s["end"]) for s in local["segments"]] == [("A", 0.0, 10.0), ("B", 20.0, 30.0)]
+        assert local["speakers"] == hints["speakers"]
+
+    def test_empty_transcript_over_speech_is_rejected(self):
+        chunk = ct.Chunk(1, 600.0, 1200.0)
+        speech = {"segments": [{"speaker": "A", "start": 0.0, "end": 40.0}]}
+        with pytest.raises(RuntimeError, match="no segments"):
+            ct.check_chunk_transcript(chunk, speech, {"segments": []})
+        ct.check_chunk_transcript(chunk, {"segments": []}, {"segments": []})       # Silent chunk
+        ct.check_chunk_transcript(chunk, speech, {"segments": [{"start": 0, "end": 3, "text": "שלום"}]})
+
+    def test_merge_offsets_timestamps_in_chunk_order(self):
+        chunks = [ct.Chunk(0, 0.0, 600.0), ct.Chunk(1, 600.0, None)]
+        results = [{"segments": [{"speaker": "A", "start": 1.0, "end": 5.0, "text": "שלום"}]},
+                   {"segments": [{"speaker": "B", "start": 2.5, "end": 4.0, "text": "היי"},
+                                 {"speaker": "B", "start": None, "end": 4.0, "text": "x"}]}]
+        merged = ct.merge_chunks(chunks, results)
+        assert [(s["start"], s["end"], s["text"]) for s in merged] == [(1.0, 5.0, "שלום"), (602.5, 604.0, "היי")]
+        assert results[1]["segments"][0]["start"] == 2.5     # Inputs are not modified
+
+    def test_speakers_reconciled_by_overlap(self):
+        diarization = [{"speaker": "דנה", "start": 0.0, "end": 10.0},
+                       {"speaker": "יוסי", "start": 10.0, "end": 30.0},
+                       {"speaker": "דנה", "start": 600.0, "end": 640.0}]
+        segments = [{"speaker": "Unknown Speaker 1", "start": 1.0, "end": 9.0},
+                    {"speaker": "דנה", "start": 8.0, "end": 25.0},       # Mostly יוסי
+                    {"speaker": "Speaker 2", "start": 605.0, "end": 610.0},
+                    {"speaker": "Speaker 3", "start": 300.0, "end": 310.0}]   # No diarization turn
+        assert ct.reconcile_speakers(segments, diarization) == 3
+        assert [s["speaker"] for s in segments] == ["דנה", "יוסי", "דנה", "Speaker 3"]
+
+    def test_transcript_text(self):
+        text = ct.transcript_text([{"speaker": "דנה", "start": 65.4, "end": 70, "text": "בוקר טוב"}])
+        assert text == "[01:05] דנה: בוקר טוב"
+
+
+@pytest.mark.unit
+class TestRunChunks:
+
+    def test_chunks_run_in_parallel_and_keep_order(self):
+        chunks = [ct.Chunk(i, i * 600.0, (i + 1) * 600.0) for i in range(ct.CHUNK_WORKERS)]
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def job(chunk):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2 if chunk.index == 0 else 0.05)
+            with lock:
+                active[0] -= 1
+            return chunk.index
+
+        results, timing = ct.run_chunks(chunks, job)
+        assert results == list(range(len(chunks)))
+        assert peak[0] > 1
+        assert timing["wall_s"] < timing["sequential_estimate_s"]
+        assert len(timing["chunk_s"]) == len(chunks)
+
+    def test_failure_is_raised(self):
+        def job(chunk):
+            if chunk.index == 1:
+                raise RuntimeError("chunk 2 blocked")
+            return chunk.index
+
+        with pytest.raises(RuntimeError, match="chunk 2"):
+            ct.run_chunks([ct.Chunk(i, i * 600.0, None) for i in range(3)], job)
+
+    def test_failure_waits_for_running_chunks_and_keeps_timing(self):
+        finished = []
+
+        def job(chunk):
+            if chunk.index == 1:
+                raise RuntimeError("upload rejected")
+            time.sleep(0.2)
+            finished.append(chunk.index)
+            return chunk.index
+
+        with pytest.raises(ct.ChunkRunError) as caught:
+            ct.run_chunks([ct.Chunk(i, i * 600.0, None) for i in range(2)], job)
+        assert finished == [0]          # The running chunk completed before the raise
+        timing = caught.value.timing
+        assert timing["chunk_s"][0] >= 0.2 and timing["chunk_s"][1] is None
+        assert isinstance(caught.value.__cause__, RuntimeError)
@@ -0,0 +1,100 @@
+"""
+Unit tests for the KB context-cache manager.
+
+The Gemini backend (cachedContents create/list, model construction) is
+replaced by a subclass that records calls.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import context_cache as cc
+
+KB_PROMPT = "בסיס ידע " * 1000
+TOOLS = [SimpleNamespace(function_declarations=[SimpleNamespace(name="search_person")])]
+
+
+class _FakeCache:
+    def __init__(self, display_name, minutes=60):
+        self.name = f"cachedContents/{display_name}"
+        self.display_name = display_name
+        self.expire_time = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+        self.updated = 0
+        self.deleted = False
+
+    def update(self, ttl):
+        self.updated += 1
+        self.expire_time = datetime.now(timezone.utc) + ttl
+
+    def delete(self):
+        self.deleted = True
+
+
+class _Manager(cc.ContextCacheManager):
+    def __init__(self, existing=(), fail=False, **kwargs):
+        super().__init__(enabled=True, **kwargs)
+        self.existing = list(existing)
+        self.fail = fail
+        self.created = []
+
+    def _create_cache(self, model_name, display_name, system_instruction, tools):
+        if self.fail:
+            raise RuntimeError("400 cached content too small")
+        cache = _FakeCache(display_name)
+        self.created.append(cache)
+        return cache
+
+    def _list_caches(self):
+        return self.existing + self.created
+
+    def _model_from_cache(self, cache):
+        return ("cached", cache.name)
+
+    def _plain_model(self, model_name, system_instruction, tools):
+        return ("plain", model_name)
+
+
+@pytest.mark.unit
+class TestContextCacheManager:
+
+    def test_same_content_reuses_cache(self):
+        manager = _Manager()
+        first = manager.get_model("gemini-2.5-flash", KB_PROMPT, TOOLS)
+        second = manager.get_model("gemini-2.5-flash", KB_PROMPT, TOOLS)
+        assert first == second and first[0] == "cached"
+        assert len(manager.created) == 1
+
+    def test_kb_change_creates_new_cache_and_retires_old(self, monkeypatch):
+        manager = _Manager()
+        manager.get_model("gemini-2.5-flash", KB_PROMPT, TOOLS)
+        manager.get_model("gemini-2.5-flash", KB_PROMPT + "עובדה חדשה", TOOLS)
+        old, new = manager.created
+        assert manager.get_status()["retired_pending"] == 1
+
+        monkeypatch.setattr(cc, "RETIRE_GRACE_SECONDS", 0)
+        manager.keep_alive()
+        assert old.deleted and not new.deleted
+
+    def test_existing_cache_found_after_restart(self):
+        key = cc.content_key("gemini-2.5-flash", KB_PROMPT, ["search_person"])
+        survivor = _FakeCache(cc.DISPLAY_NAME_PREFIX + key)
+        manager = _Manager(existing=[survivor])
+        assert manager.get_model("gemini-2.5-flash", KB_PROMPT, TOOLS) == ("cached", survivor.name)
+        assert manager.created == []
+
+    def test_failure_falls_back_to_plain_model(self):
+        manager = _Manager(fail=True)
+        assert manager.get_model("gemini-2.5-flash", KB_PROMPT, TOOLS)[0] == "plain"
+        assert manager.get_model("gemini-2.5-flash", "short", TOOLS)[0] == "plain"
+        assert not manager.is_active
+        assert manager.keep_alive()
+
+    def test_keep_alive_extends_only_near_expiry(self):
+        manager = _Manager()
+        manager.get_model("gemini-2.5-flash", KB_PROMPT, TOOLS)
+        cache = manager.created[0]
+        assert manager.keep_alive() and cache.updated == 0
+
+        cache.expire_time = datetime.now(timezone.utc) + timedelta(seconds=30)
+        assert manager.keep_alive() and cache.updated == 1
@@ -0,0 +1,188 @@
+"""
+Unit tests for the content-addressed Gemini file registry.
+
+The Files API (list/delete) is replaced by a subclass; uploads are plain
+callables that return fake file handles.
+"""
+import base64
+import hashlib
+import itertools
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import file_registry as fr
+
+
+class _Registry(fr.GeminiFileRegistry):
+    def __init__(self, existing=()):
+        super().__init__(enabled=True)
+        self.existing = list(existing)
+        self.deleted = []
+        self._thread = object()     # Don't start the janitor thread in tests
+
+    def _list_files(self):
+        return self.existing
+
+    def _delete_file(self, name):
+        self.deleted.append(name)
+
+
+_upload_ids = itertools.count()
+
+
+class _Uploader:
+    def __init__(self, delay=0.0, hours_left=48):
+        self.calls = 0
+        self.delay = delay
+        self.hours_left = hours_left
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return SimpleNamespace(
+            name=f"files/upload{next(_upload_ids)}",
+            state=SimpleNamespace(name="ACTIVE"),
+            expiration_time=datetime.now(timezone.utc) + timedelta(hours=self.hours_left),
+        )
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "voice.mp3"
+    path.write_bytes(b"reference voice bytes" * 100)
+    return str(path)
+
+
+@pytest.mark.unit
+class TestFileRegistry:
+
+    def test_same_bytes_uploaded_once(self, audio, tmp_path):
+        registry, upload = _Registry(), _Uploader()
+        first = registry.acquire(audio, upload)
+        copy = tmp_path / "copy_of_voice.mp3"
+        copy.write_bytes(open(audio, "rb").read())
+        second = registry.acquire(str(copy), upload)
+        assert first is second
+        assert upload.calls == 1
+        assert registry.get_status()["reused"] == 1
+
+    def test_file_near_expiry_is_reuploaded(self, audio):
+        registry, upload = _Registry(), _Uploader(hours_left=1)
+        registry.acquire(audio, upload)
+        registry.acquire(audio, upload)
+        assert upload.calls == 2
+
+    def test_concurrent_acquires_share_one_upload(self, audio):
+        registry, upload = _Registry(), _Uploader(delay=0.2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.acquire(audio, upload)))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert upload.calls == 1
+        assert len({id(r) for r in results}) == 1
+
+    def test_speculative_upload_is_reused_by_the_request(self, audio):
+        # process_audio_core prefetches while pyannote runs; analyze_day acquires mid-upload
+        registry, upload = _Registry(), _Uploader(delay=0.2)
+        prefetched = []
+        prefetch = threading.Thread(target=lambda: prefetched.append(registry.acquire(audio, upload)))
+        prefetch.start()
+        time.sleep(0.05)
+        request_ref = registry.acquire(audio, upload)
+        prefetch.join()
+        assert upload.calls == 1 and prefetched[0] is request_ref
+        registry.release(request_ref)
+        assert registry.get_status()["referenced"] == 1     # The prefetch lease is still held
+        registry.release(prefetched[0])
+        assert registry.get_status()["referenced"] == 0
+        assert registry.is_enabled
+
+    def test_janitor_deletes_only_unreferenced_idle_files(self, audio, tmp_path):
+        registry = _Registry()
+        other = tmp_path / "other.mp3"
+        other.write_bytes(b"other bytes")
+        kept = registry.acquire(audio, _Uploader())
+        released = registry.acquire(str(other), _Uploader())
+        registry.release(released)
+
+        assert registry.run_janitor(idle_seconds=0) == 1
+        assert registry.deleted == [released.name]
+        registry.release(kept)
+        assert registry.run_janitor(idle_seconds=0) == 1
+        assert registry.get_status()["files"] == 0
+
+    def test_drain_deletes_in_batches(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(fr, "JANITOR_BATCH_SIZE", 3)
+        registry = _Registry()
+        for i in range(7):
+            path = tmp_path / f"f{i}.bin"
+            path.write_bytes(f"bytes {i}".encode())
+            registry.release(registry.acquire(str(path), _Uploader()))
+        assert registry.run_janitor(idle_seconds=0) == 3
+        assert registry.run_janitor(idle_seconds=0, drain=True) == 4
+
+    def test_leaked_lease_expires(self, audio, monkeypatch):
+        registry = _Registry()
+        registry.acquire(audio, _Uploader())
+        assert registry.run_janitor(idle_seconds=0) == 0
+        monkeypatch.setattr(fr, "MAX_LEASE_SECONDS", 0)
+        assert registry.run_janitor(idle_seconds=0) == 1
+
+    def test_files_from_before_restart_are_adopted(self, audio):
+        digest = hashlib.sha256(open(audio, "rb").read()).hexdigest()
+        survivor = SimpleNamespace(
+            name="files/survivor", state=SimpleNamespace(name="ACTIVE"),
+            display_name=fr.registry_display_name("voice.mp3"),
+            sha256_hash=digest.encode("ascii"),
+            expiration_time=datetime.now(timezone.utc) + timedelta(hours=40),
+        )
+        registry, upload = _Registry(existing=[survivor]), _Uploader()
+        assert registry.acquire(audio, upload) is survivor
+        assert upload.calls == 0
+
+        # Another deploy on the same key may still be using it
+        registry.release(survivor)
+        assert registry.run_janitor(idle_seconds=0, drain=True) == 0
+        assert registry.deleted == []
+
+    def test_foreign_files_are_never_adopted_or_deleted(self, audio):
+        digest = hashlib.sha256(open(audio, "rb").read()).hexdigest()
+        foreign = SimpleNamespace(
+            name="files/voice-router", state=SimpleNamespace(name="ACTIVE"),
+            display_name="voice_router_upload.ogg",
+            sha256_hash=digest.encode("ascii"),
+            expiration_time=datetime.now(timezone.utc) + timedelta(hours=40),
+        )
+        registry, upload = _Registry(existing=[foreign]), _Uploader()
+        own = registry.acquire(audio, upload)
+        assert own is not foreign and upload.calls == 1
+        registry.release(own)
+        assert registry.run_janitor(idle_seconds=0, drain=True) == 1
+        assert registry.deleted == [own.name]
+
+    def test_api_hash_formats(self):
+        digest = hashlib.sha256(b"x").hexdigest()
+        assert fr._normalize_api_hash(digest.encode()) == digest
+        assert fr._normalize_api_hash(bytes.fromhex(digest)) == digest
+        assert fr._normalize_api_hash(base64.b64encode(digest.encode()).decode()) == digest
+        assert fr._normalize_api_hash("") is None
+
+    def test_processing_upload_shared_then_refreshed_or_discarded(self, audio):
+        registry = _Registry()
+        processing = SimpleNamespace(name="files/p1", state=SimpleNamespace(name="PROCESSING"))
+        assert registry.acquire(audio, lambda: processing) is processing
+        assert registry.acquire(audio, _Uploader()) is processing
+
+        active = SimpleNamespace(name="files/p1", state=SimpleNamespace(name="ACTIVE"))
+        registry.refresh(active)
+        assert registry.acquire(audio, _Uploader()) is active
+
+        registry.discard(active)
+        assert registry.get_status()["files"] == 0
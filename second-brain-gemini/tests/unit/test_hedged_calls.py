@@ -0,0 +1,95 @@
+"""
+Unit tests for hedged Pro/Flash calls and the per-model latency histogram.
+
+Fake callables sleep instead of calling Gemini. The hedge deadline is
+pinned through DEFAULT_HEDGE_AFTER_SECONDS (models with no samples use it).
+"""
+import time
+
+import pytest
+
+from app.services import hedged_calls as hc
+
+
+def _slow(seconds, value="ok", error=None):
+    def _call():
+        time.sleep(seconds)
+        if error:
+            raise error
+        return value
+    return _call
+
+
+@pytest.fixture
+def fast_hedge(monkeypatch):
+    monkeypatch.setattr(hc, "DEFAULT_HEDGE_AFTER_SECONDS", 0.1)
+
+
+@pytest.mark.unit
+class TestHedgedCall:
+
+    def test_fast_primary_wins_without_backup(self, fast_hedge):
+        calls = []
+        result = hc.hedged_call("pro-fast", _slow(0.01, "pro"),
+                                "flash-fast", lambda: calls.append(1) or "flash", timeout=5)
+        assert result == ("pro", "pro-fast")
+        assert calls == []
+
+    def test_backup_wins_when_primary_is_slow(self, fast_hedge):
+        start = time.time()
+        result = hc.hedged_call("pro-slow", _slow(1.5, "pro"),
+                                "flash-quick", _slow(0.05, "flash"), timeout=5)
+        assert result == ("flash", "flash-quick")
+        assert time.time() - start < 1.0
+
+    def test_primary_failure_starts_backup_immediately(self):
+        start = time.time()
+        result = hc.hedged_call("pro-broken", _slow(0, error=RuntimeError("503")),
+                                "flash-ok", _slow(0.05, "flash"), timeout=5)
+        assert result == ("flash", "flash-ok")
+        assert time.time() - start < hc.DEFAULT_HEDGE_AFTER_SECONDS
+
+    def test_empty_primary_answer_is_hedged(self, fast_hedge):
+        result = hc.hedged_call("pro-empty", _slow(0, ""), "flash-full", _slow(0.01, "flash"), timeout=5)
+        assert result == ("flash", "flash-full")
+
+    def test_both_fail_raises_last_error(self, fast_hedge):
+        with pytest.raises(RuntimeError, match="flash down"):
+            hc.hedged_call("pro-down", _slow(0, error=RuntimeError("pro down")),
+                           "flash-down", _slow(0.01, error=RuntimeError("flash down")), timeout=5)
+
+    def test_timeout_when_nothing_answers(self, fast_hedge):
+        with pytest.raises(TimeoutError):
+            hc.hedged_call("pro-hang", _slow(1.0), "flash-hang", _slow(1.0), timeout=0.3)
+
+
+@pytest.mark.unit
+class TestLatencyHistogram:
+
+    def test_quantile_tracks_observations(self):
+        hist = hc.LatencyHistogram()
+        for _ in range(90):
+            hist.observe(1.2)
+        for _ in range(10):
+            hist.observe(25)
+        assert 1.0 <= hist.quantile(0.5) <= 1.5
+        assert hist.quantile(0.99) > 20
+
+    def test_deadline_follows_observed_p90(self):
+        model = "pro-adaptive"
+        assert hc.hedge_deadline(model) == hc.DEFAULT_HEDGE_AFTER_SECONDS
+        for _ in range(hc.MIN_SAMPLES):
+            hc.histogram(model).observe(7.0)
+        assert 6.0 <= hc.hedge_deadline(model) <= 8.0
+
+        for _ in range(hc.MIN_SAMPLES * 15):
+            hc.histogram(model).observe(0.1)
+        assert hc.hedge_deadline(model) == hc.MIN_HEDGE_AFTER_SECONDS
+
+    def test_report_includes_losing_calls(self, fast_hedge):
+        hc.hedged_call("pro-report", _slow(0.4, "pro"), "flash-report", _slow(0.01, "flash"), timeout=5)
+        time.sleep(0.5)
+        report = hc.get_latency_report()
+        assert report["models"]["pro-report"]["samples"] == 1
+        assert report["models"]["flash-report"]["samples"] == 1
+        assert report["hedging"]["backup_won"] >= 1
@@ -0,0 +1,95 @@
+"""
+Unit tests for token-budgeted chat-history compaction.
+
+Entries are SimpleNamespace stand-ins shaped like genai.protos.Content.
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import history_compactor as hc
+from app.services.session_checkpoint import serialize_history
+
+
+def _text(role, text):
+    return SimpleNamespace(role=role, parts=[SimpleNamespace(text=text)])
+
+
+def _tool_call(name="search_meetings"):
+    fc = SimpleNamespace(name=name, args={"query": "יובל"})
+    return SimpleNamespace(role="model", parts=[SimpleNamespace(text="", function_call=fc)])
+
+
+def _tool_response(payload, name="search_meetings"):
+    fr = SimpleNamespace(name=name, response={"result": payload})
+    return SimpleNamespace(role="user", parts=[SimpleNamespace(text="", function_response=fr)])
+
+
+def _exchange(i, payload_chars=0):
+    entries = [_text("user", f"question {i}")]
+    if payload_chars:
+        entries += [_tool_call(), _tool_response("x" * payload_chars)]
+    entries.append(_text("model", f"answer {i}"))
+    return entries
+
+
+@pytest.mark.unit
+class TestCompaction:
+
+    def test_small_history_untouched(self):
+        history = _exchange(1) + _exchange(2)
+        stats = hc.compact_history(history, token_budget=1000)
+        assert len(history) == 4
+        assert stats["elided"] == stats["dropped"] == 0
+
+    def test_old_tool_payload_is_elided_recent_kept(self):
+        history = _exchange(1, payload_chars=30000) + _exchange(2, payload_chars=30000)
+        stats = hc.compact_history(history, token_budget=15000)
+
+        old_payload = history[2].parts[0].function_response.response["result"]
+        recent_payload = history[-2].parts[0].function_response.response["result"]
+        assert old_payload.startswith(hc.ELIDED_MARKER)
+        assert len(recent_payload) == 30000
+        assert stats["elided"] == 1
+        assert stats["after"] <= 15000
+
+    def test_drops_oldest_exchanges_to_fit_budget(self):
+        history = []
+        for i in range(30):
+            history += _exchange(i)
+        hc.compact_history(history, token_budget=40)
+
+        assert sum(hc.entry_tokens(c) for c in history) <= 40
+        assert history[0].parts[0].text.startswith("question")
+        assert history[-1].parts[0].text == "answer 29"
+
+    def test_never_starts_on_tool_response(self):
+        history = _exchange(1, payload_chars=600) + _exchange(2, payload_chars=600) + _exchange(3)
+        hc.compact_history(history, token_budget=50)
+        assert history[0].role == "user"
+        assert history[0].parts[0].text
+
+    def test_recent_window_is_never_dropped(self):
+        history = _exchange(1, payload_chars=60000)
+        hc.compact_history(history, token_budget=10)
+        assert len(history) == 4
+
+
+@pytest.mark.unit
+class TestRequestParts:
+
+    def test_kb_passages_not_kept_in_history(self):
+        header = "[📚 קטעים רלוונטיים מבסיס הידע:]"
+        turn = SimpleNamespace(role="user", parts=[SimpleNamespace(text="מי מנהל את יובל?"),
+                                                   SimpleNamespace(text=f"{header}\n" + "קטע " * 500)])
+        history = [turn, _text("model", "דנה.")]
+        assert hc.strip_request_parts(history, header) == 1
+        assert serialize_history(history, max_turns=20) == [
+            {"role": "user", "parts": ["מי מנהל את יובל?"]},
+            {"role": "model", "parts": ["דנה."]},
+        ]
+
+    def test_model_text_with_prefix_is_kept(self):
+        history = [_text("model", "[📚 ציטוט]")]
+        assert hc.strip_request_parts(history, "[📚") == 0
+        assert history[0].parts
@@ -0,0 +1,93 @@
+"""
+Unit tests for the unified identity graph builder and reporting-line index.
+
+Verifies that edges resolve via the id→node lookup, direct_reports are
+deduplicated, and get_all_reports_under answers from the cached closure.
+"""
+import pytest
+
+from app.services import knowledge_base_service as kb
+
+
+def _org(nodes, edges):
+    return {"nodes": nodes, "edges": edges, "hierarchy_tree": {}, "name_mappings": {}}
+
+
+def _node(node_id, name, reports_to=None):
+    return {"id": node_id, "full_name": name, "reports_to_name": reports_to, "title": "T"}
+
+
+@pytest.fixture(autouse=True)
+def reset_graph():
+    kb._identity_graph = None
+    yield
+    kb._identity_graph = None
+
+
+@pytest.mark.unit
+class TestIdentityGraphBuild:
+    """Test _rebuild_identity_graph edge resolution."""
+
+    def test_edges_resolve_to_direct_reports(self):
+        kb._rebuild_identity_graph(_org(
+            [_node(1, "Alice"), _node(2, "Bob", "Alice"), _node(3, "Carol", "Alice")],
+            [{"from_id": 1, "to_id": 2}, {"from_id": 1, "to_id": 3}],
+        ))
+        people = kb.get_identity_graph()["people"]
+        assert people["Alice"]["direct_reports"] == ["Bob", "Carol"]
+        assert people["Bob"]["direct_reports"] == []
+
+    def test_duplicate_edges_are_deduplicated(self):
+        kb._rebuild_identity_graph(_org(
+            [_node(1, "Alice"), _node(2, "Bob", "Alice")],
+            [{"from_id": 1, "to_id": 2}] * 3,
+        ))
+        assert kb.get_identity_graph()["people"]["Alice"]["direct_reports"] == ["Bob"]
+
+    def test_unknown_edge_ids_are_ignored(self):
+        kb._rebuild_identity_graph(_org(
+            [_node(1, "Alice")],
+            [{"from_id": 1, "to_id": 99}, {"from_id": 42, "to_id": 1}],
+        ))
+        assert kb.get_identity_graph()["people"]["Alice"]["direct_reports"] == []
+
+
+@pytest.mark.unit
+class TestReportsClosure:
+    """Test get_all_reports_under via the precomputed closure."""
+
+    def test_transitive_reports_in_preorder(self):
+        kb._rebuild_identity_graph(_org(
+            [_node(1, "Alice"), _node(2, "Bob", "Alice"),
+             _node(3, "Dan", "Bob"), _node(4, "Carol", "Alice")],
+            [],
+        ))
+        assert kb.get_all_reports_under("Alice") == ["Bob", "Dan", "Carol"]
+        assert kb.get_all_reports_under("Bob") == ["Dan"]
+        assert kb.get_all_reports_under("Dan") == []
+
+    def test_closure_refreshes_after_merge(self):
+        kb._rebuild_identity_graph(_org([_node(1, "Alice"), _node(2, "Bob", "Alice")], []))
+        assert kb.get_all_reports_under("Alice") == ["Bob"]
+
+        kb._merge_json_into_identity_graph(
+            {"people": [{"name": "Eve", "reports_to": "Bob"}]},
+            source_file_name="org_structure.json",
+        )
+        assert kb.get_all_reports_under("Alice") == ["Bob", "Eve"]
+
+    def test_returned_list_is_a_copy(self):
+        kb._rebuild_identity_graph(_org([_node(1, "Alice"), _node(2, "Bob", "Alice")], []))
+        kb.get_all_reports_under("Alice").append("Mallory")
+        assert kb.get_all_reports_under("Alice") == ["Bob"]
+
+    def test_cycle_does_not_recurse_forever(self):
+        kb._rebuild_identity_graph(_org(
+            [_node(1, "Alice", "Bob"), _node(2, "Bob", "Alice")],
+            [],
+        ))
+        assert kb.get_all_reports_under("Alice") == ["Bob"]
+        assert kb.get_all_reports_under("Bob") == ["Alice"]
+
+    def test_empty_graph(self):
+        assert kb.get_all_reports_under("Anyone") == []
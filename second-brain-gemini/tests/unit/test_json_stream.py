@@ -0,0 +1,138 @@
+"""
+Unit tests for the incremental, tolerant JSON parser.
+
+Responses are synthetic Hebrew transcripts shaped like the Gemini
+failure modes: code fences, prose around the object, raw newlines inside
+strings, trailing commas and output cut off mid-segment.
+"""
+import json
+import time
+
+import pytest
+
+from app.services.json_stream import StreamingJSONParser, parse_tolerant
+
+
+def _segments(count):
+    return [
+        {"speaker": f"דובר {i % 3}", "start": i * 4.5, "end": i * 4.5 + 4.0,
+         "text": f"זה משפט מספר {i} \"בציטוט\" עם ניקוד, סימנים \\ ואימוג'י 🎙️"}
+        for i in range(count)
+    ]
+
+
+def _transcript(count=20):
+    return {"segments": _segments(count), "summary": "סיכום קצר",
+            "expert_summary": "🧠 הכובע שנבחר: אסטרטג\nשורה שנייה"}
+
+
+@pytest.mark.unit
+class TestTolerantParsing:
+
+    def test_valid_json_matches_json_loads(self):
+        text = json.dumps(_transcript(), ensure_ascii=False)
+        value, parser = parse_tolerant(text)
+        assert value == json.loads(text)
+        assert parser.complete and not parser.truncated and parser.repairs == 0
+
+    def test_fences_and_prose_are_skipped(self):
+        body = json.dumps(_transcript(3), ensure_ascii=False, indent=2)
+        text = f"הנה התמלול:\n```json\n{body}\n```\nהערה: התמלול חלקי."
+        assert parse_tolerant(text)[0] == _transcript(3)
+
+    def test_raw_newlines_and_invalid_escapes_in_strings(self):
+        text = '{"segments": [{"text": "שורה א\nשורה ב\tטאב \\q"}]}'
+        value, parser = parse_tolerant(text)
+        assert value["segments"][0]["text"] == "שורה א\nשורה ב\tטאב q"
+        assert parser.repairs == 1
+
+    def test_trailing_and_missing_commas(self):
+        text = '{"segments": [{"a": 1,}, {"a": 2} {"a": 3},], "x": [1 2,],}'
+        value, parser = parse_tolerant(text)
+        assert value == {"segments": [{"a": 1}, {"a": 2}, {"a": 3}], "x": [1, 2]}
+        assert parser.repairs >= 4
+
+    def test_truncated_string_value_is_kept(self):
+        value, parser = parse_tolerant('{"executive_summary": "סיכום שנקטע באמצ', stream_path=())
+        assert value == {"executive_summary": "סיכום שנקטע באמצ"}
+        assert parser.truncated
+
+    def test_no_json_returns_none(self):
+        assert parse_tolerant("מצטער, לא הצלחתי לתמלל")[0] is None
+        assert parse_tolerant("")[0] is None
+
+
+@pytest.mark.unit
+class TestTruncationFuzz:
+
+    def test_every_prefix_parses_to_a_prefix_of_segments(self):
+        full = _transcript(12)
+        text = "```json\n" + json.dumps(full, ensure_ascii=False) + "\n```"
+        for cut in range(len(text) + 1):
+            value, _ = parse_tolerant(text[:cut])
+            if value is None:
+                continue
+            segments = value.get("segments", [])
+            assert segments == full["segments"][:len(segments)], f"cut at {cut}"
+
+    def test_truncation_in_pretty_printed_json(self):
+        full = _transcript(6)
+        text = json.dumps(full, ensure_ascii=False, indent=2)
+        seen = set()
+        for cut in range(0, len(text), 7):
+            value, parser = parse_tolerant(text[:cut])
+            if isinstance(value, dict):
+                seen.add(len(value.get("segments", [])))
+                assert parser.truncated or cut >= len(text) - 1
+        assert seen >= set(range(7))
+
+
+@pytest.mark.unit
+class TestStreaming:
+
+    def test_chunked_feed_equals_one_shot(self):
+        text = json.dumps(_transcript(30), ensure_ascii=False)
+        for size in (1, 3, 17, 256):
+            parser = StreamingJSONParser()
+            streamed = []
+            for i in range(0, len(text), size):
+                streamed.extend(parser.feed(text[i:i + size]))
+            assert parser.finish() == json.loads(text)
+            assert streamed == _segments(30)
+
+    def test_segments_arrive_before_the_response_ends(self):
+        text = json.dumps(_transcript(10), ensure_ascii=False)
+        parser = StreamingJSONParser()
+        half = parser.feed(text[:len(text) // 2])
+        assert 0 < len(half) < 10
+        rest = parser.feed(text[len(text) // 2:])
+        assert half + rest == _segments(10)
+        assert parser.items == 10
+
+    def test_split_unicode_escape_and_number(self):
+        text = '{"segments": [{"text": "\\u05d0\\u05d1", "start": 12.75}]}'
+        parser = StreamingJSONParser()
+        for ch in text:
+            parser.feed(ch)
+        assert parser.finish() == {"segments": [{"text": "אב", "start": 12.75}]}
+
+
+@pytest.mark.unit
+class TestPerformance:
+
+    def test_large_response_is_parsed_in_linear_time(self):
+        small = json.dumps(_transcript(250), ensure_ascii=False)
+        large = json.dumps(_transcript(2000), ensure_ascii=False)
+        assert len(large) > 200_000
+
+        def timed(text):
+            start = time.perf_counter()
+            value, _ = parse_tolerant(text[:-40])   # Truncated, like a max_output_tokens cut
+            return time.perf_counter() - start, value
+
+        small_s, _ = timed(small)
+        large_s, value = timed(large)
+        assert len(value["segments"]) == 2000
+        assert large_s < 2.0
+        # 8x the input should cost roughly 8x, not 64x
+        assert large_s < max(small_s, 0.001) * 30
@@ -0,0 +1,108 @@
+"""
+Unit tests for the chunked KB store and token-budgeted context assembly.
+
+Sections are injected directly via _set_sections — no Drive, no Gemini.
+"""
+import pytest
+
+from app.services import knowledge_base_service as kb
+
+
+ORG = "══ org_structure.json ══\n" + "\n".join(
+    f'{{"name": "Employee {i}", "title": "Engineer"}}' for i in range(200)
+)
+SCHEDULE = "══ schedule.png ══\nיום ראשון: חוג שחייה עם נועה\nיום שני: כדורגל"
+NOTES = "══ random_notes.pdf ══\n" + "\n".join(f"note line {i} about budget planning" for i in range(100))
+
+
+@pytest.fixture(autouse=True)
+def kb_store():
+    kb._set_sections([ORG, SCHEDULE, NOTES])
+    yield
+    kb._set_sections([])
+
+
+@pytest.mark.unit
+class TestPassageSplitting:
+
+    def test_passages_respect_max_chars(self):
+        for passage in kb._passage_index.passages:
+            assert len(passage["text"]) <= kb.PASSAGE_MAX_CHARS
+
+    def test_long_line_is_hard_split(self):
+        parts = kb._split_passages("x" * 2500, max_chars=1000)
+        assert [len(p) for p in parts] == [1000, 1000, 500]
+
+    def test_full_budget_reproduces_all_sections(self):
+        assembled = kb._assemble_context(None, token_budget=10**6)
+        assert assembled == "\n\n".join([ORG, SCHEDULE, NOTES])
+
+
+@pytest.mark.unit
+class TestBudgetedAssembly:
+
+    def test_output_stays_under_budget(self):
+        budget = 500
+        assembled = kb._assemble_context(None, token_budget=budget)
+        assert assembled
+        assert kb._estimate_tokens(assembled) <= budget + 10
+
+    def test_priority_order_without_query(self):
+        """Org/JSON data is kept first when the budget is tight."""
+        assembled = kb._assemble_context(None, token_budget=400)
+        assert assembled.startswith("══ org_structure.json ══")
+        assert "random_notes" not in assembled
+
+    def test_query_pulls_relevant_passage(self):
+        """A low-priority section wins the budget when it matches the query."""
+        assembled = kb._assemble_context("budget planning", token_budget=400)
+        assert "budget planning" in assembled
+
+    def test_hebrew_prefix_matches(self):
+        """'לנועה' (with ל prefix) should retrieve the passage mentioning 'נועה'."""
+        scores = kb._passage_index.score("מה יש לנועה?")
+        assert scores
+        best = max(scores, key=scores.get)
+        assert "נועה" in kb._passage_index.passages[best]["text"]
+
+    def test_sections_emitted_in_document_order(self):
+        assembled = kb._assemble_context("שחייה budget", token_budget=10**6)
+        assert assembled.index("org_structure") < assembled.index("schedule.png") < assembled.index("random_notes")
+
+    def test_empty_store(self):
+        kb._set_sections([])
+        assert kb._assemble_context("anything", token_budget=1000) == ""
+
+
+@pytest.mark.unit
+class TestQuerySupplement:
+
+    def test_supplement_adds_only_passages_missing_from_default_block(self, monkeypatch):
+        monkeypatch.setattr(kb, "KB_CONTEXT_TOKEN_BUDGET", 400)
+        monkeypatch.setattr(kb, "_cached_context", "loaded")
+        monkeypatch.setattr(kb, "_cache_timestamp", 10**12)
+        default = kb._assemble_context(None, 400)
+        assert "budget planning" not in default
+
+        supplement = kb.get_query_supplement("budget planning", token_budget=600)
+        assert supplement.startswith("══ random_notes.pdf ══")
+        assert "Employee" not in supplement
+        assert kb._estimate_tokens(supplement) <= 610
+
+    def test_no_supplement_for_unmatched_query(self, monkeypatch):
+        monkeypatch.setattr(kb, "_cached_context", "loaded")
+        monkeypatch.setattr(kb, "_cache_timestamp", 10**12)
+        assert kb.get_query_supplement("xyzzy") == ""
+
+    def test_postings_score_matches_full_scan(self):
+        index = kb._passage_index
+        scores = index.score("budget Engineer נועה")
+        for idx, passage in enumerate(index.passages):
+            expected = 0.0
+            for term in set(kb.tokenize("budget Engineer נועה")):
+                tf = passage["tf"].get(term, 0)
+                if tf:
+                    df = len(index.postings[term])
+                    idf = kb.math.log(1 + (len(index.passages) - df + 0.5) / (df + 0.5))
+                    expected += idf * tf * (index.K1 + 1) / (tf + index.norms[idx])
+            assert scores.get(idx, 0.0) == pytest.approx(expected)
@@ -0,0 +1,131 @@
+"""
+Unit tests for the persisted KB snapshot (fast cold start).
+
+The snapshot path is redirected to a tmp dir — nothing touches Drive.
+"""
+import pickle
+import pytest
+
+from app.services import knowledge_base_service as kb
+
+
+@pytest.fixture(autouse=True)
+def snapshot_path(tmp_path, monkeypatch):
+    path = tmp_path / "kb_snapshot.pkl"
+    monkeypatch.setattr(kb, "KB_SNAPSHOT_PATH", path)
+    yield path
+    kb._identity_graph = None
+    kb._cached_context = None
+    kb._cache_timestamp = 0
+    kb._cached_file_list = []
+    kb._set_sections([])
+
+
+def _populate():
+    kb._rebuild_identity_graph({
+        "nodes": [{"id": 1, "full_name": "Alice"},
+                  {"id": 2, "full_name": "Bob", "reports_to_name": "Alice"}],
+        "edges": [{"from_id": 1, "to_id": 2}],
+    })
+    kb._set_sections(["══ org_structure.json ══\n{\"name\": \"Alice\"}"])
+    kb._cached_file_list = ["org_structure.json"]
+    kb._cached_file_count = 1
+
+
+@pytest.mark.unit
+class TestKBSnapshot:
+
+    def test_roundtrip_restores_graph_and_context(self):
+        _populate()
+        assert kb._save_snapshot()
+
+        kb._identity_graph = None
+        kb._set_sections([])
+        kb._cached_context = None
+
+        assert kb.load_snapshot()
+        assert "Alice" in kb.get_identity_graph()["people"]
+        assert kb.get_identity_graph()["name_map"]["bob"] == "Bob"
+        assert kb.get_all_reports_under("Alice") == ["Bob"]
+        assert "org_structure.json" in kb.load_context()
+        assert kb._passage_index.passages
+
+    def test_missing_snapshot(self):
+        assert not kb.load_snapshot()
+
+    def test_schema_mismatch_is_ignored(self, snapshot_path):
+        _populate()
+        kb._save_snapshot()
+        payload = pickle.loads(snapshot_path.read_bytes())
+        payload["schema_version"] = kb.KB_SNAPSHOT_SCHEMA_VERSION + 1
+        snapshot_path.write_bytes(pickle.dumps(payload))
+
+        assert not kb.load_snapshot()
+
+    def test_other_folder_is_ignored(self, monkeypatch):
+        _populate()
+        kb._save_snapshot()
+        monkeypatch.setenv("CONTEXT_FOLDER_ID", "some-other-folder")
+
+        assert not kb.load_snapshot()
+
+    def test_corrupt_snapshot_is_ignored(self, snapshot_path):
+        snapshot_path.write_bytes(b"not a pickle")
+        assert not kb.load_snapshot()
+
+    def test_fingerprint_tracks_content(self):
+        _populate()
+        before = kb._context_fingerprint()
+        kb._set_sections(["══ org_structure.json ══\n{\"name\": \"Carol\"}"])
+        assert kb._context_fingerprint() != before
+
+
+def _drive(monkeypatch, list_files):
+    monkeypatch.setattr(kb, "_get_context_folder_id", lambda: "kb-folder")
+    monkeypatch.setattr(kb, "_get_drive_service", lambda: object())
+    monkeypatch.setattr(kb, "_list_drive_files", lambda service, folder_id: list_files())
+
+
+@pytest.mark.unit
+class TestKBRevalidation:
+
+    @pytest.mark.parametrize("failure", ["list_error", "no_service"])
+    def test_failed_reload_keeps_snapshot(self, monkeypatch, failure):
+        _populate()
+        kb._cached_context = kb._assemble_context(None, kb.KB_CONTEXT_TOKEN_BUDGET)
+        before = kb._context_fingerprint()
+
+        def broken():
+            raise ConnectionError("drive down")
+
+        _drive(monkeypatch, broken)
+        if failure == "no_service":
+            monkeypatch.setattr(kb, "_get_drive_service", lambda: None)
+        changed = []
+        kb.revalidate_in_background(on_change=lambda: changed.append(1)).join(timeout=5)
+
+        assert not changed
+        assert kb._context_fingerprint() == before
+        assert kb.get_all_reports_under("Alice") == ["Bob"]
+
+    def test_reload_builds_graph_aside_and_swaps(self, monkeypatch):
+        _populate()
+        kb._cached_context = kb._assemble_context(None, kb.KB_CONTEXT_TOKEN_BUDGET)
+        seen_during_load = []
+
+        def download(service, file_id, file_name, mime_type):
+            text = kb._extract_json_text(b'{"people": [{"name": "Carol", "reports_to": "Dana"}]}',
+                                         file_name=file_name)
+            seen_during_load.append(set(kb.get_identity_graph()["people"]))
+            return text
+
+        _drive(monkeypatch, lambda: [{"id": "f1", "name": "org_structure.json", "mimeType": "application/json"}])
+        monkeypatch.setattr(kb, "_download_file_content", download)
+        changed = []
+        kb.revalidate_in_background(on_change=lambda: changed.append(1)).join(timeout=5)
+
+        assert seen_during_load == [{"Alice", "Bob"}]      # Readers kept the old graph
+        assert set(kb.get_identity_graph()["people"]) == {"Carol"}
+        assert kb.get_all_reports_under("Dana") == ["Carol"]
+        assert "UNIFIED IDENTITY GRAPH" in kb.load_context()
+        assert changed == [1]
@@ -0,0 +1,131 @@
+"""
+Unit tests for the unified meeting-search index.
+"""
+import pytest
+
+from app.services import meeting_search as ms
+from app.services.tool_cache import bump_data_version
+
+
+def _transcript(timestamp, segments, summary="", speakers=None, analysis=""):
+    return {
+        "filename": f"transcript_{timestamp}.json",
+        "created_time": timestamp,
+        "content": {
+            "timestamp": timestamp,
+            "segments": [{"speaker": s, "text": t} for s, t in segments],
+            "summary": summary,
+            "speakers": speakers or sorted({s for s, _ in segments}),
+            "expert_analysis": analysis,
+        },
+    }
+
+
+TRANSCRIPTS = [
+    _transcript("2025-01-10T09:00:00Z", [("יובל", "צריך לסגור את התקציב לרבעון"),
+                                         ("Me", "נדבר על זה מחר")],
+                summary="פגישת תקציב עם יובל"),
+    _transcript("2025-02-20T09:00:00Z", [("דנה", "החופשה שלי מתחילה ביוני"),
+                                         ("Me", "מעולה")],
+                summary="תיאום חופשות"),
+    _transcript("2025-03-05T09:00:00Z", [("Yuval", "the budget review moved to Sunday")]),
+]
+
+
+def _index(chat_history=None, last_sessions=None):
+    return ms.build_meeting_index(TRANSCRIPTS, last_sessions or {}, chat_history or [])
+
+
+@pytest.mark.unit
+class TestMeetingSearchIndex:
+
+    def test_ranked_hit_with_prefix_stripped_hebrew(self):
+        result = _index().search(query="בתקציב")
+        assert result["meetings"][0]["timestamp"] == "2025-01-10T09:00:00Z"
+        assert result["meetings"][0]["key_segments"][0]["speaker"] == "יובל"
+
+    def test_speaker_filter_matches_transliteration(self):
+        result = _index().search(query="", speaker_name="Yuval")
+        timestamps = [m["timestamp"] for m in result["meetings"]]
+        assert timestamps == ["2025-03-05T09:00:00Z", "2025-01-10T09:00:00Z"]   # newest first
+
+    def test_date_range_filter(self):
+        result = _index().search(query="budget תקציב", date_from="2025-03-01", date_to="2025-03-31")
+        assert [m["timestamp"] for m in result["meetings"]] == ["2025-03-05T09:00:00Z"]
+
+    def test_sources_merge_into_one_meeting(self):
+        chat_history = [{
+            "type": "audio",
+            "timestamp": "2025-02-20T09:00:00Z",
+            "speakers": ["דנה", "Me"],
+            "summary": "תיאום חופשות",
+            "expert_analysis": {"raw_analysis": "דנה יוצאת לחופשה ארוכה"},
+        }]
+        last_sessions = {"972500000000": {"timestamp": "2025-02-20T09:00:00Z",
+                                          "summary": "תיאום חופשות", "speakers": ["דנה"]}}
+        result = _index(chat_history, last_sessions).search(query="חופשה")
+
+        assert result["total_matches"] == 1
+        meeting = result["meetings"][0]
+        assert set(meeting["sources"]) == {"transcripts_folder", "chat_history", "working_memory"}
+        assert meeting["expert_summary"].startswith("דנה")
+
+    def test_payload_is_bounded(self):
+        segments = [("Me", "תקציב " + "x" * 1000)] * 50
+        transcripts = [_transcript(f"2025-04-{d:02d}T09:00:00Z", segments, summary="y" * 2000)
+                       for d in range(1, 20)]
+        result = ms.build_meeting_index(transcripts, {}, []).search(query="תקציב")
+
+        assert len(result["meetings"]) <= ms.MAX_MEETINGS
+        for meeting in result["meetings"]:
+            assert len(meeting["summary"]) <= ms.SUMMARY_CHARS
+            assert len(meeting["key_segments"]) <= ms.MAX_SNIPPETS_PER_MEETING
+            assert all(len(s["text"]) <= ms.SNIPPET_CHARS for s in meeting["key_segments"])
+
+
+@pytest.mark.unit
+class TestMeetingSearchService:
+
+    def test_index_rebuilt_only_on_version_change(self):
+        class _Drive:
+            loads = 0
+
+            def get_recent_transcripts(self, limit):
+                self.loads += 1
+                return TRANSCRIPTS
+
+            def get_memory(self):
+                return {"chat_history": []}
+
+        drive = _Drive()
+        service = ms.MeetingSearchService()
+        service.search("תקציב", drive_memory_service=drive, last_sessions={})
+        service.search("חופשה", drive_memory_service=drive, last_sessions={})
+        assert drive.loads == 1
+
+        bump_data_version("meetings", "test")
+        service.search("תקציב", drive_memory_service=drive, last_sessions={})
+        assert drive.loads == 2
+
+    def test_failed_drive_build_is_retried_soon(self, monkeypatch):
+        class _FlakyDrive:
+            loads = 0
+
+            def get_recent_transcripts(self, limit):
+                self.loads += 1
+                return [] if self.loads == 1 else TRANSCRIPTS     # Errors come back as []
+
+            def get_memory(self):
+                return {"chat_history": []}
+
+        clock = [1000.0]
+        monkeypatch.setattr(ms.time, "time", lambda: clock[0])
+        drive = _FlakyDrive()
+        service = ms.MeetingSearchService()
+        assert not service.search("תקציב", drive_memory_service=drive, last_sessions={})["meetings"]
+        assert service.get_status()["ttl_seconds"] == ms.MEETING_INDEX_RETRY_SECONDS
+
+        clock[0] += ms.MEETING_INDEX_RETRY_SECONDS + 1
+        assert service.search("תקציב", drive_memory_service=drive, last_sessions={})["meetings"]
+        assert drive.loads == 2
+        assert service.get_status()["ttl_seconds"] == ms.MEETING_INDEX_TTL_SECONDS
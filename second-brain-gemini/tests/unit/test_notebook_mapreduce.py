@@ -0,0 +1,119 @@
+"""
+Unit tests for map-reduce NotebookLM analysis helpers.
+
+The map step's model call is a plain callable; the chunk cache writes
+to a pytest tmp_path.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import notebook_mapreduce as nm
+
+
+def _transcript(lines=400):
+    return "\n".join(f"{['דנה', 'יוסי'][i % 2]}: זו שורה מספר {i} בפגישה הארוכה על התקציב" for i in range(lines))
+
+
+@pytest.mark.unit
+class TestSplitTranscript:
+
+    def test_full_coverage_on_line_boundaries(self):
+        text = _transcript()
+        chunks = nm.split_transcript(text, max_chars=2000)
+        assert len(chunks) > 5
+        assert all(len(chunk) <= 2000 for chunk in chunks)
+        assert "\n".join(chunks) == text
+
+    def test_deterministic(self):
+        text = _transcript()
+        assert nm.split_transcript(text, 1500) == nm.split_transcript(text, 1500)
+
+    def test_overlong_line_cut_at_space(self):
+        line = "דנה: " + " ".join(["מילה"] * 500)
+        chunks = nm.split_transcript("קצר\n" + line, max_chars=300)
+        assert chunks[0] == "קצר"
+        assert all(len(chunk) <= 300 for chunk in chunks)
+        assert " ".join(chunks[1:]).split() == line.split()
+
+
+@pytest.mark.unit
+class TestMapChunks:
+
+    def test_chunks_summarized_in_parallel_and_in_order(self, tmp_path):
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def summarize(chunk):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {"summary": chunk[:10]}, False
+
+        chunks = [f"קטע {i}" for i in range(nm.MAP_WORKERS * 2)]
+        summaries, stats = nm.map_chunks(chunks, summarize, "flash", nm.ChunkSummaryCache(directory=str(tmp_path)))
+        assert [s["summary"] for s in summaries] == chunks
+        assert peak[0] > 1
+        assert stats["summarized"] == len(chunks) and stats["coverage"] == 1.0
+
+    def test_reanalysis_reuses_cached_chunks(self, tmp_path):
+        calls = []
+
+        def summarize(chunk):
+            calls.append(chunk)
+            return {"summary": f"סיכום של {chunk}"}, False
+
+        cache = nm.ChunkSummaryCache(directory=str(tmp_path))
+        first, _ = nm.map_chunks(["א", "ב"], summarize, "flash", cache)
+        second, stats = nm.map_chunks(["א", "ב", "ג"], summarize, "flash", cache)
+        assert calls == ["א", "ב", "ג"]
+        assert second[:2] == first and stats["cached"] == 2
+
+        # A new process (empty memory) reads the same summaries from disk
+        restarted = nm.ChunkSummaryCache(directory=str(tmp_path))
+        _, stats = nm.map_chunks(["א", "ב", "ג"], summarize, "flash", restarted)
+        assert stats["cached"] == 3 and len(calls) == 3
+
+        # Another model or prompt version is a different key
+        nm.map_chunks(["א"], summarize, "pro", cache)
+        assert len(calls) == 4
+
+    def test_failed_chunk_is_skipped_unless_all_fail(self):
+        def summarize(chunk):
+            if chunk == "רע":
+                raise RuntimeError("safety block")
+            return {"summary": chunk}, False
+
+        summaries, stats = nm.map_chunks(["טוב", "רע", "טוב2"], summarize, "flash", cache=None)
+        assert summaries[1] is None and stats["failed"] == [2]
+        assert stats["coverage"] == pytest.approx(0.667, abs=0.001)
+        assert "(לא זמין)" in nm.format_chunk_summaries(summaries)
+
+        with pytest.raises(RuntimeError):
+            nm.map_chunks(["רע"], summarize, "flash", cache=None)
+
+    def test_truncated_summary_used_but_not_cached(self, tmp_path):
+        calls = []
+
+        def summarize(chunk):
+            calls.append(chunk)
+            return {"summary": "חצי"}, len(calls) == 1
+
+        cache = nm.ChunkSummaryCache(directory=str(tmp_path))
+        summaries, stats = nm.map_chunks(["א"], summarize, "flash", cache)
+        assert summaries == [{"summary": "חצי"}] and stats["truncated"] == 1
+        _, stats = nm.map_chunks(["א"], summarize, "flash", cache)
+        assert len(calls) == 2 and stats["cached"] == 0 and stats["truncated"] == 0
+        _, stats = nm.map_chunks(["א"], summarize, "flash", cache)
+        assert len(calls) == 2 and stats["cached"] == 1
+
+    def test_cache_lru_bound(self):
+        cache = nm.ChunkSummaryCache(max_entries=2, directory=None)
+        for key in ("a", "b", "c"):
+            cache.put(key, {"k": key})
+        assert cache.get("a") is None
+        assert cache.get("c") == {"k": "c"}
+        assert cache.stats()["entries"] == 2
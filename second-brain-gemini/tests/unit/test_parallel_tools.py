@@ -0,0 +1,56 @@
+"""
+Unit tests for concurrent execution of one Gemini turn's function calls.
+
+A recording fake replaces _execute_tool — no KB, Drive or Gemini calls.
+"""
+import json
+import threading
+import time
+
+import pytest
+
+from app.services import tool_runner
+from app.services.tool_runner import run_tool_calls
+
+
+@pytest.fixture
+def fake_execute():
+    threads = {}
+
+    def execute(name, args):
+        threads[name] = threading.current_thread().name
+        time.sleep(args.get("sleep", 0))
+        return f"{name}:{args.get('name', '')}"
+
+    execute.threads = threads
+    return execute
+
+
+@pytest.mark.unit
+class TestParallelToolCalls:
+
+    def test_results_returned_in_call_order(self, fake_execute):
+        results = run_tool_calls([
+            ("search_person", {"name": "יובל", "sleep": 0.1}),
+            ("get_reports", {"name": "שי"}),
+        ], fake_execute)
+        assert results == ["search_person:יובל", "get_reports:שי"]
+
+    def test_wall_clock_is_max_not_sum(self, fake_execute):
+        start = time.time()
+        run_tool_calls([("search_person", {"sleep": 0.2}) for _ in range(4)], fake_execute)
+        assert time.time() - start < 0.6
+
+    def test_timeout_returns_error_payload(self, fake_execute, monkeypatch):
+        monkeypatch.setitem(tool_runner.TOOL_TIMEOUTS, "search_meetings", 0.05)
+        results = run_tool_calls([
+            ("search_meetings", {"sleep": 0.3}),
+            ("search_person", {"name": "דנה"}),
+        ], fake_execute)
+        assert "timed out" in json.loads(results[0])["error"]
+        assert results[1] == "search_person:דנה"
+
+    def test_write_tools_run_on_caller_thread(self, fake_execute):
+        run_tool_calls([("save_fact", {}), ("search_person", {"name": "x"})], fake_execute)
+        assert fake_execute.threads["save_fact"] == threading.current_thread().name
+        assert fake_execute.threads["search_person"].startswith("conv-tool")
@@ -0,0 +1,90 @@
+"""
+Unit tests for the post-processing job queue.
+
+Jobs are plain callables that record when they start and finish.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services import post_processing_queue as ppq
+
+
+class _Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = {}
+        self.peak = {}
+
+    def job(self, kind, name, seconds=0.05):
+        def _run():
+            with self.lock:
+                self.started.append(name)
+                self.running[kind] = self.running.get(kind, 0) + 1
+                self.peak[kind] = max(self.peak.get(kind, 0), self.running[kind])
+            time.sleep(seconds)
+            with self.lock:
+                self.running[kind] -= 1
+            return name
+        return _run
+
+
+@pytest.mark.unit
+class TestPostProcessingQueue:
+
+    def test_per_kind_limits(self):
+        queue = ppq.PostProcessingQueue(max_workers=4, limits={"analysis": 2, "render": 1})
+        rec = _Recorder()
+        futures = [queue.submit("analysis", rec.job("analysis", f"a{i}")) for i in range(5)]
+        futures += [queue.submit("render", rec.job("render", f"r{i}")) for i in range(3)]
+        assert queue.wait_idle(timeout=5)
+        assert [f.result() for f in futures[:5]] == [f"a{i}" for i in range(5)]
+        assert rec.peak == {"analysis": 2, "render": 1}
+        metrics = queue.get_metrics()["kinds"]
+        assert metrics["analysis"]["completed"] == 5 and metrics["render"]["limit"] == 1
+
+    def test_priority_order_when_busy(self):
+        queue = ppq.PostProcessingQueue(max_workers=1, limits={"analysis": 1, "render": 1, "drive": 1})
+        rec = _Recorder()
+        gate = threading.Event()
+        queue.submit("analysis", gate.wait)             # Occupies the only worker
+        queue.submit("drive", rec.job("drive", "save"), priority=ppq.PRIORITY_BACKGROUND)
+        queue.submit("analysis", rec.job("analysis", "analysis"), priority=ppq.PRIORITY_NORMAL)
+        queue.submit("render", rec.job("render", "render-1"), priority=ppq.PRIORITY_USER_FACING)
+        queue.submit("render", rec.job("render", "render-2"), priority=ppq.PRIORITY_USER_FACING)
+        gate.set()
+        assert queue.wait_idle(timeout=5)
+        assert rec.started == ["render-1", "render-2", "analysis", "save"]
+
+    def test_job_can_queue_follow_ups_and_failures_are_isolated(self):
+        queue = ppq.PostProcessingQueue(max_workers=2, limits={"analysis": 1, "render": 1})
+        done = []
+
+        def analysis():
+            queue.submit("render", lambda: done.append("render"), priority=ppq.PRIORITY_USER_FACING)
+            return "analysis"
+
+        def broken():
+            raise RuntimeError("Pro call failed")
+
+        ok = queue.submit("analysis", analysis)
+        bad = queue.submit("analysis", broken)
+        assert queue.wait_idle(timeout=5)
+        assert ok.result() == "analysis" and done == ["render"]
+        with pytest.raises(RuntimeError):
+            bad.result()
+        assert queue.get_metrics()["kinds"]["analysis"]["failed"] == 1
+
+    def test_full_queue_rejects(self):
+        queue = ppq.PostProcessingQueue(max_workers=1, limits={"analysis": 1}, max_pending=2)
+        gate = threading.Event()
+        queue.submit("analysis", gate.wait)
+        time.sleep(0.05)                                # Let the worker take it
+        assert queue.submit("analysis", lambda: None) is not None
+        assert queue.submit("analysis", lambda: None) is not None
+        assert queue.submit("analysis", lambda: None) is None
+        gate.set()
+        assert queue.wait_idle(timeout=5)
+        assert queue.get_metrics()["kinds"]["analysis"]["rejected"] == 1
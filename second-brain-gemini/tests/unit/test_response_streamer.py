@@ -0,0 +1,111 @@
+"""
+Unit tests for streaming Conversation Engine replies to WhatsApp.
+"""
+import pytest
+
+from app.services import response_streamer as rs
+
+
+class _Sender:
+    def __init__(self):
+        self.messages = []
+        self.typing = 0
+
+    def send(self, message):
+        self.messages.append(message)
+        return {"success": True}
+
+    def show_typing(self):
+        self.typing += 1
+
+
+def _stream(reply, text, piece=7):
+    for i in range(0, len(text), piece):
+        reply.feed(text[i:i + piece])
+
+
+@pytest.mark.unit
+class TestReplyChunker:
+
+    def test_first_chunk_cut_at_first_sentence_after_minimum(self):
+        chunker = rs.ReplyChunker()
+        first = "א" * rs.FIRST_CHUNK_MIN_CHARS + ". "
+        ready = chunker.feed(first + "המשך המשפט הבא")
+        assert ready == [first.strip()]
+        assert chunker.flush() == ["המשך המשפט הבא"]
+
+    def test_short_text_waits_for_flush(self):
+        chunker = rs.ReplyChunker()
+        assert chunker.feed("תשובה קצרה. ") == []
+        assert chunker.flush() == ["תשובה קצרה."]
+
+    def test_never_exceeds_max_chunk(self):
+        chunker = rs.ReplyChunker()
+        ready = chunker.feed("מילה " * 2000) + chunker.flush()
+        assert all(len(m) <= rs.MAX_CHUNK_CHARS for m in ready)
+        assert " ".join(ready).split() == ["מילה"] * 2000
+
+
+@pytest.mark.unit
+class TestStreamingReply:
+
+    def test_long_answer_sent_in_order_before_completion(self):
+        sender = _Sender()
+        reply = rs.StreamingReply(send=sender.send, typing=sender.show_typing)
+        reply.start()
+        paragraphs = [f"פסקה {i}: " + "טקסט " * 160 + "סוף." for i in range(4)]
+        answer = "\n\n".join(paragraphs)
+
+        _stream(reply, answer)
+        assert sender.messages, "first message must go out before finish()"
+        result = reply.finish(answer)
+
+        assert result["success"] and result["streamed"]
+        assert result["messages"] == len(sender.messages) > 1
+        assert " ".join(sender.messages).split() == answer.split()
+        assert result["first_message_ms"] <= result["complete_ms"]
+        assert sender.typing >= 2
+
+    def test_short_answer_is_one_message(self):
+        sender = _Sender()
+        reply = rs.StreamingReply(send=sender.send)
+        _stream(reply, "שלום! מה שלומך?")
+        reply.finish("שלום! מה שלומך?")
+        assert sender.messages == ["שלום! מה שלומך?"]
+
+    def test_unstreamed_or_fallback_answer_sent_whole(self):
+        sender = _Sender()
+        reply = rs.StreamingReply(send=sender.send)
+        reply.feed("תשובה שנקטעה באמצע")
+        reply.finish("❌ שגיאה בעיבוד ההודעה. נסה שוב.")
+        assert sender.messages == ["❌ שגיאה בעיבוד ההודעה. נסה שוב."]
+
+    def test_tool_round_text_dropped_on_reset(self):
+        sender = _Sender()
+        reply = rs.StreamingReply(send=sender.send)
+        reply.feed("רגע, אני בודק")          # Preamble of a tool-call round
+        reply.feed(None)                      # Function call arrived
+        answer = "דנה מדווחת לאבי. היא בצוות המוצר."
+        _stream(reply, answer)
+        reply.finish(answer)
+        assert sender.messages == [answer]
+
+    def test_long_tool_round_preamble_already_sent_stays_sent(self):
+        sender = _Sender()
+        reply = rs.StreamingReply(send=sender.send)
+        preamble = "רגע, " + "אני בודק את המבנה הארגוני " * 6 + "ואחזור עם תשובה. "
+        _stream(reply, preamble + "עוד רגע")
+        assert sender.messages == [preamble.strip()]
+        reply.feed(None)                      # Function call arrived
+        answer = "דנה מדווחת לאבי."
+        _stream(reply, answer)
+        reply.finish(answer)
+        assert sender.messages == [preamble.strip(), answer]
+
+    def test_metrics_recorded(self):
+        sender = _Sender()
+        reply = rs.StreamingReply(send=sender.send)
+        reply.finish("תשובה")
+        metrics = rs.get_streaming_metrics()
+        assert metrics["replies"] >= 1
+        assert metrics["complete_ms"]["p50"] is not None
@@ -0,0 +1,137 @@
+"""
+Unit tests for the lazy service registry and import-time budget.
+
+Registry tests use throwaway factories — no Gemini/Drive services are built.
+"""
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from app.services import service_registry as registry
+
+
+class _Counter:
+    builds = 0
+
+    def __init__(self):
+        type(self).builds += 1
+        self.value = 42
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    _Counter.builds = 0
+    yield
+    for name in [n for n in registry._registry if n.startswith("test_")]:
+        registry._registry.pop(name, None)
+
+
+@pytest.mark.unit
+class TestLazyService:
+
+    def test_not_built_until_first_access(self):
+        proxy = registry.register("test_lazy", _Counter)
+        assert not proxy.is_built
+        assert _Counter.builds == 0
+
+        assert proxy.value == 42
+        assert proxy.is_built
+        assert _Counter.builds == 1
+
+    def test_attribute_writes_forward_to_instance(self):
+        proxy = registry.register("test_setattr", _Counter)
+        proxy.value = 7
+        assert proxy._get().value == 7
+
+    def test_patch_object_and_del_forward_to_instance(self):
+        proxy = registry.register("test_patch", _Counter)
+        with mock.patch.object(proxy, "value", 1):
+            assert proxy.value == 1
+        assert proxy.value == 42
+        del proxy.value
+        assert not hasattr(proxy._get(), "value")
+
+    def test_concurrent_first_use_builds_once(self):
+        def slow_factory():
+            time.sleep(0.05)
+            return _Counter()
+
+        proxy = registry.register("test_concurrent", slow_factory)
+        threads = [threading.Thread(target=lambda: proxy.value) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert _Counter.builds == 1
+
+    def test_import_path_factory(self):
+        proxy = registry.register("test_path", "collections:OrderedDict")
+        proxy.update(a=1)
+        assert list(proxy.keys()) == ["a"]
+
+    def test_unknown_service_raises(self):
+        with pytest.raises(KeyError):
+            registry.service("test_does_not_exist")
+
+
+@pytest.mark.unit
+class TestWarmup:
+
+    def test_warmup_builds_in_background(self):
+        registry.register("test_warm", _Counter)
+        thread = registry.warmup(["test_warm"])
+        thread.join(timeout=5)
+        assert registry.get_status()["test_warm"]["built"]
+
+    def test_failed_build_does_not_block_others(self):
+        def broken():
+            raise RuntimeError("boom")
+
+        registry.register("test_broken", broken)
+        registry.register("test_ok", _Counter)
+        registry.warmup(["test_broken", "test_ok"], background=False)
+
+        status = registry.get_status()
+        assert not status["test_broken"]["built"]
+        assert status["test_ok"]["built"]
+
+
+@pytest.mark.unit
+class TestImportTime:
+    """Importing app.main must not pull in Gemini SDK or build services."""
+
+    HEAVY_MODULES = ["google.generativeai", "app.services.gemini_service",
+                     "app.services.conversation_engine", "app.services.model_discovery",
+                     "pyannote.audio", "torch"]
+    APP_MAIN_BUDGET_US = 3_000_000     # Cumulative import time of app.main (fastapi dominates)
+
+    @staticmethod
+    def _import_times(stderr: str) -> dict:
+        """-X importtime lines → {module: cumulative µs}."""
+        times = {}
+        for line in stderr.splitlines():
+            match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)", line)
+            if match:
+                times[match.group(4)] = int(match.group(2))
+        return times
+
+    def test_app_main_import_is_light(self):
+        pytest.importorskip("fastapi")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=Path(__file__).resolve().parents[2],
+            capture_output=True, text=True, timeout=60,
+        )
+        assert result.returncode == 0, result.stderr.strip()[-500:]
+
+        times = self._import_times(result.stderr)
+        assert "app.main" in times
+        eager = {m: times[m] for m in self.HEAVY_MODULES if m in times}
+        assert not eager, f"heavy modules imported eagerly (cumulative µs): {eager}"
+        assert times["app.main"] < self.APP_MAIN_BUDGET_US
@@ -0,0 +1,131 @@
+"""
+Unit tests for durable conversation-session checkpoints.
+
+History entries are simple stand-ins for genai.protos.Content — only
+.role and .parts[].text are read.
+"""
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import session_checkpoint as sc
+
+
+def _content(role, *texts, function_call=False):
+    parts = [SimpleNamespace(text=t) for t in texts]
+    if function_call:
+        parts.append(SimpleNamespace(text="", function_call=SimpleNamespace(name="search_person")))
+    return SimpleNamespace(role=role, parts=parts)
+
+
+@pytest.mark.unit
+class TestSerializeHistory:
+
+    def test_tool_turns_are_dropped(self):
+        history = [
+            _content("user", "מי זה יובל?"),
+            _content("model", function_call=True),
+            _content("user", function_call=True),
+            _content("model", "יובל הוא מנהל"),
+        ]
+        assert sc.serialize_history(history, max_turns=20) == [
+            {"role": "user", "parts": ["מי זה יובל?"]},
+            {"role": "model", "parts": ["יובל הוא מנהל"]},
+        ]
+
+    def test_trimmed_to_max_turns_starting_on_user(self):
+        history = []
+        for i in range(10):
+            history += [_content("user", f"q{i}"), _content("model", f"a{i}")]
+        compact = sc.serialize_history(history, max_turns=3)
+        assert [t["parts"][0] for t in compact] == ["q7", "a7", "q8", "a8", "q9", "a9"]
+
+        compact = sc.serialize_history(history[1:], max_turns=10)
+        assert compact[0]["role"] == "user"
+
+
+@pytest.mark.unit
+class TestCheckpointStore:
+
+    def test_flush_and_reload(self, tmp_path):
+        path = tmp_path / "sessions.json"
+        store = sc.SessionCheckpointStore(path=path)
+        store.update("972501234567", history=[{"role": "user", "parts": ["hi"]}], message_count=3)
+        assert store.flush()
+        assert not store.flush()   # nothing dirty
+
+        reloaded = sc.SessionCheckpointStore(path=path)
+        record = reloaded.get("972501234567")
+        assert record["message_count"] == 3
+        assert record["history"][0]["parts"] == ["hi"]
+
+    def test_update_merges_fields(self, tmp_path):
+        store = sc.SessionCheckpointStore(path=tmp_path / "s.json")
+        store.update("p", last_session={"summary": "x"})
+        store.update("p", history=[])
+        record = store.get("p")
+        assert record["last_session"] == {"summary": "x"}
+        assert record["history"] == []
+
+    def test_schema_mismatch_starts_empty(self, tmp_path):
+        path = tmp_path / "s.json"
+        path.write_text(json.dumps({"schema_version": 999, "sessions": {"p": {}}}))
+        assert sc.SessionCheckpointStore(path=path).all_records() == {}
+
+    def test_corrupt_file_starts_empty(self, tmp_path):
+        path = tmp_path / "s.json"
+        path.write_text("{not json")
+        assert sc.SessionCheckpointStore(path=path).get("p") is None
+
+    def test_flush_prunes_expired_state(self, tmp_path):
+        path = tmp_path / "s.json"
+        store = sc.SessionCheckpointStore(path=path, history_ttl_seconds=60, retention_seconds=3600)
+        store.update("fresh", history=[{"role": "user", "parts": ["hi"]}],
+                     history_updated_at=time.time(), message_count=1)
+        store.update("idle", history=[{"role": "user", "parts": ["old"]}],
+                     history_updated_at=time.time() - 120, message_count=4, last_session={"summary": "x"})
+        store.update("gone", last_session={"summary": "y"})
+        store._records["gone"]["updated_at"] = time.time() - 7200
+        assert store.flush()
+
+        records = sc.SessionCheckpointStore(path=path).all_records()
+        assert set(records) == {"fresh", "idle"}
+        assert records["fresh"]["history"]
+        assert records["idle"]["history"] == [] and records["idle"]["last_session"] == {"summary": "x"}
+
+    def test_concurrent_flushes_keep_latest_payload(self, tmp_path):
+        path = tmp_path / "s.json"
+        store = sc.SessionCheckpointStore(path=path)
+
+        def writer(n):
+            for i in range(20):
+                store.update(f"p{n}", message_count=i)
+                store.flush()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        store.flush()
+        on_disk = sc.SessionCheckpointStore(path=path).all_records()
+        assert {p: r["message_count"] for p, r in on_disk.items()} == {f"p{n}": 19 for n in range(4)}
+        assert list(tmp_path.glob("*.tmp")) == []
+
+    def test_unserializable_record_does_not_stop_checkpoints(self, tmp_path):
+        path = tmp_path / "s.json"
+        store = sc.SessionCheckpointStore(path=path, interval_seconds=0.02)
+        store.update("p", working_memory={"speakers": {"not", "json"}})
+        assert store.flush() is False
+        store.start_checkpointing()
+        time.sleep(0.1)
+        assert store._thread.is_alive()
+
+        store.update("p", working_memory={"speakers": ["דנה"]})
+        deadline = time.time() + 2
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert sc.SessionCheckpointStore(path=path).get("p")["working_memory"] == {"speakers": ["דנה"]}
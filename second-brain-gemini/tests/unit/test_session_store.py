@@ -0,0 +1,97 @@
+"""
+Unit tests for the shared TTL-LRU session store.
+
+Time is controlled by patching time.time inside the store module.
+"""
+import pytest
+
+from app.services import session_store
+from app.services.session_store import TTLSessionStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(session_store.time, "time", c)
+    return c
+
+
+@pytest.mark.unit
+class TestExpiry:
+
+    def test_entry_expires_after_ttl(self, clock):
+        store = TTLSessionStore(ttl_seconds=60, max_entries=10)
+        store.put("a", 1)
+        clock.now += 59
+        assert store.get("a", touch=False) == 1
+        clock.now += 2
+        assert store.get("a") is None
+        assert store.stats()["expired_total"] == 1
+
+    def test_touch_extends_ttl(self, clock):
+        store = TTLSessionStore(ttl_seconds=60, max_entries=10)
+        store.put("a", 1)
+        clock.now += 50
+        store.get("a")
+        clock.now += 50
+        assert store.get("a") == 1
+
+    def test_get_or_create_without_touch_keeps_ttl(self, clock):
+        store = TTLSessionStore(ttl_seconds=60, max_entries=10)
+        store.get_or_create("a", dict)
+        clock.now += 50
+        _, created = store.get_or_create("a", dict, touch=False)
+        assert not created
+        clock.now += 20
+        _, created = store.get_or_create("a", dict, touch=False)
+        assert created
+
+    def test_runtime_ttl_change_applies_to_existing(self, clock):
+        store = TTLSessionStore(ttl_seconds=600, max_entries=10)
+        store.put("a", 1)
+        clock.now += 120
+        store.configure(ttl_seconds=60)
+        assert len(store) == 0
+
+
+@pytest.mark.unit
+class TestLRUEviction:
+
+    def test_least_recently_used_is_evicted(self, clock):
+        evicted = []
+        store = TTLSessionStore(ttl_seconds=600, max_entries=2,
+                                on_evict=lambda k, v, reason: evicted.append((k, reason)))
+        store.put("a", 1)
+        clock.now += 1
+        store.put("b", 2)
+        clock.now += 1
+        store.get("a")                 # a is now most recent
+        clock.now += 1
+        store.put("c", 3)
+
+        assert evicted == [("b", "evicted")]
+        assert [k for k, _ in store.items()] == ["a", "c"]
+
+    def test_shrinking_cap_evicts_immediately(self, clock):
+        store = TTLSessionStore(ttl_seconds=600, max_entries=5)
+        for i in range(5):
+            store.put(str(i), i)
+            clock.now += 1
+        store.configure(max_entries=2)
+        assert [k for k, _ in store.items()] == ["3", "4"]
+
+    def test_pop_and_contains(self, clock):
+        store = TTLSessionStore(ttl_seconds=600, max_entries=5)
+        store.put("a", 1)
+        assert "a" in store
+        assert store.pop("a") == 1
+        assert "a" not in store
+        assert store.pop("a") is None
@@ -0,0 +1,118 @@
+"""
+Unit tests for the per-recording pipeline stage DAG.
+
+Stages are plain callables with sleeps standing in for Drive and
+WhatsApp calls.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.stage_dag import StageDAG
+
+
+def _dag():
+    return StageDAG(label="test")
+
+
+@pytest.mark.unit
+class TestStageDAGScheduling:
+
+    def test_independent_stages_overlap_and_deps_get_inputs(self):
+        order, lock = [], threading.Lock()
+
+        def stage(name, value, delay=0.2):
+            def fn(inputs):
+                time.sleep(delay)
+                with lock:
+                    order.append(name)
+                return value
+            return fn
+
+        dag = _dag()
+        dag.add("transcript", stage("transcript", "file-1"))
+        dag.add("facts", stage("facts", ["fact"]))
+        dag.add("memory", lambda inputs: inputs, deps=["transcript"])
+        started = time.time()
+        results = dag.run()
+        assert time.time() - started < 0.35       # transcript and facts ran together
+        assert results["memory"] == {"transcript": "file-1"}
+        assert set(order) == {"transcript", "facts"}
+
+        spans = {s["stage"]: s for s in dag.get_spans()}
+        assert spans["memory"]["start_ms"] >= spans["transcript"]["duration_ms"]
+        assert all(s["status"] == "ok" for s in spans.values())
+
+    def test_unknown_dependency_and_cycle_rejected(self):
+        dag = _dag().add("a", lambda i: 1, deps=["missing"])
+        with pytest.raises(ValueError, match="unknown stage"):
+            dag.run()
+        dag = _dag().add("a", lambda i: 1, deps=["b"]).add("b", lambda i: 1, deps=["a"])
+        with pytest.raises(ValueError, match="cycle"):
+            dag.run()
+
+
+@pytest.mark.unit
+class TestStageDAGPolicies:
+
+    def test_retry_then_success(self):
+        calls = []
+
+        def flaky(inputs):
+            calls.append(1)
+            if len(calls) == 1:
+                raise ConnectionError("reset")
+            return "sent"
+
+        dag = _dag().add("summary", flaky, retries=1, retry_delay=0.01)
+        assert dag.run()["summary"] == "sent"
+        assert dag.get_spans()[0]["attempts"] == 2
+
+    def test_failure_does_not_cancel_dependents(self):
+        def broken(inputs):
+            raise RuntimeError("drive down")
+
+        dag = _dag().add("transcript", broken).add("memory", lambda inputs: inputs, deps=["transcript"])
+        results = dag.run()
+        assert results["transcript"] is None
+        assert results["memory"] == {"transcript": None}
+        spans = {s["stage"]: s for s in dag.get_spans()}
+        assert spans["transcript"]["status"] == "failed" and "drive down" in spans["transcript"]["error"]
+
+    def test_base_exception_marks_stage_failed(self):
+        def interrupted(inputs):
+            raise KeyboardInterrupt()
+
+        dag = _dag().add("send", interrupted, retries=2, retry_delay=0.01)
+        dag.add("after", lambda inputs: inputs, deps=["send"])
+        assert dag.run()["after"] == {"send": None}
+        span = dag.get_spans()[0]
+        assert span["status"] == "failed" and span["attempts"] == 1
+
+    def test_timeout_releases_dependents_and_calls_on_late(self):
+        release, late = threading.Event(), []
+        dag = _dag()
+        dag.add("clips", lambda inputs: release.wait(5) and "slices", timeout=0.1,
+                on_late=late.append)
+        dag.add("after", lambda inputs: inputs, deps=["clips"])
+        started = time.time()
+        results = dag.run()
+        assert time.time() - started < 1
+        assert results["after"] == {"clips": None}
+        assert {s["stage"]: s["status"] for s in dag.get_spans()}["clips"] == "timeout"
+        release.set()
+        deadline = time.time() + 2
+        while not late and time.time() < deadline:
+            time.sleep(0.01)
+        assert late == ["slices"]
+
+    def test_runs_do_not_share_workers(self):
+        # A hung stage in one run must not delay another run's stages
+        release = threading.Event()
+        hung = _dag().add("send", lambda inputs: release.wait(5), timeout=0.1)
+        hung.run()
+        started = time.time()
+        results = _dag().add("a", lambda i: 1).add("b", lambda i: 2).run()
+        release.set()
+        assert results == {"a": 1, "b": 2} and time.time() - started < 0.5
@@ -0,0 +1,139 @@
+"""
+Unit tests for the startup warm-up DAG and readiness gate.
+
+Tasks are sleeps/recorders — no Drive, KB or Gemini involved.
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.startup_orchestrator import StartupOrchestrator
+
+
+def _sleeper(seconds, log=None, name=None):
+    def run():
+        time.sleep(seconds)
+        if log is not None:
+            log.append(name)
+    return run
+
+
+@pytest.mark.unit
+class TestStartupDAG:
+
+    def test_independent_tasks_run_concurrently(self):
+        orch = StartupOrchestrator()
+        for i in range(4):
+            orch.add(f"t{i}", _sleeper(0.2))
+        start = time.time()
+        orch.start()
+        assert orch.wait_all(timeout=5)
+        assert time.time() - start < 0.6   # max(tasks), not sum (0.8s)
+
+    def test_dependencies_run_after_their_deps(self):
+        log = []
+        orch = StartupOrchestrator()
+        orch.add("kb", _sleeper(0.1, log, "kb"))
+        orch.add("memory", _sleeper(0.05, log, "memory"))
+        orch.add("engine", _sleeper(0, log, "engine"), deps=["kb", "memory"])
+        orch.start()
+        assert orch.wait_all(timeout=5)
+        assert log[-1] == "engine"
+
+    def test_failed_task_is_recorded_and_dependents_still_run(self):
+        ran = threading.Event()
+
+        def broken():
+            raise RuntimeError("Drive down")
+
+        orch = StartupOrchestrator(retry_base=60)
+        orch.add("memory", broken)
+        orch.add("engine", ran.set, deps=["memory"])
+        orch.start()
+        assert orch.wait_all(timeout=5)
+
+        status = orch.get_status()
+        assert status["tasks"]["memory"]["status"] == "failed"
+        assert "Drive down" in status["tasks"]["memory"]["error"]
+        assert ran.is_set()
+        assert status["ready"]
+        assert not status["healthy"] and status["failed_critical"] == ["memory"]
+
+    def test_per_task_timing_reported(self):
+        orch = StartupOrchestrator()
+        orch.add("slow", _sleeper(0.1))
+        orch.start()
+        orch.wait_all(timeout=5)
+        assert orch.get_status()["tasks"]["slow"]["duration_ms"] >= 100
+
+
+@pytest.mark.unit
+class TestReadinessGate:
+
+    def test_ready_waits_for_critical_only(self):
+        release = threading.Event()
+        orch = StartupOrchestrator()
+        orch.add("critical", _sleeper(0.05))
+        orch.add("background", release.wait, critical=False)
+        orch.start()
+
+        assert orch.wait_ready(timeout=5)
+        status = orch.get_status()
+        assert status["ready"] and not status["complete"]
+
+        release.set()
+        assert orch.wait_all(timeout=5)
+
+    def test_failed_critical_task_retried_until_healthy(self):
+        calls = []
+
+        def flaky():
+            calls.append(time.time())
+            if len(calls) < 3:
+                raise ConnectionError("Drive reset")
+
+        orch = StartupOrchestrator(retry_base=0.05)
+        orch.add("knowledge_base", flaky)
+        orch.start()
+        assert orch.wait_all(timeout=5)
+        assert not orch.get_status()["healthy"]
+
+        deadline = time.time() + 5
+        while not orch.get_status()["healthy"] and time.time() < deadline:
+            time.sleep(0.01)
+        status = orch.get_status()
+        assert status["healthy"] and status["failed_critical"] == []
+        assert status["tasks"]["knowledge_base"]["attempts"] == 3
+        assert calls[2] - calls[1] >= calls[1] - calls[0] >= 0.04
+
+    def test_failed_background_task_keeps_app_healthy(self):
+        def broken():
+            raise RuntimeError("pyannote models failed to load")
+
+        orch = StartupOrchestrator()
+        orch.add("critical", _sleeper(0))
+        orch.add("pyannote_models", broken, critical=False)
+        orch.start()
+        assert orch.wait_all(timeout=5)
+        status = orch.get_status()
+        assert status["healthy"] and status["failed_critical"] == []
+        assert status["tasks"]["pyannote_models"]["status"] == "failed"
+
+    def test_not_ready_before_start(self):
+        orch = StartupOrchestrator()
+        orch.add("task", _sleeper(0))
+        assert not orch.is_ready
+
+    def test_unknown_dependency_rejected(self):
+        orch = StartupOrchestrator()
+        orch.add("engine", _sleeper(0), deps=["missing"])
+        with pytest.raises(ValueError):
+            orch.start()
+
+    def test_cycle_rejected(self):
+        orch = StartupOrchestrator()
+        orch.add("a", _sleeper(0), deps=["b"])
+        orch.add("b", _sleeper(0), deps=["a"])
+        with pytest.raises(ValueError):
+            orch.start()
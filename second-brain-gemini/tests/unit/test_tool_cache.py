@@ -0,0 +1,74 @@
+"""
+Unit tests for the versioned ConversationEngine tool-result cache.
+"""
+import json
+
+import pytest
+
+from app.services import tool_cache as tc
+
+
+class _Counter:
+    def __init__(self, result='{"found": true}'):
+        self.calls = 0
+        self.result = result
+
+    def __call__(self, name, args):
+        self.calls += 1
+        return self.result
+
+
+@pytest.mark.unit
+class TestToolResultCache:
+
+    def test_repeat_call_is_served_from_cache(self):
+        cache = tc.ToolResultCache()
+        execute = _Counter()
+        cache.call("search_person", {"name": "יובל"}, execute)
+        cache.call("search_person", {"name": "  יובל "}, execute)
+        assert execute.calls == 1
+        assert cache.stats()["hits"] == 1
+
+    def test_kb_bump_invalidates_only_kb_tools(self):
+        cache = tc.ToolResultCache()
+        person, meetings = _Counter(), _Counter()
+        cache.call("search_person", {"name": "יובל"}, person)
+        cache.call("search_meetings", {"query": "תקציב"}, meetings)
+
+        tc.bump_data_version("kb", "test")
+        cache.call("search_person", {"name": "יובל"}, person)
+        cache.call("search_meetings", {"query": "תקציב"}, meetings)
+        assert person.calls == 2
+        assert meetings.calls == 1
+
+        tc.bump_data_version("meetings", "test")
+        cache.call("search_meetings", {"query": "תקציב"}, meetings)
+        assert meetings.calls == 2
+
+    def test_writes_and_uncached_tools_always_execute(self):
+        cache = tc.ToolResultCache()
+        execute = _Counter()
+        for _ in range(2):
+            cache.call("save_fact", {"person_name": "x", "field": "title", "value": "y"}, execute)
+            cache.call("search_flights", {"destination": "Rome"}, execute)
+        assert execute.calls == 4
+        assert cache.stats()["entries"] == 0
+
+    def test_error_results_are_not_cached(self):
+        cache = tc.ToolResultCache()
+        execute = _Counter(json.dumps({"error": "Drive service not available"}))
+        cache.call("search_notebook", {"query": "x"}, execute)
+        cache.call("search_notebook", {"query": "x"}, execute)
+        assert execute.calls == 2
+
+    def test_ttl_and_lru_bound(self):
+        cache = tc.ToolResultCache(ttl_seconds=0, max_entries=2)
+        execute = _Counter()
+        cache.call("get_reports", {"manager_name": "a"}, execute)
+        cache.call("get_reports", {"manager_name": "a"}, execute)
+        assert execute.calls == 2   # expired immediately
+
+        cache = tc.ToolResultCache(max_entries=2)
+        for name in ("a", "b", "c"):
+            cache.call("get_reports", {"manager_name": name}, execute)
+        assert cache.stats()["entries"] == 2
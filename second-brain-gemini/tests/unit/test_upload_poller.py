@@ -0,0 +1,154 @@
+"""
+Unit tests for adaptive, batched upload readiness polling.
+
+get_file is a fake that reports PROCESSING until a file's scripted
+ready time.
+"""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import upload_poller as up
+
+
+def _ref(name, state="PROCESSING"):
+    return SimpleNamespace(name=name, state=SimpleNamespace(name=state))
+
+
+class _FakeFiles:
+    def __init__(self, ready_after, failed=()):
+        self.start = time.time()
+        self.ready_after = ready_after
+        self.failed = set(failed)
+        self.calls = []
+
+    def get_file(self, name):
+        self.calls.append((name, time.time() - self.start))
+        if name in self.failed:
+            return _ref(name, "FAILED")
+        ready = time.time() - self.start >= self.ready_after[name]
+        return _ref(name, "ACTIVE" if ready else "PROCESSING")
+
+
+def _pending(name, mime="audio/mp3", size=100_000):
+    return up.PendingFile(file_ref=_ref(name), display_name=name, mime_type=mime, size_bytes=size)
+
+
+@pytest.mark.unit
+class TestPollUntilActive:
+
+    def test_batch_waits_in_one_loop_and_keeps_order(self):
+        files = _FakeFiles({"files/a": 0.3, "files/b": 0.05, "files/c": 0.6})
+        start = time.time()
+        ready = up.poll_until_active([_pending("files/a"), _pending("files/b", "image/png"),
+                                      _pending("files/c")],
+                                     get_file=files.get_file, model=up.ProcessingTimeModel())
+        assert [r.name for r in ready] == ["files/a", "files/b", "files/c"]
+        assert all(r.state.name == "ACTIVE" for r in ready)
+        # Polled together: total time tracks the slowest file, not the sum
+        assert time.time() - start < 0.6 + up.MAX_INTERVAL_SECONDS
+
+    def test_short_clip_checked_quickly_and_backoff_grows(self, monkeypatch):
+        monkeypatch.setattr(up, "DEFAULT_PROFILES", {**up.DEFAULT_PROFILES, "audio": (0.0, 0.0)})
+        files = _FakeFiles({"files/clip": 1.2})
+        up.poll_until_active([_pending("files/clip")], get_file=files.get_file,
+                             model=up.ProcessingTimeModel())
+        times = [t for _, t in files.calls]
+        assert times[0] < 0.5
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        assert gaps == sorted(gaps)
+        assert len(files.calls) < 1.2 / up.INITIAL_INTERVAL_SECONDS
+
+    def test_already_active_is_not_polled(self):
+        files = _FakeFiles({})
+        item = _pending("files/done")
+        item.file_ref = _ref("files/done", "ACTIVE")
+        assert up.poll_until_active([item], get_file=files.get_file)[0] is item.file_ref
+        assert files.calls == []
+
+    def test_failed_and_timeout(self):
+        files = _FakeFiles({"files/x": 0}, failed={"files/x"})
+        with pytest.raises(ValueError):
+            up.poll_until_active([_pending("files/x")], get_file=files.get_file)
+
+        slow = _FakeFiles({"files/slow": 60})
+        with pytest.raises(TimeoutError):
+            up.poll_until_active([_pending("files/slow", mime="image/png")],
+                                 get_file=slow.get_file, max_wait=0.5)
+
+
+@pytest.mark.unit
+class TestProcessingTimeModel:
+
+    def test_defaults_scale_with_size(self):
+        model = up.ProcessingTimeModel()
+        small = model.first_check_delay("audio/ogg", 50_000)
+        large = model.first_check_delay("audio/mp3", 50_000_000)
+        assert up.INITIAL_INTERVAL_SECONDS <= small < large <= up.MAX_FIRST_CHECK_SECONDS
+
+    def test_learns_from_observations(self):
+        model = up.ProcessingTimeModel()
+        for mb in (1, 5, 10, 20, 40):
+            model.observe("audio/mp3", mb * 1_000_000, 2.0 + 0.5 * mb)
+        assert model.predict("audio/mp3", 30_000_000) == pytest.approx(17.0, rel=0.01)
+        assert model.snapshot()["audio"]["samples"] == 5
+        # Other kinds keep their defaults
+        assert model.predict("image/png", 0) == up.DEFAULT_PROFILES["image"][0]
+
+
+@pytest.mark.unit
+class TestUploadAll:
+
+    def _uploader(self, delay=0.3, fail=()):
+        def _upload(name):
+            time.sleep(delay)
+            if name in fail:
+                raise ConnectionError(f"upload of {name} reset")
+            return _pending(name)
+        return _upload
+
+    def test_uploads_run_concurrently(self, monkeypatch):
+        monkeypatch.setattr(up, "DEFAULT_PROFILES", {**up.DEFAULT_PROFILES, "audio": (0.0, 0.0)})
+        names = [f"files/f{i}" for i in range(up.UPLOAD_WORKERS)]
+        files = _FakeFiles({name: 0 for name in names})
+        start = time.time()
+        batch = up.upload_all(names, self._uploader(), get_file=files.get_file,
+                              model=up.ProcessingTimeModel())
+        elapsed = time.time() - start
+        assert [r.name for r in batch.refs_or_raise()] == names
+        assert elapsed < 0.3 * len(names) * 0.6
+        assert batch.timing["sequential_estimate_s"] >= 0.3 * len(names)
+        assert batch.timing["uploads_s"] < batch.timing["sequential_estimate_s"]
+
+    def test_errors_are_isolated_per_file(self):
+        names = ["files/ok", "files/broken-upload", "files/failed-processing", "files/ok2"]
+        files = _FakeFiles({"files/ok": 0.1, "files/ok2": 0, "files/failed-processing": 0},
+                           failed={"files/failed-processing"})
+        batch = up.upload_all(names, self._uploader(delay=0.05, fail={"files/broken-upload"}),
+                              get_file=files.get_file, model=up.ProcessingTimeModel())
+        assert [r.name if r else None for r in batch.refs] == ["files/ok", None, None, "files/ok2"]
+        assert isinstance(batch.errors[1], ConnectionError)
+        assert isinstance(batch.errors[2], ValueError)
+        assert 2 in batch.pending and 1 not in batch.pending
+        assert batch.timing["failed"] == 2
+        assert [f["ok"] for f in batch.timing["files"]] == [True, False, False, True]
+        with pytest.raises(ConnectionError):
+            batch.refs_or_raise()
+
+    def test_upload_finishing_after_timeout_goes_to_on_late(self):
+        names = ["files/fast", "files/slow"]
+        files = _FakeFiles({"files/fast": 0, "files/slow": 0})
+        late = []
+
+        def _upload(name):
+            time.sleep(0.6 if name == "files/slow" else 0.01)
+            return _pending(name)
+
+        batch = up.upload_all(names, _upload, get_file=files.get_file, max_wait=0.2,
+                              model=up.ProcessingTimeModel(), on_late=late.append)
+        assert isinstance(batch.errors[1], TimeoutError) and 1 not in batch.pending
+        deadline = time.time() + 2
+        while not late and time.time() < deadline:
+            time.sleep(0.01)
+        assert [item.display_name for item in late] == ["files/slow"]
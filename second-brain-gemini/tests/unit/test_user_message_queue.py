@@ -0,0 +1,95 @@
+"""
+Unit tests for the per-user message queue (ordering, parallelism, backpressure).
+"""
+import threading
+import time
+
+import pytest
+
+from app.services.user_message_queue import UserMessageQueue
+
+
+@pytest.mark.unit
+class TestPerUserOrdering:
+
+    def test_same_user_processed_in_order_never_concurrently(self):
+        queue = UserMessageQueue(max_workers=4, max_pending_per_user=50)
+        log, active = [], []
+
+        def handle(i):
+            active.append(i)
+            assert len(active) == 1, "two messages for one user ran concurrently"
+            time.sleep(0.01)
+            log.append(i)
+            active.remove(i)
+            return i
+
+        futures = [queue.submit("972500000001", handle, i) for i in range(10)]
+        assert [f.result(timeout=5) for f in futures] == list(range(10))
+        assert log == list(range(10))
+
+    def test_different_users_run_in_parallel(self):
+        queue = UserMessageQueue(max_workers=4)
+        start = time.time()
+        futures = [queue.submit(f"97250000000{i}", time.sleep, 0.2) for i in range(4)]
+        for f in futures:
+            f.result(timeout=5)
+        assert time.time() - start < 0.6
+
+    def test_exception_propagates_and_queue_keeps_going(self):
+        queue = UserMessageQueue(max_workers=2)
+
+        def boom():
+            raise RuntimeError("gemini down")
+
+        bad = queue.submit("u1", boom)
+        good = queue.submit("u1", lambda: "ok")
+        with pytest.raises(RuntimeError):
+            bad.result(timeout=5)
+        assert good.result(timeout=5) == "ok"
+
+
+@pytest.mark.unit
+class TestBackpressure:
+
+    def test_user_queue_full_returns_none(self):
+        queue = UserMessageQueue(max_workers=1, max_pending_per_user=2)
+        release = threading.Event()
+        first = queue.submit("u1", release.wait)
+        time.sleep(0.05)   # first item is now running, not pending
+
+        assert queue.submit("u1", lambda: 1) is not None
+        assert queue.submit("u1", lambda: 2) is not None
+        assert queue.submit("u1", lambda: 3) is None
+        # Other users are not affected by u1's backlog
+        assert queue.submit("u2", lambda: 4) is not None
+
+        release.set()
+        first.result(timeout=5)
+
+    def test_metrics_report_depth_and_rejections(self):
+        queue = UserMessageQueue(max_workers=1, max_pending_per_user=1)
+        release = threading.Event()
+        queue.submit("972501234567", release.wait)
+        time.sleep(0.05)
+        queue.submit("972501234567", lambda: None)
+        queue.submit("972501234567", lambda: None)
+
+        metrics = queue.get_metrics()
+        user = metrics["users"]["972501234567"]
+        assert user["depth"] == 1
+        assert user["rejected"] == 1
+        assert metrics["pending_total"] == 1
+
+        release.set()
+        time.sleep(0.1)
+        assert queue.get_metrics()["users"]["972501234567"]["processed"] == 2
+
+    def test_metrics_not_merged_for_shared_suffix(self):
+        queue = UserMessageQueue(max_workers=2)
+        queue.submit("972501234567", lambda: None).result(timeout=5)
+        queue.submit("972541234567", lambda: None).result(timeout=5)
+        time.sleep(0.05)
+        users = queue.get_metrics()["users"]
+        assert users["972501234567"]["processed"] == 1
+        assert users["972541234567"]["processed"] == 1